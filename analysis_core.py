@@ -0,0 +1,124 @@
+"""
+分析パイプライン（Streamlitに依存しない部分）
+企業デジタル分析ツール用
+
+URL正規化 → ページ取得 → DOM分析 → スコアリング → CSV化 までをまとめる。
+app.py（画面）と analyze_cli.py（夜間バッチ等のヘッドレス実行）の両方から使う。
+"""
+
+import csv
+import datetime
+import io
+from urllib.parse import urlparse
+
+import requests
+
+from page_analyzer import analyze_page
+from parser_backend import parse_html
+from response_cache import cached_fetch
+from results_store import score_or_reuse
+from scoring import calculate_score, check_https, judge
+
+HEADERS_REQ = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
+TIMEOUT = 15
+URL_SUFFIXES = [".jp", ".com", ".co.jp", ".net", ".org", ".io"]
+CSV_FIELDS = ["分析日時","URL","スコア","ランク","判定","業種","HTTPS","タイトル","description","viewport","OGP","H1数","リンク総数","内部","外部","SNS数","SNS一覧","採用","フォーム","電話","メール","Analytics","構造化データ","画像数","alt未設定"]
+
+
+def normalize_url(url):
+    url = url.strip()
+    if not url: return ""
+    if not url.startswith(("http://","https://")): url = "https://" + url
+    if not urlparse(url).path: url += "/"
+    return url
+
+
+def extract_urls(content):
+    """CSVの各行から、URLらしい最初のセルを取り出す"""
+    urls = []
+    for line in content.strip().split("\n"):
+        for cell in line.split(","):
+            cell = cell.strip().strip('"')
+            if cell.startswith(("http://","https://")) or "." in cell:
+                if any(cell.endswith(d) or d+"/" in cell for d in URL_SUFFIXES) or cell.startswith("http"):
+                    urls.append(cell)
+                    break
+    return urls
+
+
+def get_page_safely(url, cache=None, session=requests, timeout=TIMEOUT):
+    """
+    ページ本文を取得する。通信エラーは例外ではなくエラーメッセージで返す。
+
+    Returns:
+        tuple: (HTML文字列, None) または (None, エラーメッセージ)
+    """
+    try:
+        text,_ = cached_fetch(url, cache, headers=HEADERS_REQ, timeout=timeout, session=session)
+        return text, None
+    except requests.exceptions.ConnectionError: return None, "接続エラー"
+    except requests.exceptions.Timeout: return None, "タイムアウト"
+    except requests.exceptions.HTTPError as e: return None, f"HTTP {e.response.status_code}"
+    except requests.exceptions.RequestException as e: return None, f"エラー: {str(e)[:80]}"
+
+
+def score_page(url, text, backend="auto"):
+    pg=analyze_page(parse_html(text,backend),url)  # DOMを1回だけ走査して5項目を分析
+    seo,lnk,cnt,tch,cat=pg["seo"],pg["links"],pg["contact"],pg["tech"],pg["category"]
+    sc,det=calculate_score(url,seo,lnk,cnt,tch)
+    rk,rl,rc=judge(sc)
+    return {"url":url,"domain":urlparse(url).netloc,"score":sc,"rank":rk,"rank_label":rl,"rank_class":rc,"details":det,"seo":seo,"links":lnk,"contact":cnt,"tech":tch,"category":cat}
+
+
+def run_analysis(url, cache=None, session=requests, store=None, backend="auto", timeout=TIMEOUT):
+    """
+    1URLを分析する。
+
+    Args:
+        url: 分析するURL（スキーム省略可）
+        cache: ResponseCache（Noneならキャッシュなし）
+        session: HttpSession / requests.Session 等
+        store: ResultsStore（Noneなら保存・再利用なし）
+        backend: HTMLパーサー（auto / selectolax / lxml / html.parser）
+        timeout: タイムアウト秒数
+
+    Returns:
+        tuple: (結果dict, None) または (None, エラーメッセージ)
+    """
+    url=normalize_url(url)
+    if not url: return None,"URLを入力してください"
+    text,err=get_page_safely(url,cache,session,timeout)
+    if err: return None,err
+    # 本文が前回と同じなら保存済みの結果を再利用（storeがあれば結果はすべてDBに保存）
+    now=datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+    result,reused=score_or_reuse(url,text,store,lambda t: score_page(url,t,backend),now)
+    return dict(result,reused=reused),None
+
+
+def csv_row(r):
+    """結果dictをCSVの1行（CSV_FIELDS順のdict）にする"""
+    return {
+        "分析日時":r["analyzed_at"],"URL":r["url"],"スコア":r["score"],"ランク":r["rank"],
+        "判定":r["rank_label"],"業種":r["category"],
+        "HTTPS":"○" if check_https(r["url"]) else "×","タイトル":r["seo"]["title"],
+        "description":"○" if r["seo"]["description_length"]>0 else "×",
+        "viewport":"○" if r["seo"]["has_viewport"] else "×",
+        "OGP":"○" if r["seo"]["has_ogp"] else "×","H1数":r["seo"]["h1_count"],
+        "リンク総数":r["links"]["total_links"],"内部":r["links"]["internal_links"],
+        "外部":r["links"]["external_links"],"SNS数":r["links"]["sns_count"],
+        "SNS一覧":" / ".join(r["links"]["sns_links"].keys()),
+        "採用":"○" if r["links"]["recruit_found"] else "×",
+        "フォーム":"○" if r["contact"]["has_form"] else "×","電話":r["contact"]["phone_number"],
+        "メール":"○" if r["contact"]["has_email_link"] else "×",
+        "Analytics":"○" if r["tech"]["has_analytics"] else "×",
+        "構造化データ":"○" if r["tech"]["has_structured_data"] else "×",
+        "画像数":r["tech"]["image_count"],"alt未設定":r["tech"]["images_without_alt"],
+    }
+
+
+def generate_csv(results):
+    buf = io.StringIO()
+    w = csv.DictWriter(buf, fieldnames=CSV_FIELDS); w.writeheader()
+    for r in results:
+        w.writerow(csv_row(r))
+    return buf.getvalue()
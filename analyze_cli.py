@@ -0,0 +1,192 @@
+"""
+ヘッドレス一括分析（CLI）
+企業デジタル分析ツール用
+
+Streamlitを起動せずに、URLリスト / CSVを分析してCSV / JSONL / Parquetに1件ずつ書き出す。
+夜間の大量スコアリング向けに、プロセスプールで並列に処理できる。
+
+使い方:
+    python analyze_cli.py urls.txt -o results.csv
+    python analyze_cli.py sales_list.csv -o results.jsonl --processes 4 --workers 8
+    python analyze_cli.py urls.txt -o results.csv.gz --resume   # 中断したバッチの続きから
+    cat urls.txt | python analyze_cli.py - > results.csv
+
+  - 同じホストのURLは同じチャンク（＝同じプロセス）に入れるので、ホスト単位のアクセス間隔は守られる
+  - 結果は完了したものから書き出す（全件をメモリに溜めない。出力形式は exporter.py）。
+    プロセスプールでもワーカーが1件ごとにキューで親プロセスに送るので、チャンクの完了を待たない
+  - エラーのURLは標準エラーに出力（JSONLでは {"url", "error"} の行も出力）
+"""
+
+import argparse
+import multiprocessing
+import os
+import queue
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import analysis_core
+from analysis_core import extract_urls
+from batch_runner import DEFAULT_HOST_INTERVAL, DEFAULT_WORKERS, BatchRunner, host_of
+from exporter import FORMATS, ResultExporter
+from http_session import HttpSession
+from response_cache import ResponseCache
+from results_store import ResultsStore
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_PATH = os.path.join(BASE_DIR, ".cache", "http_cache.sqlite3")
+DEFAULT_RESULTS_PATH = os.path.join(BASE_DIR, "data", "results.sqlite3")
+DEFAULT_CHUNK_SIZE = 200
+RESULT_POLL_SEC = 0.5  # 結果キューが空のときにワーカーの終了・異常を確認する間隔
+
+# ワーカープロセスごとの接続・キャッシュ（_init_worker で生成）
+_worker = {}
+
+
+def read_urls(path):
+    """URLリスト（1行1URL）またはCSVを読み込む。"-" なら標準入力"""
+    if path == "-":
+        content = sys.stdin.read()
+    else:
+        with open(path, encoding="utf-8-sig") as f:
+            content = f.read()
+    if path.lower().endswith(".csv"):
+        return extract_urls(content)
+    return [u.strip() for u in content.splitlines() if u.strip() and not u.startswith("#")]
+
+
+def chunk_by_host(urls, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    URLをチャンクに分ける。同じホストのURLは必ず同じチャンクに入れる。
+
+    Returns:
+        list[list[str]]: チャンクのリスト（元の順序をなるべく保つ）
+    """
+    groups = {}
+    for u in urls:
+        groups.setdefault(host_of(u), []).append(u)
+    chunks, current = [], []
+    for group in groups.values():
+        if current and len(current) + len(group) > chunk_size:
+            chunks.append(current)
+            current = []
+        current.extend(group)
+    if current: chunks.append(current)
+    return chunks
+
+
+def _init_worker(config, results=None):
+    """ワーカープロセスの初期化（プロセスごとにセッション・キャッシュ・DBを1つだけ開く）"""
+    _worker.clear()
+    _worker["config"] = config
+    _worker["results"] = results
+    _worker["session"] = HttpSession(pool_size=config["workers"], headers=analysis_core.HEADERS_REQ)
+    _worker["cache"] = ResponseCache(config["cache_path"]) if config["cache_path"] else None
+    _worker["store"] = ResultsStore(config["results_path"]) if config["results_path"] else None
+
+
+def _analyze(url):
+    c = _worker["config"]
+    return analysis_core.run_analysis(url, cache=_worker["cache"], session=_worker["session"],
+                                      store=_worker["store"], backend=c["backend"], timeout=c["timeout"])
+
+
+def _analyze_chunk(urls):
+    """1チャンクをスレッドプールで分析し、完了したものから結果キューに送る（ワーカープロセス内で実行）
+
+    Returns:
+        int: 結果キューに送った件数
+    """
+    c = _worker["config"]
+    runner = BatchRunner(max_workers=c["workers"], host_interval=c["host_interval"])
+    count = 0
+    for item in runner.run(urls, _analyze):
+        _worker["results"].put(item)
+        count += 1
+    return count
+
+
+def analyze_stream(urls, config, processes=1):
+    """
+    URLを分析し、完了したものから (url, result, error) をyieldする。
+
+    Args:
+        urls: URLのリスト
+        config: workers / host_interval / backend / timeout / cache_path / results_path のdict
+        processes: プロセス数（1ならこのプロセス内でスレッドのみ）
+
+    プロセスプールでは、ワーカーが1件ごとに結果キューへ送ったものをそのままyieldする。
+    ワーカーが異常終了したら、それまでに届いた結果をyieldしてから例外を投げる。
+    """
+    if processes <= 1:
+        _init_worker(config)
+        runner = BatchRunner(max_workers=config["workers"], host_interval=config["host_interval"])
+        yield from runner.run(urls, _analyze)
+        return
+    chunks = chunk_by_host(urls, config.get("chunk_size", DEFAULT_CHUNK_SIZE))
+    results = multiprocessing.Queue()
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(config, results)) as pool:
+        futures = [pool.submit(_analyze_chunk, ch) for ch in chunks]
+        received = 0
+        while True:
+            try:
+                item = results.get(timeout=RESULT_POLL_SEC)
+            except queue.Empty:
+                if not all(f.done() for f in futures):
+                    continue
+                # 全チャンクが終わった（異常終了なら例外）。送信途中の結果が残っていれば待つ
+                if received >= sum(f.result() for f in futures):
+                    break
+                continue
+            received += 1
+            yield item
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="企業サイトのデジタル成熟度を一括分析する（Streamlitなし）")
+    p.add_argument("input", help="URLリスト（1行1URL）またはCSV。- で標準入力")
+    p.add_argument("-o", "--output", default="-", help="出力ファイル（.csv / .jsonl / .parquet、.gz で圧縮）。省略時は標準出力")
+    p.add_argument("-f", "--format", choices=FORMATS, help="出力形式（省略時は拡張子から判断、標準出力ならcsv）")
+    p.add_argument("--resume", action="store_true", help="出力ファイルにあるドメインを飛ばして続きから追記する")
+    p.add_argument("-p", "--processes", type=int, default=1, help="プロセス数")
+    p.add_argument("-w", "--workers", type=int, default=DEFAULT_WORKERS, help="プロセスあたりの同時実行数")
+    p.add_argument("--host-interval", type=float, default=DEFAULT_HOST_INTERVAL, help="同一ホストへのアクセス間隔（秒）")
+    p.add_argument("--backend", default="auto", help="HTMLパーサー（auto / selectolax / lxml / html.parser）")
+    p.add_argument("--timeout", type=float, default=analysis_core.TIMEOUT, help="タイムアウト秒数")
+    p.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="プロセスに渡す1チャンクのURL数")
+    p.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="HTTPキャッシュのパス（空文字で無効）")
+    p.add_argument("--results-db", default=DEFAULT_RESULTS_PATH, help="結果DBのパス（空文字で無効）")
+    return p
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    urls = read_urls(args.input)
+    config = {
+        "workers": args.workers, "host_interval": args.host_interval, "backend": args.backend,
+        "timeout": args.timeout, "chunk_size": args.chunk_size,
+        "cache_path": args.cache, "results_path": args.results_db,
+    }
+    ok = errors = 0
+    start = time.perf_counter()
+    with ResultExporter(args.output, args.format, resume=args.resume, stream=sys.stdout) as exporter:
+        if args.resume:
+            before = len(urls)
+            urls = [u for u in urls if not exporter.is_done(u)]
+            print(f"再開: 出力済み {before - len(urls)}件をスキップ", file=sys.stderr)
+        for url, result, error in analyze_stream(urls, config, args.processes):
+            exporter.write(url, result, error)
+            if error:
+                errors += 1
+                print(f"{url}: {error}", file=sys.stderr)
+            else:
+                ok += 1
+    elapsed = time.perf_counter() - start
+    print(f"完了: {ok + errors}件（成功 {ok} / エラー {errors}）{elapsed:.1f}秒 "
+          f"{(ok + errors) / elapsed if elapsed > 0 else 0:.2f} URL/秒", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
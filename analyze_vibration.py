@@ -7,6 +7,9 @@
   2. CSVファイルをコマンドライン引数で指定可能
   3. エラー発生時もSlackにエラー通知を送信
   4. ログ出力をloggingモジュールに統一
+
+matplotlib・pandas・scipy.signal は使う処理の中で読み込む
+（--no-plot の定期実行では matplotlib を読み込まない）。
 """
 
 import argparse
@@ -14,14 +17,24 @@ import glob
 import json
 import logging
 import os
+import signal as os_signal
 import sys
+import threading
 import urllib.request
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
-from scipy import signal
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# セグメント統計量・フィルタ係数などのキャッシュは predictive-maintenance-api と共有する
+from api_shared import EPS, dsp_cache, segment_stats  # noqa: E402
+from vibration_stream import CHUNK_ROWS  # noqa: E402
+from vibration_watch import (  # noqa: E402
+    POLL_INTERVAL, ProcessedLedger, open_watcher, watch_directory,
+)
 
 # ── ログ設定 ──────────────────────────────────────────────────
 logging.basicConfig(
@@ -129,6 +142,8 @@ def load_csv(file_path: str) -> tuple:
         raise FileNotFoundError(
             f"CSVファイルが見つかりません: {file_path}"
         )
+    import pandas as pd
+
     logger.info(f"読み込み: {os.path.basename(file_path)}")
     df = pd.read_csv(file_path)
     df["timestamp_s"] = df["timestamp_us"] / 1e6
@@ -138,6 +153,42 @@ def load_csv(file_path: str) -> tuple:
     return df, os.path.basename(file_path)
 
 
+def load_axis(file_path: str, axis: str = "az") -> tuple:
+    """指定されたCSVファイルから1軸だけを読み込む。
+
+    pandas を読み込まずに済むので、プロットしない実行
+    （--no-plot・常駐モード）ではこちらを使う。
+
+    Args:
+        file_path: CSVファイルの絶対パス
+        axis: 読み込む軸名
+
+    Returns:
+        tuple: (1軸の配列, ファイル名)
+
+    Raises:
+        FileNotFoundError: ファイルが存在しない場合
+        ValueError: 列が無い場合
+    """
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(
+            f"CSVファイルが見つかりません: {file_path}"
+        )
+    logger.info(f"読み込み: {os.path.basename(file_path)}")
+    with open(file_path, encoding="utf-8-sig") as f:
+        header = [c.strip() for c in f.readline().split(",")]
+    if axis not in header:
+        raise ValueError(f"列 {axis} がありません: {file_path}")
+    values = np.loadtxt(
+        file_path, delimiter=",", skiprows=1,
+        usecols=header.index(axis), ndmin=1,
+    )
+    logger.info(
+        f"  行数: {len(values)} / 時間: {len(values) / FS:.1f}秒"
+    )
+    return values, os.path.basename(file_path)
+
+
 def load_latest_csv(data_dir: str) -> tuple:
     """指定ディレクトリから最新のCSVファイルを読み込む。
 
@@ -147,6 +198,21 @@ def load_latest_csv(data_dir: str) -> tuple:
     Returns:
         tuple: (DataFrame, ファイル名)
 
+    Raises:
+        FileNotFoundError: CSVファイルが1つもない場合
+    """
+    return load_csv(find_latest_csv(data_dir))
+
+
+def find_latest_csv(data_dir: str) -> str:
+    """指定ディレクトリの最新のCSVファイルのパスを返す。
+
+    Args:
+        data_dir: CSVファイルが格納されたディレクトリ
+
+    Returns:
+        str: CSVファイルのパス
+
     Raises:
         FileNotFoundError: CSVファイルが1つもない場合
     """
@@ -157,7 +223,7 @@ def load_latest_csv(data_dir: str) -> tuple:
         raise FileNotFoundError(
             f"CSVが見つかりません: {data_dir}"
         )
-    return load_csv(files[-1])
+    return files[-1]
 
 
 # ════════════════════════════════════════════════════════════
@@ -165,7 +231,7 @@ def load_latest_csv(data_dir: str) -> tuple:
 # ════════════════════════════════════════════════════════════
 
 
-def preprocess(df: pd.DataFrame, axis: str = "az") -> np.ndarray:
+def preprocess(df: "pd.DataFrame", axis: str = "az") -> np.ndarray:
     """前処理: 平均除去＋クリッピング。
 
     Args:
@@ -175,7 +241,19 @@ def preprocess(df: pd.DataFrame, axis: str = "az") -> np.ndarray:
     Returns:
         np.ndarray: 前処理済みデータ
     """
-    x = df[axis].values.astype(np.float64)
+    return preprocess_values(df[axis].values)
+
+
+def preprocess_values(values: np.ndarray) -> np.ndarray:
+    """前処理: 平均除去＋クリッピング（1軸の配列版）。
+
+    Args:
+        values: 1軸の加速度データ
+
+    Returns:
+        np.ndarray: 前処理済みデータ
+    """
+    x = values.astype(np.float64)
     x = x - np.mean(x)
     std = np.std(x)
     x = np.clip(x, -5 * std, 5 * std)
@@ -195,8 +273,8 @@ def compute_fft(
         tuple: (周波数配列, 振幅配列)
     """
     n = len(x)
-    win = np.hanning(n)
-    freq = np.fft.rfftfreq(n, d=1 / fs)
+    win = dsp_cache.hanning(n)
+    freq = dsp_cache.rfftfreq(n, fs)
     amp = np.abs(np.fft.rfft(x * win)) * 2 / n
     return freq, amp
 
@@ -218,12 +296,11 @@ def envelope_analysis(
     Returns:
         tuple: (エンベロープ信号, 周波数配列, 振幅配列)
     """
+    from scipy import signal
+
     if band_high is None:
         band_high = fs / 2 * 0.9
-    sos = signal.butter(
-        4, [band_low, band_high],
-        btype="bandpass", fs=fs, output="sos",
-    )
+    sos = dsp_cache.bandpass_sos(fs, band_low, band_high)
     xf = signal.sosfilt(sos, x)
     env = np.abs(signal.hilbert(xf))
     env = env - np.mean(env)
@@ -236,12 +313,14 @@ def compute_scores(
 ) -> dict:
     """セグメントごとのRMS・ピーク・Zスコアを計算する。
 
+    全セグメントの統計量は segment_stats でまとめて計算する。
+
     Args:
         x: 時系列データ
         segment_len: セグメント長（サンプル数）
 
     Returns:
-        dict: rms, peak, cf, z_score, mean_rms, std_rms
+        dict: rms, peak, cf, kurtosis, skew, z_score, mean_rms, std_rms
 
     Raises:
         ValueError: データが短すぎる場合
@@ -252,22 +331,13 @@ def compute_scores(
             f"データが短すぎます。"
             f"{segment_len}サンプル以上必要です。"
         )
-    rms_list, peak_list, cf_list = [], [], []
-    for i in range(n_segments):
-        seg = x[i * segment_len : (i + 1) * segment_len]
-        rms = np.sqrt(np.mean(seg**2))
-        peak = np.max(np.abs(seg))
-        rms_list.append(rms)
-        peak_list.append(peak)
-        cf_list.append(peak / (rms + 1e-10))
-    rms_arr = np.array(rms_list)
+    stats = segment_stats(x, segment_len)
+    rms_arr = stats["rms"]
     mean_rms = np.mean(rms_arr)
     std_rms = np.std(rms_arr)
     return {
-        "rms": rms_arr,
-        "peak": np.array(peak_list),
-        "cf": np.array(cf_list),
-        "z_score": (rms_arr - mean_rms) / (std_rms + 1e-10),
+        **stats,
+        "z_score": (rms_arr - mean_rms) / (std_rms + EPS),
         "mean_rms": mean_rms,
         "std_rms": std_rms,
     }
@@ -289,6 +359,8 @@ def plot_results(
         env_amp: エンベロープ振幅
         save_dir: 保存先ディレクトリ
     """
+    import matplotlib.pyplot as plt
+
     fig, axes = plt.subplots(4, 1, figsize=(14, 16))
     fig.suptitle("振動データ解析結果", fontsize=14)
     t = np.arange(len(x)) / FS
@@ -382,6 +454,50 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="プロット表示を無効にする",
     )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help=(
+            "CSVをチャンク単位で読み、一定のメモリで解析する "
+            "(長時間の計測向け。プロットは出力しない)"
+        ),
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help=(
+            "常駐してDATA_DIRを監視し、新しいCSVが届くたびに解析する "
+            "(プロットは出力しない)"
+        ),
+    )
+    parser.add_argument(
+        "--ledger",
+        default=None,
+        help=(
+            "--watch 時の処理済み台帳 "
+            "(default: DATA_DIR/.processed.sqlite3)"
+        ),
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=POLL_INTERVAL,
+        help=(
+            "inotify が使えない場合のポーリング間隔[秒] "
+            f"(default: {POLL_INTERVAL})"
+        ),
+    )
+    parser.add_argument(
+        "--polling",
+        action="store_true",
+        help="inotify を使わず常にポーリングで監視する",
+    )
+    parser.add_argument(
+        "--chunk-rows",
+        type=int,
+        default=CHUNK_ROWS,
+        help=f"--stream 時に1回に読む行数 (default: {CHUNK_ROWS})",
+    )
     return parser.parse_args()
 
 
@@ -390,23 +506,58 @@ def parse_args() -> argparse.Namespace:
 # ════════════════════════════════════════════════════════════
 
 
-def main() -> None:
-    """メイン処理。解析→判定→Slack通知を実行する。"""
-    args = parse_args()
+def analyze_file(
+    csv_path: str,
+    stream: bool = False,
+    chunk_rows: int = CHUNK_ROWS,
+    plot: bool = False,
+) -> dict:
+    """CSVファイルを解析し、判定結果をまとめる。
 
-    logger.info("=" * 60)
-    logger.info("振動データ解析パイプライン 開始")
-    logger.info("=" * 60)
+    Args:
+        csv_path: CSVファイルのパス
+        stream: True ならチャンク単位で読むストリーミング解析
+        chunk_rows: ストリーミング解析で1回に読む行数
+        plot: True なら plot_results 用のデータも返す（pandasで読み込む）
 
-    try:
-        # ── CSV読み込み ──────────────────────────────────────
-        if args.csv_file:
-            df, filename = load_csv(args.csv_file)
-        else:
-            df, filename = load_latest_csv(args.data_dir)
+    Returns:
+        dict: filename, rms_total, mean_rms, max_z, peak_freq,
+              env_peak_freq, anomaly, plot（plot=True の一括解析のみ。
+              plot_results の引数）
+    """
+    filename = os.path.basename(csv_path)
+    plot_args = None
+    # ── ストリーミング解析（長時間の計測） ────────────────────
+    if stream:
+        from vibration_stream import analyze_csv_stream
 
-        # ── 前処理 ──────────────────────────────────────────
-        x = preprocess(df, axis="az")
+        logger.info(
+            f"ストリーミング解析: {filename} ({chunk_rows}行ずつ)"
+        )
+        result = analyze_csv_stream(
+            csv_path, FS, SEGMENT_LEN, chunk_rows=chunk_rows,
+        )
+        rms_total = result["rms_total"]
+        mean_rms = result["mean_rms"]
+        max_z = result["max_z"]
+        peak_freq = result["freq"][np.argmax(result["amp"])]
+        env_peak_freq = result["env_freq"][np.argmax(result["env_amp"])]
+        logger.info(
+            f"サンプル数={result['sample_count']} / "
+            f"RMS={rms_total:.4f} g"
+        )
+        logger.info(f"FFTピーク周波数: {peak_freq:.1f} Hz")
+        logger.info(
+            f"エンベロープピーク周波数: {env_peak_freq:.1f} Hz"
+        )
+    else:
+        # ── CSV読み込み・前処理 ──────────────────────────────
+        if plot:
+            df, filename = load_csv(csv_path)
+            x = preprocess(df, axis="az")
+        else:
+            values, filename = load_axis(csv_path, axis="az")
+            x = preprocess_values(values)
         rms_total = np.sqrt(np.mean(x**2))
         logger.info(
             f"前処理完了: サンプル数={len(x)} / "
@@ -427,51 +578,134 @@ def main() -> None:
 
         # ── スコア計算 ──────────────────────────────────────
         scores = compute_scores(x, SEGMENT_LEN)
-        anomaly = np.any(
-            np.abs(scores["z_score"]) > THRESHOLD
-        )
+        mean_rms = scores["mean_rms"]
         max_z = float(np.max(np.abs(scores["z_score"])))
-        logger.info(
-            f"RMS平均: {scores['mean_rms']:.4f} g / "
-            f"最大Zスコア: {max_z:.2f}"
+        if plot:
+            plot_args = (
+                df, x, scores, freq_fft, amp_fft, env_freq, env_amp,
+            )
+
+    anomaly = max_z > THRESHOLD
+    logger.info(
+        f"RMS平均: {mean_rms:.4f} g / "
+        f"最大Zスコア: {max_z:.2f}"
+    )
+    logger.info(
+        f"判定: {'異常検出' if anomaly else '正常'}"
+    )
+    return {
+        "filename": filename,
+        "rms_total": float(rms_total),
+        "mean_rms": float(mean_rms),
+        "max_z": max_z,
+        "peak_freq": float(peak_freq),
+        "env_peak_freq": float(env_peak_freq),
+        "anomaly": anomaly,
+        "plot": plot_args,
+    }
+
+
+def notify_result(summary: dict) -> None:
+    """判定結果をSlackに通知する。
+
+    Args:
+        summary: analyze_file の戻り値
+    """
+    head = (
+        ":warning: *異常検出*" if summary["anomaly"]
+        else ":white_check_mark: *正常*"
+    )
+    msg = (
+        f"{head}\n"
+        f"ファイル: `{summary['filename']}`\n"
+        f"最大Zスコア: `{summary['max_z']:.2f}` "
+        f"(閾値: {THRESHOLD})\n"
+        f"RMS: `{summary['rms_total']:.4f} g` / "
+        f"ピーク周波数: `{summary['peak_freq']:.1f} Hz`"
+    )
+    send_slack(msg, color="danger" if summary["anomaly"] else "good")
+
+
+def warm_up() -> None:
+    """常駐前に一度だけ解析処理を通し、フィルタ設計・FFTの初期化を済ませる。"""
+    x = np.sin(np.arange(SEGMENT_LEN * 2) * 0.3)
+    compute_fft(x, FS)
+    envelope_analysis(x, FS)
+    compute_scores(x, SEGMENT_LEN)
+
+
+def run_daemon(args: argparse.Namespace) -> None:
+    """DATA_DIRを監視し、新しいCSVを解析→Slack通知する（Ctrl+C / SIGTERMで終了）。
+
+    Args:
+        args: parse_args() の戻り値
+    """
+    ledger = ProcessedLedger(
+        args.ledger or os.path.join(args.data_dir, ".processed.sqlite3")
+    )
+    warm_up()
+
+    def handle(csv_path: str) -> dict:
+        try:
+            # デーモンはグラフを描かないので、プロット用の配列を作らない経路で読む
+            summary = analyze_file(
+                csv_path, args.stream, args.chunk_rows, plot=False,
+            )
+        except Exception as e:
+            send_slack_error(f"{os.path.basename(csv_path)}: {e}")
+            raise
+        notify_result(summary)
+        return summary
+
+    # systemd 等からの SIGTERM では処理中のファイルを終えてから止まる
+    stop = threading.Event()
+    os_signal.signal(os_signal.SIGTERM, lambda *_: stop.set())
+    watcher = open_watcher(
+        args.data_dir, interval=args.poll_interval,
+        use_inotify=not args.polling,
+    )
+    try:
+        watch_directory(
+            args.data_dir, handle, ledger, watcher=watcher, stop=stop,
         )
-        logger.info(
-            f"判定: {'異常検出' if anomaly else '正常'}"
+    finally:
+        ledger.close()
+        logger.info("監視を終了しました")
+
+
+def main() -> None:
+    """メイン処理。解析→判定→Slack通知を実行する。"""
+    args = parse_args()
+
+    logger.info("=" * 60)
+    logger.info("振動データ解析パイプライン 開始")
+    logger.info("=" * 60)
+
+    try:
+        # ── 常駐監視モード ──────────────────────────────────
+        if args.watch:
+            run_daemon(args)
+            return
+
+        csv_path = args.csv_file or find_latest_csv(args.data_dir)
+        summary = analyze_file(
+            csv_path, args.stream, args.chunk_rows,
+            plot=not (args.no_plot or args.stream),
         )
 
         # ── Slack通知 ───────────────────────────────────────
-        if anomaly:
-            msg = (
-                f":warning: *異常検出*\n"
-                f"ファイル: `{filename}`\n"
-                f"最大Zスコア: `{max_z:.2f}` "
-                f"(閾値: {THRESHOLD})\n"
-                f"RMS: `{rms_total:.4f} g` / "
-                f"ピーク周波数: `{peak_freq:.1f} Hz`"
-            )
-            send_slack(msg, color="danger")
-        else:
-            msg = (
-                f":white_check_mark: *正常*\n"
-                f"ファイル: `{filename}`\n"
-                f"最大Zスコア: `{max_z:.2f}` "
-                f"(閾値: {THRESHOLD})\n"
-                f"RMS: `{rms_total:.4f} g` / "
-                f"ピーク周波数: `{peak_freq:.1f} Hz`"
-            )
-            send_slack(msg, color="good")
+        notify_result(summary)
 
         # ── プロット ────────────────────────────────────────
-        if not args.no_plot:
+        if args.stream and not args.no_plot:
+            logger.info("ストリーミング解析ではプロットを出力しません")
+        elif not args.no_plot:
             save_dir = (
                 os.path.dirname(args.csv_file)
                 if args.csv_file
                 else args.data_dir
             )
-            plot_results(
-                df, x, scores, freq_fft, amp_fft,
-                env_freq, env_amp, save_dir,
-            )
+            plot_results(*summary["plot"], save_dir)
 
     except Exception as e:
         logger.error(f"解析エラー: {e}")
@@ -0,0 +1,35 @@
+"""
+predictive-maintenance-api と共有するモジュールの読み込み
+
+セグメント統計量（segment_stats）とフィルタ係数などのキャッシュ（dsp_cache）は
+predictive-maintenance-api/shared にあり、Analyzer サービスと共有する。
+sys.path に predictive-maintenance-api を加えると、その tests / services パッケージが
+トップレベルのものより先に見つかってしまうため、shared ディレクトリだけを
+別名のパッケージ（PACKAGE）としてファイルの場所から登録する。
+"""
+
+import importlib.util
+import sys
+from pathlib import Path
+
+SHARED_DIR = Path(__file__).resolve().parent / "predictive-maintenance-api" / "shared"
+PACKAGE = "pm_api_shared"
+
+
+def _register_package():
+    """shared ディレクトリを PACKAGE として登録する（登録済みなら何もしない）"""
+    if PACKAGE in sys.modules: return
+    spec = importlib.util.spec_from_file_location(
+        PACKAGE, SHARED_DIR / "__init__.py", submodule_search_locations=[str(SHARED_DIR)],
+    )
+    package = importlib.util.module_from_spec(spec)
+    sys.modules[PACKAGE] = package
+    spec.loader.exec_module(package)
+
+
+_register_package()
+
+from pm_api_shared import dsp_cache  # noqa: E402
+from pm_api_shared.segment_stats import EPS, segment_stats  # noqa: E402
+
+__all__ = ["EPS", "dsp_cache", "segment_stats"]
@@ -1,14 +1,16 @@
 import streamlit as st
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urlparse, urljoin
-import csv
 import datetime
-import io
-import re
 import math
-import time
+import os
 from pdf_report import generate_report_pdf, generate_batch_summary_pdf
+from pdf_batch import iter_report_zip
+from batch_runner import BatchRunner
+from scoring import check_https
+from response_cache import ResponseCache, hit_rate, stats_delta
+from http_session import HttpSession
+from results_store import ResultsStore
+import analysis_core
+from analysis_core import HEADERS_REQ, TIMEOUT, extract_urls, generate_csv
 
 # ===== ページ設定 =====
 st.set_page_config(page_title="企業デジタル分析ツール", page_icon="📊", layout="wide")
@@ -66,143 +68,26 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # ===== 定数 =====
-HEADERS_REQ = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
-TIMEOUT = 15
-SNS_DOMAINS = {"twitter.com":"Twitter/X","x.com":"X","facebook.com":"Facebook","instagram.com":"Instagram","linkedin.com":"LinkedIn","youtube.com":"YouTube","tiktok.com":"TikTok","line.me":"LINE","note.com":"note"}
-RECRUIT_KEYWORDS = ["recruit","career","careers","jobs","hiring","採用","求人","リクルート","新卒","中途","entry","joblist","employment"]
-CATEGORY_KEYWORDS = {
-    "製造":["製造","工場","製作所","メーカー","manufacturing","factory"],
-    "IT・Web":["システム","ソフトウェア","IT","Web","アプリ","デジタル","tech"],
-    "建設・不動産":["建設","建築","不動産","工務店","リフォーム","housing"],
-    "飲食":["飲食","レストラン","食堂","カフェ","料理","food"],
-    "小売":["販売","ショップ","ストア","store","shop","通販"],
-    "医療・介護":["医療","クリニック","病院","介護","福祉","歯科"],
-    "教育":["教育","学校","スクール","塾","学習","academy"],
-    "士業":["税理士","会計士","弁護士","司法書士","行政書士","社労士"],
-}
+BATCH_WORKERS = 8        # 一括分析の同時実行数
+HOST_INTERVAL = 1.0      # 同一ホストへのアクセス間隔（秒）
+PARSER_BACKEND = "auto"  # auto / selectolax / lxml / html.parser（未インストールならhtml.parser）
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "http_cache.sqlite3")
+CACHE_TTL = 24 * 60 * 60  # キャッシュをそのまま使う秒数（過ぎたら304で再検証）
+MAX_PAGE_BYTES = 512 * 1024  # 1ページあたりの読み込み上限（先頭から）
+RESULTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "results.sqlite3")
+HISTORY_LIMIT = 200  # 履歴に表示する件数
 SCORE_META = [{"icon":"🔒"},{"icon":"🔍"},{"icon":"📱"},{"icon":"📄"},{"icon":"📞"},{"icon":"⚙️"},{"icon":"👥"}]
 
-# ===== ユーティリティ =====
-def normalize_url(url):
-    url = url.strip()
-    if not url: return ""
-    if not url.startswith(("http://","https://")): url = "https://" + url
-    if not urlparse(url).path: url += "/"
-    return url
-
-def get_page_safely(url):
-    try:
-        r = requests.get(url, headers=HEADERS_REQ, timeout=TIMEOUT, allow_redirects=True)
-        r.raise_for_status()
-        if r.encoding and r.encoding.lower() == "iso-8859-1": r.encoding = r.apparent_encoding
-        return BeautifulSoup(r.text, "html.parser"), None
-    except requests.exceptions.ConnectionError: return None, "接続エラー"
-    except requests.exceptions.Timeout: return None, "タイムアウト"
-    except requests.exceptions.HTTPError as e: return None, f"HTTP {e.response.status_code}"
-    except requests.exceptions.RequestException as e: return None, f"エラー: {str(e)[:80]}"
-
-# ===== 分析関数群 =====
-def check_https(url): return url.startswith("https://")
-
-def analyze_meta_seo(soup):
-    r = {"title":"","title_length":0,"description":"","description_length":0,"has_viewport":False,"has_ogp":False,"h1_count":0,"h1_text":"","has_favicon":False,"has_canonical":False}
-    t = soup.find("title")
-    if t and t.string: r["title"]=t.string.strip(); r["title_length"]=len(r["title"])
-    d = soup.find("meta",attrs={"name":"description"})
-    if d and d.get("content"): r["description"]=d["content"].strip(); r["description_length"]=len(r["description"])
-    r["has_viewport"] = soup.find("meta",attrs={"name":"viewport"}) is not None
-    r["has_ogp"] = soup.find("meta",attrs={"property":"og:title"}) is not None
-    h1s = soup.find_all("h1"); r["h1_count"]=len(h1s)
-    if h1s: r["h1_text"]=h1s[0].get_text(strip=True)[:50]
-    r["has_favicon"] = soup.find("link",rel=lambda x:x and "icon" in x) is not None
-    r["has_canonical"] = soup.find("link",rel="canonical") is not None
-    return r
-
-def analyze_links(soup, base_url):
-    all_a = soup.find_all("a",href=True); bd = urlparse(base_url).netloc
-    il,el,sns,rf,ru = [],[],{},False,""
-    for a in all_a:
-        h = a.get("href","").strip()
-        if not h or h.startswith(("#","javascript:","mailto:","tel:")): continue
-        fu = urljoin(base_url,h); ld = urlparse(fu).netloc.lower()
-        if ld==bd or not ld: il.append(fu)
-        else: el.append(fu)
-        for sd,sn in SNS_DOMAINS.items():
-            if sd in ld: sns[sn]=fu; break
-        hl,tl = h.lower(), a.get_text(strip=True).lower()
-        for kw in RECRUIT_KEYWORDS:
-            if kw in hl or kw in tl: rf=True; ru=fu; break
-    return {"total_links":len(all_a),"internal_links":len(il),"external_links":len(el),"sns_links":sns,"sns_count":len(sns),"recruit_found":rf,"recruit_url":ru}
-
-def analyze_contact(soup):
-    r = {"has_form":False,"has_phone":False,"phone_number":"","has_email_link":False,"has_contact_page":False}
-    r["has_form"] = soup.find("form") is not None
-    ph = re.findall(r"0\d{1,4}[-‐ー]?\d{1,4}[-‐ー]?\d{3,4}", soup.get_text())
-    if ph: r["has_phone"]=True; r["phone_number"]=ph[0]
-    r["has_email_link"] = soup.find("a",href=re.compile(r"^mailto:")) is not None
-    for a in soup.find_all("a",href=True):
-        ht = (a.get("href","")+a.get_text()).lower()
-        if any(w in ht for w in ["問い合わせ","お問合せ","contact","inquiry"]): r["has_contact_page"]=True; break
-    return r
-
-def detect_category(soup):
-    text = soup.get_text().lower(); sc = {}
-    for c,kws in CATEGORY_KEYWORDS.items():
-        n = sum(1 for k in kws if k.lower() in text)
-        if n>0: sc[c]=n
-    return max(sc,key=sc.get) if sc else "その他"
-
-def analyze_tech(soup):
-    r = {"has_analytics":False,"has_structured_data":False,"image_count":0,"images_without_alt":0}
-    ht = str(soup)
-    if any(w in ht for w in ["google-analytics","gtag","googletagmanager"]): r["has_analytics"]=True
-    if soup.find("script",type="application/ld+json"): r["has_structured_data"]=True
-    imgs = soup.find_all("img"); r["image_count"]=len(imgs)
-    r["images_without_alt"] = sum(1 for i in imgs if not i.get("alt"))
-    return r
-
-# ===== スコアリング =====
-def calculate_score(url, seo, links, contact, tech):
-    score=0; details=[]
-    p=10 if check_https(url) else 0; score+=p; details.append(("HTTPS対応",p,10,"✅" if p==10 else "❌"))
-    s=0
-    if 10<=seo["title_length"]<=60: s+=8
-    elif seo["title_length"]>0: s+=4
-    if 50<=seo["description_length"]<=160: s+=7
-    elif seo["description_length"]>0: s+=3
-    if seo["has_viewport"]: s+=5
-    if seo["h1_count"]==1: s+=3
-    elif seo["h1_count"]>1: s+=1
-    if seo["has_favicon"]: s+=2
-    score+=s; details.append(("SEO基礎",s,25,"✅" if s>=18 else("⚠️" if s>=10 else "❌")))
-    s=min(links["sns_count"]*5,15); score+=s; details.append(("SNS連携",s,15,"✅" if s>=10 else("⚠️" if s>=5 else "❌")))
-    s=0
-    if links["total_links"]>100: s+=10
-    elif links["total_links"]>50: s+=7
-    elif links["total_links"]>20: s+=4
-    if links["internal_links"]>30: s+=5
-    elif links["internal_links"]>10: s+=3
-    s=min(s,15); score+=s; details.append(("コンテンツ充実度",s,15,"✅" if s>=10 else("⚠️" if s>=5 else "❌")))
-    s=0
-    if contact["has_form"]: s+=6
-    if contact["has_phone"]: s+=4
-    if contact["has_email_link"]: s+=3
-    if contact["has_contact_page"]: s+=2
-    s=min(s,15); score+=s; details.append(("問い合わせ導線",s,15,"✅" if s>=10 else("⚠️" if s>=5 else "❌")))
-    s=0
-    if tech["has_analytics"]: s+=5
-    if tech["has_structured_data"]: s+=3
-    if seo["has_ogp"]: s+=2
-    s=min(s,10); score+=s; details.append(("技術・運用",s,10,"✅" if s>=7 else("⚠️" if s>=3 else "❌")))
-    p=10 if links["recruit_found"] else 0; score+=p; details.append(("採用ページ",p,10,"✅" if p==10 else "❌"))
-    return score, details
-
-def judge(score):
-    if score<=25: return "S","最優先ターゲット","s"
-    elif score<=40: return "A","営業対象（高確度）","a"
-    elif score<=55: return "B","営業対象（中確度）","b"
-    elif score<=70: return "C","要検討","c"
-    else: return "D","対象外（デジタル成熟）","d"
+# ===== HTTPセッション・キャッシュ・結果DB（再実行をまたいで共有） =====
+@st.cache_resource
+def get_http_session(): return HttpSession(pool_size=BATCH_WORKERS, max_bytes=MAX_PAGE_BYTES, headers=HEADERS_REQ)
+@st.cache_resource
+def get_http_cache(): return ResponseCache(CACHE_PATH, ttl=CACHE_TTL)
+@st.cache_resource
+def get_results_store(): return ResultsStore(RESULTS_PATH)
+http_session = get_http_session()
+http_cache = get_http_cache()
+results_store = get_results_store()
 
 # ===== SVGレーダーチャート =====
 def radar_svg(details):
@@ -224,44 +109,11 @@ def radar_svg(details):
         dots+=f'<circle cx="{x}" cy="{y}" r="4" fill="#0ea5e9" stroke="white" stroke-width="2"/>'
     return f'<svg viewBox="0 0 320 320" xmlns="http://www.w3.org/2000/svg" style="max-width:320px;margin:auto;display:block;">{grid}{axes}<polygon points="{" ".join(pts)}" fill="rgba(14,165,233,0.15)" stroke="#0ea5e9" stroke-width="2.5"/>{dots}{labels}</svg>'
 
-# ===== メイン分析 =====
+# ===== メイン分析（処理本体は analysis_core） =====
 def run_analysis(url):
-    url=normalize_url(url)
-    if not url: return None,"URLを入力してください"
-    soup,err=get_page_safely(url)
-    if err: return None,err
-    seo=analyze_meta_seo(soup); lnk=analyze_links(soup,url); cnt=analyze_contact(soup)
-    tch=analyze_tech(soup); cat=detect_category(soup); sc,det=calculate_score(url,seo,lnk,cnt,tch)
-    rk,rl,rc=judge(sc)
-    return {"url":url,"domain":urlparse(url).netloc,"score":sc,"rank":rk,"rank_label":rl,"rank_class":rc,"details":det,"seo":seo,"links":lnk,"contact":cnt,"tech":tch,"category":cat,"analyzed_at":datetime.datetime.now().strftime("%Y-%m-%d %H:%M")},None
-
-# ===== CSV生成（共通） =====
-def generate_csv(results):
-    buf = io.StringIO()
-    fn = ["分析日時","URL","スコア","ランク","判定","業種","HTTPS","タイトル","description","viewport","OGP","H1数","リンク総数","内部","外部","SNS数","SNS一覧","採用","フォーム","電話","メール","Analytics","構造化データ","画像数","alt未設定"]
-    w = csv.DictWriter(buf, fieldnames=fn); w.writeheader()
-    for r in results:
-        w.writerow({
-            "分析日時":r["analyzed_at"],"URL":r["url"],"スコア":r["score"],"ランク":r["rank"],
-            "判定":r["rank_label"],"業種":r["category"],
-            "HTTPS":"○" if check_https(r["url"]) else "×","タイトル":r["seo"]["title"],
-            "description":"○" if r["seo"]["description_length"]>0 else "×",
-            "viewport":"○" if r["seo"]["has_viewport"] else "×",
-            "OGP":"○" if r["seo"]["has_ogp"] else "×","H1数":r["seo"]["h1_count"],
-            "リンク総数":r["links"]["total_links"],"内部":r["links"]["internal_links"],
-            "外部":r["links"]["external_links"],"SNS数":r["links"]["sns_count"],
-            "SNS一覧":" / ".join(r["links"]["sns_links"].keys()),
-            "採用":"○" if r["links"]["recruit_found"] else "×",
-            "フォーム":"○" if r["contact"]["has_form"] else "×","電話":r["contact"]["phone_number"],
-            "メール":"○" if r["contact"]["has_email_link"] else "×",
-            "Analytics":"○" if r["tech"]["has_analytics"] else "×",
-            "構造化データ":"○" if r["tech"]["has_structured_data"] else "×",
-            "画像数":r["tech"]["image_count"],"alt未設定":r["tech"]["images_without_alt"],
-        })
-    return buf.getvalue()
+    return analysis_core.run_analysis(url, cache=http_cache, session=http_session, store=results_store, backend=PARSER_BACKEND, timeout=TIMEOUT)
 
 # ===== セッション =====
-if "results_history" not in st.session_state: st.session_state.results_history=[]
 if "batch_results" not in st.session_state: st.session_state.batch_results=[]
 
 # ============================================
@@ -277,7 +129,11 @@ with st.sidebar:
     else:
         st.markdown("1. URLを入力欄に貼り付け\n　（1行1URL）\n2. またはCSVアップロード\n3. 「一括分析」をクリック\n4. 結果をCSVダウンロード")
     st.markdown("---")
-    st.markdown(f"**分析済み:** {len(st.session_state.results_history)}件")
+    st.markdown(f"**分析済み:** {len(results_store)}件")
+    st.markdown(f"**キャッシュ:** {len(http_cache)}ページ / ヒット率 {hit_rate(http_cache.snapshot()):.0%}")
+    if st.button("🗑️ キャッシュをクリア", use_container_width=True):
+        http_cache.clear()
+        st.rerun()
 
 # ============================================
 #               ヘッダー
@@ -303,7 +159,6 @@ if "単体" in mode:
         if error:
             st.markdown(f'<div class="alert-target">⚠️ {error}</div>',unsafe_allow_html=True)
         else:
-            st.session_state.results_history.append(result)
             sc=result["score"]; rk=result["rank"]; rc=result["rank_class"]
             st.markdown("<br>",unsafe_allow_html=True)
 
@@ -409,22 +264,15 @@ elif "一括" in mode:
         uploaded = st.file_uploader("URLが含まれるCSVファイル", type=["csv","txt"])
         if uploaded:
             content = uploaded.read().decode("utf-8-sig")
-            lines = content.strip().split("\n")
-            for line in lines:
-                # CSVの各列をチェック、URLっぽいものを抽出
-                for cell in line.split(","):
-                    cell = cell.strip().strip('"')
-                    if cell.startswith(("http://","https://")) or "." in cell:
-                        if any(cell.endswith(d) or d+"/" in cell for d in [".jp",".com",".co.jp",".net",".org",".io"]) or cell.startswith("http"):
-                            urls_to_analyze.append(cell)
-                            break
+            # CSVの各列をチェック、URLっぽいものを抽出
+            urls_to_analyze = extract_urls(content)
 
     if urls_to_analyze:
         st.info(f"📊 {len(urls_to_analyze)} 件のURLが入力されています")
 
-        # 待ち時間の目安
-        wait_sec = len(urls_to_analyze) * 5
-        st.caption(f"⏱ 推定所要時間: 約{wait_sec//60}分{wait_sec%60}秒（1件あたり約5秒）")
+        # 待ち時間の目安（BATCH_WORKERS件ずつ並列に処理）
+        wait_sec = math.ceil(len(urls_to_analyze) / BATCH_WORKERS) * 5
+        st.caption(f"⏱ 推定所要時間: 約{wait_sec//60}分{wait_sec%60}秒（1件あたり約5秒・{BATCH_WORKERS}件並列）")
 
     batch_clicked = st.button("🚀 一括分析を開始", type="primary", use_container_width=True, disabled=len(urls_to_analyze)==0)
 
@@ -435,23 +283,24 @@ elif "一括" in mode:
         status_text = st.empty()
         results_container = st.empty()
 
-        for i, u in enumerate(urls_to_analyze):
-            status_text.markdown(f"**分析中:** {u} （{i+1}/{len(urls_to_analyze)}）")
-            progress_bar.progress((i) / len(urls_to_analyze))
-
-            result, error = run_analysis(u)
+        # 並列分析（同一ホストへのアクセスのみ間隔を空ける）
+        runner = BatchRunner(max_workers=BATCH_WORKERS, host_interval=HOST_INTERVAL)
+        cache_before = http_cache.snapshot()
+        total = len(urls_to_analyze)
+        reused = 0
+        for i, (u, result, error) in enumerate(runner.run(urls_to_analyze, run_analysis), 1):
+            status_text.markdown(f"**分析中:** {i}/{total}件完了（直近: {u}）")
+            progress_bar.progress(i / total)
             if error:
                 errors.append({"url": u, "error": error})
             else:
                 st.session_state.batch_results.append(result)
-                st.session_state.results_history.append(result)
-
-            # サーバー負荷軽減のための待機
-            if i < len(urls_to_analyze) - 1:
-                time.sleep(1)
+                reused += result["reused"]
 
         progress_bar.progress(1.0)
-        status_text.markdown("**✅ 分析完了！**")
+        status_text.markdown(f"**✅ 分析完了！** {total}件 / {runner.elapsed:.1f}秒（{runner.throughput:.2f} URL/秒）")
+        cs = stats_delta(cache_before, http_cache.snapshot())
+        st.caption(f"🗄 キャッシュヒット率 {hit_rate(cs):.0%}（キャッシュ利用 {cs['hit']}件 / 304再検証 {cs['revalidated']}件 / 新規取得 {cs['miss']}件）・本文に変更がなく再スコアリングを省略 {reused}件")
 
         if errors:
             st.warning(f"⚠️ {len(errors)}件のエラーが発生しました")
@@ -500,7 +349,7 @@ elif "一括" in mode:
 
         # CSVダウンロード
         csv_data = generate_csv(sorted_results)
-        dl1, dl2 = st.columns(2)
+        dl1, dl2, dl3 = st.columns(3)
         with dl1:
             st.download_button(
                 "📥 CSVダウンロード",
@@ -523,29 +372,58 @@ elif "一括" in mode:
                 )
             except Exception as e:
                 st.warning(f"PDF生成エラー: {e}")
+        with dl3:
+            # 全社分の個別レポート（クリック時にプロセスプールで生成。callable の data は Streamlit 1.52 以降）
+            # Streamlit はダウンロードをメモリから配信するため ZIP 全体をメモリに持つ。大量の場合は pdf_batch.py でファイルに書き出す
+            st.download_button(
+                "📦 全社PDFレポート（ZIP）",
+                data=lambda: b"".join(iter_report_zip(sorted_results)),
+                file_name=f"reports_{datetime.datetime.now().strftime('%Y%m%d_%H%M')}.zip",
+                mime="application/zip",
+                use_container_width=True,
+            )
 
         if st.button("🗑️ 一括分析結果をクリア"):
             st.session_state.batch_results = []
             st.rerun()
 
 # ============================================
-#         履歴（単体分析モード時のみ）
+#         履歴（単体分析モード時のみ・結果DBから取得）
 # ============================================
-if "単体" in mode and st.session_state.results_history:
+if "単体" in mode and len(results_store):
+    history = results_store.history(limit=HISTORY_LIMIT)
     st.markdown("<br>",unsafe_allow_html=True)
     st.markdown("---")
-    st.markdown(f"### 📁 分析履歴（{len(st.session_state.results_history)}件）")
-    hd = [{"日時":r["analyzed_at"],"URL":r["domain"],"スコア":r["score"],"ランク":r["rank"],"判定":r["rank_label"],"業種":r["category"],"SNS":r["links"]["sns_count"],"採用":"✅" if r["links"]["recruit_found"] else "❌"} for r in st.session_state.results_history]
+    st.markdown(f"### 📁 分析履歴（{len(results_store)}件・新しい順に最大{HISTORY_LIMIT}件）")
+    hd = [{"日時":r["analyzed_at"],"URL":r["domain"],"スコア":r["score"],"ランク":r["rank"],"判定":r["rank_label"],"業種":r["category"],"SNS":r["links"]["sns_count"],"採用":"✅" if r["links"]["recruit_found"] else "❌"} for r in history]
     st.dataframe(hd, use_container_width=True, hide_index=True)
-    csv_data = generate_csv(st.session_state.results_history)
-    cd,cc = st.columns([1,1])
+
+    # ドメイン別のスコア推移
+    st.markdown("#### 📈 スコア推移")
+    summary = results_store.domain_summary()
+    st.dataframe([{"URL":d["domain"],"分析回数":d["analyses"],"最新":d["latest_score"],
+                   "前回比":"" if d["previous_score"] is None else f'{d["latest_score"]-d["previous_score"]:+d}',
+                   "最低":d["min_score"],"最高":d["max_score"],"最終分析":d["last_analyzed_at"]} for d in summary],
+                 use_container_width=True, hide_index=True)
+    domain = st.selectbox("推移を表示するURL", [d["domain"] for d in summary])
+    if domain:
+        tr = results_store.trend(domain)
+        st.line_chart({"日時":[t[0] for t in tr],"スコア":[t[1] for t in tr]}, x="日時", y="スコア")
+
+    csv_data = generate_csv(history)
+    cd,cp,cc = st.columns(3)
     with cd:
         st.download_button("📥 CSVダウンロード", data=csv_data,
             file_name=f"analysis_{datetime.datetime.now().strftime('%Y%m%d_%H%M')}.csv",
             mime="text/csv", type="primary", use_container_width=True)
+    with cp:
+        # 全URLの最新結果をDBからスコア順に流して描画（クリック時に生成。callable の data は Streamlit 1.52 以降）
+        st.download_button("📄 全履歴のサマリーPDF", data=lambda: generate_batch_summary_pdf(results_store.iter_by_score()),
+            file_name=f"history_summary_{datetime.datetime.now().strftime('%Y%m%d_%H%M')}.pdf",
+            mime="application/pdf", use_container_width=True)
     with cc:
         if st.button("🗑️ 履歴をクリア", use_container_width=True):
-            st.session_state.results_history = []
+            results_store.clear()
             st.rerun()
 
 # フッター
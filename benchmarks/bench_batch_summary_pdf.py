@@ -0,0 +1,100 @@
+"""
+一括分析サマリーPDFベンチマーク（行数を増やしたときの時間・メモリ・ファイルサイズ）
+
+  変更前  : 全件のリストを並べ替え、行ごとに draw_rounded_rect / draw_text で描画
+  変更後  : スコア順のイテレーターから1行ずつ描画、見出し行・縞模様はフォームXObjectを参照
+
+使い方:
+    python benchmarks/bench_batch_summary_pdf.py
+    python benchmarks/bench_batch_summary_pdf.py 1000 10000 50000
+"""
+
+import io
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.pdfgen import canvas
+
+from pdf_report import (
+    COLOR_BG_LIGHT, COLOR_DARK, COLOR_TEXT, COLOR_WHITE, RANK_COLORS,
+    SUMMARY_HEADERS, draw_rounded_rect, draw_text, generate_batch_summary_pdf, get_japanese_font,
+)
+
+
+def make_row(i):
+    score = i * 37 % 101
+    return {"rank": "SABCD"[score // 21], "rank_class": "sabcd"[score // 21], "score": score,
+            "domain": f"www.company{i}.co.jp", "rank_label": "営業対象", "category": "製造業",
+            "links": {"sns_count": i % 4, "recruit_found": i % 3 == 0}}
+
+
+def iter_rows(n):
+    """DBカーソル相当: スコア順の行を1件ずつ作る"""
+    for score in range(101):
+        for i in range(score * 71 % 101, n, 101):  # i * 37 % 101 == score となる i（71は37の逆元）
+            yield make_row(i)
+
+
+def legacy(results):
+    """変更前の描画方法（ヘッダー・サマリーカードは省略し、表の部分だけ）"""
+    buf = io.BytesIO()
+    width, height = A4
+    margin = 20 * mm
+    font = get_japanese_font()
+    cv = canvas.Canvas(buf, pagesize=A4)
+    col_x = [margin+3*mm, margin+18*mm, margin+35*mm, margin+95*mm, margin+125*mm, margin+148*mm, margin+162*mm]
+    row_y = height - 30*mm
+    for j, r in enumerate(sorted(results, key=lambda x: x["score"])):
+        if row_y < 20*mm:
+            cv.showPage()
+            row_y = height - 30*mm
+            draw_rounded_rect(cv, margin, row_y + 1*mm, width - 2*margin, 7*mm, radius=0, fill_color=COLOR_DARK)
+            for i, h in enumerate(SUMMARY_HEADERS):
+                draw_text(cv, col_x[i], row_y + 3*mm, h, font, 7, COLOR_WHITE)
+            row_y -= 7*mm
+        if j % 2 == 0:
+            draw_rounded_rect(cv, margin, row_y - 1*mm, width - 2*margin, 7*mm, radius=0, fill_color=COLOR_BG_LIGHT)
+        rc = r["rank_class"]
+        draw_text(cv, col_x[0], row_y + 1*mm, r["rank"], font, 8, RANK_COLORS.get(rc, COLOR_TEXT))
+        draw_text(cv, col_x[1], row_y + 1*mm, str(r["score"]), font, 8, RANK_COLORS.get(rc, COLOR_TEXT))
+        draw_text(cv, col_x[2], row_y + 1*mm, r["domain"][:30], font, 7, COLOR_TEXT)
+        draw_text(cv, col_x[3], row_y + 1*mm, r["rank_label"][:10], font, 7, COLOR_TEXT)
+        draw_text(cv, col_x[4], row_y + 1*mm, r["category"], font, 7, COLOR_TEXT)
+        draw_text(cv, col_x[5], row_y + 1*mm, str(r["links"]["sns_count"]), font, 7, COLOR_TEXT)
+        draw_text(cv, col_x[6], row_y + 1*mm, "✅" if r["links"]["recruit_found"] else "❌", font, 7, COLOR_TEXT)
+        row_y -= 7*mm
+    cv.save()
+    return buf.getvalue()
+
+
+def measure(fn, n):
+    """時間はそのまま、ピークメモリは tracemalloc を有効にしたもう1回の実行で測る"""
+    start = time.perf_counter()
+    data = fn(n)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn(n)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024, len(data) / 1024
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [1000, 5000, 20000]
+    print(f"フォント: {get_japanese_font()}")
+    print(f"{'行数':>6} {'方式':<6} {'秒':>7} {'ピークMB':>9} {'PDF KB':>8}")
+    for n in sizes:
+        t0, m0, k0 = measure(lambda k: legacy([make_row(i) for i in range(k)]), n)
+        t1, m1, k1 = measure(lambda k: generate_batch_summary_pdf(iter_rows(k)), n)
+        print(f"{n:>6} {'変更前':<6} {t0:7.2f} {m0:9.1f} {k0:8.0f}")
+        print(f"{n:>6} {'変更後':<6} {t1:7.2f} {m1:9.1f} {k1:8.0f}  x{t0 / t1:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+SQLiteコネクション管理の負荷テスト（Analyzer の GET /api/v1/status/{device_id}）
+
+  変更前 : 呼び出しごとにコネクションを開き、PRAGMA journal_mode=WAL を発行して閉じる
+           （get_status 1回で3本開く）
+  変更後 : スレッドごとに使い回すコネクション（PRAGMAは開いたときの1回、参照系は読み取り専用）
+
+それぞれ uvicorn を別プロセスで起動し、複数スレッドから keep-alive で
+一定時間リクエストを送り続けて requests/sec とレイテンシを比べる。
+
+使い方:
+    python benchmarks/bench_db_connections.py           # 8並列・各5秒
+    python benchmarks/bench_db_connections.py 16 10     # 並列数・秒数を指定
+"""
+
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+API = Path(__file__).resolve().parent.parent / "predictive-maintenance-api"
+sys.path.insert(0, str(API))
+
+import httpx
+import numpy as np
+
+from shared import database
+
+SERVER = """
+import sqlite3, sys
+from contextlib import contextmanager
+sys.path.insert(0, {api!r})
+from shared import database
+
+@contextmanager
+def legacy_connection(readonly=False):
+    database.Path(database.DB_PATH).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(database.DB_PATH)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+if {legacy!r}:
+    database.get_connection = legacy_connection
+
+import uvicorn
+from services.analyzer.main import app
+uvicorn.run(app, host="127.0.0.1", port={port}, log_level="warning")
+"""
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def setup_db(path):
+    database.DB_PATH = path
+    database.init_db()
+    n = 60 * 500
+    t_us = database._to_us(datetime(2026, 4, 12, 10)) + np.arange(n) * 2000
+    database.insert_vibration_arrays("m5stick_01", t_us, np.zeros(n), np.zeros(n), np.ones(n))
+    for i in range(100):
+        database.save_analysis_result({
+            "device_id": "m5stick_01", "is_anomaly": False, "max_z_score": 1.0,
+            "mean_rms": 0.1, "peak_frequency_hz": 50.0, "envelope_peak_hz": 10.0,
+            "threshold": 3.0, "sample_count": n,
+            "analyzed_at": datetime(2026, 4, 12, 10, i // 60, i % 60).isoformat(),
+        })
+    database.close_connections()
+
+
+def load(url, clients, seconds):
+    latencies = [[] for _ in range(clients)]
+    deadline = time.perf_counter() + seconds
+
+    def worker(out):
+        with httpx.Client() as client:
+            while (start := time.perf_counter()) < deadline:
+                client.get(url).raise_for_status()
+                out.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=worker, args=(lat,)) for lat in latencies]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    merged = sorted(x for lat in latencies for x in lat)
+    return len(merged) / seconds, statistics.median(merged), merged[int(len(merged) * 0.99)]
+
+
+def run_server(legacy, db_path, clients, seconds):
+    port = free_port()
+    env = dict(os.environ, DB_PATH=db_path)
+    code = SERVER.format(api=str(API), legacy=legacy, port=port)
+    proc = subprocess.Popen([sys.executable, "-c", code], env=env)
+    base = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(100):
+            try:
+                httpx.get(f"{base}/health")
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+        url = f"{base}/api/v1/status/m5stick_01"
+        load(url, clients, 1)  # ウォームアップ
+        return load(url, clients, seconds)
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    seconds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "vibration.db")
+        setup_db(db_path)
+        print(f"GET /api/v1/status/m5stick_01 ・{clients}並列・{seconds}秒")
+        results = {}
+        for label, legacy in (("変更前", True), ("変更後", False)):
+            rps, p50, p99 = run_server(legacy, db_path, clients, seconds)
+            results[label] = rps
+            print(f"{label}: {rps:8.0f} req/s  p50 {p50 * 1000:6.2f} ms  p99 {p99 * 1000:6.2f} ms")
+        print(f"向上: x{results['変更後'] / results['変更前']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
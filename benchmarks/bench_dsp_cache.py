@@ -0,0 +1,56 @@
+"""
+フィルタ係数・窓関数・周波数軸キャッシュのベンチマーク（Analyzer の1リクエスト分の解析時間）
+
+  変更前相当 : 毎回 shared.dsp_cache を空にしてから engine.analyze()（リクエストごとにフィルタ設計・窓・周波数軸を作る）
+  変更後     : キャッシュを残したまま engine.analyze()（同じ SAMPLING_RATE・データ長の2回目以降）
+
+使い方:
+    python benchmarks/bench_dsp_cache.py               # 1000・5000・30000サンプル
+    python benchmarks/bench_dsp_cache.py 2000 60000    # サンプル数を指定
+"""
+
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "predictive-maintenance-api"))
+
+import numpy as np
+
+from services.analyzer import engine
+from shared import dsp_cache
+
+
+def median_ms(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [1000, 5000, 30000]
+    logging.disable(logging.INFO)
+    rng = np.random.default_rng(0)
+    engine.analyze(rng.normal(0, 0.1, 1000))  # scipy の初回読み込みを計測から外す
+    print(f"{'サンプル数':>10} {'変更前相当':>12} {'変更後':>10} {'短縮':>6}")
+    for n in sizes:
+        z = 1.0 + rng.normal(0, 0.1, n)
+        repeat = 200 if n <= 5000 else 50
+
+        def cold():
+            dsp_cache.cache_clear()
+            engine.analyze(z)
+
+        before = median_ms(cold, repeat)
+        engine.analyze(z)
+        after = median_ms(lambda: engine.analyze(z), repeat)
+        print(f"{n:>10} {before:>10.3f}ms {after:>8.3f}ms  x{before / after:.2f}")
+
+
+if __name__ == "__main__":
+    main()
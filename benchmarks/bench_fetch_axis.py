@@ -0,0 +1,72 @@
+"""
+Analyzer の振動データ取得ベンチマーク（1軸・100万サンプル）
+
+  変更前       : fetch_vibration() → dict のリスト → np.array([r["z"] for r in rows])
+  ブロック連結 : fetch_vibration_arrays(axes=("z",))["z"]（ブロックごとの配列を連結）
+  fetch_axis   : 件数から出力配列を先に確保し、各ブロックを直接書き込む（float64）
+  間引き       : fetch_axis(step=10)（10サンプル平均）
+
+時間は3回の最小値、メモリは tracemalloc のピーク。
+
+使い方:
+    python benchmarks/bench_fetch_axis.py              # 100万サンプル
+    python benchmarks/bench_fetch_axis.py 5000000
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "predictive-maintenance-api"))
+
+import numpy as np
+
+from shared import database
+
+FS = 500
+T0 = datetime(2026, 4, 12, 10, 0, 0)
+
+
+def measure(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    result = fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak, result
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = np.random.default_rng(0)
+    xyz = np.round(rng.normal([[0.0], [0.0], [1.0]], 0.05, (3, n)) * 4096) / 4096
+    t_us = database._to_us(T0) + np.arange(n, dtype=np.int64) * (1_000_000 // FS)
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, "bench.db")
+        database.init_db()
+        database.insert_vibration_arrays("m5stick_01", t_us, *xyz)
+
+        cases = [
+            ("変更前（dictのリスト）", lambda: np.array([r["z"] for r in database.fetch_vibration("m5stick_01")]), 1),
+            ("ブロック連結", lambda: database.fetch_vibration_arrays("m5stick_01", axes=("z",))["z"], 3),
+            ("fetch_axis", lambda: database.fetch_axis("m5stick_01", "z"), 3),
+            ("fetch_axis(step=10)", lambda: database.fetch_axis("m5stick_01", "z", step=10), 3),
+        ]
+        print(f"{n}サンプル・Z軸")
+        base = None
+        for label, fn, repeat in cases:
+            sec, peak, z = measure(fn, repeat)
+            base = base or sec
+            print(f"{label:<24} {sec * 1000:9.1f} ms  x{base / sec:6.1f}  ピーク {peak / 1e6:7.1f} MB  出力 {len(z)}件 {z.dtype}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Analyzer の定期解析ベンチマーク（蓄積データが増えたときの1回あたりの解析時間）
+
+  全期間 : fetch_axis() で全データを読み、engine.analyze で解析し直す（start/end 省略時の従来動作）
+  差分   : 前回の状態を読み、続きの新しいデータだけを fetch_axis_after() で読んで
+           engine.analyze_incremental で累積統計を更新する（incremental=true）
+
+蓄積期間を変えて、直近 NEW_SEC 秒分のデータが増えるたびに解析する場合の時間を比べる。
+
+使い方:
+    python benchmarks/bench_incremental_analysis.py              # 蓄積 10分・1時間・4時間、新規60秒
+    python benchmarks/bench_incremental_analysis.py 60 600 3600 14400 28800
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "predictive-maintenance-api"))
+
+import numpy as np
+
+from services.analyzer.engine import analyze, analyze_incremental, new_state
+from shared import database
+
+FS = 500
+T0 = datetime(2026, 4, 12, 10, 0, 0)
+
+
+def insert(start_s, seconds, rng):
+    n = seconds * FS
+    t_us = database._to_us(T0) + (start_s * FS + np.arange(n, dtype=np.int64)) * (1_000_000 // FS)
+    z = 1.0 + rng.normal(0, 0.05, n)
+    database.insert_vibration_arrays("m5stick_01", t_us, np.zeros(n), np.zeros(n), z)
+
+
+def full():
+    return analyze(database.fetch_axis("m5stick_01", "z"))
+
+
+def incremental():
+    state = database.get_analysis_state("m5stick_01")
+    t_us, z = database.fetch_axis_after("m5stick_01", "z", state["last_us"])
+    result, new = analyze_incremental(z, state)
+    new.update(last_us=int(t_us[result["sample_count"] - 1]), sample_rate=FS, segment_len=FS)
+    database.save_analysis_state("m5stick_01", new)
+    return result
+
+
+def main():
+    new_sec = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    totals = [int(a) for a in sys.argv[2:]] or [600, 3600, 14400]
+    rng = np.random.default_rng(0)
+    print(f"新しいデータ {new_sec}秒分（{new_sec * FS}サンプル）ごとの解析時間")
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, "bench.db")
+        database.init_db()
+        stored = 0
+        for total in totals:
+            insert(stored, total - stored, rng)
+            stored = total
+            # 差分解析の状態を蓄積済みの末尾まで進めておく
+            database.delete_analysis_state("m5stick_01")
+            t_us, z = database.fetch_axis_after("m5stick_01", "z", None)
+            _, state = analyze_incremental(z, new_state())
+            state.update(last_us=int(t_us[-1]), sample_rate=FS, segment_len=FS)
+            database.save_analysis_state("m5stick_01", state)
+
+            insert(stored, new_sec, rng)
+            stored += new_sec
+            start = time.perf_counter()
+            full()
+            full_sec = time.perf_counter() - start
+            start = time.perf_counter()
+            result = incremental()
+            inc_sec = time.perf_counter() - start
+            print(f"蓄積 {total / 3600:5.2f} 時間  全期間 {full_sec * 1000:9.1f} ms  "
+                  f"差分 {inc_sec * 1000:7.1f} ms（{result['sample_count']}サンプル）  x{full_sec / inc_sec:6.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Collector の書き込みバッファの負荷テスト（POST /api/v1/vibration を多数のデバイスから）
+
+  変更前相当 : lifespan を動かさずに起動（バッファ無し。1リクエスト1トランザクションで書き込む）
+  変更後     : 書き込みバッファ経由（INGEST_FLUSH_SEC ごとに全デバイス分を1トランザクションで書き込む）
+
+SQLITE_SYNCHRONOUS=NORMAL と FULL（コミットごとに fsync）のそれぞれで、
+複数スレッドから一定時間1件ずつ送り続けて requests/sec・レイテンシと、
+保存されたブロック数（1ブロックあたりのサンプル数）を比べる。
+
+使い方:
+    python benchmarks/bench_ingest_buffer.py           # 8並列・各5秒
+    python benchmarks/bench_ingest_buffer.py 16 10     # 並列数・秒数を指定
+"""
+
+import os
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+API = Path(__file__).resolve().parent.parent / "predictive-maintenance-api"
+
+import httpx
+
+T0 = datetime(2026, 4, 12, 10)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def load(url, clients, seconds):
+    latencies = [[] for _ in range(clients)]
+    deadline = time.perf_counter() + seconds
+
+    def worker(k, out):
+        device_id = f"m5stick_{k:02d}"
+        with httpx.Client() as client:
+            i = 0
+            while (start := time.perf_counter()) < deadline:
+                client.post(url, json={
+                    "device_id": device_id,
+                    "timestamp": (T0 + timedelta(milliseconds=2 * i)).isoformat(),
+                    "x": 0.01, "y": -0.03, "z": 1.02,
+                }).raise_for_status()
+                out.append(time.perf_counter() - start)
+                i += 1
+
+    threads = [threading.Thread(target=worker, args=(k, lat)) for k, lat in enumerate(latencies)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    merged = sorted(x for lat in latencies for x in lat)
+    return len(merged) / seconds, statistics.median(merged), merged[int(len(merged) * 0.99)]
+
+
+def run_server(buffered, synchronous, clients, seconds):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "vibration.db")
+        sqlite3.connect(db_path).close()
+        port = free_port()
+        env = dict(os.environ, DB_PATH=db_path, SQLITE_SYNCHRONOUS=synchronous)
+        args = [sys.executable, "-m", "uvicorn", "services.collector.main:app",
+                "--port", str(port), "--log-level", "warning"]
+        if not buffered:
+            # バッファは lifespan で動かすので、無効にすると受信ごとに直接書き込む
+            subprocess.run([sys.executable, "-c", "from shared.database import init_db; init_db()"],
+                           cwd=API, env=env, check=True)
+            args += ["--lifespan", "off"]
+        proc = subprocess.Popen(args, cwd=API, env=env, stderr=subprocess.DEVNULL)
+        base = f"http://127.0.0.1:{port}"
+        try:
+            for _ in range(100):
+                try:
+                    httpx.get(f"{base}/health")
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.1)
+            result = load(f"{base}/api/v1/vibration", clients, seconds)
+        finally:
+            proc.terminate()
+            proc.wait()
+        conn = sqlite3.connect(db_path)
+        blocks, samples = conn.execute(
+            "SELECT COUNT(*), SUM(sample_count) FROM vibration_blocks"
+        ).fetchone()
+        conn.close()
+        return result, blocks, samples
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    seconds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    print(f"{clients}デバイス並列・各{seconds}秒（1リクエスト1サンプル）")
+    for synchronous in ("NORMAL", "FULL"):
+        for buffered, label in ((False, "変更前相当"), (True, "変更後")):
+            (rps, p50, p99), blocks, samples = run_server(buffered, synchronous, clients, seconds)
+            print(f"synchronous={synchronous:<6} {label:<10} {rps:8.0f} req/s  "
+                  f"p50 {p50 * 1000:6.2f} ms  p99 {p99 * 1000:6.2f} ms  "
+                  f"保存 {samples}件 / {blocks}ブロック（{samples / blocks:6.1f}件/ブロック）")
+
+
+if __name__ == "__main__":
+    main()
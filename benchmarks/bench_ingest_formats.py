@@ -0,0 +1,120 @@
+"""
+Collector の受信形式ごとのスループット（1プロセスで捌ける samples/sec）
+
+  JSON（変更前） : POST /api/v1/vibration/batch（サンプルごとに device_id・ISO時刻を持つオブジェクト）
+  列形式JSON     : POST /api/v1/vibration/columnar（開始時刻・サンプリング周波数・軸ごとの配列）
+  バイナリ       : POST /api/v1/vibration/raw（float32 の x・y・z 配列を連結）
+
+uvicorn で Collector を1プロセス起動し、複数スレッドから一定時間送り続ける。
+送信する本文は事前に作っておき、クライアント側のエンコードは計測に含めない。
+
+使い方:
+    python benchmarks/bench_ingest_formats.py              # 10秒分（5000サンプル）ずつ・4並列・各5秒
+    python benchmarks/bench_ingest_formats.py 1 8 10       # 1秒分ずつ・8並列・各10秒
+"""
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+API = Path(__file__).resolve().parent.parent / "predictive-maintenance-api"
+
+import httpx
+import numpy as np
+
+FS = 500
+T0 = datetime(2026, 4, 12, 10)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def payloads(seconds):
+    n = seconds * FS
+    rng = np.random.default_rng(0)
+    x, y, z = (np.round(rng.normal([[0.0], [0.0], [1.0]], 0.05, (3, n)) * 4096) / 4096).astype("<f4")
+    nested = json.dumps({"device_id": "m5stick_01", "samples": [
+        {"device_id": "m5stick_01", "timestamp": (T0 + timedelta(microseconds=2000 * i)).isoformat(),
+         "x": float(a), "y": float(b), "z": float(c)}
+        for i, (a, b, c) in enumerate(zip(x, y, z))
+    ]}).encode()
+    columnar = json.dumps({
+        "device_id": "m5stick_01", "start": T0.isoformat(), "sample_rate": FS,
+        "x": x.tolist(), "y": y.tolist(), "z": z.tolist(),
+    }).encode()
+    raw = np.concatenate([x, y, z]).tobytes()
+    params = {"device_id": "m5stick_01", "start": T0.isoformat(), "sample_rate": FS}
+    return n, [
+        ("JSON（変更前）", "/api/v1/vibration/batch", nested, "application/json", None),
+        ("列形式JSON", "/api/v1/vibration/columnar", columnar, "application/json", None),
+        ("バイナリ", "/api/v1/vibration/raw", raw, "application/octet-stream", params),
+    ]
+
+
+def blast(url, body, content_type, params, clients, seconds):
+    counts = [0] * clients
+    deadline = time.perf_counter() + seconds
+
+    def worker(k):
+        with httpx.Client(timeout=60) as client:
+            while time.perf_counter() < deadline:
+                client.post(url, content=body, params=params,
+                            headers={"Content-Type": content_type}).raise_for_status()
+                counts[k] += 1
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(k,)) for k in range(clients)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    return sum(counts), time.perf_counter() - start
+
+
+def main():
+    batch_sec = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    seconds = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    n, cases = payloads(batch_sec)
+    with tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        env = dict(os.environ, DB_PATH=os.path.join(tmp, "vibration.db"))
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "services.collector.main:app",
+             "--port", str(port), "--log-level", "warning"],
+            cwd=API, env=env,
+        )
+        base = f"http://127.0.0.1:{port}"
+        try:
+            for _ in range(100):
+                try:
+                    httpx.get(f"{base}/health")
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.1)
+            print(f"1リクエスト {n}サンプル（{batch_sec}秒分）・{clients}並列・各{seconds}秒")
+            base_rate = None
+            for label, path, body, content_type, params in cases:
+                blast(base + path, body, content_type, params, clients, 1)  # ウォームアップ
+                requests, elapsed = blast(base + path, body, content_type, params, clients, seconds)
+                rate = requests * n / elapsed
+                base_rate = base_rate or rate
+                print(f"{label:<14} 本文 {len(body) / 1e3:8.1f} KB  {requests / elapsed:7.1f} req/s  "
+                      f"{rate:11.0f} samples/s  x{rate / base_rate:.1f}")
+        finally:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+異常通知が集中したときの、Notifier の通知まとめ・送信レート制限のベンチマーク
+
+Slack Webhook を模したサーバーは1秒あたり1通（バースト5通）を超えると 429 を返す。
+複数デバイスの異常通知を並列に送り、Webhookへの送信数・429の数・失敗応答（502）の数と、
+すべての通知がSlackに届く（ダイジェストに入る）までの時間を比べる。
+
+  変更前相当 : NOTIFY_COALESCE_SEC=0, NOTIFY_RATE_PER_SEC=0（1件ずつすぐ送る）
+  変更後     : まとめ時間 NOTIFY_COALESCE_SEC、送信先ごとに 1通/秒・バースト5通
+
+使い方:
+    python benchmarks/bench_notify_coalesce.py            # 10デバイス×30件、まとめ時間2秒
+    python benchmarks/bench_notify_coalesce.py 20 50 5
+"""
+
+import os
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+API = Path(__file__).resolve().parent.parent / "predictive-maintenance-api"
+sys.path.insert(0, str(API))
+
+import httpx
+
+from services.notifier.coalescer import TokenBucket
+
+SERVER = """
+import sys
+sys.path.insert(0, {api!r})
+import uvicorn
+uvicorn.run("services.notifier.main:app", host="127.0.0.1", port={port}, log_level="warning")
+"""
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def slack_like_webhook():
+    """1通/秒・バースト5通を超えると 429 を返すWebhook"""
+    stats = {"accepted": 0, "rejected": 0, "alerts": 0, "last": 0.0}
+    bucket = TokenBucket(rate=1.0, burst=5)
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers["Content-Length"])).decode()
+            time.sleep(0.05)
+            with lock:
+                ok = bucket.try_acquire()
+                if ok:
+                    stats["accepted"] += 1
+                    digest = re.search(r"の通知 (\d+)件をまとめて", body)
+                    stats["alerts"] += int(digest.group(1)) if digest else 1
+                    stats["last"] = time.perf_counter()
+                else:
+                    stats["rejected"] += 1
+            self.send_response(200 if ok else 429)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        request_queue_size = 128
+
+    server = Server(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+
+def run(env, devices, per_device):
+    server, stats = slack_like_webhook()
+    port = free_port()
+    env = dict(env, SLACK_WEBHOOK_URL=f"http://127.0.0.1:{server.server_port}/hook")
+    proc = subprocess.Popen(
+        [sys.executable, "-c", SERVER.format(api=str(API), port=port)],
+        cwd=API, env=env, stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(300):
+            try:
+                httpx.get(f"{base}/health")
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+        total = devices * per_device
+        client = httpx.Client(timeout=30, limits=httpx.Limits(max_connections=32))
+
+        def send(i):
+            resp = client.post(f"{base}/api/v1/notify", json={
+                "device_id": f"m5stick_{i % devices:02d}",
+                "message": f":warning: *異常検出* #{i}",
+                "color": "danger",
+            })
+            return resp.json()["status"] if resp.status_code in (200, 202) else str(resp.status_code)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(32) as pool:
+            statuses = list(pool.map(send, range(total)))
+        storm = time.perf_counter() - start
+        # まとめ中の通知が送り終わるまで待つ
+        while client.get(f"{base}/health").json().get("pending_alerts", 0) > 0:
+            time.sleep(0.1)
+        client.close()
+        counts = {s: statuses.count(s) for s in sorted(set(statuses))}
+        return storm, counts, stats["accepted"], stats["rejected"], stats["alerts"], stats["last"] - start, total
+    finally:
+        proc.terminate()
+        proc.wait()
+        server.shutdown()
+
+
+def main():
+    devices = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    per_device = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    window = sys.argv[3] if len(sys.argv) > 3 else "2"
+    print(f"{devices}デバイス × {per_device}件を32並列で送信（Webhook 1通/秒・バースト5通）")
+    cases = (
+        ("変更前相当", {"NOTIFY_COALESCE_SEC": "0", "NOTIFY_RATE_PER_SEC": "0"}),
+        ("変更後", {"NOTIFY_COALESCE_SEC": window, "NOTIFY_RATE_PER_SEC": "1.0", "NOTIFY_BURST": "5"}),
+    )
+    for label, extra in cases:
+        storm, counts, accepted, rejected, alerts, done, total = run(dict(os.environ, **extra), devices, per_device)
+        print(
+            f"{label:<10} 受付 {storm:5.2f} 秒  応答 {counts}\n"
+            f"{'':<10} Webhook送信 {accepted + rejected}通（429: {rejected}）"
+            f"  Slackに届いた通知 {alerts}/{total}件（{done:5.2f} 秒後）"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+異常通知が集中したときのベンチマーク（遅いSlack Webhookを模したサーバーに送る）
+
+Notifier:
+  変更前相当 : urllib.request.urlopen で送信（イベントループを止める）
+  変更後     : 使い回す httpx.AsyncClient で非同期に送信
+  → 通知を多数同時に送ったときの処理時間と、その間の /health の応答時間
+
+Analyzer（通知先は変更後の Notifier）:
+  変更前相当 : 異常のたびに httpx.AsyncClient を作って Notifier の応答を待つ
+  変更後     : アウトボックスに入れて応答し、バックグラウンドで送る
+  → 全件が異常になる解析を続けたときの解析の応答時間と、Webhookに届いた件数
+
+使い方:
+    python benchmarks/bench_notify_storm.py            # Webhook 200ms・通知100件・解析40回
+    python benchmarks/bench_notify_storm.py 0.5 200 40
+"""
+
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+API = Path(__file__).resolve().parent.parent / "predictive-maintenance-api"
+sys.path.insert(0, str(API))
+
+import httpx
+import numpy as np
+
+from shared import database
+
+LEGACY_NOTIFIER = """
+import json, urllib.request
+from services.notifier import main
+
+async def send_blocking(text, color="good", webhook_url=""):
+    data = json.dumps({"attachments": [{"color": color, "text": text, "mrkdwn_in": ["text"]}]}).encode()
+    req = urllib.request.Request(webhook_url, data=data, headers={"Content-Type": "application/json"})
+    urllib.request.urlopen(req, timeout=5)
+    return True
+
+main._send_slack = send_blocking
+"""
+
+LEGACY_ANALYZER = """
+import httpx
+from fastapi.concurrency import run_in_threadpool
+from services.analyzer import main
+from shared.database import record_analyses
+
+async def record_then_notify_inline(results, states):
+    await run_in_threadpool(record_analyses, results, states, [])
+    for r in results:
+        if not r["is_anomaly"]:
+            continue
+        async with httpx.AsyncClient(timeout=5.0) as client:
+            await client.post(f"{main.NOTIFIER_URL}/api/v1/notify", json={
+                "device_id": r["device_id"], "message": main._anomaly_message(r), "color": "danger",
+            })
+
+main._record_analyses = record_then_notify_inline
+"""
+
+SERVER = """
+import sys
+sys.path.insert(0, {api!r})
+{patch}
+import uvicorn
+uvicorn.run({app!r}, host="127.0.0.1", port={port}, log_level="warning")
+"""
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def slow_webhook(delay):
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            time.sleep(delay)
+            received.append(time.perf_counter())
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        request_queue_size = 128
+
+    server = Server(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, received
+
+
+def start(app, patch, env):
+    port = free_port()
+    code = SERVER.format(api=str(API), patch=patch, app=app, port=port)
+    proc = subprocess.Popen([sys.executable, "-c", code], cwd=API, env=env, stderr=subprocess.DEVNULL)
+    base = f"http://127.0.0.1:{port}"
+    for _ in range(300):
+        try:
+            httpx.get(f"{base}/health")
+            return proc, base
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise RuntimeError(f"{app} が起動しません")
+
+
+def probe_health(base, stop):
+    latencies = []
+    with httpx.Client(timeout=60) as client:
+        while not stop.is_set():
+            start = time.perf_counter()
+            client.get(f"{base}/health")
+            latencies.append(time.perf_counter() - start)
+            time.sleep(0.01)
+    return latencies
+
+
+def notifier_storm(legacy, env, count):
+    proc, base = start("services.notifier.main:app", LEGACY_NOTIFIER if legacy else "", env)
+    try:
+        stop = threading.Event()
+        with ThreadPoolExecutor(1) as prober:
+            health = prober.submit(probe_health, base, stop)
+
+            client = httpx.Client(timeout=5.0, limits=httpx.Limits(max_connections=32))
+
+            def send(i):
+                try:
+                    return client.post(f"{base}/api/v1/notify", json={
+                        "device_id": "m5stick_01", "message": f"異常{i}", "dedup_key": f"storm:{i}",
+                    }).status_code == 200
+                except httpx.TimeoutException:
+                    return False
+
+            start_t = time.perf_counter()
+            with ThreadPoolExecutor(32) as pool:
+                ok = sum(pool.map(send, range(count)))
+            elapsed = time.perf_counter() - start_t
+            client.close()
+            stop.set()
+            latencies = health.result()
+        return elapsed, ok, statistics.median(latencies), max(latencies)
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def setup_db(path, devices):
+    database.DB_PATH = path
+    database.init_db()
+    n = 20 * 500
+    t_us = database._to_us(datetime(2026, 4, 12, 10)) + np.arange(n, dtype=np.int64) * 2000
+    rng = np.random.default_rng(0)
+    for k in range(devices):
+        z = 1.0 + rng.normal(0, 0.05, n)
+        database.insert_vibration_arrays(f"m5stick_{k:03d}", t_us, np.zeros(n), np.zeros(n), z)
+    database.close_connections()
+
+
+def analyzer_storm(legacy, env, tmp, analyses, received):
+    db_path = os.path.join(tmp, f"analyzer_{legacy}.db")
+    setup_db(db_path, analyses)
+    notifier, notifier_base = start("services.notifier.main:app", "", env)
+    env = dict(env, DB_PATH=db_path, ANOMALY_THRESHOLD="0", NOTIFIER_URL=notifier_base)
+    analyzer, base = start("services.analyzer.main:app", LEGACY_ANALYZER if legacy else "", env)
+    received.clear()
+    try:
+        latencies = []
+        with httpx.Client(timeout=60) as client:
+            for k in range(analyses):
+                start_t = time.perf_counter()
+                client.post(f"{base}/api/v1/analyze", json={"device_id": f"m5stick_{k:03d}"}).raise_for_status()
+                latencies.append(time.perf_counter() - start_t)
+        deadline = time.perf_counter() + 30
+        while len(received) < analyses and time.perf_counter() < deadline:
+            time.sleep(0.05)
+        return statistics.median(latencies), max(latencies), len(received)
+    finally:
+        for proc in (analyzer, notifier):
+            proc.terminate()
+            proc.wait()
+
+
+def main():
+    delay = float(sys.argv[1]) if len(sys.argv) > 1 else 0.2
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    analyses = int(sys.argv[3]) if len(sys.argv) > 3 else 40
+    webhook, received = slow_webhook(delay)
+    # 通知まとめ・送信レート制限（bench_notify_coalesce.py で測る）は切って、送信経路だけを比べる
+    env = dict(
+        os.environ, SLACK_WEBHOOK_URL=f"http://127.0.0.1:{webhook.server_port}/hook",
+        NOTIFY_COALESCE_SEC="0", NOTIFY_RATE_PER_SEC="0",
+    )
+    print(f"Webhookの応答 {delay * 1000:.0f} ms")
+    print(f"== Notifier: {count}件を32並列で送信")
+    for legacy, label in ((True, "変更前相当"), (False, "変更後")):
+        elapsed, ok, p50, worst = notifier_storm(legacy, env, count)
+        print(f"{label:<10} {elapsed:6.2f} 秒  成功 {ok}/{count}  /health p50 {p50 * 1000:7.1f} ms  max {worst * 1000:7.1f} ms")
+    print(f"== Analyzer: 全件異常の解析を{analyses}回")
+    with tempfile.TemporaryDirectory() as tmp:
+        for legacy, label in ((True, "変更前相当"), (False, "変更後")):
+            p50, worst, delivered = analyzer_storm(legacy, env, tmp, analyses, received)
+            print(f"{label:<10} 解析 p50 {p50 * 1000:7.1f} ms  max {worst * 1000:7.1f} ms  Webhook到達 {delivered}/{analyses}")
+    webhook.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+ページ分析ベンチマーク: 個別5関数 vs 1パス analyze_page
+
+使い方:
+    python benchmarks/bench_page_analyzer.py               # 合成した大規模コーポレートサイト
+    python benchmarks/bench_page_analyzer.py saved1.html   # 保存済みHTMLで計測
+"""
+
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bs4 import BeautifulSoup
+
+from page_analyzer import (
+    analyze_contact, analyze_links, analyze_meta_seo, analyze_page,
+    analyze_tech, detect_category,
+)
+
+BASE_URL = "https://www.example-corp.co.jp/"
+ALT = " alt='ニュース'"
+
+
+def make_corporate_page(n_nav=150, n_news=300, n_products=200, n_footer=120):
+    """大企業トップページ相当の合成HTMLを作る（メガメニュー・ニュース・製品一覧・フッター）"""
+    head = (
+        "<head><meta charset='utf-8'><title>株式会社サンプル製作所 | ものづくりで未来をつくる</title>"
+        "<meta name='description' content='株式会社サンプル製作所は精密部品の製造・加工を行うメーカーです。工場見学も受け付けています。'>"
+        "<meta name='viewport' content='width=device-width'><meta property='og:title' content='サンプル製作所'>"
+        "<link rel='icon' href='/favicon.ico'><link rel='canonical' href='https://www.example-corp.co.jp/'>"
+        + "".join(f"<link rel='stylesheet' href='/css/{i}.css'>" for i in range(20))
+        + "<script async src='https://www.googletagmanager.com/gtag/js?id=G-XXXX'></script>"
+        "<script type='application/ld+json'>{\"@type\":\"Organization\"}</script></head>"
+    )
+    nav = "".join(
+        f"<li class='menu-item'><a href='/business/{i}/'><span>事業紹介{i}</span></a>"
+        f"<ul class='sub'><li><a href='/business/{i}/detail'>詳細 {i}</a></li></ul></li>"
+        for i in range(n_nav)
+    )
+    news = "".join(
+        f"<article class='news'><time>2026.04.{i % 28 + 1:02d}</time><h3><a href='/news/{i}.html'>"
+        f"第{i}回 工場見学会のお知らせ</a></h3><p>{'精密加工の技術紹介。' * 5}</p>"
+        f"<img src='/img/news{i}.jpg'{ALT if i % 3 else ''}></article>"
+        for i in range(n_news)
+    )
+    products = "".join(
+        f"<div class='card'><a href='https://shop.example.com/p/{i}'><img src='/p/{i}.png' alt='製品{i}'>"
+        f"<p>製品{i} 高精度シャフト</p></a></div>"
+        for i in range(n_products)
+    )
+    footer = "".join(f"<a href='/sitemap/{i}'>サイトマップ{i}</a>" for i in range(n_footer)) + (
+        "<a href='/recruit/'>採用情報</a><a href='/contact/'>お問い合わせ</a>"
+        "<a href='mailto:info@example-corp.co.jp'>メール</a>"
+        "<a href='https://twitter.com/example'>X</a><a href='https://www.youtube.com/@example'>YouTube</a>"
+        "<p>TEL 03-1234-5678</p>"
+    )
+    body = (
+        f"<body><header><h1>サンプル製作所</h1><nav><ul>{nav}</ul></nav></header>"
+        f"<main><section>{news}</section><section>{products}</section>"
+        f"<form action='/search'><input name='q'></form></main><footer>{footer}</footer>"
+        + "".join(f"<script>var data{i} = {{}};</script>" for i in range(30))
+        + "</body>"
+    )
+    return f"<!DOCTYPE html><html lang='ja'>{head}{body}</html>"
+
+
+def legacy(soup, url):
+    return {
+        "seo": analyze_meta_seo(soup), "links": analyze_links(soup, url),
+        "contact": analyze_contact(soup), "tech": analyze_tech(soup),
+        "category": detect_category(soup),
+    }
+
+
+def timeit(fn, *args, repeat=7):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times)
+
+
+def bench(name, html):
+    soup = BeautifulSoup(html, "html.parser")
+    assert legacy(soup, BASE_URL) == analyze_page(soup, BASE_URL), "結果が一致しません"
+    n_tags = len(soup.find_all(True))
+    t_old = timeit(legacy, soup, BASE_URL)
+    t_new = timeit(analyze_page, soup, BASE_URL)
+    print(f"{name:<28} {len(html) / 1024:8.0f} KB {n_tags:7d} tags  "
+          f"5関数 {t_old * 1000:8.1f} ms  1パス {t_new * 1000:8.1f} ms  x{t_old / t_new:.2f}")
+
+
+def main():
+    print("ページ分析ベンチマーク（中央値）")
+    if len(sys.argv) > 1:
+        for path in sys.argv[1:]:
+            bench(Path(path).name, Path(path).read_text(encoding="utf-8", errors="replace"))
+        return
+    for scale in (1, 2, 4):
+        html = make_corporate_page(150 * scale, 300 * scale, 200 * scale, 120 * scale)
+        bench(f"synthetic corporate x{scale}", html)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""
+パーサーバックエンド別ベンチマーク（パース + analyze_page）
+
+使い方:
+    python benchmarks/bench_parser_backend.py
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_page_analyzer import BASE_URL, make_corporate_page, timeit
+from page_analyzer import analyze_page
+from parser_backend import available_backends, parse_html
+
+
+def parse_and_analyze(html, backend):
+    return analyze_page(parse_html(html, backend), BASE_URL)
+
+
+def main():
+    backends = available_backends()
+    print(f"利用可能: {', '.join(backends)}（中央値）")
+    for scale in (1, 4):
+        html = make_corporate_page(150 * scale, 300 * scale, 200 * scale, 120 * scale)
+        base = timeit(parse_and_analyze, html, "html.parser", repeat=5)
+        for b in backends:
+            t = base if b == "html.parser" else timeit(parse_and_analyze, html, b, repeat=5)
+            print(f"{len(html) / 1024:6.0f} KB  {b:<12} {t * 1000:8.1f} ms  x{base / t:.2f}")
+
+
+if __name__ == "__main__":
+    main()
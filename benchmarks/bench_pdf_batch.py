@@ -0,0 +1,78 @@
+"""
+PDFレポート一括生成ベンチマーク（ページ/秒）
+
+  従来            : レポートごとにフォントを検出・登録し直す（変更前の get_japanese_font）
+  フォント登録1回  : 同じプロセスで直列に生成
+  プロセスプール   : pdf_batch.iter_report_zip（ZIP化まで含む）
+
+日本語フォントが無い環境では、登録コストを計測するために同梱のTTFを代わりに登録する。
+
+使い方:
+    python benchmarks/bench_pdf_batch.py            # 60社分
+    python benchmarks/bench_pdf_batch.py 300 4      # 300社分・4プロセス
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import reportlab
+
+import pdf_report
+from analysis_core import score_page
+from bench_page_analyzer import BASE_URL, make_corporate_page
+from pdf_batch import iter_report_zip
+
+STAND_IN_FONTS = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    os.path.join(os.path.dirname(reportlab.__file__), "fonts", "Vera.ttf"),
+]
+
+
+def make_results(n):
+    base = score_page(BASE_URL, make_corporate_page())
+    return [dict(base, domain=f"www.company{i}.co.jp", url=f"https://www.company{i}.co.jp/",
+                 analyzed_at="2026-06-01 10:00") for i in range(n)]
+
+
+def ensure_font():
+    """日本語フォントが無ければ代わりのTTFを候補の先頭に入れる"""
+    if not any(os.path.exists(p) for p, _ in pdf_report.FONT_CANDIDATES):
+        for path in STAND_IN_FONTS:
+            if os.path.exists(path):
+                pdf_report.FONT_CANDIDATES.insert(0, (path, "BenchFont"))
+                print(f"日本語フォントが無いため {os.path.basename(path)} で代用")
+                return
+
+
+def run(label, fn, n):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<16} {n:5d}件 {elapsed:7.2f}秒 {n / elapsed:8.1f} ページ/秒")
+    return n / elapsed
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    ensure_font()
+    results = make_results(n)
+
+    cached = pdf_report.get_japanese_font
+    pdf_report.get_japanese_font = cached.__wrapped__  # キャッシュなし（毎回登録）
+    try:
+        base = run("従来", lambda: [pdf_report.generate_report_pdf(r) for r in results], n)
+    finally:
+        pdf_report.get_japanese_font = cached
+    cached()
+    run("フォント登録1回", lambda: [pdf_report.generate_report_pdf(r) for r in results], n)
+    pps = run(f"プロセス×{processes}", lambda: b"".join(iter_report_zip(results, processes)), n)
+    print(f"従来比 x{pps / base:.2f}")
+
+
+if __name__ == "__main__":
+    main()
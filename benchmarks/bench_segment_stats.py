@@ -0,0 +1,60 @@
+"""
+セグメント統計量ベンチマーク（計測時間の長さごとの処理時間）
+
+  変更前 : セグメントごとにスライスして np.sqrt(np.mean(seg**2)) / np.max を呼ぶ（RMS・ピーク・CFのみ）
+  変更後 : shared.segment_stats で全セグメントを1回で計算（RMS・ピーク・CF・尖度・歪度）
+
+使い方:
+    python benchmarks/bench_segment_stats.py              # 1分・10分・1時間・4時間（500Hz, 1秒セグメント）
+    python benchmarks/bench_segment_stats.py 60 86400     # 秒数を指定
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "predictive-maintenance-api"))
+
+import numpy as np
+
+from shared.segment_stats import segment_stats
+
+FS = 500
+SEGMENT_LEN = 500
+
+
+def legacy(x, segment_len):
+    """変更前の compute_scores のループ部分"""
+    rms_list, peak_list, cf_list = [], [], []
+    for i in range(len(x) // segment_len):
+        seg = x[i * segment_len : (i + 1) * segment_len]
+        rms = np.sqrt(np.mean(seg**2))
+        peak = np.max(np.abs(seg))
+        rms_list.append(rms)
+        peak_list.append(peak)
+        cf_list.append(peak / (rms + 1e-10))
+    return np.array(rms_list), np.array(peak_list), np.array(cf_list)
+
+
+def best_of(fn, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    durations = [int(a) for a in sys.argv[1:]] or [60, 600, 3600, 4 * 3600]
+    rng = np.random.default_rng(0)
+    print(f"{'時間':>8} {'セグメント':>10} {'変更前 秒':>10} {'変更後 秒':>10} {'倍率':>7}")
+    for sec in durations:
+        x = rng.normal(0, 0.1, sec * FS)
+        t0 = best_of(lambda: legacy(x, SEGMENT_LEN))
+        t1 = best_of(lambda: segment_stats(x, SEGMENT_LEN))
+        print(f"{sec:>7}s {len(x) // SEGMENT_LEN:>10} {t0:10.4f} {t1:10.4f} {t0 / t1:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
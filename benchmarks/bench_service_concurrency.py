@@ -0,0 +1,171 @@
+"""
+重い解析の実行中に他のリクエストが待たされないかを測るベンチマーク
+
+  変更前 : DBアクセス・engine.analyze をイベントループ上で直接実行
+  変更後 : DBアクセスはスレッドプール、解析はプロセスプール（ANALYSIS_WORKERS）
+
+Analyzer・Collector を uvicorn で別プロセスとして起動し（docker-compose と同じ構成）、
+30分間分のデータの解析を2並列で送り続けながら、次のレイテンシを測る。
+  - Analyzer の GET /health・GET /api/v1/status/{id}
+  - Collector への一括送信（1秒分・500サンプル）
+種類ごとに別スレッドから送る。比較用に、解析を流さないときの値も測る。
+
+使い方:
+    python benchmarks/bench_service_concurrency.py          # 各10秒
+    python benchmarks/bench_service_concurrency.py 20
+"""
+
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+API = Path(__file__).resolve().parent.parent / "predictive-maintenance-api"
+sys.path.insert(0, str(API))
+
+import httpx
+import numpy as np
+
+from shared import database
+
+SERVER = """
+import sys
+sys.path.insert(0, {api!r})
+import uvicorn
+from services.{service}.main import app
+from services.{service} import main
+
+async def inline(fn, *args, **kwargs):
+    return fn(*args, **kwargs)
+
+async def analyze_inline(z_values, step):
+    return main.analyze(z_values, fs=main.SAMPLING_RATE / step, segment_len=main.SEGMENT_LEN // step)
+
+if {legacy!r}:
+    main.run_in_threadpool = inline
+    if hasattr(main, "_analyze_in_pool"):
+        main._analyze_in_pool = analyze_inline
+uvicorn.run(app, host="127.0.0.1", port={port}, log_level="warning")
+"""
+
+T0 = datetime(2026, 4, 12, 10)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def setup_db(path, minutes):
+    database.DB_PATH = path
+    database.init_db()
+    n = minutes * 60 * 500
+    rng = np.random.default_rng(0)
+    t_us = database._to_us(T0) + np.arange(n) * 2000
+    z = 1.0 + 0.3 * np.sin(np.arange(n) * 0.2) + rng.normal(0, 0.05, n)
+    database.insert_vibration_arrays("heavy", t_us, np.zeros(n), np.zeros(n), z)
+    database.close_connections()
+
+
+def start(service, legacy, env):
+    port = free_port()
+    code = SERVER.format(api=str(API), service=service, legacy=legacy, port=port)
+    proc = subprocess.Popen([sys.executable, "-c", code], env=env)
+    base = f"http://127.0.0.1:{port}"
+    for _ in range(300):
+        try:
+            httpx.get(f"{base}/health")
+            return proc, base
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise RuntimeError(f"{service} が起動しません")
+
+
+def probe(seconds, analyzer, collector):
+    """種類ごとに別スレッドから10Hzで軽いリクエストを送り、レイテンシ（秒）を集める"""
+    lat = {"health": [], "status": [], "ingest": []}
+    deadline = time.perf_counter() + seconds
+
+    def run(key):
+        with httpx.Client(timeout=60) as client:
+            i = 0
+            while time.perf_counter() < deadline:
+                t = time.perf_counter()
+                if key == "health":
+                    resp = client.get(f"{analyzer}/health")
+                elif key == "status":
+                    resp = client.get(f"{analyzer}/api/v1/status/heavy")
+                else:
+                    resp = client.post(f"{collector}/api/v1/vibration/batch", json=batch(i))
+                resp.raise_for_status()
+                lat[key].append(time.perf_counter() - t)
+                i += 1
+                time.sleep(0.1)
+
+    threads = [threading.Thread(target=run, args=(key,)) for key in lat]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    return lat
+
+
+def batch(i):
+    t0 = T0 + timedelta(days=1, seconds=i)
+    return {"device_id": "probe", "samples": [
+        {"device_id": "probe", "timestamp": (t0 + timedelta(milliseconds=2 * k)).isoformat(),
+         "x": 0.0, "y": 0.0, "z": 1.0}
+        for k in range(500)
+    ]}
+
+
+def heavy_load(analyzer, stop, done):
+    with httpx.Client(timeout=120) as client:
+        while not stop.is_set():
+            client.post(f"{analyzer}/api/v1/analyze", json={"device_id": "heavy"}).raise_for_status()
+            done.append(1)
+
+
+def summary(values):
+    values = sorted(values)
+    return f"p50 {statistics.median(values) * 1000:7.1f} ms  max {values[-1] * 1000:7.1f} ms"
+
+
+def main():
+    seconds = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "vibration.db")
+        setup_db(db_path, 30)
+        env = dict(os.environ, DB_PATH=db_path, ANOMALY_THRESHOLD="1e9")
+        for label, legacy in (("変更前", True), ("変更後", False)):
+            analyzer_proc, analyzer = start("analyzer", legacy, env)
+            collector_proc, collector = start("collector", legacy, env)
+            try:
+                idle = probe(seconds / 2, analyzer, collector)
+                stop, done = threading.Event(), []
+                loaders = [threading.Thread(target=heavy_load, args=(analyzer, stop, done)) for _ in range(2)]
+                for th in loaders:
+                    th.start()
+                time.sleep(1)
+                busy = probe(seconds, analyzer, collector)
+                stop.set()
+                for th in loaders:
+                    th.join()
+            finally:
+                for proc in (analyzer_proc, collector_proc):
+                    proc.terminate()
+                    proc.wait()
+            print(f"== {label}（解析 {len(done)} 回完了）")
+            for key in ("health", "status", "ingest"):
+                print(f"  {key:<7} 解析なし {summary(idle[key])}  |  解析2並列中 {summary(busy[key])}")
+
+
+if __name__ == "__main__":
+    main()
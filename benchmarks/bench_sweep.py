@@ -0,0 +1,118 @@
+"""
+Analyzer の全デバイス解析ベンチマーク（多数のセンサーを1周解析する時間）
+
+  外部から1台ずつ : POST /api/v1/analyze（incremental=true）をデバイスの数だけ順に呼ぶ
+  外部から並列    : 同じ呼び出しを8スレッドから並列に送る
+  スイープ        : POST /api/v1/sweep を1回（サービス内で解析ワーカーに振り分け、結果はまとめて保存）
+
+各デバイスに新しいデータ NEW_SEC 秒分がある状態のDBを用意し、
+それぞれ新しい uvicorn プロセス・DBのコピーで1周にかかる時間を比べる。
+
+使い方:
+    python benchmarks/bench_sweep.py            # 200台・各60秒分
+    python benchmarks/bench_sweep.py 50 300     # 台数・秒数を指定
+"""
+
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+API = Path(__file__).resolve().parent.parent / "predictive-maintenance-api"
+sys.path.insert(0, str(API))
+
+import httpx
+import numpy as np
+
+from shared import database
+
+FS = 500
+T0 = datetime(2026, 4, 12, 10)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def setup_db(path, devices, seconds):
+    database.DB_PATH = path
+    database.init_db()
+    rng = np.random.default_rng(0)
+    n = seconds * FS
+    t_us = database._to_us(T0) + np.arange(n, dtype=np.int64) * (1_000_000 // FS)
+    for k in range(devices):
+        z = 1.0 + rng.normal(0, 0.05, n)
+        database.insert_vibration_arrays(f"m5stick_{k:03d}", t_us, np.zeros(n), np.zeros(n), z)
+    database.close_connections()
+
+
+def external(base, devices, clients):
+    def call(k):
+        with httpx.Client(timeout=120) as client:
+            client.post(f"{base}/api/v1/analyze", json={
+                "device_id": f"m5stick_{k:03d}", "incremental": True,
+            }).raise_for_status()
+
+    with ThreadPoolExecutor(clients) as pool:
+        list(pool.map(call, range(devices)))
+
+
+def sweep(base, devices, clients):
+    summary = httpx.post(f"{base}/api/v1/sweep", timeout=600).json()
+    assert summary["analyzed"] == devices, summary
+
+
+def run_server(db_path, fn, devices, clients):
+    port = free_port()
+    env = dict(os.environ, DB_PATH=db_path, ANOMALY_THRESHOLD="1e9",
+               NOTIFIER_URL="http://127.0.0.1:9")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "services.analyzer.main:app",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=API, env=env, stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(300):
+            try:
+                httpx.get(f"{base}/health")
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+        start = time.perf_counter()
+        fn(base, devices, clients)
+        return time.perf_counter() - start
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    devices = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    seconds = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "source.db")
+        setup_db(source, devices, seconds)
+        print(f"{devices}台・各{seconds}秒分（{seconds * FS}サンプル）の新しいデータを1周解析")
+        cases = [
+            ("外部から1台ずつ", external, 1),
+            ("外部から8並列", external, 8),
+            ("スイープ", sweep, 1),
+        ]
+        for label, fn, clients in cases:
+            db_path = os.path.join(tmp, f"{label}.db")
+            shutil.copy(source, db_path)
+            sec = run_server(db_path, fn, devices, clients)
+            print(f"{label:<12} {sec:7.2f} 秒  {devices / sec:6.1f} 台/秒")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+振動データの保存形式ベンチマーク（DBサイズ・Analyzer の取得時間）
+
+  変更前 : 1サンプル1行（device_id, timestamp TEXT, x, y, z）＋ (device_id, timestamp) 索引
+           取得は SELECT * → dict のリスト → Z軸を np.array（変更前の run_analysis）
+  変更後 : 10秒ごとのブロックに float32 を zlib 圧縮して保存
+           取得は fetch_vibration_arrays(axes=("z",))
+
+使い方:
+    python benchmarks/bench_vibration_blocks.py          # 1時間分（500Hz）
+    python benchmarks/bench_vibration_blocks.py 600      # 秒数を指定
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "predictive-maintenance-api"))
+
+import numpy as np
+
+from shared import database
+
+FS = 500
+T0 = datetime(2026, 4, 12, 10, 0, 0)
+
+
+def make_data(seconds):
+    """M5StickC相当（±8g・16bit量子化）の3軸データ"""
+    n = seconds * FS
+    rng = np.random.default_rng(0)
+    t = np.arange(n) / FS
+    xyz = rng.normal(0, 0.05, (3, n))
+    xyz[2] += 1.0 + 0.3 * np.sin(2 * np.pi * 160 * t)
+    return t, np.round(xyz * 4096) / 4096
+
+
+def legacy_setup(path, t, xyz):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE vibration_data (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+        "device_id TEXT NOT NULL, timestamp TEXT NOT NULL, x REAL NOT NULL, "
+        "y REAL NOT NULL, z REAL NOT NULL, created_at TEXT DEFAULT (datetime('now')))"
+    )
+    conn.execute("CREATE INDEX idx_vibration_device_time ON vibration_data (device_id, timestamp)")
+    conn.executemany(
+        "INSERT INTO vibration_data (device_id, timestamp, x, y, z) VALUES (?, ?, ?, ?, ?)",
+        (("m5stick_01", (T0 + timedelta(seconds=s)).isoformat(), x, y, z)
+         for s, x, y, z in zip(t.tolist(), *xyz.tolist())),
+    )
+    conn.commit()
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+
+
+def legacy_fetch(path, start=None, end=None):
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    query = "SELECT * FROM vibration_data WHERE device_id = ?"
+    params = ["m5stick_01"]
+    if start:
+        query += " AND timestamp >= ? AND timestamp <= ?"
+        params += [start.isoformat(), end.isoformat()]
+    rows = [dict(r) for r in conn.execute(query + " ORDER BY timestamp ASC", params).fetchall()]
+    conn.close()
+    return np.array([r["z"] for r in rows])
+
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    seconds = int(sys.argv[1]) if len(sys.argv) > 1 else 3600
+    t, xyz = make_data(seconds)
+    window = (T0 + timedelta(seconds=seconds // 2), T0 + timedelta(seconds=seconds // 2 + 60))
+    with tempfile.TemporaryDirectory() as tmp:
+        old_path = os.path.join(tmp, "legacy.db")
+        start = time.perf_counter()
+        legacy_setup(old_path, t, xyz)
+        old_insert = time.perf_counter() - start
+
+        database.DB_PATH = os.path.join(tmp, "blocks.db")
+        database.init_db()
+        start = time.perf_counter()
+        database.insert_vibration_arrays("m5stick_01", database._to_us(T0) + np.rint(t * 1e6).astype(np.int64), *xyz)
+        new_insert = time.perf_counter() - start
+        with database.get_connection() as conn:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+        old_all, z_old = timed(lambda: legacy_fetch(old_path))
+        new_all, z_new = timed(lambda: database.fetch_vibration_arrays("m5stick_01", axes=("z",))["z"])
+        old_min, _ = timed(lambda: legacy_fetch(old_path, *window))
+        new_min, _ = timed(lambda: database.fetch_vibration_arrays("m5stick_01", *window, axes=("z",)))
+        np.testing.assert_allclose(z_new, z_old, rtol=1e-6)
+
+        old_size = os.path.getsize(old_path)
+        new_size = os.path.getsize(database.DB_PATH)
+
+    print(f"{seconds}秒分（{len(t)}サンプル × 3軸）")
+    print(f"{'':<16} {'変更前':>12} {'変更後':>12} {'比':>8}")
+    print(f"{'DBサイズ':<16} {old_size / 1e6:>10.1f}MB {new_size / 1e6:>10.2f}MB  x{old_size / new_size:.1f}")
+    print(f"{'書き込み':<16} {old_insert * 1000:>10.0f}ms {new_insert * 1000:>10.0f}ms  x{old_insert / new_insert:.1f}")
+    print(f"{'全期間のZ軸取得':<16} {old_all * 1000:>10.1f}ms {new_all * 1000:>10.1f}ms  x{old_all / new_all:.1f}")
+    print(f"{'1分間のZ軸取得':<16} {old_min * 1000:>10.1f}ms {new_min * 1000:>10.1f}ms  x{old_min / new_min:.1f}")
+
+
+if __name__ == "__main__":
+    main()
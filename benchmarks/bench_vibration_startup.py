@@ -0,0 +1,70 @@
+"""
+analyze_vibration.py の起動時間ベンチマーク（cron / Slack通知用の --no-plot 実行）
+
+  変更前相当 : matplotlib.pyplot・pandas・scipy.signal を先に読み込んでから実行（モジュール先頭で import していた状態）
+  変更後     : そのまま実行（matplotlib は読み込まず、pandas・scipy.signal は解析の直前に読み込む）
+
+それぞれ新しいプロセスで起動し、終了までの時間の中央値を比べる。
+
+使い方:
+    python benchmarks/bench_vibration_startup.py           # 60秒分のCSV・各5回
+    python benchmarks/bench_vibration_startup.py 600 10    # 600秒分のCSV・各10回
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from bench_vibration_stream import write_csv
+
+RUN = """
+import sys
+sys.path.insert(0, {root!r})
+{preload}
+import analyze_vibration
+sys.argv = ["analyze_vibration.py"] + {args!r}
+analyze_vibration.main()
+print(sorted(m for m in ("matplotlib", "pandas", "scipy.signal") if m in sys.modules))
+"""
+
+EAGER = "import matplotlib.pyplot, pandas, scipy.signal"
+
+
+def timed(code, cwd, env):
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", code], cwd=cwd, env=env, capture_output=True, text=True, check=True)
+    return time.perf_counter() - start, out.stdout.strip().splitlines()[-1]
+
+
+def main():
+    seconds = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    env = dict(os.environ, SLACK_WEBHOOK_URL="")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "vibration_001.csv"
+        write_csv(path, seconds)
+        cases = [
+            ("import のみ（変更前相当）", EAGER, ["--help"]),
+            ("import のみ（変更後）", "", ["--help"]),
+            ("--no-plot（変更前相当）", EAGER, [str(path), "--no-plot"]),
+            ("--no-plot（変更後）", "", [str(path), "--no-plot"]),
+        ]
+        print(f"{seconds}秒分のCSV・各{repeat}回の中央値")
+        for label, preload, args in cases:
+            code = RUN.format(root=str(ROOT), preload=preload, args=args)
+            if args == ["--help"]:
+                code = code.replace("analyze_vibration.main()", "")
+            runs = [timed(code, tmp, env) for _ in range(repeat)]
+            median = statistics.median(t for t, _ in runs)
+            print(f"{label:<24} {median * 1000:8.0f} ms  読み込み済み: {runs[-1][1]}")
+
+
+if __name__ == "__main__":
+    main()
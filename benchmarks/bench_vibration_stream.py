@@ -0,0 +1,85 @@
+"""
+振動データ解析ベンチマーク（一括 vs ストリーミング、計測時間ごとの処理時間・最大メモリ）
+
+  一括          : load_csv → preprocess → compute_fft / envelope_analysis / compute_scores
+  ストリーミング : vibration_stream.analyze_csv_stream（CSVを2回チャンク読み）
+
+各方式は別プロセスで実行し、プロセスの最大常駐メモリ（/proc/self/status の VmHWM）を比べる。
+ru_maxrss は親プロセスの値を引き継ぐため使わない（Linux専用）。
+
+使い方:
+    python benchmarks/bench_vibration_stream.py              # 10分・1時間・4時間（500Hz）
+    python benchmarks/bench_vibration_stream.py 600 86400    # 秒数を指定
+"""
+
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+FS = 500
+
+CHILD = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+import numpy as np
+import analyze_vibration as av
+import vibration_stream as vs
+def hwm_mb():
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmHWM")) / 1024
+base = hwm_mb()
+start = time.perf_counter()
+if {mode!r} == "batch":
+    df, _ = av.load_csv({path!r})
+    x = av.preprocess(df)
+    av.compute_fft(x, av.FS)
+    av.envelope_analysis(x, av.FS)
+    max_z = float(np.max(np.abs(av.compute_scores(x, av.SEGMENT_LEN)["z_score"])))
+else:
+    max_z = vs.analyze_csv_stream({path!r}, av.FS, av.SEGMENT_LEN)["max_z"]
+elapsed = time.perf_counter() - start
+print(json.dumps({{"sec": elapsed, "base_mb": base, "peak_mb": hwm_mb(), "max_z": max_z}}))
+"""
+
+
+def write_csv(path, seconds):
+    """正弦波＋AM変調＋ノイズのCSVを1時間分ずつ書き出す"""
+    rng = np.random.default_rng(0)
+    step = 3600 * FS
+    for start in range(0, seconds * FS, step):
+        n = min(step, seconds * FS - start)
+        t = (start + np.arange(n)) / FS
+        az = (1.0 + 0.2 * np.sin(2 * np.pi * 37 * t)
+              + (1 + 0.8 * np.sin(2 * np.pi * 13 * t)) * 0.3 * np.sin(2 * np.pi * 160 * t)
+              + rng.normal(0, 0.05, n))
+        df = pd.DataFrame({"timestamp_us": (t * 1e6).astype(np.int64), "ax": 0.0, "ay": 0.0, "az": az})
+        df.to_csv(path, mode="a" if start else "w", header=not start, index=False, float_format="%.5f")
+
+
+def run(mode, path, workdir):
+    code = CHILD.format(root=str(ROOT), mode=mode, path=str(path))
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=workdir, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    durations = [int(a) for a in sys.argv[1:]] or [600, 3600, 4 * 3600]
+    print(f"{'時間':>8} {'方式':<10} {'秒':>7} {'最大MB':>8} {'import後MB':>10} {'最大Z':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for sec in durations:
+            path = Path(tmp) / f"vibration_{sec}.csv"
+            write_csv(path, sec)
+            for mode in ("batch", "stream"):
+                r = run(mode, path, tmp)
+                print(f"{sec:>7}s {mode:<10} {r['sec']:7.2f} {r['peak_mb']:8.0f} {r['base_mb']:10.0f} {r['max_z']:7.2f}")
+            path.unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+振動データ1ファイルあたりの処理時間（都度起動 vs 常駐モード）
+
+  都度起動 : python analyze_vibration.py <file> --no-plot をファイルごとに実行（cron相当）
+  常駐     : warm_up() 済みのプロセスで analyze_file() を呼ぶ（--watch の1ファイル分の処理）
+
+使い方:
+    python benchmarks/bench_vibration_watch.py           # 60秒分のCSV × 5ファイル
+    python benchmarks/bench_vibration_watch.py 600 10    # 600秒分 × 10ファイル
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from bench_vibration_stream import write_csv
+
+
+def main():
+    seconds = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    files = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    env = dict(os.environ, SLACK_WEBHOOK_URL="")
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)  # app.log の出力先
+        paths = []
+        for i in range(files):
+            path = Path(tmp) / f"vibration_{i:03d}.csv"
+            write_csv(path, seconds)
+            paths.append(str(path))
+
+        cold = []
+        for path in paths:
+            start = time.perf_counter()
+            subprocess.run([sys.executable, str(ROOT / "analyze_vibration.py"), path, "--no-plot"],
+                           env=env, capture_output=True, check=True)
+            cold.append(time.perf_counter() - start)
+
+        import logging
+        import analyze_vibration as av
+        logging.disable(logging.INFO)
+        start = time.perf_counter()
+        av.warm_up()
+        warm_sec = time.perf_counter() - start
+        warm = []
+        for path in paths:
+            start = time.perf_counter()
+            av.analyze_file(path)
+            warm.append(time.perf_counter() - start)
+
+    print(f"{seconds}秒分のCSV × {files}ファイル")
+    print(f"都度起動 : {statistics.median(cold) * 1000:8.1f} ms/ファイル（中央値）")
+    print(f"常駐     : {statistics.median(warm) * 1000:8.1f} ms/ファイル（中央値、warm_up {warm_sec * 1000:.0f} ms は起動時に1回）")
+    print(f"短縮     : x{statistics.median(cold) / statistics.median(warm):.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""
+分析結果のストリーミング出力
+企業デジタル分析ツール用
+
+結果リスト全体をメモリに持たず、届いた結果から1行ずつ書き出す。
+  - 形式: CSV / JSONL / Parquet（pyarrow インストール時）
+  - 拡張子 .gz なら gzip 圧縮（CSV / JSONL）
+  - resume=True なら既存ファイルに出力済みのドメインを飛ばして追記する
+    （中断で途中まで書かれた末尾の行は捨ててから続きを書く）
+  - Parquetは close() で初めてファイルが完成する。Ctrl+C などで正常に閉じれば再開できるが、
+    強制終了・クラッシュ時はその回の結果が残らない（強制終了に備えるなら CSV / JSONL を使う）
+"""
+
+import csv
+import gzip
+import io
+import json
+import os
+import time
+import zlib
+from urllib.parse import urlparse
+
+from analysis_core import CSV_FIELDS, csv_row, normalize_url
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+FORMATS = ("csv", "jsonl", "parquet")
+INT_FIELDS = {"スコア", "H1数", "リンク総数", "内部", "外部", "SNS数", "画像数", "alt未設定"}
+PARQUET_BATCH = 1000  # Parquetは行グループ単位で書くので、この件数ずつまとめる
+# CSV / JSONL はこの行数ごと、または前回から FLUSH_SEC 秒経ったらファイルに書き出す
+# （1行ごとの flush は gzip の圧縮率と速度を落とす）
+FLUSH_ROWS = 100
+FLUSH_SEC = 5.0
+
+
+def detect_format(path, fmt=None):
+    """
+    出力形式と圧縮の有無をファイル名から判断する。
+
+    Returns:
+        tuple: (形式, gzipかどうか)
+    """
+    name = path.lower()
+    gz = name.endswith(".gz")
+    if gz: name = name[:-3]
+    if fmt is None:
+        if name.endswith((".jsonl", ".ndjson")): fmt = "jsonl"
+        elif name.endswith(".parquet"): fmt = "parquet"
+        else: fmt = "csv"
+    if fmt not in FORMATS: raise ValueError(f"未対応の出力形式です: {fmt}")
+    if fmt == "parquet" and gz: raise ValueError("Parquetは .gz ではなく内部圧縮を使います")
+    return fmt, gz
+
+
+def domain_of(url):
+    return urlparse(normalize_url(url)).netloc
+
+
+def iter_csv_lines(results, header=True):
+    """結果dictを CSV の1行ずつの文字列にする（ジェネレーター）"""
+    buf = io.StringIO()
+    w = csv.DictWriter(buf, fieldnames=CSV_FIELDS)
+    if header:
+        w.writeheader()
+        yield buf.getvalue()
+    for r in results:
+        buf.seek(0); buf.truncate()
+        w.writerow(csv_row(r))
+        yield buf.getvalue()
+
+
+def iter_jsonl_lines(rows):
+    """dict を JSONL の1行ずつの文字列にする（ジェネレーター）"""
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + "\n"
+
+
+def _open_text(path, mode, fmt, gz):
+    # gzip への追記は新しいメンバーになるので、途中にBOMが入らないよう utf-8 にする
+    encoding = "utf-8-sig" if fmt == "csv" and not gz else "utf-8"
+    if gz: return gzip.open(path, mode + "t", encoding=encoding, newline="")
+    return open(path, mode, encoding=encoding, newline="")
+
+
+def _complete_lines(f, state):
+    """改行で終わる行だけを返す。途中で切れた行・壊れたgzipの末尾があれば state["damaged"] を立てる"""
+    try:
+        for line in f:
+            if not line.endswith("\n"):
+                state["damaged"] = True
+                return
+            yield line
+    except (EOFError, gzip.BadGzipFile, zlib.error):
+        state["damaged"] = True
+
+
+def _iter_existing(path, fmt, gz, state):
+    """既存の CSV / JSONL 出力から (ドメイン, 行文字列) を順に返す（エラー行はドメインNone）"""
+    with _open_text(path, "r", fmt, gz) as f:
+        lines = _complete_lines(f, state)
+        if fmt == "jsonl":
+            for line in lines:
+                try: row = json.loads(line)
+                except ValueError:
+                    state["damaged"] = True
+                    return
+                yield (None if row.get("error") else domain_of(row["url"])), line
+            return
+        buf = io.StringIO()
+        w = csv.writer(buf)
+        try:
+            reader = csv.reader(lines)
+            header = next(reader, None)
+            if header is None: return
+            if header != CSV_FIELDS: raise ValueError(f"{path} は分析結果のCSVではありません（列が一致しません）")
+            for row in reader:
+                if len(row) != len(CSV_FIELDS):
+                    state["damaged"] = True
+                    return
+                buf.seek(0); buf.truncate()
+                w.writerow(row)
+                yield domain_of(row[CSV_FIELDS.index("URL")]), buf.getvalue()
+        except csv.Error:
+            state["damaged"] = True
+
+
+def done_domains(path, fmt=None):
+    """
+    出力ファイルに結果が書かれているドメインの集合（エラー行は含めない＝再開時に再試行する）。
+
+    Args:
+        path: 出力ファイル
+        fmt: 出力形式（Noneなら拡張子から判断）
+    """
+    fmt, gz = detect_format(path, fmt)
+    if not os.path.exists(path): return set()
+    if fmt == "parquet":
+        if pq is None: raise ImportError("Parquet出力には pyarrow が必要です: pip install pyarrow")
+        return {domain_of(u) for u in pq.read_table(path, columns=["URL"]).column("URL").to_pylist()}
+    return {d for d, _ in _iter_existing(path, fmt, gz, {}) if d}
+
+
+class ResultExporter:
+    """
+    結果を1件ずつファイルに書き出す。
+
+    使い方:
+        with ResultExporter("results.csv.gz", resume=True) as ex:
+            urls = [u for u in urls if not ex.is_done(u)]
+            for url, result, error in runner.run(urls, run_analysis):
+                ex.write(url, result, error)
+
+    Args:
+        path: 出力ファイル（"-" なら標準出力にCSV / JSONL。Parquetは不可）
+        fmt: csv / jsonl / parquet（Noneなら拡張子から判断）
+        resume: 既存ファイルの続きから書くかどうか
+        stream: path="-" のときの出力先
+    """
+
+    def __init__(self, path, fmt=None, resume=False, stream=None):
+        self.path = path
+        self.fmt, self.gz = detect_format(path if path != "-" else "", fmt)
+        if path == "-" and self.fmt == "parquet":
+            raise ValueError("Parquetは標準出力に書けません。出力ファイルを指定してください")
+        self.done = set()
+        self.written = 0
+        self._unflushed = 0
+        self._flushed_at = time.monotonic()
+        self._parquet = None
+        self._batch = []
+        if self.fmt == "parquet":
+            self._open_parquet(resume)
+        elif path == "-":
+            self._out = stream
+            self._write_header = True
+        else:
+            self._open_text_output(resume)
+        if self._write_header and self.fmt == "csv":
+            self._out.write(next(iter_csv_lines([])))
+
+    def _open_text_output(self, resume):
+        exists = resume and os.path.exists(self.path) and os.path.getsize(self.path) > 0
+        if exists:
+            state = {}
+            for d, _ in _iter_existing(self.path, self.fmt, self.gz, state):
+                if d: self.done.add(d)
+            if state.get("damaged"): self._rewrite_valid_rows()
+        self._out = _open_text(self.path, "a" if exists else "w", self.fmt, self.gz)
+        self._write_header = not exists
+
+    def _rewrite_valid_rows(self):
+        """中断で壊れた末尾を除き、正しく書けている行だけでファイルを作り直す"""
+        tmp = self.path + ".tmp"
+        with _open_text(tmp, "w", self.fmt, self.gz) as out:
+            if self.fmt == "csv": out.write(next(iter_csv_lines([])))
+            for _, line in _iter_existing(self.path, self.fmt, self.gz, {}):
+                out.write(line)
+        os.replace(tmp, self.path)
+
+    def _open_parquet(self, resume):
+        if pq is None: raise ImportError("Parquet出力には pyarrow が必要です: pip install pyarrow")
+        self._schema = pa.schema([(k, pa.int64() if k in INT_FIELDS else pa.string()) for k in CSV_FIELDS])
+        # Parquetは追記できないので一時ファイルに書き、close() で置き換える（既存分は先にコピー）。
+        # フッターのない書きかけのファイルは読めないため、強制終了した回の結果は再開に使えない
+        self._tmp = self.path + ".tmp"
+        self._parquet = pq.ParquetWriter(self._tmp, self._schema, compression="zstd")
+        self._write_header = False
+        if resume and os.path.exists(self.path):
+            for batch in pq.ParquetFile(self.path).iter_batches(batch_size=PARQUET_BATCH):
+                self._parquet.write_batch(batch.cast(self._schema))
+                self.done.update(domain_of(u) for u in batch.column("URL").to_pylist())
+
+    def is_done(self, url):
+        """出力済みのドメインかどうか"""
+        return domain_of(url) in self.done
+
+    def write(self, url, result, error=None):
+        if result:
+            self.done.add(result["domain"])
+            self.written += 1
+        if self.fmt == "parquet":
+            if result: self._batch.append(csv_row(result))
+            if len(self._batch) >= PARQUET_BATCH: self._flush_parquet()
+            return
+        if self.fmt == "csv":
+            if not result: return  # CSVにはエラー行を出さない
+            line = next(iter_csv_lines([result], header=False))
+        else:
+            line = next(iter_jsonl_lines([result if result else {"url": url, "error": error}]))
+        self._out.write(line)
+        self._unflushed += 1
+        if self._unflushed >= FLUSH_ROWS or time.monotonic() - self._flushed_at >= FLUSH_SEC:
+            self._out.flush()
+            self._unflushed = 0
+            self._flushed_at = time.monotonic()
+
+    def _flush_parquet(self):
+        if self._batch:
+            self._parquet.write_table(pa.Table.from_pylist(self._batch, schema=self._schema))
+            self._batch = []
+
+    def close(self):
+        if self._parquet is not None:
+            self._flush_parquet()
+            self._parquet.close()
+            self._parquet = None
+            os.replace(self._tmp, self.path)
+        elif self.path != "-":
+            self._out.close()
+        else:
+            self._out.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
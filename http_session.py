@@ -0,0 +1,77 @@
+"""
+共有HTTPセッション
+企業デジタル分析ツール用
+
+requests.get を毎回呼ぶ代わりに、接続プール付きの Session を1つ共有する。
+  - keep-alive で同一ホストへの再接続（TLSハンドシェイク）を省く
+  - gzip / deflate / br（brotli インストール時）を自動展開
+  - 本文はストリーミングで読み、上限バイト数に達したら打ち切る
+urllib3 の接続プールはスレッドセーフなので、一括分析の各スレッドから同時に使える。
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_POOL_SIZE = 8
+DEFAULT_MAX_BYTES = 512 * 1024  # 判定に使うのはページ先頭の数百KBで十分
+CHUNK_SIZE = 64 * 1024
+
+
+def read_capped(response, max_bytes):
+    """
+    レスポンス本文を展開しながら max_bytes まで読む。
+
+    Returns:
+        tuple: (本文bytes, 打ち切ったかどうか)
+    """
+    chunks, size = [], 0
+    for chunk in response.iter_content(CHUNK_SIZE):
+        chunks.append(chunk)
+        size += len(chunk)
+        if max_bytes and size >= max_bytes:
+            return b"".join(chunks)[:max_bytes], True
+    return b"".join(chunks), False
+
+
+class HttpSession:
+    """
+    接続プール付きの共有セッション。get() は requests.get と同じように使える。
+
+    Args:
+        pool_size: ホストごとに保持する接続数（一括分析の同時実行数に合わせる）
+        max_bytes: 本文の読み込み上限（0なら無制限）
+        headers: 全リクエスト共通のヘッダー
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, max_bytes=DEFAULT_MAX_BYTES, headers=None):
+        self.max_bytes = max_bytes
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if headers: self.session.headers.update(headers)
+
+    def get(self, url, headers=None, timeout=15, allow_redirects=True):
+        """
+        ページを取得する。本文は max_bytes で打ち切る。
+
+        本文を最後まで読んだ場合だけ接続をプールに返して再利用する。
+        max_bytes で打ち切った場合は残りを読まずに接続を切る（次のリクエストは新しい接続になる）。
+
+        Returns:
+            requests.Response: content / text が使える状態。打ち切った場合は truncated=True
+        """
+        r = self.session.get(url, headers=headers, timeout=timeout, allow_redirects=allow_redirects, stream=True)
+        try:
+            body, truncated = read_capped(r, self.max_bytes)
+        finally:
+            # 読み切っていれば接続はプールに戻り、打ち切った場合は破棄される
+            r.close()
+        # 読み込み済みの本文を Response に戻し、通常のレスポンスと同じように扱えるようにする
+        r._content = body
+        r._content_consumed = True
+        r.truncated = truncated
+        return r
+
+    def close(self):
+        self.session.close()
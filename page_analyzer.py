@@ -0,0 +1,296 @@
+"""
+ページ分析モジュール
+企業デジタル分析ツール用
+
+analyze_page() はDOMを1回だけ走査して、
+SEO・リンク・問い合わせ・技術・業種の5つの分析結果をまとめて作る。
+個別の analyze_* 関数は従来どおり残してあり、結果は完全に一致する。
+"""
+
+import re
+from urllib.parse import urlparse, urljoin
+
+from bs4.element import CData, NavigableString, Tag
+
+# ===== 定数 =====
+SNS_DOMAINS = {"twitter.com":"Twitter/X","x.com":"X","facebook.com":"Facebook","instagram.com":"Instagram","linkedin.com":"LinkedIn","youtube.com":"YouTube","tiktok.com":"TikTok","line.me":"LINE","note.com":"note"}
+RECRUIT_KEYWORDS = ["recruit","career","careers","jobs","hiring","採用","求人","リクルート","新卒","中途","entry","joblist","employment"]
+CATEGORY_KEYWORDS = {
+    "製造":["製造","工場","製作所","メーカー","manufacturing","factory"],
+    "IT・Web":["システム","ソフトウェア","IT","Web","アプリ","デジタル","tech"],
+    "建設・不動産":["建設","建築","不動産","工務店","リフォーム","housing"],
+    "飲食":["飲食","レストラン","食堂","カフェ","料理","food"],
+    "小売":["販売","ショップ","ストア","store","shop","通販"],
+    "医療・介護":["医療","クリニック","病院","介護","福祉","歯科"],
+    "教育":["教育","学校","スクール","塾","学習","academy"],
+    "士業":["税理士","会計士","弁護士","司法書士","行政書士","社労士"],
+}
+CONTACT_KEYWORDS = ["問い合わせ","お問合せ","contact","inquiry"]
+ANALYTICS_KEYWORDS = ["google-analytics","gtag","googletagmanager"]
+PHONE_PATTERN = re.compile(r"0\d{1,4}[-‐ー]?\d{1,4}[-‐ー]?\d{3,4}")
+SKIP_LINK_PREFIXES = ("#","javascript:","mailto:","tel:")
+
+# get_text() の対象になる文字列型（コメント・script・style等は除外）
+MAIN_TEXT_TYPES = (NavigableString, CData)
+
+
+# ===== 個別の分析関数 =====
+def analyze_meta_seo(soup):
+    r = {"title":"","title_length":0,"description":"","description_length":0,"has_viewport":False,"has_ogp":False,"h1_count":0,"h1_text":"","has_favicon":False,"has_canonical":False}
+    t = soup.find("title")
+    if t and t.string: r["title"]=t.string.strip(); r["title_length"]=len(r["title"])
+    d = soup.find("meta",attrs={"name":"description"})
+    if d and d.get("content"): r["description"]=d["content"].strip(); r["description_length"]=len(r["description"])
+    r["has_viewport"] = soup.find("meta",attrs={"name":"viewport"}) is not None
+    r["has_ogp"] = soup.find("meta",attrs={"property":"og:title"}) is not None
+    h1s = soup.find_all("h1"); r["h1_count"]=len(h1s)
+    if h1s: r["h1_text"]=h1s[0].get_text(strip=True)[:50]
+    r["has_favicon"] = soup.find("link",rel=lambda x:x and "icon" in x) is not None
+    r["has_canonical"] = soup.find("link",rel="canonical") is not None
+    return r
+
+def analyze_links(soup, base_url):
+    all_a = soup.find_all("a",href=True); bd = urlparse(base_url).netloc
+    il,el,sns,rf,ru = [],[],{},False,""
+    for a in all_a:
+        h = a.get("href","").strip()
+        if not h or h.startswith(SKIP_LINK_PREFIXES): continue
+        fu = urljoin(base_url,h); ld = urlparse(fu).netloc.lower()
+        if ld==bd or not ld: il.append(fu)
+        else: el.append(fu)
+        for sd,sn in SNS_DOMAINS.items():
+            if sd in ld: sns[sn]=fu; break
+        hl,tl = h.lower(), a.get_text(strip=True).lower()
+        for kw in RECRUIT_KEYWORDS:
+            if kw in hl or kw in tl: rf=True; ru=fu; break
+    return {"total_links":len(all_a),"internal_links":len(il),"external_links":len(el),"sns_links":sns,"sns_count":len(sns),"recruit_found":rf,"recruit_url":ru}
+
+def analyze_contact(soup):
+    r = {"has_form":False,"has_phone":False,"phone_number":"","has_email_link":False,"has_contact_page":False}
+    r["has_form"] = soup.find("form") is not None
+    ph = PHONE_PATTERN.findall(soup.get_text())
+    if ph: r["has_phone"]=True; r["phone_number"]=ph[0]
+    r["has_email_link"] = soup.find("a",href=re.compile(r"^mailto:")) is not None
+    for a in soup.find_all("a",href=True):
+        ht = (a.get("href","")+a.get_text()).lower()
+        if any(w in ht for w in CONTACT_KEYWORDS): r["has_contact_page"]=True; break
+    return r
+
+def detect_category(soup):
+    return category_from_text(soup.get_text())
+
+def category_from_text(text):
+    text = text.lower(); sc = {}
+    for c,kws in CATEGORY_KEYWORDS.items():
+        n = sum(1 for k in kws if k.lower() in text)
+        if n>0: sc[c]=n
+    return max(sc,key=sc.get) if sc else "その他"
+
+def analyze_tech(soup):
+    r = {"has_analytics":False,"has_structured_data":False,"image_count":0,"images_without_alt":0}
+    ht = str(soup)
+    if any(w in ht for w in ANALYTICS_KEYWORDS): r["has_analytics"]=True
+    if soup.find("script",type="application/ld+json"): r["has_structured_data"]=True
+    imgs = soup.find_all("img"); r["image_count"]=len(imgs)
+    r["images_without_alt"] = sum(1 for i in imgs if not i.get("alt"))
+    return r
+
+
+# ===== 1パス分析 =====
+def _attr_tokens(value):
+    """rel等の複数値属性をトークンのリストにそろえる"""
+    if value is None: return []
+    if isinstance(value, str): return value.split()
+    return list(value)
+
+
+class _Anchor:
+    """走査中の <a href> 1件分"""
+    __slots__ = ("href", "texts")
+
+    def __init__(self, href):
+        self.href = href
+        self.texts = []
+
+
+class PageVisitor:
+    """
+    DOMの開始タグ・テキスト・終了タグのイベントを受け取り、
+    analyze_meta_seo / analyze_links / analyze_contact / analyze_tech / detect_category
+    と同じ結果を1回の走査で組み立てる。
+
+    イベントの発行はパーサーに依存しない（walk_soup / parser_backend.walk_selectolax）。
+    """
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.seo = {"title":"","title_length":0,"description":"","description_length":0,"has_viewport":False,"has_ogp":False,"h1_count":0,"h1_text":"","has_favicon":False,"has_canonical":False}
+        self.tech = {"has_analytics":False,"has_structured_data":False,"image_count":0,"images_without_alt":0}
+        self.has_form = False
+        self.has_email_link = False
+        self.anchors = []
+        self._texts = []            # ページ全体の get_text() 相当
+        self._open_anchors = []     # 開いている <a href>（入れ子対応）
+        self._a_stack = []          # 開いている <a> ごとに href の有無
+        self._title_done = False
+        self._title_frames = []     # 最初の <title> の .string 解決用 [子要素数, 値]
+        self._description_done = False
+        self._h1_depth = 0          # 最初の <h1> の入れ子の深さ
+        self._h1_texts = []
+
+    # --- イベント ---
+    def start(self, name, attrs):
+        if self._title_frames:
+            self._title_frames[-1][0] += 1
+            self._title_frames.append([0, None])
+        elif name == "title" and not self._title_done:
+            self._title_done = True
+            self._title_frames.append([0, None])
+
+        if not self.tech["has_analytics"]:
+            self._scan_analytics(name, attrs)
+
+        if name == "a":
+            href = attrs.get("href")
+            self._a_stack.append(href is not None)
+            if href is not None:
+                anchor = _Anchor(href)
+                self.anchors.append(anchor)
+                self._open_anchors.append(anchor)
+                if not self.has_email_link and href.startswith("mailto:"):
+                    self.has_email_link = True
+        elif name == "meta":
+            mname = attrs.get("name")
+            if mname == "description" and not self._description_done:
+                self._description_done = True
+                content = attrs.get("content")
+                if content:
+                    self.seo["description"] = content.strip()
+                    self.seo["description_length"] = len(self.seo["description"])
+            elif mname == "viewport":
+                self.seo["has_viewport"] = True
+            if attrs.get("property") == "og:title":
+                self.seo["has_ogp"] = True
+        elif name == "link":
+            rel = _attr_tokens(attrs.get("rel"))
+            if any("icon" in v for v in rel): self.seo["has_favicon"] = True
+            if "canonical" in rel: self.seo["has_canonical"] = True
+        elif name == "h1":
+            self.seo["h1_count"] += 1
+            if self._h1_depth or self.seo["h1_count"] == 1:
+                self._h1_depth += 1
+        elif name == "img":
+            self.tech["image_count"] += 1
+            if not attrs.get("alt"): self.tech["images_without_alt"] += 1
+        elif name == "form":
+            self.has_form = True
+        elif name == "script":
+            if attrs.get("type") == "application/ld+json":
+                self.tech["has_structured_data"] = True
+
+    def text(self, data, main):
+        """main: get_text() の対象になる文字列か（コメント・script等はFalse）"""
+        if self._title_frames:
+            frame = self._title_frames[-1]
+            frame[0] += 1; frame[1] = data
+        if not self.tech["has_analytics"] and any(w in data for w in ANALYTICS_KEYWORDS):
+            self.tech["has_analytics"] = True
+        if not main: return
+        self._texts.append(data)
+        for anchor in self._open_anchors:
+            anchor.texts.append(data)
+        if self._h1_depth:
+            self._h1_texts.append(data)
+
+    def end(self, name):
+        if self._title_frames:
+            count, value = self._title_frames.pop()
+            value = value if count == 1 else None
+            if self._title_frames:
+                self._title_frames[-1][1] = value
+            elif value:
+                self.seo["title"] = value.strip()
+                self.seo["title_length"] = len(self.seo["title"])
+        if name == "a":
+            if self._a_stack and self._a_stack.pop():
+                self._open_anchors.pop()
+        elif name == "h1" and self._h1_depth:
+            self._h1_depth -= 1
+
+    def _scan_analytics(self, name, attrs):
+        """str(soup) に現れるタグ名・属性名・属性値からGA等を探す"""
+        parts = [name]
+        for k, v in attrs.items():
+            parts.append(k)
+            parts.append(v if isinstance(v, str) else " ".join(v))
+        joined = " ".join(parts)
+        if any(w in joined for w in ANALYTICS_KEYWORDS):
+            self.tech["has_analytics"] = True
+
+    # --- 結果 ---
+    def results(self):
+        """5つの分析結果を run_analysis() の結果dictと同じキーで返す"""
+        if self.seo["h1_count"]:
+            self.seo["h1_text"] = "".join(s.strip() for s in self._h1_texts if s.strip())[:50]
+
+        bd = urlparse(self.base_url).netloc
+        internal = external = 0
+        sns, rf, ru = {}, False, ""
+        has_contact_page = False
+        for anchor in self.anchors:
+            raw = "".join(anchor.texts)
+            if not has_contact_page:
+                ht = (anchor.href + raw).lower()
+                if any(w in ht for w in CONTACT_KEYWORDS): has_contact_page = True
+            h = anchor.href.strip()
+            if not h or h.startswith(SKIP_LINK_PREFIXES): continue
+            fu = urljoin(self.base_url, h); ld = urlparse(fu).netloc.lower()
+            if ld == bd or not ld: internal += 1
+            else: external += 1
+            for sd, sn in SNS_DOMAINS.items():
+                if sd in ld: sns[sn] = fu; break
+            hl = h.lower()
+            tl = "".join(s.strip() for s in anchor.texts if s.strip()).lower()
+            for kw in RECRUIT_KEYWORDS:
+                if kw in hl or kw in tl: rf = True; ru = fu; break
+        links = {"total_links":len(self.anchors),"internal_links":internal,"external_links":external,"sns_links":sns,"sns_count":len(sns),"recruit_found":rf,"recruit_url":ru}
+
+        text = "".join(self._texts)
+        contact = {"has_form":self.has_form,"has_phone":False,"phone_number":"","has_email_link":self.has_email_link,"has_contact_page":has_contact_page}
+        ph = PHONE_PATTERN.search(text)
+        if ph: contact["has_phone"] = True; contact["phone_number"] = ph.group(0)
+
+        return {"seo":self.seo,"links":links,"contact":contact,"tech":self.tech,"category":category_from_text(text)}
+
+
+def walk_soup(soup, visitor):
+    """BeautifulSoupの木を1回だけ走査し、visitorへイベントを送る"""
+    start, text, end = visitor.start, visitor.text, visitor.end
+    stack = [(None, iter(soup.contents))]
+    while stack:
+        for node in stack[-1][1]:
+            if isinstance(node, Tag):
+                start(node.name, node.attrs)
+                stack.append((node.name, iter(node.contents)))
+                break
+            text(node, type(node) in MAIN_TEXT_TYPES)
+        else:
+            name = stack.pop()[0]
+            if name is not None: end(name)
+
+
+def analyze_page(page, base_url):
+    """
+    ページを1回の走査で分析する。
+
+    Args:
+        page: parser_backend.ParsedPage または BeautifulSoup オブジェクト
+        base_url: 正規化済みのページURL
+
+    Returns:
+        dict: seo / links / contact / tech / category（各 analyze_* と同じ内容）
+    """
+    visitor = PageVisitor(base_url)
+    if isinstance(page, Tag): walk_soup(page, visitor)
+    else: page.walk(visitor)
+    return visitor.results()
@@ -0,0 +1,116 @@
+"""
+HTMLパーサーバックエンド
+企業デジタル分析ツール用
+
+selectolax（lexbor）> lxml > html.parser の順に、インストール済みで最速のものを使う。
+どのバックエンドでも page_analyzer.PageVisitor に同じ形式のイベントを送るので、
+分析・スコアリング側はパーサーの違いを意識しなくてよい。
+
+高速パーサーを使う場合（任意）:
+    pip install selectolax lxml
+"""
+
+from bs4 import BeautifulSoup
+
+from page_analyzer import walk_soup
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+try:
+    import lxml  # noqa: F401  BeautifulSoup(..., "lxml") で使う
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+# 速い順
+BACKEND_PREFERENCE = ("selectolax", "lxml", "html.parser")
+
+# bs4 では Script / Stylesheet / TemplateString / RubyTextString 等になり、
+# get_text() に含まれない文字列を持つタグ
+NON_MAIN_TEXT_TAGS = {"script", "style", "template", "rt", "rp"}
+
+
+def available_backends():
+    """この環境で使えるバックエンド名を速い順に返す"""
+    found = []
+    if LexborHTMLParser is not None: found.append("selectolax")
+    if HAS_LXML: found.append("lxml")
+    found.append("html.parser")
+    return found
+
+
+def resolve_backend(name="auto"):
+    """指定名を実際に使うバックエンド名に解決する（使えなければ html.parser）"""
+    backends = available_backends()
+    if name == "auto": return backends[0]
+    return name if name in backends else "html.parser"
+
+
+class ParsedPage:
+    """パース済みページ。walk() で PageVisitor にイベントを送る"""
+
+    def __init__(self, backend, tree):
+        self.backend = backend
+        self.tree = tree
+
+    def walk(self, visitor):
+        if self.backend == "selectolax":
+            walk_selectolax(self.tree, visitor)
+        else:
+            walk_soup(self.tree, visitor)
+
+
+def parse_html(text, backend="auto"):
+    """
+    HTMLをパースする。高速パーサーで失敗した場合は html.parser にフォールバックする。
+
+    Args:
+        text: HTML文字列
+        backend: "auto" / "selectolax" / "lxml" / "html.parser"
+
+    Returns:
+        ParsedPage
+    """
+    name = resolve_backend(backend)
+    try:
+        if name == "selectolax":
+            return ParsedPage(name, LexborHTMLParser(text))
+        if name == "lxml":
+            return ParsedPage(name, BeautifulSoup(text, "lxml"))
+    except Exception:
+        pass
+    return ParsedPage("html.parser", BeautifulSoup(text, "html.parser"))
+
+
+def walk_selectolax(tree, visitor):
+    """selectolaxの木を1回だけ走査し、walk_soup と同じ形式のイベントを送る"""
+    start, text, end = visitor.start, visitor.text, visitor.end
+    root = tree.root
+    if root is None: return
+    if root.parent is not None: root = root.parent  # DOCTYPE・先頭コメントも含める
+    muted = 0  # script / style 等の内側にいる深さ
+    stack = [(None, root.iter(include_text=True))]
+    while stack:
+        for node in stack[-1][1]:
+            tag = node.tag
+            if tag == "-text":
+                text(node.text_content or "", not muted)
+                continue
+            if tag == "-comment":
+                text(node.comment_content or "", False)
+                continue
+            if tag.startswith("-"):  # -doctype 等
+                continue
+            # 値なし属性は bs4 と同じく空文字にそろえる
+            start(tag, {k: ("" if v is None else v) for k, v in node.attributes.items()})
+            if tag in NON_MAIN_TEXT_TAGS: muted += 1
+            stack.append((tag, node.iter(include_text=True)))
+            break
+        else:
+            tag = stack.pop()[0]
+            if tag is not None:
+                if tag in NON_MAIN_TEXT_TAGS: muted -= 1
+                end(tag)
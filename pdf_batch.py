@@ -0,0 +1,133 @@
+"""
+PDFレポートの一括生成
+企業デジタル分析ツール用
+
+一括分析の全社分のPDFレポートをプロセスプールで並列に生成し、ZIPとして逐次出力する。
+  - フォントの検出・登録はワーカープロセスごとに1回だけ（初期化時に済ませておく）
+  - 同時に抱えるレポートは「プロセス数 × 4」件までなので、件数が多くてもメモリは増えない
+  - ZIPは完成したレポートから順にチャンクで返す（ファイルにもレスポンスにも流せる）
+
+使い方:
+    python pdf_batch.py results.jsonl -o reports.zip --processes 4
+"""
+
+import argparse
+import gzip
+import json
+import os
+import re
+import sys
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from pdf_report import generate_report_pdf, get_japanese_font
+
+PENDING_PER_PROCESS = 4
+
+
+def report_filename(result):
+    """1社分のPDFファイル名（画面からのダウンロードと同じ形式）"""
+    domain = re.sub(r"[^\w.-]", "_", result["domain"])
+    date = result["analyzed_at"][:10].replace("-", "")
+    return f"report_{domain}_{date}.pdf"
+
+
+def _init_worker():
+    get_japanese_font()  # フォント登録を最初のレポートより前に済ませる
+
+
+def _render(result):
+    return report_filename(result), generate_report_pdf(result)
+
+
+def render_reports(results, processes=None):
+    """
+    結果を1社ずつPDFにし、完成順に (ファイル名, PDF bytes) をyieldする。
+
+    Args:
+        results: run_analysis() の結果dictのイテラブル（ジェネレーター可）
+        processes: プロセス数（Noneならコア数、1ならこのプロセス内で直列）
+    """
+    processes = processes or os.cpu_count() or 1
+    if processes <= 1:
+        for r in results:
+            yield _render(r)
+        return
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker) as pool:
+        pending = set()
+        for r in results:
+            pending.add(pool.submit(_render, r))
+            if len(pending) >= processes * PENDING_PER_PROCESS:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    yield fut.result()
+        for fut in wait(pending).done:
+            yield fut.result()
+
+
+class _ChunkSink:
+    """ZipFile の書き込み先。書かれたbytesを溜めておき、pop() で取り出す（シーク不可のストリーム扱い）"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_report_zip(results, processes=None):
+    """
+    全社分のPDFレポートを入れたZIPを、チャンク（bytes）ごとにyieldする。
+
+    同じファイル名が重複した場合は _2, _3 ... を付ける。
+    """
+    sink = _ChunkSink()
+    names = {}
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, pdf in render_reports(results, processes):
+            n = names[name] = names.get(name, 0) + 1
+            if n > 1: name = f"{name[:-4]}_{n}.pdf"
+            zf.writestr(name, pdf)
+            yield sink.pop()
+    yield sink.pop()
+
+
+def read_results(path):
+    """analyze_cli の JSONL（.gz可）から成功した結果を1件ずつ読む"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            row = json.loads(line)
+            if not row.get("error"): yield row
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="分析結果（JSONL）から全社分のPDFレポートをZIPにまとめる")
+    p.add_argument("input", help="analyze_cli の JSONL 出力（.jsonl / .jsonl.gz）")
+    p.add_argument("-o", "--output", required=True, help="出力ZIPファイル")
+    p.add_argument("-p", "--processes", type=int, default=None, help="プロセス数（省略時はコア数）")
+    args = p.parse_args(argv)
+
+    count = 0
+    start = time.perf_counter()
+    with open(args.output, "wb") as out:
+        # レポート1件ごとに1チャンク、最後のチャンクはZIPの目次
+        for count, chunk in enumerate(iter_report_zip(read_results(args.input), args.processes)):
+            out.write(chunk)
+    elapsed = time.perf_counter() - start
+    print(f"完了: {count}件 {elapsed:.1f}秒 {count / elapsed if elapsed > 0 else 0:.1f} ページ/秒", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
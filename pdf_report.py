@@ -11,6 +11,7 @@ from reportlab.lib.units import mm
 from reportlab.lib.colors import HexColor
 from reportlab.pdfgen import canvas
 from reportlab.lib.utils import simpleSplit
+import functools
 import io
 import math
 import os
@@ -32,28 +33,34 @@ COLOR_WHITE = HexColor("#ffffff")
 RANK_COLORS = {"s": COLOR_RED, "a": COLOR_ORANGE, "b": COLOR_YELLOW, "c": COLOR_BLUE, "d": COLOR_GREEN}
 
 # ===== 日本語フォント検出 =====
+# よくあるフォントパス（Windows / Mac / Linux）
+FONT_CANDIDATES = [
+    # Windows
+    ("C:/Windows/Fonts/meiryo.ttc", "Meiryo"),
+    ("C:/Windows/Fonts/msgothic.ttc", "MSGothic"),
+    ("C:/Windows/Fonts/YuGothM.ttc", "YuGothic"),
+    ("C:/Windows/Fonts/msmincho.ttc", "MSMincho"),
+    # Mac
+    ("/System/Library/Fonts/ヒラギノ角ゴシック W3.ttc", "HiraginoSans"),
+    ("/Library/Fonts/Arial Unicode.ttf", "ArialUnicode"),
+    # Linux
+    ("/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc", "NotoSansCJK"),
+    ("/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc", "NotoSansCJK"),
+    ("/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc", "NotoSansCJK"),
+]
+
+
+@functools.lru_cache(maxsize=1)
 def get_japanese_font():
-    """利用可能な日本語フォントを検出して登録する"""
+    """
+    利用可能な日本語フォントを検出して登録する。
+
+    TTCの読み込み・登録は重いので、1プロセスにつき1回だけ行い、以降はフォント名を返す。
+    """
     from reportlab.pdfbase import pdfmetrics
     from reportlab.pdfbase.ttfonts import TTFont
 
-    # よくあるフォントパス（Windows / Mac / Linux）
-    font_candidates = [
-        # Windows
-        ("C:/Windows/Fonts/meiryo.ttc", "Meiryo"),
-        ("C:/Windows/Fonts/msgothic.ttc", "MSGothic"),
-        ("C:/Windows/Fonts/YuGothM.ttc", "YuGothic"),
-        ("C:/Windows/Fonts/msmincho.ttc", "MSMincho"),
-        # Mac
-        ("/System/Library/Fonts/ヒラギノ角ゴシック W3.ttc", "HiraginoSans"),
-        ("/Library/Fonts/Arial Unicode.ttf", "ArialUnicode"),
-        # Linux
-        ("/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc", "NotoSansCJK"),
-        ("/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc", "NotoSansCJK"),
-        ("/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc", "NotoSansCJK"),
-    ]
-
-    for path, name in font_candidates:
+    for path, name in FONT_CANDIDATES:
         if os.path.exists(path):
             try:
                 pdfmetrics.registerFont(TTFont(name, path))
@@ -337,92 +344,140 @@ def generate_report_pdf(result):
 
 
 # ===== 一括分析用サマリーPDF =====
-def generate_batch_summary_pdf(results):
+SUMMARY_HEADERS = ["ランク", "スコア", "URL", "判定", "業種", "SNS", "採用"]
+SUMMARY_ROW_H = 7 * mm
+
+
+def _define_summary_forms(cv, font, width, margin):
+    """表の見出し行・縞模様の帯を1回だけ描いてフォームXObjectにする（各ページから参照するだけにする）"""
+    col_x = [margin+3*mm, margin+18*mm, margin+35*mm, margin+95*mm, margin+125*mm, margin+148*mm, margin+162*mm]
+
+    cv.beginForm("table_header")
+    draw_rounded_rect(cv, margin, 0, width - 2*margin, SUMMARY_ROW_H, radius=0, fill_color=COLOR_DARK)
+    for i, h in enumerate(SUMMARY_HEADERS):
+        draw_text(cv, col_x[i], 2*mm, h, font, 7, COLOR_WHITE)
+    cv.endForm()
+
+    cv.beginForm("band")
+    draw_rounded_rect(cv, margin, 0, width - 2*margin, SUMMARY_ROW_H, radius=0, fill_color=COLOR_BG_LIGHT)
+    cv.endForm()
+    return col_x
+
+
+def _place_form(cv, name, y):
+    cv.saveState()
+    cv.translate(0, y)
+    cv.doForm(name)
+    cv.restoreState()
+
+
+def generate_batch_summary_pdf(results, out=None):
     """
     一括分析結果のサマリーPDFを生成
 
+    行は1件ずつ描画し、1ページ分たまったら改ページする。見出し行・縞模様はフォームXObjectとして
+    1回だけ定義して各ページから参照する。件数・平均スコアなどの集計は全行を描いた後に確定するので、
+    1ページ目からは後で定義するフォーム（summary）を参照しておく。
+
+    入力の行はメモリに溜めないが、reportlab は完成したページの描画命令を save() まで保持するため、
+    メモリは行数に比例して増える（1行あたり約0.7KB。行ごとに描画していたときの半分以下）。
+
     Args:
-        results: list of run_analysis() の戻り値
+        results: run_analysis() の戻り値のリスト（ここでスコア昇順に並べ替える）、
+                 またはスコア昇順に並んだイテラブル（ResultsStore.iter_by_score 等。メモリに溜めずに描画する）
+        out: 書き込み先のファイルパス / ファイルオブジェクト（Noneなら bytes を返す）
 
     Returns:
-        bytes: PDF のバイトデータ
+        bytes: PDF のバイトデータ（out を指定した場合は None）
     """
-    buf = io.BytesIO()
+    if isinstance(results, list):
+        results = sorted(results, key=lambda x: x["score"])
+    buf = io.BytesIO() if out is None else out
     width, height = A4
     margin = 20 * mm
     font = get_japanese_font()
+    generated = datetime.datetime.now().strftime('%Y-%m-%d %H:%M')
 
     cv = canvas.Canvas(buf, pagesize=A4)
     cv.setTitle("一括分析サマリーレポート")
+    col_x = _define_summary_forms(cv, font, width, margin)
 
     # ヘッダー
     draw_rounded_rect(cv, margin, height - 40*mm, width - 2*margin, 25*mm, radius=4*mm, fill_color=COLOR_DARK)
     draw_text(cv, margin + 8*mm, height - 23*mm, "📊 一括分析サマリーレポート", font, 16, COLOR_WHITE)
-    draw_text(cv, margin + 8*mm, height - 31*mm, f"分析件数: {len(results)}件 | 生成日: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}", font, 8, HexColor("#94a3b8"))
-
-    # サマリー
-    targets = [r for r in results if r["score"] <= 40]
-    maybes = [r for r in results if 40 < r["score"] <= 55]
-    safes = [r for r in results if r["score"] > 55]
-    avg = sum(r["score"] for r in results) / len(results) if results else 0
-
-    sy = height - 55*mm
-    cw = (width - 2*margin - 12*mm) / 4
-    labels = [("営業対象", len(targets), COLOR_RED), ("要検討", len(maybes), COLOR_YELLOW), ("対象外", len(safes), COLOR_GREEN), ("平均スコア", f"{avg:.0f}", COLOR_BLUE)]
-    for i, (label, val, color) in enumerate(labels):
-        x = margin + i*(cw + 4*mm)
-        draw_rounded_rect(cv, x, sy, cw, 15*mm, radius=3*mm, fill_color=COLOR_WHITE, stroke_color=COLOR_BORDER)
-        draw_text(cv, x + 5*mm, sy + 9*mm, str(val), font, 16, color)
-        draw_text(cv, x + 5*mm, sy + 3*mm, label, font, 7, COLOR_SUB)
+    cv.doForm("summary")  # 分析件数・サマリーカード（全行を描いた後に定義）
 
     # テーブル
+    sy = height - 55*mm
     table_y = sy - 12*mm
     draw_text(cv, margin, table_y, "分析結果一覧（スコア昇順）", font, 10, COLOR_TEXT)
 
     # ヘッダー行
     table_y -= 8*mm
-    draw_rounded_rect(cv, margin, table_y - 1*mm, width - 2*margin, 7*mm, radius=0, fill_color=COLOR_DARK)
-    headers = ["ランク", "スコア", "URL", "判定", "業種", "SNS", "採用"]
-    col_x = [margin+3*mm, margin+18*mm, margin+35*mm, margin+95*mm, margin+125*mm, margin+148*mm, margin+162*mm]
-    for i, h in enumerate(headers):
-        draw_text(cv, col_x[i], table_y + 1*mm, h, font, 7, COLOR_WHITE)
+    _place_form(cv, "table_header", table_y - 1*mm)
 
-    # データ行
-    sorted_results = sorted(results, key=lambda x: x["score"])
-    row_y = table_y - 7*mm
-    for j, r in enumerate(sorted_results):
+    # データ行（文字はページごとに1つのテキストオブジェクトにまとめ、縞模様の上に最後に描く）
+    count = targets = maybes = total = 0
+    row_y = table_y - SUMMARY_ROW_H
+    tx = cv.beginText()
+    for r in results:
         if row_y < 20*mm:
             # 新しいページ
+            cv.drawText(tx)
             cv.showPage()
+            tx = cv.beginText()
             row_y = height - 30*mm
-            draw_rounded_rect(cv, margin, row_y + 1*mm, width - 2*margin, 7*mm, radius=0, fill_color=COLOR_DARK)
-            for i, h in enumerate(headers):
-                draw_text(cv, col_x[i], row_y + 3*mm, h, font, 7, COLOR_WHITE)
-            row_y -= 7*mm
+            _place_form(cv, "table_header", row_y + 1*mm)
+            row_y -= SUMMARY_ROW_H
 
         # 交互背景
-        if j % 2 == 0:
-            draw_rounded_rect(cv, margin, row_y - 1*mm, width - 2*margin, 7*mm, radius=0, fill_color=COLOR_BG_LIGHT)
-
-        rc = r["rank_class"]
-        draw_text(cv, col_x[0], row_y + 1*mm, r["rank"], font, 8, RANK_COLORS.get(rc, COLOR_TEXT))
-        draw_text(cv, col_x[1], row_y + 1*mm, str(r["score"]), font, 8, RANK_COLORS.get(rc, COLOR_TEXT))
-        draw_text(cv, col_x[2], row_y + 1*mm, r["domain"][:30], font, 7, COLOR_TEXT)
-        draw_text(cv, col_x[3], row_y + 1*mm, r["rank_label"][:10], font, 7, COLOR_TEXT)
-        draw_text(cv, col_x[4], row_y + 1*mm, r["category"], font, 7, COLOR_TEXT)
-        draw_text(cv, col_x[5], row_y + 1*mm, str(r["links"]["sns_count"]), font, 7, COLOR_TEXT)
-        draw_text(cv, col_x[6], row_y + 1*mm, "✅" if r["links"]["recruit_found"] else "❌", font, 7, COLOR_TEXT)
-
-        row_y -= 7*mm
+        if count % 2 == 0:
+            _place_form(cv, "band", row_y - 1*mm)
+
+        score = r["score"]
+        count += 1
+        total += score
+        if score <= 40: targets += 1
+        elif score <= 55: maybes += 1
+
+        y = row_y + 1*mm
+        cells = [r["domain"][:30], r["rank_label"][:10], r["category"], str(r["links"]["sns_count"]),
+                 "✅" if r["links"]["recruit_found"] else "❌"]
+        tx.setFont(font, 8)
+        tx.setFillColor(RANK_COLORS.get(r["rank_class"], COLOR_TEXT))
+        for x, text in zip(col_x, (r["rank"], str(score))):
+            tx.setTextOrigin(x, y)
+            tx.textOut(text)
+        tx.setFont(font, 7)
+        tx.setFillColor(COLOR_TEXT)
+        for x, text in zip(col_x[2:], cells):
+            tx.setTextOrigin(x, y)
+            tx.textOut(text)
+
+        row_y -= SUMMARY_ROW_H
+    cv.drawText(tx)
 
     # フッター
     cv.setFont(font, 6)
     cv.setFillColor(COLOR_SUB)
-    cv.drawCentredString(width/2, 10*mm, f"企業デジタル分析ツール v3.0 | Generated: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}")
+    cv.drawCentredString(width/2, 10*mm, f"企業デジタル分析ツール v3.0 | Generated: {generated}")
+
+    # サマリー（1ページ目から参照しているフォームをここで定義）
+    avg = total / count if count else 0
+    cv.beginForm("summary")
+    draw_text(cv, margin + 8*mm, height - 31*mm, f"分析件数: {count}件 | 生成日: {generated}", font, 8, HexColor("#94a3b8"))
+    cw = (width - 2*margin - 12*mm) / 4
+    labels = [("営業対象", targets, COLOR_RED), ("要検討", maybes, COLOR_YELLOW), ("対象外", count - targets - maybes, COLOR_GREEN), ("平均スコア", f"{avg:.0f}", COLOR_BLUE)]
+    for i, (label, val, color) in enumerate(labels):
+        x = margin + i*(cw + 4*mm)
+        draw_rounded_rect(cv, x, sy, cw, 15*mm, radius=3*mm, fill_color=COLOR_WHITE, stroke_color=COLOR_BORDER)
+        draw_text(cv, x + 5*mm, sy + 9*mm, str(val), font, 16, color)
+        draw_text(cv, x + 5*mm, sy + 3*mm, label, font, 7, COLOR_SUB)
+    cv.endForm()
 
     cv.save()
-    buf.seek(0)
-    return buf.getvalue()
+    if out is None:
+        return buf.getvalue()
 
 
 # datetimeのインポート（generate_batch_summary_pdfで使用）
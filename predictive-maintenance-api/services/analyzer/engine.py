@@ -3,14 +3,25 @@
 
 analyze_vibration.pyの解析ロジックをAPI用に再構成
 FFT・エンベロープ解析・Zスコア異常検知を提供する
+
+analyze_incremental は前回までの統計量（状態）を受け取り、新しいデータだけを
+解析して状態を更新する（データが増えても1回の解析コストは新しい分に比例）。
 """
 
 import logging
+import math
 
 import numpy as np
 from scipy import signal
 
-from shared.config import ANOMALY_THRESHOLD, SAMPLING_RATE, SEGMENT_LEN
+from shared import dsp_cache
+from shared.config import (
+    ANALYSIS_RMS_HISTORY,
+    ANOMALY_THRESHOLD,
+    SAMPLING_RATE,
+    SEGMENT_LEN,
+)
+from shared.segment_stats import EPS, segment_stats
 
 logger = logging.getLogger(__name__)
 
@@ -37,6 +48,8 @@ def compute_fft(
 ) -> tuple[np.ndarray, np.ndarray]:
     """FFTスペクトルを計算する
 
+    窓関数と周波数軸は shared.dsp_cache でデータ長ごとに使い回す
+
     Args:
         x: 時系列データ
         fs: サンプリング周波数
@@ -45,8 +58,8 @@ def compute_fft(
         (周波数配列, 振幅配列)
     """
     n = len(x)
-    win = np.hanning(n)
-    freq = np.fft.rfftfreq(n, d=1 / fs)
+    win = dsp_cache.hanning(n)
+    freq = dsp_cache.rfftfreq(n, fs)
     amp = np.abs(np.fft.rfft(x * win)) * 2 / n
     return freq, amp
 
@@ -76,10 +89,7 @@ def envelope_analysis(
         logger.warning("フィルタ周波数がナイキスト周波数を超えています")
         return np.array([0.0]), np.array([0.0])
 
-    sos = signal.butter(
-        4, [band_low, band_high],
-        btype="bandpass", fs=fs, output="sos",
-    )
+    sos = dsp_cache.bandpass_sos(fs, band_low, band_high)
     xf = signal.sosfilt(sos, x)
     env = np.abs(signal.hilbert(xf))
     env = env - np.mean(env)
@@ -92,12 +102,14 @@ def compute_scores(
 ) -> dict:
     """セグメントごとのRMS・Zスコアを計算する
 
+    全セグメントの統計量は shared.segment_stats でまとめて計算する
+
     Args:
         x: 時系列データ
         segment_len: セグメント長（サンプル数）
 
     Returns:
-        rms, peak, z_score, mean_rms, std_rms を含む辞書
+        rms, peak, cf, kurtosis, skew, z_score, mean_rms, std_rms を含む辞書
 
     Raises:
         ValueError: データが短すぎる場合
@@ -109,38 +121,51 @@ def compute_scores(
             f"(最低{segment_len}サンプル必要)"
         )
 
-    rms_list = []
-    peak_list = []
-    for i in range(n_segments):
-        seg = x[i * segment_len: (i + 1) * segment_len]
-        rms = np.sqrt(np.mean(seg ** 2))
-        peak = np.max(np.abs(seg))
-        rms_list.append(rms)
-        peak_list.append(peak)
-
-    rms_arr = np.array(rms_list)
+    stats = segment_stats(x, segment_len)
+    rms_arr = stats["rms"]
     mean_rms = float(np.mean(rms_arr))
     std_rms = float(np.std(rms_arr))
-    z_scores = (rms_arr - mean_rms) / (std_rms + 1e-10)
+    z_scores = (rms_arr - mean_rms) / (std_rms + EPS)
 
     return {
-        "rms": rms_arr,
-        "peak": np.array(peak_list),
+        **stats,
         "z_score": z_scores,
         "mean_rms": mean_rms,
         "std_rms": std_rms,
     }
 
 
+def _peak_frequencies(x: np.ndarray, fs: float) -> tuple[float, float]:
+    """FFTとエンベロープのピーク周波数"""
+    freq_fft, amp_fft = compute_fft(x, fs)
+    env_freq, env_amp = envelope_analysis(x, fs)
+    return (
+        float(freq_fft[np.argmax(amp_fft)]),
+        float(env_freq[np.argmax(env_amp)]),
+    )
+
+
+def warm_up() -> None:
+    """SciPyの読み込み・フィルタ設計・FFTの初期化を済ませる（解析ワーカーの起動時用）"""
+    x = np.sin(np.arange(SEGMENT_LEN * 2) * 0.3)
+    compute_fft(x)
+    envelope_analysis(x)
+    compute_scores(x)
+
+
 def analyze(
     z_values: np.ndarray,
     threshold: float = ANOMALY_THRESHOLD,
+    fs: float = SAMPLING_RATE,
+    segment_len: int = SEGMENT_LEN,
 ) -> dict:
     """振動データのZ軸を解析して異常判定する
 
     Args:
         z_values: Z軸加速度の配列
         threshold: 異常判定しきい値（Zスコア）
+        fs: サンプリング周波数（間引いたデータは間引き後の値）
+        segment_len: セグメント長（サンプル数）
 
     Returns:
         解析結果辞書
@@ -148,16 +173,11 @@ def analyze(
     # 前処理
     x = preprocess(z_values)
 
-    # FFT
-    freq_fft, amp_fft = compute_fft(x)
-    peak_freq = float(freq_fft[np.argmax(amp_fft)])
-
-    # エンベロープ解析
-    env_freq, env_amp = envelope_analysis(x)
-    env_peak = float(env_freq[np.argmax(env_amp)])
+    # FFT・エンベロープ解析
+    peak_freq, env_peak = _peak_frequencies(x, fs)
 
     # スコア計算
-    scores = compute_scores(x)
+    scores = compute_scores(x, segment_len)
     max_z = float(np.max(np.abs(scores["z_score"])))
     is_anomaly = max_z > threshold
 
@@ -176,3 +196,123 @@ def analyze(
         "threshold": threshold,
         "sample_count": len(z_values),
     }
+
+
+def new_state() -> dict:
+    """解析前（データ0件）の状態"""
+    return {
+        "sample_count": 0,
+        "sample_mean": 0.0,
+        "sample_m2": 0.0,
+        "segment_count": 0,
+        "rms_mean": 0.0,
+        "rms_m2": 0.0,
+        "rms_history": np.zeros(0, dtype=np.float32),
+    }
+
+
+def _merge_moments(
+    count: int, mean: float, m2: float, x: np.ndarray,
+) -> tuple[int, float, float]:
+    """件数・平均・偏差平方和に x をまとめて加える（Welford法の並列版）
+
+    Returns:
+        (件数, 平均, 偏差平方和)
+    """
+    n = len(x)
+    if n == 0:
+        return count, mean, m2
+    x_mean = float(np.mean(x))
+    x_m2 = float(np.sum(np.square(x - x_mean)))
+    total = count + n
+    delta = x_mean - mean
+    return (
+        total,
+        mean + delta * n / total,
+        m2 + x_m2 + delta * delta * count * n / total,
+    )
+
+
+def analyze_incremental(
+    z_values: np.ndarray,
+    state: dict,
+    threshold: float = ANOMALY_THRESHOLD,
+    fs: float = SAMPLING_RATE,
+    segment_len: int = SEGMENT_LEN,
+    history: int = ANALYSIS_RMS_HISTORY,
+) -> tuple[dict, dict]:
+    """前回までの状態に新しいデータを加えて解析する
+
+    セグメント単位で処理し、端数のサンプルは解析しない（次回に回す）。
+    前処理の平均・標準偏差は全期間のサンプルの累積値、Zスコアは
+    全期間のセグメントRMSの累積平均・標準偏差に対する新しいセグメントの値。
+    FFT・エンベロープは新しいデータだけで計算する。
+    初回（new_state から）は、解析したサンプルについて analyze と同じ結果になる。
+
+    Args:
+        z_values: 前回の続きからのZ軸加速度の配列
+        state: 前回までの状態（new_state または前回の戻り値）
+        threshold: 異常判定しきい値（Zスコア）
+        fs: サンプリング周波数
+        segment_len: セグメント長（サンプル数）
+        history: 状態に残すセグメントRMSの件数
+
+    Returns:
+        (解析結果辞書, 更新後の状態)。解析結果の sample_count は今回解析したサンプル数
+
+    Raises:
+        ValueError: 新しいデータが1セグメントに満たない場合
+    """
+    n_segments = len(z_values) // segment_len
+    if n_segments == 0:
+        raise ValueError(
+            f"データ不足: 新しいデータが{len(z_values)}サンプル "
+            f"(最低{segment_len}サンプル必要)"
+        )
+    z = np.asarray(z_values[:n_segments * segment_len], dtype=np.float64)
+
+    # 前処理（全期間の累積平均を除去 + 累積標準偏差の5σでクリッピング）
+    sample_count, sample_mean, sample_m2 = _merge_moments(
+        state["sample_count"], state["sample_mean"], state["sample_m2"], z,
+    )
+    x = z - sample_mean
+    std = math.sqrt(sample_m2 / sample_count)
+    if std > 0:
+        np.clip(x, -5 * std, 5 * std, out=x)
+
+    peak_freq, env_peak = _peak_frequencies(x, fs)
+
+    # 新しいセグメントのRMSを累積統計に加え、累積の平均・標準偏差でZスコアを出す
+    rms = segment_stats(x, segment_len)["rms"]
+    segment_count, rms_mean, rms_m2 = _merge_moments(
+        state["segment_count"], state["rms_mean"], state["rms_m2"], rms,
+    )
+    std_rms = math.sqrt(rms_m2 / segment_count)
+    max_z = float(np.max(np.abs((rms - rms_mean) / (std_rms + EPS))))
+    is_anomaly = max_z > threshold
+
+    logger.info(
+        f"差分解析完了: samples={len(z)}, segments={segment_count}, "
+        f"RMS={rms_mean:.4f}, max_z={max_z:.2f}, anomaly={is_anomaly}"
+    )
+
+    result = {
+        "is_anomaly": is_anomaly,
+        "max_z_score": round(max_z, 4),
+        "mean_rms": round(rms_mean, 6),
+        "peak_frequency_hz": round(peak_freq, 2),
+        "envelope_peak_hz": round(env_peak, 2),
+        "threshold": threshold,
+        "sample_count": len(z),
+    }
+    rms_history = np.concatenate([state["rms_history"], rms.astype(np.float32)])
+    rms_history = rms_history[max(0, len(rms_history) - history):]
+    return result, {
+        "sample_count": sample_count,
+        "sample_mean": sample_mean,
+        "sample_m2": sample_m2,
+        "segment_count": segment_count,
+        "rms_mean": rms_mean,
+        "rms_m2": rms_m2,
+        "rms_history": rms_history,
+    }
@@ -3,10 +3,23 @@ Service 2: 異常検知API
 
 蓄積した振動データに対してFFT+エンベロープ解析を実行し
 異常スコアと判定結果を返す
+
+SWEEP_INTERVAL_SEC を設定すると、新しいデータのある全デバイスを定期的に
+差分解析する（スイープ）。POST /api/v1/sweep で手動実行もできる。
+
+異常の通知はDBのアウトボックスに入れ、バックグラウンドで Notifier に送る
+（解析は通知の送信を待たない。送れなければ再送する）。
 """
 
+import asyncio
+import contextlib
+import functools
 import logging
+import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 from pathlib import Path
 
@@ -18,16 +31,45 @@ from typing import AsyncGenerator
 import httpx
 import numpy as np
 from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
 
-from services.analyzer.engine import analyze
-from shared.config import ANALYZER_PORT, NOTIFIER_URL
+from services.analyzer.engine import (
+    analyze, analyze_incremental, new_state, warm_up,
+)
+from services.analyzer.outbox import NotificationOutbox
+from shared.config import (
+    ANALYSIS_MAX_PENDING,
+    ANALYSIS_NICE,
+    ANALYSIS_WORKERS,
+    ANALYZER_PORT,
+    NOTIFIER_URL,
+    NOTIFY_TIMEOUT_SEC,
+    OUTBOX_BATCH,
+    OUTBOX_DEFER_SEC,
+    OUTBOX_POLL_SEC,
+    OUTBOX_RETENTION_DAYS,
+    OUTBOX_RETRY_BASE_SEC,
+    OUTBOX_RETRY_MAX_SEC,
+    SAMPLING_RATE,
+    SEGMENT_LEN,
+    SWEEP_CHECK_SEC,
+    SWEEP_INTERVAL_SEC,
+    SWEEP_MIN_NEW_SAMPLES,
+    SWEEP_TRIGGER_SAMPLES,
+)
 from shared.database import (
-    fetch_vibration,
+    close_connections,
+    delete_analysis_state,
+    fetch_axis,
+    fetch_axis_after,
+    get_analysis_state,
     get_device_data_count,
     get_last_received,
     get_latest_analysis,
+    get_outbox_stats,
+    get_sweep_candidates,
     init_db,
-    save_analysis_result,
+    record_analyses,
 )
 from shared.models import AnalyzeRequest, AnalyzeResponse, DeviceStatus
 
@@ -38,13 +80,98 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 解析用のプロセスプールと、実行中・実行待ちの解析数（イベントループ内でのみ更新）
+_pool: ProcessPoolExecutor | None = None
+_pending = 0
+# デバイスごとの差分解析のロック（同じデバイスの状態を同時に更新しない）
+_state_locks: dict[str, asyncio.Lock] = {}
+# スイープ（全デバイスの一括解析）の定期実行タスク・多重実行防止のロック・直近の実行結果
+_sweep_task: asyncio.Task | None = None
+# Notifier への通知用（lifespan の間だけ。無いときはアウトボックスに入れるだけで次の起動時に送る）
+_http: httpx.AsyncClient | None = None
+_outbox: NotificationOutbox | None = None
+_sweep_lock = asyncio.Lock()
+_sweep_metrics: dict = {
+    "sweeps_total": 0,
+    "last_trigger": None,
+    "last_started_at": None,
+    "last_duration_sec": None,
+    "last_devices": 0,
+    "last_analyzed": 0,
+    "last_anomalies": 0,
+    "last_failed": 0,
+    "last_queue_lag_sec": 0.0,
+}
+
+
+def _init_worker(nice: int) -> None:
+    """解析ワーカーの優先度を下げる"""
+    if nice and hasattr(os, "nice"):
+        os.nice(nice)
+
+
+def _analysis_pool() -> ProcessPoolExecutor:
+    """解析用のプロセスプールを返す（無ければ作る）"""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=ANALYSIS_WORKERS,
+            initializer=_init_worker, initargs=(ANALYSIS_NICE,),
+        )
+    return _pool
+
+
+def _shutdown_pool() -> None:
+    """解析用のプロセスプールを止める"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
-    """サーバー起動時にDB初期化"""
+    """サーバー起動時にDB初期化と解析ワーカーの準備、終了時に後片付け"""
     init_db()
-    logger.info("異常検知API 起動完了")
+    loop = asyncio.get_running_loop()
+    pool = _analysis_pool()
+    await asyncio.gather(*(
+        loop.run_in_executor(pool, warm_up) for _ in range(ANALYSIS_WORKERS)
+    ))
+    global _sweep_task, _http, _outbox
+    _http = httpx.AsyncClient(
+        timeout=NOTIFY_TIMEOUT_SEC,
+        limits=httpx.Limits(max_connections=OUTBOX_BATCH),
+    )
+    _outbox = NotificationOutbox(
+        _http,
+        f"{NOTIFIER_URL}/api/v1/notify",
+        poll_sec=OUTBOX_POLL_SEC,
+        batch=OUTBOX_BATCH,
+        retry_base_sec=OUTBOX_RETRY_BASE_SEC,
+        retry_max_sec=OUTBOX_RETRY_MAX_SEC,
+        retention_sec=OUTBOX_RETENTION_DAYS * 86400,
+        defer_sec=OUTBOX_DEFER_SEC,
+    )
+    _outbox.start()
+    _outbox.wake()  # 前回の未送信分を送る
+    if SWEEP_INTERVAL_SEC > 0:
+        _sweep_task = asyncio.create_task(_sweep_loop())
+    logger.info(
+        f"異常検知API 起動完了（解析ワーカー {ANALYSIS_WORKERS}、"
+        f"スイープ間隔 {SWEEP_INTERVAL_SEC or 'なし'}）"
+    )
     yield
+    if _sweep_task is not None:
+        _sweep_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await _sweep_task
+        _sweep_task = None
+    await _outbox.close()
+    await _http.aclose()
+    _outbox, _http = None, None
+    _shutdown_pool()
+    close_connections()
 
 
 app = FastAPI(
@@ -66,33 +193,41 @@ async def run_analysis(req: AnalyzeRequest) -> AnalyzeResponse:
 
     - **device_id**: 解析対象デバイス
     - **start / end**: 解析期間（省略時は全データ）
+    - **downsample**: 間引き率（長期間の傾向を見るとき用）
+    - **incremental**: 前回の続きだけを解析する（定期実行用）
     """
-    # DBから振動データ取得
-    rows = fetch_vibration(req.device_id, req.start, req.end)
-    if not rows:
-        raise HTTPException(
-            status_code=404,
-            detail=f"デバイス {req.device_id} のデータが見つかりません",
+    if req.incremental:
+        if req.start or req.end or req.downsample != 1:
+            raise HTTPException(
+                status_code=422,
+                detail="incremental では start / end / downsample を指定できません",
+            )
+        # 状態・結果・通知を保存し終えるまでロックを持つ（同じデータの二重解析を防ぐ）
+        async with _state_lock(req.device_id):
+            result, state = await _analyze_incremental(req.device_id)
+            analyzed_at = datetime.now()
+            result["device_id"] = req.device_id
+            result["analyzed_at"] = analyzed_at.isoformat()
+            await _record_analyses([result], {req.device_id: state})
+    else:
+        # DBからZ軸データを配列で取得（間引きもDB層で行う）
+        step = req.downsample
+        z_values = await run_in_threadpool(
+            fetch_axis, req.device_id, "z", req.start, req.end, step=step,
         )
-
-    # Z軸データを配列化して解析
-    z_values = np.array([r["z"] for r in rows])
-
-    try:
-        result = analyze(z_values)
-    except ValueError as e:
-        raise HTTPException(status_code=422, detail=str(e))
-
-    analyzed_at = datetime.now()
-    result["device_id"] = req.device_id
-    result["analyzed_at"] = analyzed_at.isoformat()
-
-    # 結果をDB保存
-    save_analysis_result(result)
-
-    # 異常検出時はnotifierに通知依頼
-    if result["is_anomaly"]:
-        await _notify_anomaly(req.device_id, result)
+        if len(z_values) == 0:
+            raise HTTPException(
+                status_code=404,
+                detail=f"デバイス {req.device_id} のデータが見つかりません",
+            )
+        try:
+            result = await _analyze_in_pool(z_values, step)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        analyzed_at = datetime.now()
+        result["device_id"] = req.device_id
+        result["analyzed_at"] = analyzed_at.isoformat()
+        await _record_analyses([result], {})
 
     return AnalyzeResponse(
         device_id=req.device_id,
@@ -107,30 +242,302 @@ async def run_analysis(req: AnalyzeRequest) -> AnalyzeResponse:
     )
 
 
-async def _notify_anomaly(device_id: str, result: dict) -> None:
-    """notifierサービスに異常通知を送る"""
-    msg = (
+def _state_lock(device_id: str) -> asyncio.Lock:
+    """デバイスの差分解析用のロックを返す"""
+    return _state_locks.setdefault(device_id, asyncio.Lock())
+
+
+async def _analyze_incremental(device_id: str) -> tuple[dict, dict]:
+    """前回の続きの新しいデータだけを解析する
+
+    サンプリング周波数・セグメント長の設定が変わっていたら状態を作り直す。
+    新しい状態はここでは保存しない（結果・通知と一緒に _record_analyses で保存する）
+
+    Returns:
+        (engine.analyze_incremental の解析結果辞書, 保存する新しい状態)
+
+    Raises:
+        HTTPException: データが無ければ404、新しいデータが1セグメントに満たなければ422
+    """
+    state = await run_in_threadpool(get_analysis_state, device_id)
+    if state is not None and (
+        (state["sample_rate"], state["segment_len"]) != (SAMPLING_RATE, SEGMENT_LEN)
+    ):
+        logger.warning(f"設定が変わったため差分解析の状態を作り直します: {device_id}")
+        state = None
+    t_us, z_values = await run_in_threadpool(
+        fetch_axis_after, device_id, "z", state["last_us"] if state else None,
+    )
+    if len(z_values) == 0 and state is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"デバイス {device_id} のデータが見つかりません",
+        )
+    try:
+        result, new = await _run_in_pool(functools.partial(
+            analyze_incremental, z_values, state or new_state(),
+        ))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    new.update(
+        last_us=int(t_us[result["sample_count"] - 1]),
+        sample_rate=SAMPLING_RATE,
+        segment_len=SEGMENT_LEN,
+    )
+    return result, new
+
+
+async def _analyze_in_pool(z_values: np.ndarray, step: int) -> dict:
+    """engine.analyze をプロセスプールで実行する
+
+    Args:
+        z_values: Z軸加速度の配列
+        step: 取得時の間引き率
+
+    Returns:
+        engine.analyze の解析結果辞書
+    """
+    return await _run_in_pool(functools.partial(
+        analyze, z_values,
+        fs=SAMPLING_RATE / step,
+        segment_len=max(1, SEGMENT_LEN // step),
+    ))
+
+
+async def _run_in_pool(job: functools.partial):
+    """解析をプロセスプールで実行する（イベントループを止めない）
+
+    Args:
+        job: ワーカーで実行する関数（引数を束縛したもの）
+
+    Returns:
+        job の戻り値
+
+    Raises:
+        HTTPException: 実行待ちが上限を超えた・ワーカーが異常終了した場合は503
+    """
+    global _pending
+    if _pending >= ANALYSIS_MAX_PENDING:
+        raise HTTPException(
+            status_code=503,
+            detail="解析の実行待ちが上限に達しています。時間をおいて再実行してください",
+            headers={"Retry-After": "5"},
+        )
+    _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(
+            _analysis_pool(), job,
+        )
+    except BrokenProcessPool:
+        logger.error("解析ワーカーが異常終了しました。プールを作り直します")
+        _shutdown_pool()
+        raise HTTPException(status_code=503, detail="解析ワーカーが異常終了しました")
+    finally:
+        _pending -= 1
+
+
+def _anomaly_message(result: dict) -> str:
+    """異常通知のメッセージ（Slack mrkdwn）"""
+    return (
         f":warning: *異常検出*\n"
-        f"デバイス: `{device_id}`\n"
+        f"デバイス: `{result['device_id']}`\n"
         f"最大Zスコア: `{result['max_z_score']:.2f}` "
         f"(閾値: {result['threshold']})\n"
         f"RMS: `{result['mean_rms']:.4f} g` / "
         f"ピーク周波数: `{result['peak_frequency_hz']:.1f} Hz`"
     )
-    try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            await client.post(
-                f"{NOTIFIER_URL}/api/v1/notify",
-                json={
-                    "device_id": device_id,
-                    "message": msg,
-                    "color": "danger",
-                },
+
+
+def _anomaly_notifications(results: list[dict]) -> list[tuple[str, str, dict]]:
+    """異常の結果をアウトボックスに入れる通知にする
+
+    重複キーは デバイスID と解析時刻 で、同じ解析結果は1回だけ通知する
+    """
+    return [
+        (
+            f"anomaly:{r['device_id']}:{r['analyzed_at']}",
+            r["device_id"],
+            {"device_id": r["device_id"], "message": _anomaly_message(r), "color": "danger"},
+        )
+        for r in results
+        if r["is_anomaly"]
+    ]
+
+
+async def _record_analyses(results: list[dict], states: dict[str, dict]) -> None:
+    """解析結果・差分解析の状態・異常の通知を1トランザクションで保存する（送信は待たない）
+
+    保存に失敗したら状態も進まないので、同じデータを次回もう一度解析する
+    """
+    added = await run_in_threadpool(
+        record_analyses, results, states, _anomaly_notifications(results),
+    )
+    if added:
+        logger.info(f"異常通知を登録: {added}件")
+        if _outbox is not None:
+            _outbox.wake()
+
+
+@app.get(
+    "/api/v1/notifications/outbox",
+    summary="通知の送信待ち状況",
+    description="アウトボックスの未送信件数・再送中の件数・最古の未送信の経過秒数",
+)
+async def get_outbox_status() -> dict:
+    """アウトボックスの状況と、起動してからの送信・失敗回数を返す"""
+    stats = await run_in_threadpool(get_outbox_stats)
+    return {
+        **stats,
+        "sent_total": _outbox.sent_total if _outbox is not None else 0,
+        "failed_total": _outbox.failed_total if _outbox is not None else 0,
+        "deferred_total": _outbox.deferred_total if _outbox is not None else 0,
+    }
+
+
+@app.delete(
+    "/api/v1/analyze/{device_id}/state",
+    summary="差分解析の状態をリセット",
+    description="累積統計を破棄し、次回の差分解析を全期間からやり直す（部品交換後など）",
+)
+async def reset_analysis_state(device_id: str) -> dict:
+    """差分解析の状態を削除する"""
+    async with _state_lock(device_id):
+        deleted = await run_in_threadpool(delete_analysis_state, device_id)
+    if not deleted:
+        raise HTTPException(
+            status_code=404,
+            detail=f"デバイス {device_id} の差分解析の状態がありません",
+        )
+    return {"device_id": device_id, "status": "reset"}
+
+
+async def _sweep(trigger: str) -> dict:
+    """新しいデータのある全デバイスを差分解析し、結果をまとめて保存する
+
+    解析は同時に ANALYSIS_WORKERS 台まで（単発の解析要求の枠を使い切らない）。
+    解析できなかったデバイスは数えるだけで、他のデバイスの結果は保存する。
+
+    Args:
+        trigger: 実行のきっかけ（interval / new_data / manual）
+
+    Returns:
+        今回のスイープの集計
+    """
+    async with _sweep_lock:
+        started = time.monotonic()
+        started_at = datetime.now()
+        candidates = await run_in_threadpool(
+            get_sweep_candidates, SWEEP_MIN_NEW_SAMPLES,
+        )
+        slots = asyncio.Semaphore(ANALYSIS_WORKERS)
+        # 解析したデバイスのロックは、状態・結果・通知をまとめて保存し終えるまで持つ
+        held: list[asyncio.Lock] = []
+
+        async def analyze_device(device_id: str) -> tuple[dict, dict]:
+            async with slots:
+                lock = _state_lock(device_id)
+                await lock.acquire()
+                held.append(lock)
+                return await _analyze_incremental(device_id)
+
+        try:
+            outcomes = await asyncio.gather(
+                *(analyze_device(c["device_id"]) for c in candidates),
+                return_exceptions=True,
             )
-        logger.info("notifierへ通知送信完了")
-    except Exception as e:
-        # 通知失敗しても解析結果は返す
-        logger.warning(f"notifier通知失敗（解析は正常完了）: {e}")
+            analyzed_at = datetime.now().isoformat()
+            results, states = [], {}
+            for candidate, outcome in zip(candidates, outcomes):
+                if isinstance(outcome, BaseException):
+                    detail = getattr(outcome, "detail", outcome)
+                    logger.warning(f"スイープ解析失敗: {candidate['device_id']}: {detail}")
+                    continue
+                result, state = outcome
+                result["device_id"] = candidate["device_id"]
+                result["analyzed_at"] = analyzed_at
+                results.append(result)
+                states[candidate["device_id"]] = state
+            if results:
+                await _record_analyses(results, states)
+        finally:
+            for lock in held:
+                lock.release()
+        anomalies = [r for r in results if r["is_anomaly"]]
+
+        summary = {
+            "trigger": trigger,
+            "started_at": started_at.isoformat(),
+            "duration_sec": round(time.monotonic() - started, 3),
+            "devices": len(candidates),
+            "analyzed": len(results),
+            "anomalies": len(anomalies),
+            "failed": len(candidates) - len(results),
+            "queue_lag_sec": max((c["lag_sec"] for c in candidates), default=0.0),
+        }
+        _sweep_metrics.update(
+            sweeps_total=_sweep_metrics["sweeps_total"] + 1,
+            last_trigger=trigger,
+            last_started_at=summary["started_at"],
+            last_duration_sec=summary["duration_sec"],
+            last_devices=summary["devices"],
+            last_analyzed=summary["analyzed"],
+            last_anomalies=summary["anomalies"],
+            last_failed=summary["failed"],
+            last_queue_lag_sec=summary["queue_lag_sec"],
+        )
+        logger.info(
+            f"スイープ完了（{trigger}）: {summary['analyzed']}/{summary['devices']}台, "
+            f"異常 {summary['anomalies']}台, {summary['duration_sec']:.2f}秒, "
+            f"最大遅れ {summary['queue_lag_sec']:.1f}秒"
+        )
+        return summary
+
+
+async def _sweep_loop() -> None:
+    """SWEEP_INTERVAL_SEC ごと、または新着データが SWEEP_TRIGGER_SAMPLES 件貯まったデバイスがあればスイープする"""
+    last = time.monotonic()
+    while True:
+        await asyncio.sleep(SWEEP_CHECK_SEC)
+        try:
+            if time.monotonic() - last >= SWEEP_INTERVAL_SEC:
+                trigger = "interval"
+            elif await run_in_threadpool(get_sweep_candidates, SWEEP_TRIGGER_SAMPLES):
+                trigger = "new_data"
+            else:
+                continue
+            last = time.monotonic()
+            await _sweep(trigger)
+        except Exception as e:
+            logger.error(f"スイープエラー: {e}")
+
+
+@app.post(
+    "/api/v1/sweep",
+    summary="全デバイスを一括解析",
+    description="新しいデータのある全デバイスを差分解析して結果を保存する（定期実行と同じ処理を今すぐ実行）",
+)
+async def run_sweep() -> dict:
+    """スイープを実行して集計を返す"""
+    return await _sweep("manual")
+
+
+@app.get(
+    "/api/v1/sweep",
+    summary="スイープの実行状況",
+    description="直近のスイープの所要時間・解析台数と、現在の未解析データの遅れ",
+)
+async def get_sweep_status() -> dict:
+    """スイープの実行状況と、現在の解析待ち（台数・最大の遅れ秒数）を返す"""
+    candidates = await run_in_threadpool(
+        get_sweep_candidates, SWEEP_MIN_NEW_SAMPLES,
+    )
+    return {
+        **_sweep_metrics,
+        "running": _sweep_lock.locked(),
+        "interval_sec": SWEEP_INTERVAL_SEC,
+        "pending_devices": len(candidates),
+        "queue_lag_sec": max((c["lag_sec"] for c in candidates), default=0.0),
+    }
 
 
 @app.get(
@@ -141,9 +548,7 @@ async def _notify_anomaly(device_id: str, result: dict) -> None:
 )
 async def get_status(device_id: str) -> DeviceStatus:
     """デバイスの最新ステータスを取得する"""
-    latest = get_latest_analysis(device_id)
-    count = get_device_data_count(device_id)
-    last_recv = get_last_received(device_id)
+    latest, count, last_recv = await run_in_threadpool(_load_status, device_id)
 
     last_analysis = None
     if latest:
@@ -169,6 +574,15 @@ async def get_status(device_id: str) -> DeviceStatus:
     )
 
 
+def _load_status(device_id: str) -> tuple[dict | None, int, str | None]:
+    """最新の解析結果・データ件数・最終受信時刻をまとめて取得する"""
+    return (
+        get_latest_analysis(device_id),
+        get_device_data_count(device_id),
+        get_last_received(device_id),
+    )
+
+
 @app.get("/health", summary="ヘルスチェック")
 async def health() -> dict:
     """サービスの稼働状態を返す"""
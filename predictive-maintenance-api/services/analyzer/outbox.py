@@ -0,0 +1,159 @@
+"""
+通知のアウトボックス送信
+
+異常の通知はいったんDBのアウトボックス（notification_outbox テーブル）に入れ、
+このモジュールがバックグラウンドで Notifier に送る。送れなかった通知は
+間隔を倍にしながら再送し、再起動しても送信待ちのまま残る。
+Notifier がダイジェストにまとめるため 202 で応答した通知も、届いたことを
+確かめるまで（同じ重複キーで送り直して duplicate が返るまで）送信待ちのまま残す。
+解析側は通知の送信を待たない。
+"""
+
+import asyncio
+import logging
+import time
+
+import httpx
+from fastapi.concurrency import run_in_threadpool
+
+from shared.database import (
+    fetch_due_notifications,
+    finish_notifications,
+    purge_sent_notifications,
+)
+
+logger = logging.getLogger(__name__)
+
+# 送信済みの通知を掃除する間隔（秒）
+PURGE_INTERVAL_SEC = 3600
+# Notifier がまとめ送信に回した（202 Accepted で応答した）ことを表す _send の戻り値
+DEFERRED = "deferred"
+
+
+class NotificationOutbox:
+    """アウトボックスの通知を Notifier に送る（イベントループ内で使う）
+
+    Args:
+        client: 使い回すHTTPクライアント
+        url: Notifier の通知API
+        poll_sec: 送信待ちを確認する間隔 [秒]
+        batch: 1回に並行して送る件数
+        retry_base_sec: 初回の再送間隔 [秒]（失敗ごとに倍）
+        retry_max_sec: 再送間隔の上限 [秒]
+        retention_sec: 送信済みの通知を重複防止に残す秒数
+        defer_sec: Notifier がまとめ送信に回した通知を確認し直す間隔 [秒]
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        poll_sec: float,
+        batch: int,
+        retry_base_sec: float,
+        retry_max_sec: float,
+        retention_sec: float,
+        defer_sec: float = 30.0,
+    ) -> None:
+        self.client = client
+        self.url = url
+        self.poll_sec = poll_sec
+        self.batch = batch
+        self.retry_base_sec = retry_base_sec
+        self.retry_max_sec = retry_max_sec
+        self.retention_sec = retention_sec
+        self.defer_sec = defer_sec
+        self.sent_total = 0
+        self.failed_total = 0
+        self.deferred_total = 0
+        self._wake = asyncio.Event()
+        self._closing = False
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """バックグラウンドの送信を開始する"""
+        self._task = asyncio.create_task(self._run())
+
+    def wake(self) -> None:
+        """確認間隔を待たずに送信する"""
+        self._wake.set()
+
+    def retry_delay(self, attempts: int) -> float:
+        """attempts 回失敗した後の再送間隔 [秒]"""
+        return min(self.retry_max_sec, self.retry_base_sec * 2 ** attempts)
+
+    async def dispatch(self) -> int:
+        """送信時刻になった通知をすべて送る
+
+        Returns:
+            送信できた件数
+        """
+        sent_count = 0
+        while True:
+            due = await run_in_threadpool(
+                fetch_due_notifications, time.time(), self.batch,
+            )
+            if not due:
+                return sent_count
+            errors = await asyncio.gather(*(self._send(n) for n in due))
+            sent, failed, deferred = [], [], []
+            for notification, error in zip(due, errors):
+                if error is None:
+                    sent.append(notification["id"])
+                    continue
+                if error == DEFERRED:
+                    deferred.append((notification["id"], time.time() + self.defer_sec))
+                    continue
+                delay = self.retry_delay(notification["attempts"])
+                logger.warning(
+                    f"通知の送信失敗（{notification['attempts'] + 1}回目、"
+                    f"{delay:.0f}秒後に再送）: {notification['dedup_key']}: {error}"
+                )
+                failed.append((notification["id"], error, time.time() + delay))
+            await run_in_threadpool(finish_notifications, sent, failed, deferred)
+            self.sent_total += len(sent)
+            self.failed_total += len(failed)
+            self.deferred_total += len(deferred)
+            sent_count += len(sent)
+            if len(due) < self.batch:
+                return sent_count
+
+    async def close(self) -> None:
+        """バックグラウンドの送信を止める（未送信の通知はDBに残る）"""
+        self._closing = True
+        self._wake.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    async def _send(self, notification: dict) -> str | None:
+        """1件送る。失敗したらエラー内容、まとめ送信に回されたら DEFERRED を返す"""
+        try:
+            resp = await self.client.post(self.url, json={
+                **notification["payload"], "dedup_key": notification["dedup_key"],
+            })
+            resp.raise_for_status()
+            return DEFERRED if resp.status_code == 202 else None
+        except httpx.HTTPError as e:
+            return f"{type(e).__name__}: {e}"
+
+    async def _run(self) -> None:
+        """poll_sec ごと、または wake() されたら送信する"""
+        last_purge = 0.0
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_sec)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self._closing:
+                break
+            try:
+                await self.dispatch()
+                if time.monotonic() - last_purge >= PURGE_INTERVAL_SEC:
+                    last_purge = time.monotonic()
+                    await run_in_threadpool(
+                        purge_sent_notifications, time.time() - self.retention_sec,
+                    )
+            except Exception as e:
+                logger.error(f"通知の送信処理エラー: {e}")
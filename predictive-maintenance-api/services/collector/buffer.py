@@ -0,0 +1,213 @@
+"""
+受信データの書き込みバッファ
+
+複数のリクエスト・デバイスから届いたサンプルをメモリに貯め、
+一定間隔または一定件数ごとに1トランザクションでまとめて書き込む。
+貯めている件数が上限に達したら、空くまで受信側を待たせる。
+書き込みが続けて max_attempts 回失敗したら、半分ずつに分けて書き込み直し、
+1件でも書けないレコードはデッドレターファイル（JSON Lines）に移して先に進む。
+"""
+
+import asyncio
+import json
+import logging
+from pathlib import Path
+from typing import Callable
+
+from fastapi.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+Record = tuple  # (device_id, timestamp, x, y, z)
+
+
+class BufferFullError(Exception):
+    """待ち時間内にバッファが空かなかった"""
+
+
+class IngestBuffer:
+    """サンプルをまとめて書き込むバッファ（イベントループ内で使う）
+
+    Args:
+        writer: レコードのリストを書き込む関数（スレッドプールで呼ぶ）
+        flush_sec: 書き込み間隔 [秒]
+        flush_samples: この件数が貯まったら間隔を待たずに書き込む
+        max_samples: 貯めておける上限件数（書き込み中の分を含む）
+        put_timeout: 上限に達したときに空きを待つ秒数
+        max_attempts: 続けて失敗したら書けないレコードを探して外すまでの書き込み回数
+        dead_letter_path: 書けなかったレコードを追記するファイル（None ならログに残して捨てる）
+    """
+
+    def __init__(
+        self,
+        writer: Callable[[list[Record]], int],
+        flush_sec: float,
+        flush_samples: int,
+        max_samples: int,
+        put_timeout: float,
+        max_attempts: int = 3,
+        dead_letter_path: str | None = None,
+    ) -> None:
+        self.writer = writer
+        self.flush_sec = flush_sec
+        self.flush_samples = flush_samples
+        self.max_samples = max_samples
+        self.put_timeout = put_timeout
+        self.max_attempts = max_attempts
+        self.dead_letter_path = dead_letter_path
+        self.flushed_samples = 0
+        self.flush_count = 0
+        # 書けずにデッドレターに移した件数
+        self.dead_letter_samples = 0
+        # 先頭のレコードの書き込みが続けて失敗した回数
+        self._failures = 0
+        self._records: list[Record] = []
+        self._in_flight = 0
+        self._space = asyncio.Condition()
+        self._flush_lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        self._closing = False
+        self._task: asyncio.Task | None = None
+
+    @property
+    def pending(self) -> int:
+        """まだDBに書き込んでいない件数"""
+        return len(self._records) + self._in_flight
+
+    def start(self) -> None:
+        """定期書き込みを開始する"""
+        self._task = asyncio.create_task(self._run())
+
+    async def put(self, records: list[Record]) -> None:
+        """レコードを貯める
+
+        上限を超えるときは put_timeout 秒まで空きを待つ。
+        1回で上限を超える大きさのレコードは、貯まっている分を書いてから直接書き込む。
+
+        Raises:
+            BufferFullError: 待ち時間内に空かなかった
+        """
+        if len(records) > self.max_samples:
+            await self.flush()
+            await run_in_threadpool(self.writer, records)
+            return
+        async with self._space:
+            try:
+                await asyncio.wait_for(
+                    self._space.wait_for(
+                        lambda: self.pending + len(records) <= self.max_samples,
+                    ),
+                    self.put_timeout,
+                )
+            except asyncio.TimeoutError:
+                raise BufferFullError(
+                    f"書き込み待ちが上限 {self.max_samples} 件に達しています"
+                )
+            self._records.extend(records)
+            if len(self._records) >= self.flush_samples:
+                self._wake.set()
+
+    async def flush(self) -> int:
+        """貯まっているレコードをすべて書き込む
+
+        書き込みに失敗したレコードは先頭に戻し、次回に書き込む。
+        続けて max_attempts 回失敗したら、半分ずつに分けて書ける分を書き、
+        1件でも書けないレコードはデッドレターに移す。
+
+        Returns:
+            書き込んだ件数
+        """
+        async with self._flush_lock:
+            records, self._records = self._records, []
+            if not records:
+                return 0
+            self._in_flight = len(records)
+            try:
+                try:
+                    await run_in_threadpool(self.writer, records)
+                    written, dead = len(records), []
+                except Exception as e:
+                    self._failures += 1
+                    if self._failures < self.max_attempts:
+                        self._records[:0] = records
+                        raise
+                    logger.error(
+                        f"書き込みに{self._failures}回続けて失敗したため、{len(records)}件を"
+                        f"分けて書き込みます（先頭: {records[0]}）: {e}"
+                    )
+                    written, dead = await self._write_split(records)
+                    await run_in_threadpool(self._write_dead_letter, dead)
+                self._failures = 0
+            finally:
+                self._in_flight = 0
+                async with self._space:
+                    self._space.notify_all()
+            self.flushed_samples += written
+            self.dead_letter_samples += len(dead)
+            self.flush_count += 1
+            return written
+
+    async def close(self) -> None:
+        """定期書き込みを止め、残りをすべて書き込む"""
+        self._closing = True
+        self._wake.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.flush()
+
+    async def _write_split(
+        self, records: list[Record],
+    ) -> tuple[int, list[tuple[Record, str]]]:
+        """書き込みに失敗したレコードを半分ずつに分けて書き込む
+
+        Returns:
+            (書き込んだ件数, [(1件でも書けなかったレコード, エラー内容), ...])
+        """
+        written, dead = 0, []
+        mid = len(records) // 2
+        for part in (records[:mid], records[mid:]):
+            if not part:
+                continue
+            try:
+                await run_in_threadpool(self.writer, part)
+                written += len(part)
+            except Exception as e:
+                if len(part) == 1:
+                    dead.append((part[0], f"{type(e).__name__}: {e}"))
+                else:
+                    w, d = await self._write_split(part)
+                    written += w
+                    dead.extend(d)
+        return written, dead
+
+    def _write_dead_letter(self, dead: list[tuple[Record, str]]) -> None:
+        """書けなかったレコードをデッドレターファイルに追記する"""
+        if not dead:
+            return
+        record, error = dead[0]
+        logger.error(
+            f"書き込めないレコード {len(dead)}件をデッドレター（{self.dead_letter_path}）に移します"
+            f"（先頭: {record}: {error}）"
+        )
+        if self.dead_letter_path is None:
+            return
+        Path(self.dead_letter_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+            for record, error in dead:
+                f.write(json.dumps(
+                    {"record": record, "error": error}, ensure_ascii=False, default=str,
+                ) + "\n")
+
+    async def _run(self) -> None:
+        """flush_sec ごと、または flush_samples 件貯まるごとに書き込む"""
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_sec)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"書き込みエラー（{len(self._records)}件を次回再試行）: {e}")
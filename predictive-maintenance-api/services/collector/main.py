@@ -2,9 +2,13 @@
 Service 1: データ収集API
 
 M5StickC Plus2から振動データをJSON受信しSQLiteに保存する
+
+サンプルごとのJSON（1件・一括）は書き込みバッファに貯め、複数リクエスト分を
+まとめて1トランザクションで保存する（受信の応答は書き込みを待たない）。
 """
 
 import logging
+import math
 import sys
 from pathlib import Path
 
@@ -12,19 +16,35 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
 
 from contextlib import asynccontextmanager
+from datetime import datetime
 from typing import AsyncGenerator
 
-from fastapi import FastAPI, HTTPException
+import numpy as np
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 
-from shared.config import COLLECTOR_PORT
+from services.collector.buffer import BufferFullError, IngestBuffer
+from shared.config import (
+    COLLECTOR_PORT,
+    INGEST_DEAD_LETTER_PATH,
+    INGEST_FLUSH_SAMPLES,
+    INGEST_FLUSH_SEC,
+    INGEST_MAX_ATTEMPTS,
+    INGEST_MAX_SAMPLES,
+    INGEST_PUT_TIMEOUT,
+)
 from shared.database import (
+    checkpoint,
+    close_connections,
     get_device_data_count,
     get_last_received,
     init_db,
-    insert_vibration,
     insert_vibration_batch,
+    insert_vibration_uniform,
+)
+from shared.models import (
+    CollectResponse, VibrationBatch, VibrationColumns, VibrationData,
 )
-from shared.models import CollectResponse, VibrationBatch, VibrationData
 
 logging.basicConfig(
     level=logging.INFO,
@@ -33,13 +53,37 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 書き込みバッファ（lifespan の間だけ動かす。無いときは受信ごとに直接書き込む）
+_buffer: IngestBuffer | None = None
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
-    """サーバー起動時にDB初期化"""
+    """サーバー起動時にDB初期化と書き込みバッファの開始、終了時に残りを書き込んで同期する"""
+    global _buffer
     init_db()
+    _buffer = IngestBuffer(
+        insert_vibration_batch,
+        flush_sec=INGEST_FLUSH_SEC,
+        flush_samples=INGEST_FLUSH_SAMPLES,
+        max_samples=INGEST_MAX_SAMPLES,
+        put_timeout=INGEST_PUT_TIMEOUT,
+        max_attempts=INGEST_MAX_ATTEMPTS,
+        dead_letter_path=INGEST_DEAD_LETTER_PATH,
+    )
+    _buffer.start()
     logger.info("データ収集API 起動完了")
     yield
+    buffer, _buffer = _buffer, None
+    try:
+        await buffer.close()
+    except Exception as e:
+        logger.error(f"終了時の書き込みエラー（{buffer.pending}件未保存）: {e}")
+    checkpoint()
+    close_connections()
+    logger.info(
+        f"データ収集API 停止（{buffer.flush_count}回で{buffer.flushed_samples}件を書き込み）"
+    )
 
 
 app = FastAPI(
@@ -50,6 +94,28 @@ app = FastAPI(
 )
 
 
+async def _store(records: list[tuple]) -> None:
+    """レコードを書き込みバッファに入れる（バッファが無ければ直接書き込む）
+
+    Raises:
+        HTTPException: バッファが空かなければ503、書き込みに失敗したら500
+    """
+    try:
+        if _buffer is None:
+            await run_in_threadpool(insert_vibration_batch, records)
+        else:
+            await _buffer.put(records)
+    except BufferFullError as e:
+        logger.warning(f"受信を保留: {e}")
+        raise HTTPException(
+            status_code=503, detail=str(e),
+            headers={"Retry-After": str(max(1, math.ceil(INGEST_FLUSH_SEC)))},
+        )
+    except Exception as e:
+        logger.error(f"保存エラー: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post(
     "/api/v1/vibration",
     response_model=CollectResponse,
@@ -63,18 +129,11 @@ async def receive_vibration(data: VibrationData) -> CollectResponse:
     - **timestamp**: 計測時刻（ISO 8601形式）
     - **x, y, z**: 3軸加速度 [g]
     """
-    try:
-        insert_vibration(
-            data.device_id, data.timestamp,
-            data.x, data.y, data.z,
-        )
-        logger.info(f"受信: {data.device_id} @ {data.timestamp}")
-        return CollectResponse(
-            status="ok", device_id=data.device_id, saved_count=1,
-        )
-    except Exception as e:
-        logger.error(f"保存エラー: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    await _store([(data.device_id, data.timestamp, data.x, data.y, data.z)])
+    logger.info(f"受信: {data.device_id} @ {data.timestamp}")
+    return CollectResponse(
+        status="ok", device_id=data.device_id, saved_count=1,
+    )
 
 
 @app.post(
@@ -91,38 +150,129 @@ async def receive_vibration_batch(
     M5StickCが一定時間分のデータをバッファリングして
     まとめて送信するケースに対応する
     """
+    records = [
+        (s.device_id, s.timestamp, s.x, s.y, s.z)
+        for s in batch.samples
+    ]
+    await _store(records)
+    logger.info(f"一括受信: {batch.device_id} x {len(records)}件")
+    return CollectResponse(
+        status="ok", device_id=batch.device_id, saved_count=len(records),
+    )
+
+
+def _validated_axes(x, y, z) -> list[np.ndarray]:
+    """3軸の値を float32 配列にし、まとめて検証する
+
+    Raises:
+        HTTPException: 長さが揃っていない・空・NaN/無限大を含む場合は422
+    """
+    axes = [np.asarray(a, dtype=np.float32) for a in (x, y, z)]
+    if len({len(a) for a in axes}) != 1:
+        raise HTTPException(status_code=422, detail="x, y, z の長さが揃っていません")
+    if len(axes[0]) == 0:
+        raise HTTPException(status_code=422, detail="サンプルがありません")
+    if not all(np.isfinite(a).all() for a in axes):
+        raise HTTPException(status_code=422, detail="NaN・無限大は保存できません")
+    return axes
+
+
+async def _save_uniform(
+    device_id: str, start: datetime, sample_rate: float, axes: list[np.ndarray],
+) -> CollectResponse:
+    """等間隔データを保存してレスポンスを返す"""
     try:
-        records = [
-            (s.device_id, s.timestamp, s.x, s.y, s.z)
-            for s in batch.samples
-        ]
-        count = insert_vibration_batch(records)
-        logger.info(f"一括受信: {batch.device_id} x {count}件")
-        return CollectResponse(
-            status="ok", device_id=batch.device_id, saved_count=count,
+        count = await run_in_threadpool(
+            insert_vibration_uniform, device_id, start, sample_rate, *axes,
         )
+        logger.info(f"一括受信: {device_id} x {count}件 ({sample_rate}Hz)")
+        return CollectResponse(status="ok", device_id=device_id, saved_count=count)
     except Exception as e:
         logger.error(f"一括保存エラー: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post(
+    "/api/v1/vibration/columnar",
+    response_model=CollectResponse,
+    summary="振動データを列形式で一括受信",
+    description="開始時刻・サンプリング周波数と軸ごとの配列で送る（サンプルごとのオブジェクトを作らない）",
+)
+async def receive_vibration_columnar(
+    batch: VibrationColumns,
+) -> CollectResponse:
+    """列形式（軸ごとの配列）の振動データを受信して保存する
+
+    - **start**: 先頭サンプルの計測時刻
+    - **sample_rate**: サンプリング周波数 [Hz]
+    - **x, y, z**: 同じ長さの加速度配列 [g]
+    """
+    axes = _validated_axes(batch.x, batch.y, batch.z)
+    return await _save_uniform(batch.device_id, batch.start, batch.sample_rate, axes)
+
+
+@app.post(
+    "/api/v1/vibration/raw",
+    response_model=CollectResponse,
+    summary="振動データをバイナリで一括受信",
+    description=(
+        "本文は float32（リトルエンディアン）の x 配列・y 配列・z 配列をこの順に連結したもの"
+        "（Content-Type: application/octet-stream）"
+    ),
+)
+async def receive_vibration_raw(
+    request: Request,
+    device_id: str = Query(..., description="デバイスID"),
+    start: datetime = Query(..., description="先頭サンプルの計測時刻（ISO 8601）"),
+    sample_rate: float = Query(..., gt=0, description="サンプリング周波数 [Hz]"),
+) -> CollectResponse:
+    """バイナリ（float32 × 3軸）の振動データを受信して保存する
+
+    本文をコピーせずに NumPy 配列として解釈し、まとめて検証する
+    """
+    body = await request.body()
+    if len(body) % (3 * 4):
+        raise HTTPException(
+            status_code=422,
+            detail=f"本文の長さ {len(body)} バイトが float32 × 3軸 の倍数ではありません",
+        )
+    x, y, z = np.frombuffer(body, dtype="<f4").reshape(3, -1)
+    axes = _validated_axes(x, y, z)
+    return await _save_uniform(device_id, start, sample_rate, axes)
+
+
 @app.get(
     "/api/v1/devices/{device_id}/count",
     summary="デバイスのデータ件数を取得",
 )
 async def get_data_count(device_id: str) -> dict:
-    """指定デバイスの保存データ件数と最終受信時刻を返す"""
+    """指定デバイスの保存データ件数と最終受信時刻を返す
+
+    書き込みバッファに残っている分を先に書き込んでから数える
+    """
+    if _buffer is not None:
+        try:
+            await _buffer.flush()
+        except Exception as e:
+            logger.error(f"書き込みエラー（未保存分は件数に含まれない）: {e}")
+    count = await run_in_threadpool(get_device_data_count, device_id)
+    last_received = await run_in_threadpool(get_last_received, device_id)
     return {
         "device_id": device_id,
-        "data_count": get_device_data_count(device_id),
-        "last_received": get_last_received(device_id),
+        "data_count": count,
+        "last_received": last_received,
     }
 
 
 @app.get("/health", summary="ヘルスチェック")
 async def health() -> dict:
-    """サービスの稼働状態を返す"""
-    return {"status": "ok", "service": "collector"}
+    """サービスの稼働状態と書き込み待ちの件数を返す"""
+    return {
+        "status": "ok",
+        "service": "collector",
+        "pending_samples": _buffer.pending if _buffer is not None else 0,
+        "dead_letter_samples": _buffer.dead_letter_samples if _buffer is not None else 0,
+    }
 
 
 if __name__ == "__main__":
@@ -0,0 +1,313 @@
+"""
+通知のまとめ送信と送信レート制限
+
+同じデバイス・同じ色（重大度）の通知が続くときは、最初の1件だけをすぐ送り、
+まとめ時間の間に届いた分は1通のダイジェストにまとめて送る。
+送信先（Webhook URL）ごとにトークンバケットで送信レートを制限し、
+枠がないときの通知は単独では送らずにダイジェストに回す。
+ダイジェストに回した通知の重複キーは、ダイジェストが届くまで送信待ちとして覚えておき、
+届いたら on_delivered で知らせる（送信元はそれまで再送を続ける）。
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+Sender = Callable[[str, str, str], Awaitable[object]]  # (text, color, webhook_url)
+WindowKey = tuple[str, str, str]  # (webhook_url, device_id, color)
+
+
+class TokenBucket:
+    """送信レートを制限するトークンバケット
+
+    Args:
+        rate: 1秒あたりに補充するトークン数（0以下なら制限しない）
+        burst: 貯めておけるトークンの上限
+        clock: 現在時刻 [秒] を返す関数
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        """経過時間分のトークンを補充する"""
+        now = self.clock()
+        self._tokens = min(
+            float(self.burst), self._tokens + (now - self._updated) * self.rate,
+        )
+        self._updated = now
+
+    def try_acquire(self) -> bool:
+        """トークンがあれば1つ使って True を返す"""
+        if self.rate <= 0:
+            return True
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def wait_time(self) -> float:
+        """次のトークンが貯まるまでの秒数"""
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        return max(0.0, (1 - self._tokens) / self.rate)
+
+    async def acquire(self) -> None:
+        """トークンが貯まるまで待って1つ使う"""
+        while not self.try_acquire():
+            await asyncio.sleep(self.wait_time())
+
+
+class _Window:
+    """まとめ中の通知（送信先・デバイス・色ごと）"""
+
+    def __init__(self, deadline: float, lines: int) -> None:
+        self.deadline = deadline
+        self.count = 0
+        self.messages: deque[str] = deque(maxlen=lines)
+        self.keys: list[str] = []
+
+    def add(self, message: str, key: str | None = None) -> None:
+        """通知を1件加える（本文は新しいものから lines 件だけ残す。重複キーはすべて残す）"""
+        self.count += 1
+        self.messages.append(message)
+        if key is not None:
+            self.keys.append(key)
+
+    def absorb(self, older: "_Window") -> None:
+        """送れなかった前のまとめを先頭に加える"""
+        self.count += older.count
+        messages = deque(older.messages, maxlen=self.messages.maxlen)
+        messages.extend(self.messages)
+        self.messages = messages
+        self.keys[:0] = older.keys
+
+
+class AlertCoalescer:
+    """通知をまとめ、送信先ごとにレートを制限して送る（イベントループ内で使う）
+
+    Args:
+        sender: 1通送る関数 (text, color, webhook_url)。失敗したら例外を投げる
+        window_sec: まとめ時間 [秒]（0ならまとめずにすべて送る）
+        digest_lines: ダイジェストに載せるメッセージ数（新しいものから）
+        rate_per_sec: 送信先ごとの送信レート [通/秒]（0以下なら制限しない）
+        burst: 送信先ごとに続けて送れる通数
+        on_delivered: ダイジェストが届いたときに、含まれていた重複キーを渡して呼ぶ関数
+    """
+
+    def __init__(
+        self,
+        sender: Sender,
+        window_sec: float,
+        digest_lines: int,
+        rate_per_sec: float,
+        burst: int,
+        on_delivered: Callable[[list[str]], None] | None = None,
+    ) -> None:
+        self.sender = sender
+        self.on_delivered = on_delivered
+        self.window_sec = window_sec
+        self.digest_lines = digest_lines
+        self.rate_per_sec = rate_per_sec
+        self.burst = burst
+        # Webhookに送った通数（うちダイジェストの通数）
+        self.sent_total = 0
+        self.digest_total = 0
+        # まとめ時間中に届いてダイジェストに回した件数
+        self.merged_total = 0
+        # 送信レートの枠がなく、単独では送らずダイジェストに回した件数
+        self.suppressed_total = 0
+        self._windows: dict[WindowKey, _Window] = {}
+        self._in_flight = 0
+        # ダイジェストに回して、まだ届いていない通知の重複キー
+        self._pending_keys: set[str] = set()
+        self._buckets: dict[str, TokenBucket] = {}
+        self._wake = asyncio.Event()
+        self._closing = False
+        self._task: asyncio.Task | None = None
+
+    @property
+    def pending(self) -> int:
+        """ダイジェストで送る予定の件数（送信中の分を含む）"""
+        return sum(w.count for w in self._windows.values()) + self._in_flight
+
+    def is_pending(self, key: str) -> bool:
+        """重複キーの通知がダイジェストの送信待ち（送信中を含む）かどうか"""
+        return key in self._pending_keys
+
+    def start(self) -> None:
+        """ダイジェストの定期送信を開始する"""
+        self._task = asyncio.create_task(self._run())
+
+    def bucket(self, webhook_url: str) -> TokenBucket:
+        """送信先のトークンバケット"""
+        if webhook_url not in self._buckets:
+            self._buckets[webhook_url] = TokenBucket(self.rate_per_sec, self.burst)
+        return self._buckets[webhook_url]
+
+    async def submit(
+        self,
+        device_id: str,
+        message: str,
+        color: str,
+        webhook_url: str,
+        key: str | None = None,
+    ) -> str:
+        """通知を1件受け付ける
+
+        Args:
+            key: 重複キー（ダイジェストに回したら、届くまで is_pending が真になる）
+
+        Returns:
+            "sent"（すぐ送った）、"merged"（まとめ時間中のためダイジェストに回した）、
+            "suppressed"（送信レートの枠がないためダイジェストに回した）
+
+        Raises:
+            Exception: すぐ送る通知の送信に失敗した（sender の例外をそのまま投げる）
+        """
+        bucket = self.bucket(webhook_url)
+        if self.window_sec <= 0:
+            await bucket.acquire()
+            await self.sender(message, color, webhook_url)
+            self.sent_total += 1
+            return "sent"
+
+        window_key = (webhook_url, device_id, color)
+        window = self._windows.get(window_key)
+        if window is not None:
+            self._hold(window, message, key)
+            self.merged_total += 1
+            return "merged"
+        if not bucket.try_acquire():
+            self._hold(self._open(window_key), message, key)
+            self.suppressed_total += 1
+            return "suppressed"
+
+        # 送信中に届いた同じ通知もまとめるよう、送る前にまとめ時間を始める
+        window = self._open(window_key)
+        try:
+            await self.sender(message, color, webhook_url)
+        except Exception:
+            if window.count == 0 and self._windows.get(window_key) is window:
+                del self._windows[window_key]
+            raise
+        self.sent_total += 1
+        return "sent"
+
+    def digest_text(self, device_id: str, window: _Window) -> str:
+        """ダイジェストの本文（Slack mrkdwn）"""
+        text = (
+            f":bell: `{device_id}` の通知 {window.count}件をまとめて送ります"
+            f"（{self.window_sec:g}秒ごと）\n\n" + "\n\n".join(window.messages)
+        )
+        rest = window.count - len(window.messages)
+        if rest > 0:
+            text += f"\n\n…ほか{rest}件"
+        return text
+
+    async def flush(self, force: bool = False) -> int:
+        """まとめ時間が過ぎた（force なら全部の）ダイジェストを送る
+
+        送れなかったダイジェストは次のまとめ時間に持ち越す。
+
+        Returns:
+            送ったダイジェストの通数
+        """
+        now = time.monotonic()
+        due = [k for k, w in self._windows.items() if force or w.deadline <= now]
+        windows = [(key, self._windows.pop(key)) for key in due]
+        sent = await asyncio.gather(
+            *(self._send_digest(key, w) for key, w in windows if w.count > 0)
+        )
+        return sum(sent)
+
+    async def close(self) -> None:
+        """定期送信を止め、まとめ中の通知をすべて送る"""
+        self._closing = True
+        self._wake.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.flush(force=True)
+        if self._windows:
+            # 重複キー付きの通知は送信待ちから外し、送信元（Analyzer のアウトボックス）の再送に任せる
+            logger.error(f"送れなかった通知 {self.pending}件を破棄します")
+            self._windows.clear()
+            self._pending_keys.clear()
+
+    def stats(self) -> dict:
+        """まとめ送信の状態と累計"""
+        return {
+            "window_sec": self.window_sec,
+            "open_windows": len(self._windows),
+            "pending_alerts": self.pending,
+            "sent": self.sent_total,
+            "digests": self.digest_total,
+            "merged": self.merged_total,
+            "suppressed": self.suppressed_total,
+        }
+
+    def _hold(self, window: _Window, message: str, key: str | None) -> None:
+        """通知をダイジェストに回す"""
+        window.add(message, key)
+        if key is not None:
+            self._pending_keys.add(key)
+
+    def _open(self, key: WindowKey) -> _Window:
+        """まとめ時間を始める"""
+        window = _Window(time.monotonic() + self.window_sec, self.digest_lines)
+        self._windows[key] = window
+        self._wake.set()
+        return window
+
+    async def _send_digest(self, key: WindowKey, window: _Window) -> bool:
+        """ダイジェストを1通送る。失敗したら次のまとめ時間に持ち越す"""
+        webhook_url, device_id, color = key
+        self._in_flight += window.count
+        try:
+            await self.bucket(webhook_url).acquire()
+            await self.sender(self.digest_text(device_id, window), color, webhook_url)
+        except Exception as e:
+            logger.error(f"ダイジェストの送信失敗（{window.count}件を次回再送）: {e}")
+            (self._windows.get(key) or self._open(key)).absorb(window)
+            return False
+        finally:
+            self._in_flight -= window.count
+        self.sent_total += 1
+        self.digest_total += 1
+        self._pending_keys.difference_update(window.keys)
+        if self.on_delivered is not None and window.keys:
+            self.on_delivered(window.keys)
+        return True
+
+    async def _run(self) -> None:
+        """最も早いまとめ時間の終わり、または wake されたら送信する"""
+        while not self._closing:
+            deadline = min((w.deadline for w in self._windows.values()), default=None)
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self._closing:
+                break
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"ダイジェストの送信処理エラー: {e}")
@@ -3,19 +3,40 @@ Service 3: Slack通知API
 
 異常検知結果をSlack Webhook経由で通知する
 analyze_vibration.pyのSlack通知処理を流用
+
+Slackへの送信は使い回す非同期HTTPクライアントで行い、イベントループを止めない。
+重複キー付きの通知は、同じキーを送信済み・送信中なら送らない（Analyzer の再送対策）。
+送信中のキーには、送れたかどうかがまだ分からないため duplicate ではなく deferred（202）を返す。
+同じデバイス・色の通知はまとめ時間ごとに1通のダイジェストにまとめ、
+送信先ごとの送信レートを制限する（coalescer.py）。
+ダイジェストに回した通知には 202 を返し、届くまでは重複キーを送信済みにしない
+（Analyzer のアウトボックスは 202 の通知を残して、あとで送り直す）。
 """
 
-import json
 import logging
 import sys
-import urllib.request
+from collections import OrderedDict
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
 
-from fastapi import FastAPI, HTTPException
-
-from shared.config import NOTIFIER_PORT, SLACK_WEBHOOK_URL
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator
+
+import httpx
+from fastapi import FastAPI, HTTPException, Response
+
+from services.notifier.coalescer import AlertCoalescer
+from shared.config import (
+    NOTIFIER_PORT,
+    NOTIFY_BURST,
+    NOTIFY_COALESCE_SEC,
+    NOTIFY_DEDUP_SIZE,
+    NOTIFY_DIGEST_LINES,
+    NOTIFY_RATE_PER_SEC,
+    NOTIFY_TIMEOUT_SEC,
+    SLACK_WEBHOOK_URL,
+)
 from shared.models import NotifyRequest, NotifyResponse
 
 logging.basicConfig(
@@ -25,14 +46,56 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Slack送信用のHTTPクライアント（lifespan の間だけ使い回す）
+_http: httpx.AsyncClient | None = None
+# 送信済みの重複キー（古いものから NOTIFY_DEDUP_SIZE 件を超えた分を忘れる）と送信中の重複キー
+_sent_keys: OrderedDict[str, None] = OrderedDict()
+_sending_keys: set[str] = set()
+# 通知のまとめ送信（lifespan の間だけ使う。None ならまとめずにすぐ送る）
+_coalescer: AlertCoalescer | None = None
+# 重複キーが送信済みのため送らなかった件数
+_duplicate_total = 0
+
+_STATUS_MESSAGES = {
+    "sent": "Slack通知完了",
+    "merged": "ダイジェストにまとめて送信します",
+    "suppressed": "送信レート超過のためダイジェストにまとめて送信します",
+    "deferred": "同じ通知の送信待ちです",
+}
+# ダイジェストに回した（まだ届いていない）ことを示すステータス。HTTP 202 で返す
+_DEFERRED_STATUSES = {"merged", "suppressed"}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
+    """起動時にHTTPクライアントとまとめ送信を用意し、終了時にまとめ中の通知を送って閉じる"""
+    global _http, _coalescer
+    _http = httpx.AsyncClient(timeout=NOTIFY_TIMEOUT_SEC)
+    _coalescer = AlertCoalescer(
+        _send_slack,
+        window_sec=NOTIFY_COALESCE_SEC,
+        digest_lines=NOTIFY_DIGEST_LINES,
+        rate_per_sec=NOTIFY_RATE_PER_SEC,
+        burst=NOTIFY_BURST,
+        on_delivered=_remember_delivered,
+    )
+    _coalescer.start()
+    yield
+    await _coalescer.close()
+    _coalescer = None
+    await _http.aclose()
+    _http = None
+
+
 app = FastAPI(
     title="Slack通知API",
     description="異常検知結果をSlack Webhookで通知するサービス",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 
-def _send_slack(
+async def _send_slack(
     text: str,
     color: str = "good",
     webhook_url: str = "",
@@ -60,14 +123,13 @@ def _send_slack(
             }
         ]
     }
-    data = json.dumps(payload).encode("utf-8")
-    req = urllib.request.Request(
-        webhook_url,
-        data=data,
-        headers={"Content-Type": "application/json"},
-    )
     try:
-        urllib.request.urlopen(req, timeout=5)
+        if _http is not None:
+            resp = await _http.post(webhook_url, json=payload)
+        else:
+            async with httpx.AsyncClient(timeout=NOTIFY_TIMEOUT_SEC) as client:
+                resp = await client.post(webhook_url, json=payload)
+        resp.raise_for_status()
         logger.info("Slack通知 送信成功")
         return True
     except Exception as e:
@@ -75,19 +137,51 @@ def _send_slack(
         raise
 
 
+def _remember_sent(key: str) -> None:
+    """送信済みの重複キーを覚える"""
+    _sent_keys[key] = None
+    _sent_keys.move_to_end(key)
+    while len(_sent_keys) > NOTIFY_DEDUP_SIZE:
+        _sent_keys.popitem(last=False)
+
+
+def _remember_delivered(keys: list[str]) -> None:
+    """ダイジェストで届いた通知の重複キーを送信済みとして覚える"""
+    for key in keys:
+        _remember_sent(key)
+
+
 @app.post(
     "/api/v1/notify",
     response_model=NotifyResponse,
     summary="Slack通知を送信",
     description="指定メッセージをSlack Webhookで送信する",
 )
-async def notify(req: NotifyRequest) -> NotifyResponse:
+async def notify(req: NotifyRequest, response: Response) -> NotifyResponse:
     """Slack通知を送信する
 
     - **device_id**: 通知元デバイス
     - **message**: 通知メッセージ（Slack mrkdwn形式対応）
     - **color**: 添付バーの色 (good=緑 / warning=黄 / danger=赤)
+    - **dedup_key**: 重複キー（同じキーの通知は1回だけ送る）
+
+    同じデバイス・色の通知がまとめ時間内に続いたとき、または送信レートを超えたときは
+    merged / suppressed を HTTP 202 で返し、まとめ時間の終わりにダイジェストとして送る。
+    同じ重複キーの通知が送信中、またはダイジェストの送信待ちなら deferred（202）を返す
+    （先の送信が失敗したら、送信元は同じキーで送り直せる）。
     """
+    global _duplicate_total
+    key = req.dedup_key
+    if key is not None and key in _sent_keys:
+        _duplicate_total += 1
+        logger.info(f"重複した通知のためスキップ: {key}")
+        return NotifyResponse(status="duplicate", message="送信済みの通知です")
+    if key is not None and (
+        key in _sending_keys or (_coalescer is not None and _coalescer.is_pending(key))
+    ):
+        response.status_code = 202
+        return NotifyResponse(status="deferred", message=_STATUS_MESSAGES["deferred"])
+
     if not SLACK_WEBHOOK_URL:
         logger.warning(
             f"Webhook未設定のため通知をログ出力のみ: "
@@ -98,13 +192,39 @@ async def notify(req: NotifyRequest) -> NotifyResponse:
             message="SLACK_WEBHOOK_URL未設定のためスキップ",
         )
 
+    if key is not None:
+        _sending_keys.add(key)
     try:
-        _send_slack(req.message, req.color, SLACK_WEBHOOK_URL)
-        return NotifyResponse(status="sent", message="Slack通知完了")
+        if _coalescer is not None:
+            status = await _coalescer.submit(
+                req.device_id, req.message, req.color, SLACK_WEBHOOK_URL, key,
+            )
+        else:
+            await _send_slack(req.message, req.color, SLACK_WEBHOOK_URL)
+            status = "sent"
     except Exception as e:
         raise HTTPException(
             status_code=502, detail=f"Slack送信失敗: {e}",
         )
+    finally:
+        _sending_keys.discard(key)
+    if status in _DEFERRED_STATUSES:
+        # 重複キーはダイジェストが届いたとき（_remember_delivered）に覚える
+        response.status_code = 202
+    elif key is not None:
+        _remember_sent(key)
+    return NotifyResponse(status=status, message=_STATUS_MESSAGES[status])
+
+
+@app.get(
+    "/api/v1/notify/stats",
+    summary="通知のまとめ送信の状態",
+    description="まとめ中の通知の件数と、送信・まとめ・レート制限・重複の累計を返す",
+)
+async def notify_stats() -> dict:
+    """まとめ送信の状態と累計を返す"""
+    stats = _coalescer.stats() if _coalescer is not None else {}
+    return {**stats, "duplicates": _duplicate_total}
 
 
 @app.get("/health", summary="ヘルスチェック")
@@ -114,6 +234,7 @@ async def health() -> dict:
         "status": "ok",
         "service": "notifier",
         "webhook_configured": bool(SLACK_WEBHOOK_URL),
+        "pending_alerts": _coalescer.pending if _coalescer is not None else 0,
     }
 
 
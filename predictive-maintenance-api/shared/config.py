@@ -13,6 +13,11 @@ DB_PATH = os.environ.get(
     "DB_PATH", str(BASE_DIR / "data" / "vibration.db"),
 )
 
+# SQLiteの接続設定（コネクションを開いたときに1回だけ適用する）
+SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_CACHE_MB = int(os.environ.get("SQLITE_CACHE_MB", "16"))
+SQLITE_MMAP_MB = int(os.environ.get("SQLITE_MMAP_MB", "256"))
+
 # サンプリング周波数（M5StickC Plus2のデフォルト）
 SAMPLING_RATE = int(os.environ.get("SAMPLING_RATE", "500"))
 
@@ -23,6 +28,57 @@ ANOMALY_THRESHOLD = float(os.environ.get("ANOMALY_THRESHOLD", "3.0"))
 SEGMENT_SEC = float(os.environ.get("SEGMENT_SEC", "1.0"))
 SEGMENT_LEN = int(SAMPLING_RATE * SEGMENT_SEC)
 
+# 差分解析（incremental）の状態に残すセグメントRMSの件数（1セグメント SEGMENT_SEC 秒）
+ANALYSIS_RMS_HISTORY = int(os.environ.get("ANALYSIS_RMS_HISTORY", "3600"))
+
+# 解析用プロセスプールのワーカー数と、実行待ちを含む同時解析数の上限
+ANALYSIS_WORKERS = int(os.environ.get("ANALYSIS_WORKERS", "2"))
+ANALYSIS_MAX_PENDING = int(os.environ.get("ANALYSIS_MAX_PENDING", "8"))
+# 解析ワーカーのnice値（受信・参照系の処理をCPUで優先させる）
+ANALYSIS_NICE = int(os.environ.get("ANALYSIS_NICE", "10"))
+
+# 受信データの書き込みバッファ（まとめて書く間隔[秒]・件数、保持できる上限件数、
+# 上限に達したときに空きを待つ秒数）
+INGEST_FLUSH_SEC = float(os.environ.get("INGEST_FLUSH_SEC", "1.0"))
+INGEST_FLUSH_SAMPLES = int(os.environ.get("INGEST_FLUSH_SAMPLES", "5000"))
+INGEST_MAX_SAMPLES = int(os.environ.get("INGEST_MAX_SAMPLES", "100000"))
+INGEST_PUT_TIMEOUT = float(os.environ.get("INGEST_PUT_TIMEOUT", "2.0"))
+# 書き込みが続けて失敗したら、書けないレコードを探してデッドレター（JSON Lines）に移すまでの回数
+INGEST_MAX_ATTEMPTS = int(os.environ.get("INGEST_MAX_ATTEMPTS", "3"))
+INGEST_DEAD_LETTER_PATH = os.environ.get(
+    "INGEST_DEAD_LETTER_PATH", str(BASE_DIR / "data" / "ingest_dead_letter.jsonl"),
+)
+
+# 全デバイスの一括解析（スイープ）: 実行間隔[秒]（0なら定期実行しない）、
+# 新着データの確認間隔[秒]、間隔を待たずに実行する新着サンプル数、対象にする最小の新着サンプル数
+SWEEP_INTERVAL_SEC = float(os.environ.get("SWEEP_INTERVAL_SEC", "0"))
+SWEEP_CHECK_SEC = float(os.environ.get("SWEEP_CHECK_SEC", "5"))
+SWEEP_TRIGGER_SAMPLES = int(
+    os.environ.get("SWEEP_TRIGGER_SAMPLES", str(SAMPLING_RATE * 60)),
+)
+SWEEP_MIN_NEW_SAMPLES = int(
+    os.environ.get("SWEEP_MIN_NEW_SAMPLES", str(SEGMENT_LEN)),
+)
+
+# 通知の送信: HTTPタイムアウト[秒]、アウトボックスの確認間隔[秒]・1回に送る件数、
+# 再送間隔（初回[秒]、失敗ごとに倍、上限[秒]）、送信済みを重複防止に残す日数
+NOTIFY_TIMEOUT_SEC = float(os.environ.get("NOTIFY_TIMEOUT_SEC", "5.0"))
+OUTBOX_POLL_SEC = float(os.environ.get("OUTBOX_POLL_SEC", "5.0"))
+OUTBOX_BATCH = int(os.environ.get("OUTBOX_BATCH", "20"))
+OUTBOX_RETRY_BASE_SEC = float(os.environ.get("OUTBOX_RETRY_BASE_SEC", "2.0"))
+OUTBOX_RETRY_MAX_SEC = float(os.environ.get("OUTBOX_RETRY_MAX_SEC", "300"))
+OUTBOX_RETENTION_DAYS = float(os.environ.get("OUTBOX_RETENTION_DAYS", "7"))
+# Notifier がダイジェストに回した（202で応答した）通知を、届いたか確認し直す間隔[秒]
+OUTBOX_DEFER_SEC = float(os.environ.get("OUTBOX_DEFER_SEC", "30"))
+# Notifier が送信済みとして覚えておく重複キーの件数
+NOTIFY_DEDUP_SIZE = int(os.environ.get("NOTIFY_DEDUP_SIZE", "1024"))
+# Notifier の通知まとめ: 同じデバイス・色の通知をまとめる時間[秒]（0でまとめない）、
+# ダイジェストに載せるメッセージ数、送信先ごとの送信レート[通/秒]（0で制限なし）とバースト
+NOTIFY_COALESCE_SEC = float(os.environ.get("NOTIFY_COALESCE_SEC", "60"))
+NOTIFY_DIGEST_LINES = int(os.environ.get("NOTIFY_DIGEST_LINES", "5"))
+NOTIFY_RATE_PER_SEC = float(os.environ.get("NOTIFY_RATE_PER_SEC", "1.0"))
+NOTIFY_BURST = int(os.environ.get("NOTIFY_BURST", "5"))
+
 # 各サービスのポート
 COLLECTOR_PORT = int(os.environ.get("COLLECTOR_PORT", "8001"))
 ANALYZER_PORT = int(os.environ.get("ANALYZER_PORT", "8002"))
@@ -2,64 +2,143 @@
 SQLiteデータベース管理モジュール
 
 振動データと解析結果の永続化を担当する
+
+振動データはデバイスごと・時間ブロック（最長 BLOCK_SEC 秒）ごとに1行で保存する。
+1行には開始時刻（UNIXエポックからのマイクロ秒）・サンプリング周波数・件数と、
+x / y / z それぞれの float32（リトルエンディアン）配列を zlib 圧縮したBLOBを持つ。
+各サンプルの時刻は 開始時刻 + i / サンプリング周波数 で復元する。
 """
 
+import json
 import logging
+import math
 import sqlite3
+import threading
+import time
+import zlib
 from contextlib import contextmanager
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Generator
+from typing import Generator, Iterator
+
+import numpy as np
 
-from shared.config import DB_PATH
+from shared.config import (
+    DB_PATH,
+    SAMPLING_RATE,
+    SQLITE_CACHE_MB,
+    SQLITE_MMAP_MB,
+    SQLITE_SYNCHRONOUS,
+)
 
 logger = logging.getLogger(__name__)
 
+# 1ブロックの最大時間幅（秒）
+BLOCK_SEC = 10
+BLOCK_US = BLOCK_SEC * 1_000_000
+AXES = ("x", "y", "z")
+# 等間隔からのずれがこの割合（周期比）を超えたら別ブロックにする
+JITTER_TOLERANCE = 0.5
+
+_EPOCH = datetime(1970, 1, 1)
+_SAMPLE_DTYPE = np.dtype("<f4")
+_SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
 
-def _ensure_dir() -> None:
-    """DB格納ディレクトリを作成する"""
-    Path(DB_PATH).parent.mkdir(parents=True, exist_ok=True)
+# スレッドごとのコネクション {(DBパス, 読み取り専用か): コネクション}
+_local = threading.local()
+
+
+def _open_connection(path: str, readonly: bool) -> sqlite3.Connection:
+    """コネクションを開き、PRAGMAを設定する
+
+    読み取り専用は mode=ro で開く（WALの設定は書き込み側が済ませている前提）。
+    """
+    if readonly:
+        conn = sqlite3.connect(f"{Path(path).resolve().as_uri()}?mode=ro", uri=True)
+    else:
+        synchronous = SQLITE_SYNCHRONOUS.upper()
+        if synchronous not in _SYNCHRONOUS_MODES:
+            raise ValueError(f"不正な SQLITE_SYNCHRONOUS: {SQLITE_SYNCHRONOUS}")
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={synchronous}")
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA cache_size={-SQLITE_CACHE_MB * 1024}")
+    conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_MB * 1024 * 1024}")
+    return conn
 
 
 @contextmanager
-def get_connection() -> Generator[sqlite3.Connection, None, None]:
+def get_connection(
+    readonly: bool = False,
+) -> Generator[sqlite3.Connection, None, None]:
     """SQLiteコネクションのコンテキストマネージャ
 
+    コネクションはスレッドごとに DB_PATH・読み取り専用かどうかの組で1本だけ開き、
+    使い回す（PRAGMAの設定も開いたときの1回だけ）。
+    抜けるときに書き込み用はコミット、例外時はロールバックする。
+
+    Args:
+        readonly: 読み取り専用のコネクションを使うか（参照系のクエリ用）
+
     Yields:
         sqlite3.Connection
     """
-    _ensure_dir()
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode=WAL")
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    key = (DB_PATH, readonly)
+    conn = conns.get(key)
+    if conn is None:
+        conn = conns[key] = _open_connection(DB_PATH, readonly)
     try:
         yield conn
-        conn.commit()
+        if not readonly:
+            conn.commit()
     except Exception:
         conn.rollback()
         raise
-    finally:
+
+
+def close_connections() -> None:
+    """呼び出したスレッドが開いているコネクションをすべて閉じる"""
+    for conn in getattr(_local, "conns", {}).values():
         conn.close()
+    _local.conns = {}
+
+
+def checkpoint() -> None:
+    """WALの内容をDB本体に書き戻し、WALファイルを空にする
+
+    synchronous=NORMAL ではコミット直後の数トランザクションが電源断で失われうるため、
+    終了時に呼んで確実にディスクへ同期する。
+    """
+    with get_connection() as conn:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
 
 
 def init_db() -> None:
     """テーブルを初期化する（存在しなければ作成）"""
     with get_connection() as conn:
-        # 振動データテーブル
+        # 振動データテーブル（時間ブロック単位）
         conn.execute("""
-            CREATE TABLE IF NOT EXISTS vibration_data (
+            CREATE TABLE IF NOT EXISTS vibration_blocks (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 device_id TEXT NOT NULL,
-                timestamp TEXT NOT NULL,
-                x REAL NOT NULL,
-                y REAL NOT NULL,
-                z REAL NOT NULL,
+                start_us INTEGER NOT NULL,
+                end_us INTEGER NOT NULL,
+                sample_rate REAL NOT NULL,
+                sample_count INTEGER NOT NULL,
+                x BLOB NOT NULL,
+                y BLOB NOT NULL,
+                z BLOB NOT NULL,
                 created_at TEXT DEFAULT (datetime('now'))
             )
         """)
         conn.execute("""
-            CREATE INDEX IF NOT EXISTS idx_vibration_device_time
-            ON vibration_data (device_id, timestamp)
+            CREATE INDEX IF NOT EXISTS idx_blocks_device_time
+            ON vibration_blocks (device_id, start_us)
         """)
 
         # 解析結果テーブル
@@ -82,9 +161,252 @@ def init_db() -> None:
             ON analysis_results (device_id, analyzed_at DESC)
         """)
 
+        # デバイス一覧（データのある期間。ブロックの書き込み時に更新する）
+        has_devices = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'devices'"
+        ).fetchone() is not None
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS devices (
+                device_id TEXT PRIMARY KEY,
+                first_us INTEGER NOT NULL,
+                last_us INTEGER NOT NULL
+            )
+        """)
+        if not has_devices:
+            # デバイス一覧が無かったDBは既存のブロックから作る（初回のみ）
+            conn.execute(
+                "INSERT OR IGNORE INTO devices (device_id, first_us, last_us) "
+                "SELECT device_id, MIN(start_us), MAX(end_us) "
+                "FROM vibration_blocks GROUP BY device_id"
+            )
+
+        # 差分解析の状態テーブル（デバイスごとに1行）
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS analysis_state (
+                device_id TEXT PRIMARY KEY,
+                last_us INTEGER NOT NULL,
+                sample_rate REAL NOT NULL,
+                segment_len INTEGER NOT NULL,
+                sample_count INTEGER NOT NULL,
+                sample_mean REAL NOT NULL,
+                sample_m2 REAL NOT NULL,
+                segment_count INTEGER NOT NULL,
+                rms_mean REAL NOT NULL,
+                rms_m2 REAL NOT NULL,
+                rms_history BLOB NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+        """)
+
+        # 通知の送信待ち（アウトボックス）。送信済みも重複防止のため一定期間残す
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS notification_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                dedup_key TEXT NOT NULL UNIQUE,
+                device_id TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                last_error TEXT,
+                created_at TEXT DEFAULT (datetime('now')),
+                sent_at REAL
+            )
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_outbox_due
+            ON notification_outbox (next_attempt_at) WHERE sent_at IS NULL
+        """)
+
+        if _has_legacy_rows(conn):
+            logger.warning(
+                "旧形式の vibration_data テーブルにデータがあります。"
+                "python -m shared.migrate で移行してください"
+            )
+
     logger.info(f"DB初期化完了: {DB_PATH}")
 
 
+def _to_us(ts: datetime) -> int:
+    """時刻をUNIXエポックからのマイクロ秒にする（タイムゾーン付きはUTCに変換）"""
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return (ts - _EPOCH) // timedelta(microseconds=1)
+
+
+def _from_us(us: int) -> datetime:
+    """UNIXエポックからのマイクロ秒を時刻に戻す"""
+    return _EPOCH + timedelta(microseconds=int(us))
+
+
+def _sample_times(start_us: int, sample_rate: float, count: int) -> np.ndarray:
+    """ブロック内各サンプルの時刻（マイクロ秒）"""
+    return start_us + np.rint(np.arange(count) * (1e6 / sample_rate)).astype(np.int64)
+
+
+def _split_blocks(t_us: np.ndarray) -> list[tuple[int, int, float]]:
+    """昇順の時刻列を、等間隔とみなせて BLOCK_SEC 秒に収まる区間に分ける
+
+    時刻差の中央値から大きく外れる飛び（欠損）の手前までを区間候補とし、
+    その両端から周期を求める。開始時刻 + i * 周期 からのずれが
+    周期の JITTER_TOLERANCE 倍を超えたところでも区切る。
+
+    Args:
+        t_us: 時刻（マイクロ秒）の昇順配列
+
+    Returns:
+        [(開始index, 終了index, サンプリング周波数), ...]
+    """
+    blocks = []
+    i, n = 0, len(t_us)
+    while i < n:
+        limit = int(np.searchsorted(t_us, t_us[i] + BLOCK_US, side="left"))
+        diffs = np.diff(t_us[i:limit])
+        median = float(np.median(diffs)) if len(diffs) else 0.0
+        if median <= 0:
+            # 1件だけ・同時刻の重複は1件ずつ保存する
+            blocks.append((i, i + 1, float(SAMPLING_RATE)))
+            i += 1
+            continue
+        gaps = np.flatnonzero(diffs > median * (1 + JITTER_TOLERANCE))
+        if len(gaps):
+            limit = i + int(gaps[0]) + 1
+        period = (
+            (t_us[limit - 1] - t_us[i]) / (limit - 1 - i) if limit - i > 1
+            else median
+        )
+        offset = np.abs(t_us[i:limit] - _sample_times(t_us[i], 1e6 / period, limit - i))
+        bad = np.flatnonzero(offset > period * JITTER_TOLERANCE)
+        j = i + int(bad[0]) if len(bad) else limit
+        blocks.append((i, j, 1e6 / period))
+        i = j
+    return blocks
+
+
+def _block_rows(
+    device_id: str,
+    t_us: np.ndarray,
+    x: np.ndarray,
+    y: np.ndarray,
+    z: np.ndarray,
+) -> list[tuple]:
+    """1デバイス分の配列をブロックの行に分ける（時刻順に並べ替える）"""
+    order = np.argsort(t_us, kind="stable")
+    t_us = np.asarray(t_us, dtype=np.int64)[order]
+    axes = [np.asarray(a)[order].astype(_SAMPLE_DTYPE) for a in (x, y, z)]
+    return [
+        _block_row(device_id, int(t_us[i]), int(t_us[j - 1]), rate, axes, i, j)
+        for i, j, rate in _split_blocks(t_us)
+    ]
+
+
+def _insert_blocks(
+    conn: sqlite3.Connection,
+    device_id: str,
+    t_us: np.ndarray,
+    x: np.ndarray,
+    y: np.ndarray,
+    z: np.ndarray,
+) -> int:
+    """1デバイス分の配列をブロックに分けて挿入する"""
+    _write_blocks(conn, _block_rows(device_id, t_us, x, y, z))
+    return len(t_us)
+
+
+def _block_row(
+    device_id: str,
+    start_us: int,
+    end_us: int,
+    rate: float,
+    axes: list[np.ndarray],
+    i: int,
+    j: int,
+) -> tuple:
+    """axes[:, i:j] を1ブロックの行にする"""
+    return (
+        device_id, start_us, end_us, rate, j - i,
+        *(zlib.compress(a[i:j].tobytes(), 1) for a in axes),
+    )
+
+
+def _write_blocks(conn: sqlite3.Connection, rows: list[tuple]) -> None:
+    """ブロックの行をまとめて挿入し、デバイス一覧の期間を広げる"""
+    conn.executemany(
+        "INSERT INTO vibration_blocks "
+        "(device_id, start_us, end_us, sample_rate, sample_count, x, y, z) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    spans: dict[str, tuple[int, int]] = {}
+    for device_id, start_us, end_us, *_ in rows:
+        first, last = spans.get(device_id, (start_us, end_us))
+        spans[device_id] = (min(first, start_us), max(last, end_us))
+    conn.executemany(
+        "INSERT INTO devices (device_id, first_us, last_us) VALUES (?, ?, ?) "
+        "ON CONFLICT (device_id) DO UPDATE SET "
+        "first_us = MIN(first_us, excluded.first_us), "
+        "last_us = MAX(last_us, excluded.last_us)",
+        [(d, first, last) for d, (first, last) in spans.items()],
+    )
+
+
+def insert_vibration_uniform(
+    device_id: str,
+    start: datetime,
+    sample_rate: float,
+    x: np.ndarray,
+    y: np.ndarray,
+    z: np.ndarray,
+) -> int:
+    """開始時刻とサンプリング周波数で時刻が決まる等間隔データを挿入する
+
+    時刻列から周期を推定せず、BLOCK_SEC 秒ごとに区切ってそのまま保存する
+
+    Args:
+        device_id: デバイスID
+        start: 先頭サンプルの計測時刻
+        sample_rate: サンプリング周波数 [Hz]
+        x, y, z: 3軸加速度 [g]（同じ長さ）
+
+    Returns:
+        挿入件数
+    """
+    start_us = _to_us(start)
+    axes = [np.asarray(a, dtype=_SAMPLE_DTYPE) for a in (x, y, z)]
+    n = len(axes[0])
+    per_block = max(1, math.ceil(BLOCK_SEC * sample_rate))
+    offsets = np.rint(np.arange(0, n, per_block) * (1e6 / sample_rate)).astype(np.int64)
+    rows = []
+    for offset, i in zip(offsets.tolist(), range(0, n, per_block)):
+        j = min(n, i + per_block)
+        block_start = start_us + offset
+        end_us = block_start + round((j - 1 - i) * 1e6 / sample_rate)
+        rows.append(_block_row(device_id, block_start, end_us, sample_rate, axes, i, j))
+    with get_connection() as conn:
+        _write_blocks(conn, rows)
+    return n
+
+
+def insert_vibration_arrays(
+    device_id: str,
+    timestamps_us: np.ndarray,
+    x: np.ndarray,
+    y: np.ndarray,
+    z: np.ndarray,
+) -> int:
+    """1デバイス分の振動データを配列のまま挿入する
+
+    Args:
+        device_id: デバイスID
+        timestamps_us: 計測時刻（UNIXエポックからのマイクロ秒）
+        x, y, z: 3軸加速度 [g]
+
+    Returns:
+        挿入件数
+    """
+    with get_connection() as conn:
+        return _insert_blocks(conn, device_id, timestamps_us, x, y, z)
+
+
 def insert_vibration(
     device_id: str,
     timestamp: datetime,
@@ -93,12 +415,7 @@ def insert_vibration(
     z: float,
 ) -> None:
     """振動データ1件を挿入する"""
-    with get_connection() as conn:
-        conn.execute(
-            "INSERT INTO vibration_data (device_id, timestamp, x, y, z) "
-            "VALUES (?, ?, ?, ?, ?)",
-            (device_id, timestamp.isoformat(), x, y, z),
-        )
+    insert_vibration_batch([(device_id, timestamp, x, y, z)])
 
 
 def insert_vibration_batch(
@@ -106,21 +423,229 @@ def insert_vibration_batch(
 ) -> int:
     """振動データを一括挿入する
 
+    デバイスをまたいでも1トランザクション・1回の executemany で書き込む
+
     Args:
         records: [(device_id, timestamp, x, y, z), ...]
 
     Returns:
         挿入件数
     """
-    with get_connection() as conn:
-        conn.executemany(
-            "INSERT INTO vibration_data (device_id, timestamp, x, y, z) "
-            "VALUES (?, ?, ?, ?, ?)",
-            [(r[0], r[1].isoformat(), r[2], r[3], r[4]) for r in records],
+    by_device: dict[str, tuple[list, list]] = {}
+    for r in records:
+        times, values = by_device.setdefault(r[0], ([], []))
+        times.append(_to_us(r[1]))
+        values.append(r[2:5])
+    rows = []
+    for device_id, (times, values) in by_device.items():
+        xyz = np.array(values, dtype=np.float64)
+        rows += _block_rows(
+            device_id, np.array(times, dtype=np.int64),
+            xyz[:, 0], xyz[:, 1], xyz[:, 2],
         )
+    with get_connection() as conn:
+        _write_blocks(conn, rows)
     return len(records)
 
 
+def decode_samples(blob: bytes) -> np.ndarray:
+    """BLOBを float32 配列に戻す
+
+    展開したバッファをコピーせずに参照する読み取り専用の配列を返す
+
+    Args:
+        blob: zlib圧縮した float32 配列
+
+    Returns:
+        float32 の1次元配列
+    """
+    return np.frombuffer(zlib.decompress(blob), dtype=_SAMPLE_DTYPE)
+
+
+def _select_blocks(
+    conn: sqlite3.Connection,
+    device_id: str,
+    start_us: int | None,
+    end_us: int | None,
+    axes: tuple[str, ...],
+) -> list[sqlite3.Row]:
+    """期間にかかるブロックを時刻順に取得する（BLOBは指定した軸のみ）"""
+    for axis in axes:
+        if axis not in AXES:
+            raise ValueError(f"不明な軸: {axis}")
+    query = (
+        f"SELECT start_us, sample_rate, sample_count, {', '.join(axes)} "
+        "FROM vibration_blocks WHERE device_id = ?"
+    )
+    params: list = [device_id]
+    if start_us is not None:
+        # ブロックの幅は BLOCK_SEC 未満なので、開始時刻の索引だけで絞り込める
+        query += " AND start_us > ? AND end_us >= ?"
+        params += [start_us - BLOCK_US, start_us]
+    if end_us is not None:
+        query += " AND start_us <= ?"
+        params.append(end_us)
+    query += " ORDER BY start_us ASC, id ASC"
+    return conn.execute(query, params).fetchall()
+
+
+def _block_range(
+    row: sqlite3.Row, start_us: int | None, end_us: int | None,
+) -> tuple[np.ndarray, int, int]:
+    """ブロック内の時刻と、期間内に入るサンプルの範囲 [lo, hi)"""
+    t_us = _sample_times(row["start_us"], row["sample_rate"], row["sample_count"])
+    lo = int(np.searchsorted(t_us, start_us, "left")) if start_us is not None else 0
+    hi = int(np.searchsorted(t_us, end_us, "right")) if end_us is not None else len(t_us)
+    return t_us, lo, max(lo, hi)
+
+
+def iter_vibration_blocks(
+    device_id: str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    axes: tuple[str, ...] = AXES,
+) -> Iterator[dict]:
+    """期間内の振動データをブロック単位で時刻順に返す
+
+    期間の端にかかるブロックは範囲内のサンプルだけに切り詰める（配列はスライスで、コピーしない）
+
+    Args:
+        device_id: デバイスID
+        start: 開始時刻（省略時は全期間）
+        end: 終了時刻（省略時は全期間）
+        axes: 展開する軸
+
+    Yields:
+        start_us, sample_rate, timestamp_us と各軸の配列を持つ辞書
+
+    Raises:
+        ValueError: x / y / z 以外の軸を指定した場合
+    """
+    start_us = _to_us(start) if start else None
+    end_us = _to_us(end) if end else None
+    with get_connection(readonly=True) as conn:
+        rows = _select_blocks(conn, device_id, start_us, end_us, axes)
+    for row in rows:
+        t_us, lo, hi = _block_range(row, start_us, end_us)
+        block = {
+            "start_us": row["start_us"],
+            "sample_rate": row["sample_rate"],
+            "timestamp_us": t_us[lo:hi],
+        }
+        for axis in axes:
+            block[axis] = decode_samples(row[axis])[lo:hi]
+        yield block
+
+
+def fetch_axis(
+    device_id: str,
+    axis: str = "z",
+    start: datetime | None = None,
+    end: datetime | None = None,
+    step: int = 1,
+    dtype: np.dtype = np.float64,
+) -> np.ndarray:
+    """1軸分の振動データを1本の配列で取得する
+
+    期間内のサンプル数をブロックの件数から先に求めて出力配列を確保し、
+    各ブロックを展開したバッファから直接書き込む（中間のリスト・連結を作らない）。
+    step > 1 のときは連続する step サンプルの平均を1サンプルとする
+    （箱型の平滑化を兼ねた間引き。ブロックをまたぐ区間も連続して扱い、末尾の端数は捨てる）。
+
+    Args:
+        device_id: デバイスID
+        axis: 取得する軸（x / y / z）
+        start: 開始時刻（省略時は全期間）
+        end: 終了時刻（省略時は全期間）
+        step: 間引き率（1なら間引かない）
+        dtype: 出力配列の型
+
+    Returns:
+        長さ 期間内のサンプル数 // step の配列
+
+    Raises:
+        ValueError: 不明な軸・1未満の間引き率を指定した場合
+    """
+    if step < 1:
+        raise ValueError(f"間引き率は1以上: {step}")
+    start_us = _to_us(start) if start else None
+    end_us = _to_us(end) if end else None
+    with get_connection(readonly=True) as conn:
+        rows = _select_blocks(conn, device_id, start_us, end_us, (axis,))
+    spans = [_block_range(row, start_us, end_us)[1:] for row in rows]
+    total = sum(hi - lo for lo, hi in spans)
+    out = np.empty(total // step, dtype=dtype)
+
+    pos = 0
+    carry = np.empty(0, dtype=_SAMPLE_DTYPE)
+    for row, (lo, hi) in zip(rows, spans):
+        if hi == lo:
+            continue
+        samples = decode_samples(row[axis])[lo:hi]
+        if step == 1:
+            out[pos:pos + len(samples)] = samples
+            pos += len(samples)
+            continue
+        if len(carry):
+            samples = np.concatenate([carry, samples])
+        n = len(samples) // step
+        out[pos:pos + n] = samples[:n * step].reshape(n, step).mean(
+            axis=1, dtype=np.float64,
+        )
+        pos += n
+        carry = samples[n * step:]
+    return out
+
+
+def fetch_vibration_arrays(
+    device_id: str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    axes: tuple[str, ...] = AXES,
+) -> dict[str, np.ndarray]:
+    """振動データを軸ごとの配列で取得する
+
+    1ブロックに収まる場合は展開したバッファをそのまま参照する（読み取り専用）
+
+    Args:
+        device_id: デバイスID
+        start: 開始時刻（省略時は全期間）
+        end: 終了時刻（省略時は全期間）
+        axes: 取得する軸
+
+    Returns:
+        timestamp_us（int64）と各軸（float32）の配列を持つ辞書
+    """
+    blocks = list(iter_vibration_blocks(device_id, start, end, axes))
+    if not blocks:
+        return {
+            "timestamp_us": np.empty(0, np.int64),
+            **{axis: np.empty(0, _SAMPLE_DTYPE) for axis in axes},
+        }
+    keys = ("timestamp_us", *axes)
+    if len(blocks) == 1:
+        return {k: blocks[0][k] for k in keys}
+    return {k: np.concatenate([b[k] for b in blocks]) for k in keys}
+
+
+def fetch_axis_after(
+    device_id: str, axis: str, after_us: int | None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """指定時刻より後の1軸のデータを時刻とともに取得する（差分解析用）
+
+    Args:
+        device_id: デバイスID
+        axis: "x" / "y" / "z"
+        after_us: この時刻（UNIXエポックからのマイクロ秒）より後を取得（None なら全期間）
+
+    Returns:
+        (timestamp_us（int64）, 値（float32）)
+    """
+    start = None if after_us is None else _from_us(after_us + 1)
+    data = fetch_vibration_arrays(device_id, start, None, axes=(axis,))
+    return data["timestamp_us"], data[axis]
+
+
 def fetch_vibration(
     device_id: str,
     start: datetime | None = None,
@@ -136,32 +661,126 @@ def fetch_vibration(
     Returns:
         振動データのリスト
     """
-    query = "SELECT * FROM vibration_data WHERE device_id = ?"
-    params: list = [device_id]
+    data = fetch_vibration_arrays(device_id, start, end)
+    return [
+        {
+            "device_id": device_id,
+            "timestamp": _from_us(t).isoformat(),
+            "x": x, "y": y, "z": z,
+        }
+        for t, x, y, z in zip(
+            data["timestamp_us"].tolist(), data["x"].tolist(),
+            data["y"].tolist(), data["z"].tolist(),
+        )
+    ]
 
-    if start:
-        query += " AND timestamp >= ?"
-        params.append(start.isoformat())
-    if end:
-        query += " AND timestamp <= ?"
-        params.append(end.isoformat())
 
-    query += " ORDER BY timestamp ASC"
+def _has_legacy_table(conn: sqlite3.Connection) -> bool:
+    """旧形式（1サンプル1行）の vibration_data テーブルがあるか"""
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master "
+        "WHERE type = 'table' AND name = 'vibration_data'"
+    ).fetchone() is not None
 
-    with get_connection() as conn:
-        rows = conn.execute(query, params).fetchall()
-    return [dict(r) for r in rows]
+
+def _has_legacy_rows(conn: sqlite3.Connection) -> bool:
+    """旧形式の vibration_data テーブルにデータが残っているか"""
+    return _has_legacy_table(conn) and conn.execute(
+        "SELECT 1 FROM vibration_data LIMIT 1"
+    ).fetchone() is not None
+
+
+def migrate_legacy_vibration(
+    conn: sqlite3.Connection,
+    chunk_rows: int = 100_000,
+    drop: bool = True,
+) -> dict[str, int]:
+    """旧形式の vibration_data をブロック形式に移行する
+
+    デバイスごとに、ブロックの挿入と旧データの削除を1トランザクションで行う
+    （途中で止まっても、再実行すれば残りのデバイスから続けられる）。
+
+    Args:
+        conn: 移行対象のDBへのコネクション（vibration_blocks 作成済み）
+        chunk_rows: 一度に読み込む行数
+        drop: 移行後に空になった vibration_data テーブルを削除するか
+
+    Returns:
+        {デバイスID: 移行件数}
+    """
+    if not _has_legacy_table(conn):
+        return {}
+    devices = [
+        r[0] for r in conn.execute("SELECT DISTINCT device_id FROM vibration_data")
+    ]
+    migrated = {}
+    for device_id in devices:
+        cur = conn.execute(
+            "SELECT timestamp, x, y, z FROM vibration_data "
+            "WHERE device_id = ? ORDER BY timestamp ASC",
+            (device_id,),
+        )
+        count = 0
+        while rows := cur.fetchmany(chunk_rows):
+            t_us = np.array(
+                [_to_us(datetime.fromisoformat(r[0])) for r in rows], dtype=np.int64,
+            )
+            xyz = np.array([tuple(r[1:]) for r in rows], dtype=np.float64)
+            count += _insert_blocks(conn, device_id, t_us, xyz[:, 0], xyz[:, 1], xyz[:, 2])
+        conn.execute("DELETE FROM vibration_data WHERE device_id = ?", (device_id,))
+        conn.commit()
+        migrated[device_id] = count
+        logger.info(f"移行完了: {device_id} x {count}件")
+    if drop:
+        conn.execute("DROP TABLE vibration_data")
+        conn.commit()
+    return migrated
 
 
 def save_analysis_result(result: dict) -> None:
     """解析結果を保存する"""
+    save_analysis_results([result])
+
+
+def save_analysis_results(results: list[dict]) -> None:
+    """複数の解析結果を1トランザクションでまとめて保存する"""
     with get_connection() as conn:
-        conn.execute(
-            "INSERT INTO analysis_results "
-            "(device_id, is_anomaly, max_z_score, mean_rms, "
-            "peak_frequency_hz, envelope_peak_hz, threshold, "
-            "sample_count, analyzed_at) "
-            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        _insert_results(conn, results)
+
+
+def record_analyses(
+    results: list[dict],
+    states: dict[str, dict],
+    notifications: list[tuple[str, str, dict]],
+) -> int:
+    """解析結果・差分解析の状態・異常の通知を1トランザクションで保存する
+
+    差分解析の状態（解析済みの時刻）だけが進んで結果や通知が残らない、
+    ということが起きないよう、まとめてコミットする（失敗時はすべてロールバック）。
+
+    Args:
+        results: 解析結果のリスト
+        states: {device_id: 差分解析の新しい状態}（save_analysis_state と同じ形）
+        notifications: [(重複キー, device_id, 通知APIへ送る本文), ...]
+
+    Returns:
+        アウトボックスに追加した通知の件数
+    """
+    with get_connection() as conn:
+        _upsert_states(conn, states)
+        _insert_results(conn, results)
+        return _insert_notifications(conn, notifications)
+
+
+def _insert_results(conn: sqlite3.Connection, results: list[dict]) -> None:
+    """analysis_results に解析結果を追加する（コミットは呼び出し側）"""
+    conn.executemany(
+        "INSERT INTO analysis_results "
+        "(device_id, is_anomaly, max_z_score, mean_rms, "
+        "peak_frequency_hz, envelope_peak_hz, threshold, "
+        "sample_count, analyzed_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [
             (
                 result["device_id"],
                 int(result["is_anomaly"]),
@@ -172,13 +791,15 @@ def save_analysis_result(result: dict) -> None:
                 result["threshold"],
                 result["sample_count"],
                 result["analyzed_at"],
-            ),
-        )
+            )
+            for result in results
+        ],
+    )
 
 
 def get_latest_analysis(device_id: str) -> dict | None:
     """最新の解析結果を取得する"""
-    with get_connection() as conn:
+    with get_connection(readonly=True) as conn:
         row = conn.execute(
             "SELECT * FROM analysis_results "
             "WHERE device_id = ? ORDER BY analyzed_at DESC LIMIT 1",
@@ -189,9 +810,10 @@ def get_latest_analysis(device_id: str) -> dict | None:
 
 def get_device_data_count(device_id: str) -> int:
     """デバイスのデータ件数を取得する"""
-    with get_connection() as conn:
+    with get_connection(readonly=True) as conn:
         row = conn.execute(
-            "SELECT COUNT(*) as cnt FROM vibration_data WHERE device_id = ?",
+            "SELECT COALESCE(SUM(sample_count), 0) as cnt "
+            "FROM vibration_blocks WHERE device_id = ?",
             (device_id,),
         ).fetchone()
     return row["cnt"]
@@ -199,10 +821,237 @@ def get_device_data_count(device_id: str) -> int:
 
 def get_last_received(device_id: str) -> str | None:
     """デバイスの最終受信時刻を取得する"""
-    with get_connection() as conn:
+    with get_connection(readonly=True) as conn:
         row = conn.execute(
-            "SELECT MAX(timestamp) as last_ts FROM vibration_data "
+            "SELECT MAX(end_us) as last_us FROM vibration_blocks "
             "WHERE device_id = ?",
             (device_id,),
         ).fetchone()
-    return row["last_ts"] if row else None
+    if row is None or row["last_us"] is None:
+        return None
+    return _from_us(row["last_us"]).isoformat()
+
+
+def get_analysis_state(device_id: str) -> dict | None:
+    """差分解析の状態を取得する
+
+    Returns:
+        状態の辞書（last_us は解析済みの最後のサンプルの時刻、
+        rms_history は float32 配列）。未解析なら None
+    """
+    with get_connection(readonly=True) as conn:
+        row = conn.execute(
+            "SELECT * FROM analysis_state WHERE device_id = ?",
+            (device_id,),
+        ).fetchone()
+    if row is None:
+        return None
+    state = dict(row)
+    state["rms_history"] = decode_samples(state["rms_history"])
+    return state
+
+
+def save_analysis_state(device_id: str, state: dict) -> None:
+    """差分解析の状態を保存する（デバイスごとに上書き）
+
+    Args:
+        device_id: デバイスID
+        state: last_us, sample_rate, segment_len と engine.analyze_incremental の状態
+    """
+    with get_connection() as conn:
+        _upsert_states(conn, {device_id: state})
+
+
+def _upsert_states(conn: sqlite3.Connection, states: dict[str, dict]) -> None:
+    """analysis_state をデバイスごとに上書きする（コミットは呼び出し側）"""
+    updated_at = datetime.now().isoformat()
+    conn.executemany(
+        "INSERT OR REPLACE INTO analysis_state "
+        "(device_id, last_us, sample_rate, segment_len, "
+        "sample_count, sample_mean, sample_m2, "
+        "segment_count, rms_mean, rms_m2, rms_history, updated_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (
+                device_id,
+                int(state["last_us"]),
+                state["sample_rate"],
+                state["segment_len"],
+                state["sample_count"],
+                state["sample_mean"],
+                state["sample_m2"],
+                state["segment_count"],
+                state["rms_mean"],
+                state["rms_m2"],
+                zlib.compress(
+                    np.asarray(state["rms_history"], dtype=_SAMPLE_DTYPE).tobytes(), 1,
+                ),
+                updated_at,
+            )
+            for device_id, state in states.items()
+        ],
+    )
+
+
+def delete_analysis_state(device_id: str) -> bool:
+    """差分解析の状態を削除する（次回は全期間から解析し直す）
+
+    Returns:
+        削除したか（状態が無ければ False）
+    """
+    with get_connection() as conn:
+        cur = conn.execute(
+            "DELETE FROM analysis_state WHERE device_id = ?", (device_id,),
+        )
+    return cur.rowcount > 0
+
+
+def get_sweep_candidates(min_new_samples: int) -> list[dict]:
+    """差分解析の済んでいないデータがあるデバイスを取得する
+
+    新しいサンプル数は、前回解析した時刻より後のサンプルの件数
+    （解析済みの時刻を含むブロックは、開始時刻とサンプリング周波数から解析済みの分を引く）。
+    1セグメントに満たない端数だけが残ったデバイスは、新しいデータが届くまで候補にしない。
+    全デバイス分を1回のクエリ（デバイスごとに集計）で数える。
+
+    Args:
+        min_new_samples: 新しいサンプルがこの件数以上あるデバイスだけを返す
+
+    Returns:
+        [{"device_id", "new_samples", "lag_sec"}, ...]（未解析のデータの時間幅 lag_sec の大きい順）
+    """
+    with get_connection(readonly=True) as conn:
+        rows = conn.execute(
+            "WITH pending AS ("
+            " SELECT d.device_id, d.last_us, COALESCE(s.last_us, d.first_us - 1) AS after_us"
+            " FROM devices d LEFT JOIN analysis_state s USING (device_id)"
+            " WHERE s.last_us IS NULL OR d.last_us > s.last_us) "
+            "SELECT p.device_id, (p.last_us - p.after_us) / 1e6 AS lag_sec, "
+            "SUM(CASE WHEN b.start_us > p.after_us THEN b.sample_count "
+            "ELSE b.sample_count - MIN(b.sample_count, "
+            "CAST((p.after_us - b.start_us) * b.sample_rate / 1e6 + 0.5 AS INTEGER) + 1) END"
+            ") AS new_samples "
+            "FROM pending p JOIN vibration_blocks b ON b.device_id = p.device_id "
+            "AND b.start_us > p.after_us - :block_us AND b.end_us > p.after_us "
+            "GROUP BY p.device_id HAVING new_samples >= :min_new_samples "
+            "ORDER BY lag_sec DESC",
+            {"block_us": BLOCK_US, "min_new_samples": min_new_samples},
+        ).fetchall()
+    return [
+        {"device_id": r["device_id"], "new_samples": r["new_samples"], "lag_sec": r["lag_sec"]}
+        for r in rows
+    ]
+
+
+def enqueue_notifications(items: list[tuple[str, str, dict]]) -> int:
+    """通知をアウトボックスに追加する（同じ重複キーは1回だけ）
+
+    Args:
+        items: [(重複キー, device_id, 通知APIへ送る本文), ...]
+
+    Returns:
+        追加した件数（重複キーが既にあるものは数えない）
+    """
+    with get_connection() as conn:
+        return _insert_notifications(conn, items)
+
+
+def _insert_notifications(
+    conn: sqlite3.Connection, items: list[tuple[str, str, dict]],
+) -> int:
+    """notification_outbox に通知を追加し、追加した件数を返す（コミットは呼び出し側）"""
+    now = time.time()
+    before = conn.total_changes
+    conn.executemany(
+        "INSERT OR IGNORE INTO notification_outbox "
+        "(dedup_key, device_id, payload, next_attempt_at) VALUES (?, ?, ?, ?)",
+        [
+            (key, device_id, json.dumps(payload, ensure_ascii=False), now)
+            for key, device_id, payload in items
+        ],
+    )
+    return conn.total_changes - before
+
+
+def fetch_due_notifications(now: float, limit: int) -> list[dict]:
+    """送信時刻になった未送信の通知を古い順に取得する
+
+    Args:
+        now: 現在時刻（UNIX秒）
+        limit: 最大件数
+
+    Returns:
+        [{"id", "dedup_key", "device_id", "payload"（dict）, "attempts"}, ...]
+    """
+    with get_connection(readonly=True) as conn:
+        rows = conn.execute(
+            "SELECT id, dedup_key, device_id, payload, attempts "
+            "FROM notification_outbox "
+            "WHERE sent_at IS NULL AND next_attempt_at <= ? "
+            "ORDER BY next_attempt_at, id LIMIT ?",
+            (now, limit),
+        ).fetchall()
+    return [{**dict(r), "payload": json.loads(r["payload"])} for r in rows]
+
+
+def finish_notifications(
+    sent_ids: list[int],
+    failed: list[tuple[int, str, float]],
+    deferred: list[tuple[int, float]] = (),
+) -> None:
+    """送信結果をまとめて記録する
+
+    Args:
+        sent_ids: 送信できた通知のID
+        failed: [(ID, エラー内容, 次に送る時刻（UNIX秒）), ...]
+        deferred: [(ID, 次に確認する時刻（UNIX秒）), ...]
+            Notifier がまとめ送信に回した通知（失敗回数は増やさず、未送信のまま残す）
+    """
+    now = time.time()
+    with get_connection() as conn:
+        conn.executemany(
+            "UPDATE notification_outbox "
+            "SET sent_at = ?, attempts = attempts + 1, last_error = NULL WHERE id = ?",
+            [(now, i) for i in sent_ids],
+        )
+        conn.executemany(
+            "UPDATE notification_outbox "
+            "SET attempts = attempts + 1, last_error = ?, next_attempt_at = ? WHERE id = ?",
+            [(error, next_at, i) for i, error, next_at in failed],
+        )
+        conn.executemany(
+            "UPDATE notification_outbox SET next_attempt_at = ? WHERE id = ?",
+            [(next_at, i) for i, next_at in deferred],
+        )
+
+
+def get_outbox_stats() -> dict:
+    """アウトボックスの未送信件数・最古の未送信の経過秒数・再送中の件数"""
+    with get_connection(readonly=True) as conn:
+        row = conn.execute(
+            "SELECT COUNT(*) AS pending, "
+            "COALESCE(SUM(attempts > 0), 0) AS retrying, "
+            "MIN(created_at) AS oldest "
+            "FROM notification_outbox WHERE sent_at IS NULL"
+        ).fetchone()
+    oldest = row["oldest"]
+    age = (
+        (datetime.now(timezone.utc).replace(tzinfo=None)
+         - datetime.fromisoformat(oldest)).total_seconds()
+        if oldest else 0.0
+    )
+    return {"pending": row["pending"], "retrying": row["retrying"], "oldest_age_sec": age}
+
+
+def purge_sent_notifications(before: float) -> int:
+    """送信済みの通知のうち、指定時刻より前に送ったものを削除する
+
+    Returns:
+        削除件数
+    """
+    with get_connection() as conn:
+        cur = conn.execute(
+            "DELETE FROM notification_outbox WHERE sent_at IS NOT NULL AND sent_at < ?",
+            (before,),
+        )
+    return cur.rowcount
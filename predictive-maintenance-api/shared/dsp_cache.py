@@ -0,0 +1,96 @@
+"""
+信号処理の前計算キャッシュ
+
+フィルタ係数・窓関数・周波数軸を (fs, 帯域, 次数, n) ごとに1回だけ作り、
+LRUで上限を設けて使い回す。analyze_vibration.py と Analyzer サービスで共有する。
+
+窓関数・周波数軸は書き込み禁止の配列を返す。フィルタ係数は sosfilt が
+書き込み可能な配列を要求するため、キャッシュのコピーを返す。
+"""
+
+import functools
+
+import numpy as np
+
+# 条件の組み合わせごとに保持する上限（サンプリング周波数・データ長の種類数の目安）
+CACHE_SIZE = 32
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _design_bandpass(
+    fs: float, band_low: float, band_high: float, order: int,
+) -> np.ndarray:
+    from scipy import signal
+
+    return signal.butter(
+        order, [band_low, band_high],
+        btype="bandpass", fs=fs, output="sos",
+    )
+
+
+def bandpass_sos(
+    fs: float, band_low: float, band_high: float, order: int = 4,
+) -> np.ndarray:
+    """バターワース・バンドパスフィルタの係数（SOS形式）
+
+    Args:
+        fs: サンプリング周波数
+        band_low: 下限周波数
+        band_high: 上限周波数
+        order: 次数
+
+    Returns:
+        (セクション数, 6) の配列（呼び出し側で書き換えてよいコピー）
+    """
+    return _design_bandpass(fs, band_low, band_high, order).copy()
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def hanning(n: int) -> np.ndarray:
+    """ハニング窓（書き込み禁止）
+
+    Args:
+        n: 窓長
+
+    Returns:
+        長さ n の配列
+    """
+    win = np.hanning(n)
+    win.flags.writeable = False
+    return win
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def rfftfreq(n: int, fs: float) -> np.ndarray:
+    """rfft の周波数軸（書き込み禁止）
+
+    Args:
+        n: FFT長
+        fs: サンプリング周波数
+
+    Returns:
+        長さ n // 2 + 1 の配列
+    """
+    freq = np.fft.rfftfreq(n, d=1 / fs)
+    freq.flags.writeable = False
+    return freq
+
+
+def cache_info() -> dict:
+    """キャッシュごとのヒット数・ミス数・件数
+
+    Returns:
+        bandpass_sos, hanning, rfftfreq をキーとする辞書
+    """
+    return {
+        "bandpass_sos": _design_bandpass.cache_info()._asdict(),
+        "hanning": hanning.cache_info()._asdict(),
+        "rfftfreq": rfftfreq.cache_info()._asdict(),
+    }
+
+
+def cache_clear() -> None:
+    """すべてのキャッシュを空にする"""
+    _design_bandpass.cache_clear()
+    hanning.cache_clear()
+    rfftfreq.cache_clear()
@@ -0,0 +1,65 @@
+"""
+振動データの保存形式を移行するツール
+
+旧形式（1サンプル1行の vibration_data テーブル）をブロック形式
+（vibration_blocks テーブル）に移行する。
+
+使い方:
+    python -m shared.migrate                      # DB_PATH のDBを移行
+    python -m shared.migrate --db data/old.db --vacuum
+"""
+
+import argparse
+import logging
+import sqlite3
+
+from shared import database
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args() -> argparse.Namespace:
+    """コマンドライン引数を解析する"""
+    parser = argparse.ArgumentParser(description="振動データをブロック形式に移行する")
+    parser.add_argument("--db", default=database.DB_PATH, help="移行するDBファイル")
+    parser.add_argument(
+        "--chunk-rows", type=int, default=100_000, help="一度に読み込む行数",
+    )
+    parser.add_argument(
+        "--keep-legacy", action="store_true",
+        help="移行後も空の vibration_data テーブルを残す",
+    )
+    parser.add_argument(
+        "--vacuum", action="store_true", help="移行後にVACUUMしてファイルを縮める",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """旧形式のデータをすべて移行する"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+    )
+    args = parse_args()
+    database.DB_PATH = args.db
+    database.init_db()
+    with database.get_connection() as conn:
+        migrated = database.migrate_legacy_vibration(
+            conn, args.chunk_rows, drop=not args.keep_legacy,
+        )
+    logger.info(
+        f"{len(migrated)}デバイス・{sum(migrated.values())}件を移行しました"
+    )
+    database.close_connections()
+    if args.vacuum:
+        conn = sqlite3.connect(args.db)
+        try:
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+        logger.info("VACUUM完了")
+
+
+if __name__ == "__main__":
+    main()
@@ -28,12 +28,28 @@ class VibrationBatch(BaseModel):
     samples: list[VibrationData] = Field(..., description="振動データ配列")
 
 
+class VibrationColumns(BaseModel):
+    """振動データの列形式での一括送信用（等間隔サンプリング）
+
+    各サンプルの時刻は start + i / sample_rate とする
+    """
+
+    device_id: str = Field(..., json_schema_extra={"example": "m5stick_01"})
+    start: datetime = Field(..., description="先頭サンプルの計測時刻（ISO 8601）")
+    sample_rate: float = Field(..., gt=0, description="サンプリング周波数 [Hz]")
+    x: list[float] = Field(..., description="X軸加速度の配列 [g]")
+    y: list[float] = Field(..., description="Y軸加速度の配列 [g]")
+    z: list[float] = Field(..., description="Z軸加速度の配列 [g]")
+
+
 class CollectResponse(BaseModel):
     """データ収集APIのレスポンス"""
 
     status: str = Field(..., json_schema_extra={"example": "ok"})
     device_id: str
-    saved_count: int = Field(..., description="保存件数")
+    saved_count: int = Field(
+        ..., description="保存件数（サンプルごとのJSONは書き込みバッファに受け付けた件数）",
+    )
 
 
 # ── 異常検知 ──────────────────────────────────────────────
@@ -44,6 +60,16 @@ class AnalyzeRequest(BaseModel):
     device_id: str = Field(..., json_schema_extra={"example": "m5stick_01"})
     start: datetime | None = Field(None, description="解析開始時刻")
     end: datetime | None = Field(None, description="解析終了時刻")
+    downsample: int = Field(
+        1, ge=1, description="間引き率（連続するNサンプルの平均を1サンプルとして解析）",
+    )
+    incremental: bool = Field(
+        False,
+        description=(
+            "差分解析（前回の続きの新しいデータだけを解析し、全期間の累積統計でZスコアを出す。"
+            "start / end / downsample とは併用できない）"
+        ),
+    )
 
 
 class AnalyzeResponse(BaseModel):
@@ -77,6 +103,9 @@ class NotifyRequest(BaseModel):
     device_id: str
     message: str = Field(..., description="通知メッセージ")
     color: str = Field("good", description="添付カラー (good/warning/danger)")
+    dedup_key: str | None = Field(
+        None, description="重複キー（同じキーの通知は1回だけ送る。再送時の二重通知防止）",
+    )
 
 
 class NotifyResponse(BaseModel):
@@ -0,0 +1,82 @@
+"""
+セグメント統計量モジュール
+
+時系列を一定長のセグメントに区切り、RMS・ピーク・クレストファクタ・
+尖度・歪度を全セグメント分まとめて計算する。
+analyze_vibration.py と Analyzer サービスの compute_scores で共有する。
+"""
+
+import numpy as np
+
+# 0除算よけ（従来の compute_scores と同じ値）
+EPS = 1e-10
+
+# 一度に処理するサンプル数の目安（作業配列がCPUキャッシュに収まる大きさ）
+BLOCK_SAMPLES = 1 << 15
+
+
+def segment_view(x: np.ndarray, segment_len: int) -> np.ndarray:
+    """時系列を (セグメント数, segment_len) の2次元ビューにする
+
+    端数のサンプルは切り捨てる。C連続の配列ならコピーは発生しない。
+
+    Args:
+        x: 1次元の時系列データ
+        segment_len: セグメント長（サンプル数）
+
+    Returns:
+        (n_segments, segment_len) の配列
+    """
+    n_segments = len(x) // segment_len
+    return np.reshape(x[:n_segments * segment_len], (n_segments, segment_len))
+
+
+def segment_stats(x: np.ndarray, segment_len: int) -> dict:
+    """セグメントごとの統計量をまとめて計算する
+
+    RMS は平均を除かない二乗平均平方根（従来と同じ定義）、
+    尖度・歪度はセグメント平均まわりのモーメントから求める
+    （尖度は正規分布で3になるピアソンの定義、分散0のセグメントは0）。
+
+    Args:
+        x: 1次元の時系列データ
+        segment_len: セグメント長（サンプル数）
+
+    Returns:
+        rms, peak, cf, kurtosis, skew（いずれも長さ n_segments の配列）を含む辞書
+    """
+    seg = segment_view(np.asarray(x, dtype=np.float64), segment_len)
+    n_segments = seg.shape[0]
+    rows = max(1, BLOCK_SAMPLES // segment_len)
+
+    # 全体を一度に計算すると巨大な一時配列の確保が支配的になるので、
+    # セグメントを数百個ずつのブロックに分け、作業配列を使い回す
+    sq, peak, m2, m3, m4 = np.empty((5, n_segments))
+    d = np.empty((min(rows, n_segments), segment_len))
+    d2 = np.empty_like(d)
+    for start in range(0, n_segments, rows):
+        stop = min(start + rows, n_segments)
+        blk = seg[start:stop]
+        bd, bd2 = d[:stop - start], d2[:stop - start]
+        sq[start:stop] = np.einsum("ij,ij->i", blk, blk)
+        np.maximum(blk.max(axis=1), -blk.min(axis=1), out=peak[start:stop])
+        np.subtract(blk, blk.mean(axis=1, keepdims=True), out=bd)
+        np.multiply(bd, bd, out=bd2)
+        m2[start:stop] = bd2.sum(axis=1)
+        m3[start:stop] = np.einsum("ij,ij->i", bd2, bd)
+        m4[start:stop] = np.einsum("ij,ij->i", bd2, bd2)
+
+    rms = np.sqrt(sq / segment_len)
+    m2 /= segment_len
+    m3 /= segment_len
+    m4 /= segment_len
+    flat = m2 <= EPS * EPS
+    safe = np.where(flat, 1.0, m2)
+
+    return {
+        "rms": rms,
+        "peak": peak,
+        "cf": peak / (rms + EPS),
+        "kurtosis": np.where(flat, 0.0, m4 / (safe * safe)),
+        "skew": np.where(flat, 0.0, m3 / (safe * np.sqrt(safe))),
+    }
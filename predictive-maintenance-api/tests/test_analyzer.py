@@ -1,7 +1,7 @@
 """
 Service 2: 異常検知APIのテスト
 
-正常系2・異常系2・境界値1
+正常系14・異常系12・境界値5
 """
 
 import sys
@@ -13,8 +13,18 @@ import numpy as np
 import pytest
 from fastapi.testclient import TestClient
 
-from services.analyzer.engine import analyze, compute_fft, preprocess
+from services.analyzer.engine import (
+    analyze,
+    analyze_incremental,
+    compute_fft,
+    compute_scores,
+    envelope_analysis,
+    new_state,
+    preprocess,
+)
 from services.analyzer.main import app
+from shared import dsp_cache
+from shared.segment_stats import segment_stats
 
 
 @pytest.fixture
@@ -73,6 +83,127 @@ class TestEngine:
         assert result["is_anomaly"] is True
 
 
+class TestIncrementalEngine:
+    """差分解析（累積統計の更新）のテスト"""
+
+    def test_normal_first_call_matches_full_analysis(self) -> None:
+        """正常系: 初回は解析したサンプルについて analyze と同じ結果になる"""
+        z = np.random.default_rng(0).normal(1.0, 0.1, 500 * 20 + 123)
+        result, state = analyze_incremental(z, new_state())
+        full = analyze(z[:500 * 20])
+        assert result["sample_count"] == 500 * 20
+        for key in ("is_anomaly", "peak_frequency_hz", "envelope_peak_hz"):
+            assert result[key] == full[key]
+        assert result["max_z_score"] == pytest.approx(full["max_z_score"], abs=1e-3)
+        assert result["mean_rms"] == pytest.approx(full["mean_rms"], abs=1e-5)
+        assert state["segment_count"] == 20
+
+    def test_normal_running_moments_match_whole_data(self) -> None:
+        """正常系: 分割して渡しても、累積の件数・平均・偏差平方和は全体で計算した値と一致する"""
+        z = np.random.default_rng(1).normal(1.0, 0.1, 500 * 30)
+        state = new_state()
+        for chunk in np.split(z, [500 * 7, 500 * 8, 500 * 21]):
+            _, state = analyze_incremental(chunk, state)
+        assert (state["sample_count"], state["segment_count"]) == (500 * 30, 30)
+        assert state["sample_mean"] == pytest.approx(np.mean(z), rel=1e-12)
+        assert state["sample_m2"] == pytest.approx(np.var(z) * len(z), rel=1e-9)
+        assert len(state["rms_history"]) == 30
+        rms = state["rms_history"].astype(np.float64)
+        assert state["rms_mean"] == pytest.approx(np.mean(rms), rel=1e-6)
+
+    def test_error_shorter_than_segment(self) -> None:
+        """異常系: 新しいデータが1セグメントに満たなければ ValueError（状態は変えない）"""
+        with pytest.raises(ValueError, match="データ不足"):
+            analyze_incremental(np.ones(499), new_state())
+
+    def test_boundary_history_limit(self) -> None:
+        """境界値: セグメントRMSの履歴は上限件数の新しい分だけ残す"""
+        z = np.random.default_rng(2).normal(1.0, 0.1, 500 * 10)
+        _, state = analyze_incremental(z, new_state(), history=4)
+        _, state = analyze_incremental(z * 2, state, history=4)
+        assert state["segment_count"] == 20
+        assert len(state["rms_history"]) == 4
+        _, state = analyze_incremental(z, state, history=0)
+        assert len(state["rms_history"]) == 0
+
+
+class TestSegmentStats:
+    """セグメント統計量カーネルのテスト"""
+
+    def test_normal_matches_per_segment_loop(self) -> None:
+        """正常系: セグメントごとにループで計算した値と一致する"""
+        from scipy import stats
+
+        x = np.random.default_rng(0).normal(0, 0.3, 500 * 12 + 123)
+        result = segment_stats(x, 500)
+        segs = [x[i * 500:(i + 1) * 500] for i in range(12)]
+        np.testing.assert_allclose(result["rms"], [np.sqrt(np.mean(s ** 2)) for s in segs])
+        np.testing.assert_allclose(result["peak"], [np.max(np.abs(s)) for s in segs])
+        np.testing.assert_allclose(result["cf"], result["peak"] / (result["rms"] + 1e-10))
+        np.testing.assert_allclose(result["kurtosis"], [stats.kurtosis(s, fisher=False) for s in segs])
+        np.testing.assert_allclose(result["skew"], [stats.skew(s) for s in segs])
+
+    def test_normal_compute_scores_includes_shape_stats(self) -> None:
+        """正常系: compute_scores が尖度・歪度・クレストファクタも返す"""
+        x = np.sin(np.linspace(0, 40 * np.pi, 2000))
+        scores = compute_scores(x, 500)
+        assert len(scores["z_score"]) == len(scores["kurtosis"]) == 4
+        np.testing.assert_allclose(scores["kurtosis"], 1.5, atol=0.01)  # 正弦波の尖度は1.5
+        np.testing.assert_allclose(scores["cf"], np.sqrt(2), atol=0.01)
+
+    def test_error_constant_segment(self) -> None:
+        """異常系: 分散0のセグメントは尖度・歪度を0とし、NaNにしない"""
+        result = segment_stats(np.zeros(1000), 500)
+        assert np.all(result["kurtosis"] == 0) and np.all(result["skew"] == 0)
+        assert not np.any(np.isnan(result["cf"]))
+
+    def test_boundary_shorter_than_segment(self) -> None:
+        """境界値: 1セグメントに満たないデータは空の配列になる"""
+        result = segment_stats(np.ones(499), 500)
+        assert all(len(v) == 0 for v in result.values())
+
+
+class TestDspCache:
+    """フィルタ係数・窓関数・周波数軸のキャッシュのテスト"""
+
+    def test_normal_reuse_across_requests(self) -> None:
+        """正常系: 同じ条件の2回目以降はフィルタ設計・窓・周波数軸を作り直さない"""
+        dsp_cache.cache_clear()
+        x = np.sin(np.linspace(0, 200 * np.pi, 2000))
+        first = envelope_analysis(x)
+        second = envelope_analysis(x)
+        np.testing.assert_array_equal(first[1], second[1])
+        info = dsp_cache.cache_info()
+        assert info["bandpass_sos"]["misses"] == 1 and info["bandpass_sos"]["hits"] == 1
+        assert info["hanning"]["misses"] == 1 and info["rfftfreq"]["misses"] == 1
+        assert dsp_cache.hanning(2000) is dsp_cache.hanning(2000)
+
+    def test_normal_same_values_and_protected(self) -> None:
+        """正常系: 直接計算した値と一致し、返した配列を書き換えてもキャッシュは壊れない"""
+        from scipy import signal
+
+        sos = dsp_cache.bandpass_sos(500, 50.0, 225.0)
+        np.testing.assert_array_equal(
+            sos, signal.butter(4, [50.0, 225.0], btype="bandpass", fs=500, output="sos"),
+        )
+        sos[:] = 0
+        assert np.any(dsp_cache.bandpass_sos(500, 50.0, 225.0) != 0)
+        np.testing.assert_array_equal(dsp_cache.rfftfreq(1000, 500), np.fft.rfftfreq(1000, d=1 / 500))
+        with pytest.raises(ValueError):
+            dsp_cache.hanning(1000)[0] = 1.0
+
+    def test_boundary_lru_eviction(self) -> None:
+        """境界値: 上限を超えると最も古い条件から捨て、件数は上限を超えない"""
+        dsp_cache.cache_clear()
+        for n in range(1, dsp_cache.CACHE_SIZE + 2):
+            dsp_cache.hanning(n)
+        assert dsp_cache.cache_info()["hanning"]["currsize"] == dsp_cache.CACHE_SIZE
+        dsp_cache.hanning(dsp_cache.CACHE_SIZE + 1)  # 最新は残っている
+        assert dsp_cache.cache_info()["hanning"]["hits"] == 1
+        dsp_cache.hanning(1)  # 最古は捨てられている
+        assert dsp_cache.cache_info()["hanning"]["misses"] == dsp_cache.CACHE_SIZE + 2
+
+
 class TestAnalyzeAPI:
     """解析APIエンドポイントのテスト"""
 
@@ -108,6 +239,63 @@ class TestAnalyzeAPI:
         assert "is_anomaly" in data
         assert "max_z_score" in data
 
+    def test_boundary_downsample(self, client: TestClient) -> None:
+        """境界値: 間引き率2では半分のサンプル数で解析し、ピーク周波数は変わらない"""
+        self._insert_test_data(client)
+        full = client.post("/api/v1/analyze", json={"device_id": "test_device"}).json()
+        half = client.post("/api/v1/analyze", json={
+            "device_id": "test_device", "downsample": 2,
+        }).json()
+        assert (full["sample_count"], half["sample_count"]) == (1000, 500)
+        assert full["peak_frequency_hz"] == pytest.approx(50, abs=1)
+        assert half["peak_frequency_hz"] == pytest.approx(50, abs=1)
+        resp = client.post("/api/v1/analyze", json={
+            "device_id": "test_device", "downsample": 0,
+        })
+        assert resp.status_code == 422
+
+    def test_normal_health_while_analyzing(self, client: TestClient) -> None:
+        """正常系: 解析はワーカープロセスで実行し、解析と並行して /health に応答する"""
+        import asyncio
+        import os
+
+        import httpx
+
+        from services.analyzer import main
+
+        self._insert_test_data(client)
+
+        async def scenario() -> tuple[int, int]:
+            pool = main._analysis_pool()
+            worker_pid = await asyncio.get_running_loop().run_in_executor(pool, os.getpid)
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+                analysis = asyncio.create_task(ac.post("/api/v1/analyze", json={"device_id": "test_device"}))
+                health = await ac.get("/health")
+                assert health.status_code == 200
+                assert (await analysis).status_code == 200
+            return worker_pid, os.getpid()
+
+        worker_pid, own_pid = asyncio.run(scenario())
+        assert worker_pid != own_pid
+
+    def test_error_too_many_pending(
+        self, client: TestClient, monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """異常系: 実行待ちの解析が上限に達していれば503で断る"""
+        self._insert_test_data(client)
+        monkeypatch.setattr("services.analyzer.main.ANALYSIS_MAX_PENDING", 0)
+        resp = client.post("/api/v1/analyze", json={"device_id": "test_device"})
+        assert resp.status_code == 503
+        assert resp.headers["retry-after"] == "5"
+
+    def test_error_short_data_from_worker(self, client: TestClient) -> None:
+        """異常系: ワーカー側の解析エラー（データ不足）は422で返す"""
+        self._insert_test_data(client, n=100)
+        resp = client.post("/api/v1/analyze", json={"device_id": "test_device"})
+        assert resp.status_code == 422
+        assert "データ不足" in resp.json()["detail"]
+
     def test_error_no_data(self, client: TestClient) -> None:
         """異常系: データなしで404"""
         resp = client.post("/api/v1/analyze", json={
@@ -116,6 +304,277 @@ class TestAnalyzeAPI:
         assert resp.status_code == 404
 
 
+class TestIncrementalAPI:
+    """差分解析APIのテスト"""
+
+    T0_US = 1_776_000_000_000_000
+
+    def _insert(self, start_s: int, seconds: int, scale: float = 0.1, seed: int = 0) -> None:
+        from shared.database import insert_vibration_arrays
+
+        n = seconds * 500
+        t_us = self.T0_US + (start_s * 500 + np.arange(n)) * 2000
+        z = 1.0 + np.random.default_rng(seed).normal(0, scale, n)
+        insert_vibration_arrays("test_device", t_us, np.zeros(n), np.zeros(n), z)
+
+    def test_normal_only_new_samples(
+        self, client: TestClient, monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """正常系: 2回目以降は前回の続きだけを解析し、累積統計に対して振幅の増加を異常と判定する"""
+        from shared.database import get_analysis_state
+
+        monkeypatch.setattr("services.analyzer.main.NOTIFIER_URL", "http://127.0.0.1:9")
+        self._insert(0, 60)
+        first = client.post("/api/v1/analyze", json={"device_id": "test_device", "incremental": True}).json()
+        assert first["sample_count"] == 30000 and first["is_anomaly"] is False
+        assert get_analysis_state("test_device")["last_us"] == self.T0_US + 29999 * 2000
+
+        self._insert(60, 5, scale=0.5, seed=1)
+        second = client.post("/api/v1/analyze", json={"device_id": "test_device", "incremental": True}).json()
+        assert second["sample_count"] == 2500
+        assert second["is_anomaly"] is True
+        assert client.get("/api/v1/notifications/outbox").json()["pending"] == 1
+        state = get_analysis_state("test_device")
+        assert (state["segment_count"], state["sample_count"]) == (65, 32500)
+
+        resp = client.post("/api/v1/analyze", json={"device_id": "test_device", "incremental": True})
+        assert resp.status_code == 422
+        assert "データ不足" in resp.json()["detail"]
+
+    def test_error_invalid_combination(self, client: TestClient) -> None:
+        """異常系: 期間・間引きとは併用できず、データの無いデバイスは404"""
+        resp = client.post("/api/v1/analyze", json={
+            "device_id": "test_device", "incremental": True, "start": "2026-04-12T10:00:00",
+        })
+        assert resp.status_code == 422
+        resp = client.post("/api/v1/analyze", json={"device_id": "test_device", "incremental": True})
+        assert resp.status_code == 404
+
+    def test_error_reset_state(self, client: TestClient) -> None:
+        """異常系: 状態の無いデバイスのリセットは404、リセット後は全期間を解析し直す"""
+        assert client.delete("/api/v1/analyze/test_device/state").status_code == 404
+        self._insert(0, 3)
+        client.post("/api/v1/analyze", json={"device_id": "test_device", "incremental": True})
+        assert client.delete("/api/v1/analyze/test_device/state").status_code == 200
+        again = client.post("/api/v1/analyze", json={"device_id": "test_device", "incremental": True})
+        assert again.json()["sample_count"] == 1500
+
+    def test_error_save_failure_keeps_state(
+        self, client: TestClient, monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """異常系: 保存に失敗したら状態・結果をすべて戻し、次回同じデータを解析し直す"""
+        import sqlite3
+
+        from shared import database
+
+        def broken(conn: sqlite3.Connection, items: list) -> int:
+            raise sqlite3.OperationalError("disk I/O error")
+
+        self._insert(0, 3)
+        with monkeypatch.context() as m:
+            m.setattr(database, "_insert_notifications", broken)
+            with pytest.raises(sqlite3.OperationalError):
+                client.post("/api/v1/analyze", json={"device_id": "test_device", "incremental": True})
+        assert database.get_analysis_state("test_device") is None
+        assert database.get_latest_analysis("test_device") is None
+        again = client.post("/api/v1/analyze", json={"device_id": "test_device", "incremental": True})
+        assert again.json()["sample_count"] == 1500
+
+
+class TestSweep:
+    """全デバイスの一括解析（スイープ）のテスト"""
+
+    T0_US = 1_776_000_000_000_000
+
+    def _insert(self, device_id: str, seconds: float) -> None:
+        from shared.database import insert_vibration_arrays
+
+        n = int(seconds * 500)
+        t_us = self.T0_US + np.arange(n) * 2000
+        z = 1.0 + np.random.default_rng(0).normal(0, 0.1, n)
+        insert_vibration_arrays(device_id, t_us, np.zeros(n), np.zeros(n), z)
+
+    def test_normal_sweep_all_devices(
+        self, client: TestClient, monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """正常系: 新しいデータのあるデバイスだけをまとめて解析し、結果と実行状況を残す"""
+        from services.analyzer import main
+        from shared.database import get_latest_analysis
+
+        monkeypatch.setitem(main._sweep_metrics, "sweeps_total", 0)
+        self._insert("m5stick_01", 10)
+        self._insert("m5stick_02", 3)
+        self._insert("m5stick_03", 0.5)  # 1セグメントに満たない
+        before = client.get("/api/v1/sweep").json()
+        assert before["pending_devices"] == 2 and before["queue_lag_sec"] == pytest.approx(10.0, abs=0.01)
+
+        summary = client.post("/api/v1/sweep").json()
+        assert (summary["devices"], summary["analyzed"], summary["failed"]) == (2, 2, 0)
+        assert summary["trigger"] == "manual"
+        assert get_latest_analysis("m5stick_01")["sample_count"] == 5000
+        assert get_latest_analysis("m5stick_02")["sample_count"] == 1500
+        assert get_latest_analysis("m5stick_03") is None
+
+        assert client.post("/api/v1/sweep").json()["devices"] == 0
+        status = client.get("/api/v1/sweep").json()
+        assert status["sweeps_total"] == 2 and status["last_duration_sec"] >= 0
+        assert (status["pending_devices"], status["queue_lag_sec"]) == (0, 0.0)
+
+    def test_normal_triggered_by_new_data(
+        self, client: TestClient, monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """正常系: 定期実行中は、間隔を待たずに新着データの多いデバイスがあればスイープする"""
+        import time
+
+        from services.analyzer import main
+
+        monkeypatch.setattr("services.analyzer.main.SWEEP_INTERVAL_SEC", 3600.0)
+        monkeypatch.setattr("services.analyzer.main.SWEEP_CHECK_SEC", 0.05)
+        monkeypatch.setattr("services.analyzer.main.SWEEP_TRIGGER_SAMPLES", 1000)
+        monkeypatch.setitem(main._sweep_metrics, "last_trigger", None)
+        with TestClient(app) as running:
+            self._insert("m5stick_01", 3)
+            deadline = time.monotonic() + 10
+            while running.get("/api/v1/sweep").json()["last_trigger"] is None:
+                assert time.monotonic() < deadline
+                time.sleep(0.05)
+            assert running.get("/api/v1/sweep").json()["last_trigger"] == "new_data"
+        assert main._sweep_task is None
+
+    def test_error_failed_device_does_not_block_others(
+        self, client: TestClient, monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """異常系: 解析に失敗したデバイスは数えるだけで、他のデバイスの結果は保存する"""
+        from services.analyzer import main
+        from shared.database import get_latest_analysis
+
+        analyze_incremental = main._analyze_incremental
+
+        async def flaky(device_id: str) -> tuple[dict, dict]:
+            if device_id == "broken":
+                raise RuntimeError("読み込み失敗")
+            return await analyze_incremental(device_id)
+
+        monkeypatch.setattr("services.analyzer.main._analyze_incremental", flaky)
+        self._insert("m5stick_01", 2)
+        self._insert("broken", 2)
+        summary = client.post("/api/v1/sweep").json()
+        assert (summary["analyzed"], summary["failed"]) == (1, 1)
+        assert get_latest_analysis("m5stick_01") is not None
+        assert get_latest_analysis("broken") is None
+
+    def test_error_save_failure_keeps_state(
+        self, client: TestClient, monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """異常系: まとめての保存に失敗したら全デバイスの状態を進めず、次のスイープで解析し直す"""
+        import sqlite3
+
+        from shared import database
+
+        def broken(conn: sqlite3.Connection, items: list) -> int:
+            raise sqlite3.OperationalError("disk I/O error")
+
+        self._insert("m5stick_01", 2)
+        self._insert("m5stick_02", 2)
+        with monkeypatch.context() as m:
+            m.setattr(database, "_insert_notifications", broken)
+            with pytest.raises(sqlite3.OperationalError):
+                client.post("/api/v1/sweep")
+        assert database.get_analysis_state("m5stick_01") is None
+        assert database.get_latest_analysis("m5stick_01") is None
+        # ロックは解放されていて、次のスイープで同じデータを解析する
+        summary = client.post("/api/v1/sweep").json()
+        assert (summary["devices"], summary["analyzed"]) == (2, 2)
+
+
+class TestNotificationOutbox:
+    """異常通知のアウトボックス（再送・重複防止）のテスト"""
+
+    def _outbox(self, handler):
+        import httpx
+
+        from services.analyzer.outbox import NotificationOutbox
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        return NotificationOutbox(
+            client, "http://notifier/api/v1/notify", poll_sec=60, batch=2,
+            retry_base_sec=60, retry_max_sec=600, retention_sec=86400,
+        )
+
+    def test_normal_send_once(self, client: TestClient) -> None:
+        """正常系: 同じ重複キーは1回だけ登録し、重複キー付きで送って送信済みにする"""
+        import asyncio
+
+        import httpx
+
+        from shared.database import enqueue_notifications, get_outbox_stats
+
+        sent = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            sent.append(request.read().decode())
+            return httpx.Response(200, json={"status": "sent", "message": ""})
+
+        items = [(f"anomaly:{i}", "m5stick_01", {"device_id": "m5stick_01", "message": f"異常{i}"}) for i in range(3)]
+        assert enqueue_notifications(items) == 3
+        assert enqueue_notifications(items[:1]) == 0
+        outbox = self._outbox(handler)
+        assert asyncio.run(outbox.dispatch()) == 3  # batch=2 を超える分も続けて送る
+        assert asyncio.run(outbox.dispatch()) == 0
+        assert len(sent) == 3 and all('"dedup_key":"anomaly:' in body for body in sent)
+        assert get_outbox_stats()["pending"] == 0
+
+    def test_error_retry_with_backoff(self, client: TestClient) -> None:
+        """異常系: 送れなかった通知は失敗回数に応じた間隔の後に再送し、失わない"""
+        import asyncio
+
+        import httpx
+
+        from shared.database import (
+            enqueue_notifications, finish_notifications, get_outbox_stats,
+        )
+
+        responses = iter([503, 200])
+        handler = lambda request: httpx.Response(next(responses))  # noqa: E731
+        enqueue_notifications([("anomaly:1", "m5stick_01", {"device_id": "m5stick_01", "message": "異常"})])
+        outbox = self._outbox(handler)
+        assert asyncio.run(outbox.dispatch()) == 0
+        stats = get_outbox_stats()
+        assert (stats["pending"], stats["retrying"]) == (1, 1)
+        assert asyncio.run(outbox.dispatch()) == 0  # 再送間隔（60秒）の前は送らない
+        assert [outbox.retry_delay(n) for n in range(4)] == [60, 120, 240, 480]
+
+        finish_notifications([], [(1, "再送時刻を前倒し", 0.0)])
+        assert asyncio.run(outbox.dispatch()) == 1
+        assert get_outbox_stats()["pending"] == 0
+
+    def test_normal_deferred_until_delivered(self, client: TestClient) -> None:
+        """正常系: Notifier がまとめ送信に回した（202）通知は未送信のまま残し、あとで確認して送信済みにする"""
+        import asyncio
+
+        import httpx
+
+        from shared.database import (
+            enqueue_notifications, finish_notifications, get_outbox_stats,
+        )
+
+        responses = iter([
+            httpx.Response(202, json={"status": "merged", "message": ""}),
+            httpx.Response(200, json={"status": "duplicate", "message": ""}),
+        ])
+        enqueue_notifications([("anomaly:1", "m5stick_01", {"device_id": "m5stick_01", "message": "異常"})])
+        outbox = self._outbox(lambda request: next(responses))
+        assert asyncio.run(outbox.dispatch()) == 0
+        stats = get_outbox_stats()
+        assert (stats["pending"], stats["retrying"]) == (1, 0)  # 失敗回数は増やさない
+        assert outbox.deferred_total == 1 and outbox.failed_total == 0
+        assert asyncio.run(outbox.dispatch()) == 0  # 確認間隔の前は送らない
+
+        finish_notifications([], [], [(1, 0.0)])
+        assert asyncio.run(outbox.dispatch()) == 1
+        assert get_outbox_stats()["pending"] == 0
+
+
 class TestStatusAPI:
     """ステータスAPIのテスト"""
 
@@ -1,17 +1,23 @@
 """
 Service 1: データ収集APIのテスト
 
-正常系2・異常系2・境界値1
+正常系6・異常系8・境界値3
 """
 
+import asyncio
+import json
+import sqlite3
 import sys
+import time
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
+import numpy as np
 import pytest
 from fastapi.testclient import TestClient
 
+from services.collector.buffer import IngestBuffer
 from services.collector.main import app
 
 
@@ -100,6 +106,232 @@ class TestBatchReceive:
         assert resp.json()["saved_count"] == 5
 
 
+class TestCompactReceive:
+    """列形式・バイナリでの一括受信のテスト"""
+
+    def test_normal_columnar(self, client: TestClient) -> None:
+        """正常系: 列形式のJSONを開始時刻＋サンプリング周波数の等間隔データとして保存する"""
+        resp = client.post("/api/v1/vibration/columnar", json={
+            "device_id": "m5stick_01",
+            "start": "2026-04-12T10:00:00",
+            "sample_rate": 500,
+            "x": [0.01] * 1000, "y": [0.02] * 1000, "z": [1.0 + i * 1e-3 for i in range(1000)],
+        })
+        assert resp.status_code == 200
+        assert resp.json()["saved_count"] == 1000
+        data = client.get("/api/v1/devices/m5stick_01/count").json()
+        assert data["data_count"] == 1000
+        assert data["last_received"] == "2026-04-12T10:00:01.998000"
+
+    def test_normal_raw_float32(self, client: TestClient) -> None:
+        """正常系: float32 の x・y・z 配列を連結したバイナリを保存し、値がそのまま戻る"""
+        from datetime import datetime
+
+        from shared.database import fetch_vibration_arrays
+
+        z = np.random.default_rng(0).normal(1.0, 0.1, 12000).astype("<f4")
+        body = np.concatenate([np.zeros(12000, "<f4"), np.zeros(12000, "<f4"), z]).tobytes()
+        resp = client.post(
+            "/api/v1/vibration/raw",
+            params={"device_id": "m5stick_01", "start": "2026-04-12T10:00:00", "sample_rate": 500},
+            content=body, headers={"Content-Type": "application/octet-stream"},
+        )
+        assert resp.status_code == 200
+        assert resp.json()["saved_count"] == 12000
+        data = fetch_vibration_arrays("m5stick_01", start=datetime(2026, 4, 12, 10, 0, 10))
+        np.testing.assert_array_equal(data["z"], z[5000:])
+        assert np.all(np.diff(data["timestamp_us"]) == 2000)  # ブロックの境目も等間隔
+
+    def test_error_columnar_length_mismatch(self, client: TestClient) -> None:
+        """異常系: 軸ごとの配列の長さが違えば422"""
+        resp = client.post("/api/v1/vibration/columnar", json={
+            "device_id": "m5stick_01", "start": "2026-04-12T10:00:00", "sample_rate": 500,
+            "x": [0.0, 0.0], "y": [0.0, 0.0], "z": [1.0],
+        })
+        assert resp.status_code == 422
+        assert "長さ" in resp.json()["detail"]
+
+    def test_error_raw_bad_length(self, client: TestClient) -> None:
+        """異常系: バイナリの長さが float32 × 3軸 の倍数でなければ422"""
+        resp = client.post(
+            "/api/v1/vibration/raw",
+            params={"device_id": "m5stick_01", "start": "2026-04-12T10:00:00", "sample_rate": 500},
+            content=b"\x00" * 13,
+        )
+        assert resp.status_code == 422
+
+    def test_boundary_nan_and_rate(self, client: TestClient) -> None:
+        """境界値: NaN を含むデータ・サンプリング周波数0は保存しない"""
+        body = np.array([0.0, 0.0, np.nan], dtype="<f4").tobytes()
+        params = {"device_id": "m5stick_01", "start": "2026-04-12T10:00:00", "sample_rate": 500}
+        assert client.post("/api/v1/vibration/raw", params=params, content=body).status_code == 422
+        params["sample_rate"] = 0
+        body = np.zeros(3, dtype="<f4").tobytes()
+        assert client.post("/api/v1/vibration/raw", params=params, content=body).status_code == 422
+        assert client.get("/api/v1/devices/m5stick_01/count").json()["data_count"] == 0
+
+
+def sample(i: int, device_id: str = "m5stick_01") -> dict:
+    return {
+        "device_id": device_id,
+        "timestamp": f"2026-04-12T10:00:{i // 500:02d}.{i % 500 * 2000:06d}",
+        "x": 0.01, "y": 0.02, "z": 1.0,
+    }
+
+
+def stored_count(db_path: str) -> int:
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COALESCE(SUM(sample_count), 0) FROM vibration_blocks").fetchone()[0]
+    finally:
+        conn.close()
+
+
+class TestIngestBuffer:
+    """書き込みバッファのテスト（lifespan を動かして確認する）"""
+
+    @pytest.fixture
+    def db_path(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> str:
+        db_path = str(tmp_path / "test.db")
+        monkeypatch.setattr("shared.database.DB_PATH", db_path)
+        monkeypatch.setattr("services.collector.main.INGEST_FLUSH_SEC", 60.0)
+        return db_path
+
+    def test_normal_coalesce_across_requests(self, db_path: str) -> None:
+        """正常系: 複数リクエスト・複数デバイスの受信は応答後にまとめて1回で書き込む"""
+        from services.collector import main
+
+        with TestClient(app) as client:
+            for i in range(3):
+                assert client.post("/api/v1/vibration", json=sample(i)).status_code == 200
+            client.post("/api/v1/vibration/batch", json={
+                "device_id": "m5stick_02", "samples": [sample(i, "m5stick_02") for i in range(10)],
+            })
+            assert stored_count(db_path) == 0
+            assert client.get("/health").json()["pending_samples"] == 13
+            assert client.get("/api/v1/devices/m5stick_01/count").json()["data_count"] == 3
+            assert stored_count(db_path) == 13
+            assert main._buffer.flush_count == 1
+
+    def test_normal_flush_on_shutdown(self, db_path: str) -> None:
+        """正常系: 終了時に残りをすべて書き込み、WALをDB本体に書き戻す"""
+        with TestClient(app) as client:
+            client.post("/api/v1/vibration/batch", json={
+                "device_id": "m5stick_01", "samples": [sample(i) for i in range(100)],
+            })
+            assert stored_count(db_path) == 0
+        assert stored_count(db_path) == 100
+        assert Path(db_path + "-wal").stat().st_size == 0
+
+    def test_error_backpressure(self, db_path: str, monkeypatch: pytest.MonkeyPatch) -> None:
+        """異常系: 上限まで貯まって空かなければ503と Retry-After を返し、受け付けた分は失わない"""
+        monkeypatch.setattr("services.collector.main.INGEST_MAX_SAMPLES", 5)
+        monkeypatch.setattr("services.collector.main.INGEST_PUT_TIMEOUT", 0.05)
+        with TestClient(app) as client:
+            client.post("/api/v1/vibration/batch", json={
+                "device_id": "m5stick_01", "samples": [sample(i) for i in range(5)],
+            })
+            resp = client.post("/api/v1/vibration", json=sample(5))
+            assert resp.status_code == 503
+            assert resp.headers["Retry-After"] == "60"
+        assert stored_count(db_path) == 5
+
+    def test_error_retry_after_write_failure(self) -> None:
+        """異常系: 書き込みに失敗したレコードはバッファに戻り、次回まとめて書き込む"""
+        written = []
+
+        def writer(records: list) -> int:
+            if not written:
+                written.append(None)
+                raise RuntimeError("database is locked")
+            written.append(list(records))
+            return len(records)
+
+        async def scenario() -> None:
+            buffer = IngestBuffer(writer, 60.0, 100, 100, 0.05)
+            await buffer.put([("m5stick_01", 0, 0.0, 0.0, 1.0)])
+            with pytest.raises(RuntimeError):
+                await buffer.flush()
+            assert buffer.pending == 1
+            await buffer.put([("m5stick_01", 1, 0.0, 0.0, 1.0)])
+            assert await buffer.flush() == 2
+
+        asyncio.run(scenario())
+        assert [r[1] for r in written[1]] == [0, 1]
+
+    def test_error_bad_record_moved_to_dead_letter(self, tmp_path: Path) -> None:
+        """異常系: 常に失敗するレコードは max_attempts 回目に外してデッドレターに移し、残りは書き込む"""
+        written = []
+
+        def writer(records: list) -> int:
+            if any(r[0] == "bad" for r in records):
+                raise sqlite3.IntegrityError("CHECK constraint failed")
+            written.extend(records)
+            return len(records)
+
+        dead_letter = tmp_path / "dead.jsonl"
+
+        async def scenario() -> IngestBuffer:
+            buffer = IngestBuffer(writer, 60.0, 100, 100, 0.05, max_attempts=3, dead_letter_path=str(dead_letter))
+            await buffer.put([("m5stick_01", i, 0.0, 0.0, 1.0) for i in range(5)])
+            await buffer.put([("bad", 5, 0.0, 0.0, 1.0)])
+            await buffer.put([("m5stick_01", i, 0.0, 0.0, 1.0) for i in range(6, 10)])
+            for _ in range(2):
+                with pytest.raises(sqlite3.IntegrityError):
+                    await buffer.flush()
+                assert buffer.pending == 10
+            assert await buffer.flush() == 9
+            assert buffer.pending == 0
+            await buffer.put([("m5stick_01", 10, 0.0, 0.0, 1.0)])
+            assert await buffer.flush() == 1  # 失敗回数は数え直す
+            return buffer
+
+        buffer = asyncio.run(scenario())
+        assert [r[1] for r in written] == [0, 1, 2, 3, 4, 6, 7, 8, 9, 10]
+        assert buffer.dead_letter_samples == 1
+        lines = [json.loads(line) for line in dead_letter.read_text(encoding="utf-8").splitlines()]
+        assert lines == [{"record": ["bad", 5, 0.0, 0.0, 1.0], "error": "IntegrityError: CHECK constraint failed"}]
+
+    def test_error_writer_always_fails(self, tmp_path: Path) -> None:
+        """異常系: 書き込みが常に失敗しても再試行し続けず、すべてデッドレターに移してバッファを空ける"""
+        calls = []
+
+        def writer(records: list) -> int:
+            calls.append(len(records))
+            raise RuntimeError("disk I/O error")
+
+        dead_letter = tmp_path / "data" / "dead.jsonl"
+
+        async def scenario() -> IngestBuffer:
+            buffer = IngestBuffer(writer, 60.0, 100, 4, 0.05, max_attempts=2, dead_letter_path=str(dead_letter))
+            await buffer.put([("m5stick_01", i, 0.0, 0.0, 1.0) for i in range(4)])
+            with pytest.raises(RuntimeError):
+                await buffer.flush()
+            assert await buffer.flush() == 0
+            await buffer.put([("m5stick_01", 4, 0.0, 0.0, 1.0)])  # 上限まで空いて受け付けられる
+            return buffer
+
+        buffer = asyncio.run(scenario())
+        assert calls == [4, 4, 2, 1, 1, 2, 1, 1]
+        assert buffer.pending == 1 and buffer.dead_letter_samples == 4
+        assert len(dead_letter.read_text(encoding="utf-8").splitlines()) == 4
+
+    def test_boundary_flush_on_size(self, db_path: str, monkeypatch: pytest.MonkeyPatch) -> None:
+        """境界値: 貯まった件数が INGEST_FLUSH_SAMPLES に達したら間隔を待たずに書き込む"""
+        monkeypatch.setattr("services.collector.main.INGEST_FLUSH_SAMPLES", 10)
+        with TestClient(app) as client:
+            client.post("/api/v1/vibration/batch", json={
+                "device_id": "m5stick_01", "samples": [sample(i) for i in range(9)],
+            })
+            time.sleep(0.2)
+            assert stored_count(db_path) == 0
+            client.post("/api/v1/vibration", json=sample(9))
+            deadline = time.monotonic() + 5
+            while stored_count(db_path) < 10 and time.monotonic() < deadline:
+                time.sleep(0.02)
+            assert stored_count(db_path) == 10
+
+
 class TestHealth:
     """ヘルスチェックのテスト"""
 
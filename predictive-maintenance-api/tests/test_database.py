@@ -0,0 +1,278 @@
+"""
+振動データ保存（ブロック形式）のテスト
+
+正常系6・異常系4・境界値6
+"""
+
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+import pytest
+
+from shared import database
+from shared.database import (
+    close_connections,
+    fetch_axis,
+    fetch_vibration,
+    fetch_vibration_arrays,
+    get_connection,
+    get_device_data_count,
+    get_last_received,
+    get_sweep_candidates,
+    insert_vibration_arrays,
+    insert_vibration_batch,
+    migrate_legacy_vibration,
+    save_analysis_state,
+)
+
+T0 = datetime(2026, 4, 12, 10, 0, 0)
+T0_US = database._to_us(T0)
+
+
+@pytest.fixture
+def db(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> str:
+    """一時DBを初期化する（終了時にコネクションを閉じる）"""
+    db_path = str(tmp_path / "test.db")
+    monkeypatch.setattr("shared.database.DB_PATH", db_path)
+    database.init_db()
+    yield db_path
+    close_connections()
+
+
+def block_rows(db_path: str) -> list[tuple]:
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(
+            "SELECT start_us, end_us, sample_rate, sample_count "
+            "FROM vibration_blocks ORDER BY start_us"
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+class TestBlockStorage:
+    """ブロック形式の書き込み・読み出しのテスト"""
+
+    def test_normal_roundtrip(self, db: str) -> None:
+        """正常系: 1分・500Hzのデータが10秒ごとのブロックになり、値と時刻がそのまま戻る"""
+        n = 30000
+        t_us = T0_US + np.arange(n) * 2000
+        rng = np.random.default_rng(0)
+        x, y, z = rng.normal(0, 0.1, (3, n))
+        assert insert_vibration_arrays("m5stick_01", t_us, x, y, z + 1.0) == n
+
+        rows = block_rows(db)
+        assert len(rows) == 6
+        assert all(r[2] == 500.0 and r[3] == 5000 for r in rows)
+        data = fetch_vibration_arrays("m5stick_01")
+        np.testing.assert_array_equal(data["timestamp_us"], t_us)
+        np.testing.assert_allclose(data["z"], z + 1.0, rtol=1e-6)
+        assert data["z"].dtype == np.float32
+        assert get_device_data_count("m5stick_01") == n
+        assert get_last_received("m5stick_01") == (T0 + timedelta(microseconds=int(t_us[-1] - T0_US))).isoformat()
+
+    def test_normal_range_query(self, db: str) -> None:
+        """正常系: 期間指定ではブロックの途中で切り詰め、端の時刻を含む"""
+        t_us = T0_US + np.arange(15000) * 2000
+        insert_vibration_arrays("m5stick_01", t_us, np.zeros(15000), np.zeros(15000), np.arange(15000))
+        insert_vibration_arrays("m5stick_02", t_us, np.zeros(15000), np.zeros(15000), np.ones(15000))
+        start, end = T0 + timedelta(seconds=7), T0 + timedelta(seconds=21)
+        data = fetch_vibration_arrays("m5stick_01", start, end, axes=("z",))
+        assert set(data) == {"timestamp_us", "z"}
+        np.testing.assert_array_equal(data["z"], np.arange(3500, 10501))
+        rows = fetch_vibration("m5stick_01", start, start + timedelta(milliseconds=4))
+        assert [r["timestamp"] for r in rows] == [
+            "2026-04-12T10:00:07", "2026-04-12T10:00:07.002000", "2026-04-12T10:00:07.004000",
+        ]
+
+    def test_normal_single_block_is_zero_copy(self, db: str) -> None:
+        """正常系: 1ブロック分の読み出しは展開したバッファを参照する読み取り専用配列になる"""
+        insert_vibration_batch([
+            ("m5stick_01", T0 + timedelta(seconds=i), 0.01, -0.03, 1.0 + i) for i in range(3)
+        ])
+        z = fetch_vibration_arrays("m5stick_01")["z"]
+        assert not z.flags.writeable and not z.flags.owndata
+        np.testing.assert_array_equal(z, [1.0, 2.0, 3.0])
+
+    def test_error_unknown_device(self, db: str) -> None:
+        """異常系: データの無いデバイスは空の配列・件数0・最終受信なし"""
+        data = fetch_vibration_arrays("unknown")
+        assert all(len(v) == 0 for v in data.values())
+        assert get_device_data_count("unknown") == 0
+        assert get_last_received("unknown") is None
+
+    def test_boundary_gap_and_jitter(self, db: str) -> None:
+        """境界値: 半周期以内の時刻ずれは同じブロック、欠損（時刻の飛び）では別ブロックにする"""
+        jitter = np.tile([0, 300, -300, 0], 250)
+        t_us = T0_US + np.arange(1000) * 2000 + jitter
+        t_us[500:] += 1_000_000  # 1秒の欠損
+        insert_vibration_arrays("m5stick_01", t_us[::-1], np.zeros(1000), np.zeros(1000), np.arange(1000)[::-1])
+        rows = block_rows(db)
+        assert [r[3] for r in rows] == [500, 500]
+        data = fetch_vibration_arrays("m5stick_01")
+        np.testing.assert_array_equal(data["z"], np.arange(1000))
+        assert np.max(np.abs(data["timestamp_us"] - t_us)) <= 1000
+
+    def test_boundary_duplicate_timestamps(self, db: str) -> None:
+        """境界値: 同じ時刻の重複サンプルも失わずに保存する"""
+        insert_vibration_batch([("m5stick_01", T0, 0.0, 0.0, float(i)) for i in range(3)])
+        assert get_device_data_count("m5stick_01") == 3
+        np.testing.assert_array_equal(fetch_vibration_arrays("m5stick_01")["z"], [0.0, 1.0, 2.0])
+
+
+class TestFetchAxis:
+    """1軸の配列取得のテスト"""
+
+    def test_normal_same_as_block_arrays(self, db: str) -> None:
+        """正常系: ブロックをまたぐ期間でも fetch_vibration_arrays と同じ値を float64 で返す"""
+        t_us = T0_US + np.arange(15000) * 2000
+        z = np.random.default_rng(0).normal(1.0, 0.1, 15000)
+        insert_vibration_arrays("m5stick_01", t_us, np.zeros(15000), np.zeros(15000), z)
+        start, end = T0 + timedelta(seconds=3), T0 + timedelta(seconds=25)
+        got = fetch_axis("m5stick_01", "z", start, end)
+        assert got.dtype == np.float64
+        np.testing.assert_array_equal(got, fetch_vibration_arrays("m5stick_01", start, end, axes=("z",))["z"])
+
+    def test_boundary_downsample_across_blocks(self, db: str) -> None:
+        """境界値: 間引きはブロックの境目をまたいで連続した平均になり、末尾の端数は捨てる"""
+        t_us = T0_US + np.arange(10003) * 2000  # 5000件ずつのブロック＋3件
+        insert_vibration_arrays("m5stick_01", t_us, np.zeros(10003), np.zeros(10003), np.arange(10003))
+        got = fetch_axis("m5stick_01", "z", step=7)
+        expected = np.arange(10003)[: 10003 // 7 * 7].reshape(-1, 7).mean(axis=1)
+        np.testing.assert_allclose(got, expected, rtol=1e-6)
+        assert len(fetch_axis("m5stick_01", "z", step=20000)) == 0
+
+    def test_error_invalid_axis_or_step(self, db: str) -> None:
+        """異常系: x / y / z 以外の軸・1未満の間引き率は ValueError"""
+        with pytest.raises(ValueError, match="不明な軸"):
+            fetch_axis("m5stick_01", "z; DROP TABLE vibration_blocks")
+        with pytest.raises(ValueError, match="間引き率"):
+            fetch_axis("m5stick_01", "z", step=0)
+
+
+class TestConnections:
+    """スレッドごとのコネクション管理のテスト"""
+
+    def test_normal_reuse_per_thread(self, db: str) -> None:
+        """正常系: 同じスレッドでは同じコネクションを使い回し、PRAGMAは開いたときに設定済み"""
+        with get_connection() as first, get_connection() as second:
+            assert first is second
+            assert first.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+            assert first.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+            assert first.execute("PRAGMA cache_size").fetchone()[0] == -16 * 1024
+        with get_connection(readonly=True) as ro:
+            assert ro is not first
+        other = []
+
+        def worker() -> None:
+            with get_connection() as conn:
+                other.append(conn)
+            close_connections()
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        assert other[0] is not first
+
+    def test_error_rollback_keeps_connection_usable(self, db: str) -> None:
+        """異常系: 例外で抜けると書き込みはロールバックされ、同じコネクションで続けて使える"""
+        with pytest.raises(RuntimeError):
+            with get_connection() as conn:
+                database._insert_blocks(conn, "m5stick_01", np.array([T0_US]), [0.0], [0.0], [1.0])
+                raise RuntimeError("途中で失敗")
+        assert get_device_data_count("m5stick_01") == 0
+        insert_vibration_batch([("m5stick_01", T0, 0.0, 0.0, 1.0)])
+        assert get_device_data_count("m5stick_01") == 1
+
+    def test_error_readonly_rejects_write(self, db: str) -> None:
+        """異常系: 読み取り専用のコネクションでは書き込めない"""
+        with pytest.raises(sqlite3.OperationalError, match="readonly"):
+            with get_connection(readonly=True) as conn:
+                conn.execute("DELETE FROM vibration_blocks")
+
+
+class TestSweepCandidates:
+    """差分解析の済んでいないデバイスの取得のテスト"""
+
+    def test_boundary_backfill_and_partial_blocks(self, db: str) -> None:
+        """境界値: デバイス一覧の無い既存DBでも一覧を作り、解析済みの時刻より後に終わるブロックを数える"""
+        t_us = T0_US + np.arange(15000) * 2000  # 10秒ずつ3ブロック
+        insert_vibration_arrays("m5stick_01", t_us, np.zeros(15000), np.zeros(15000), np.ones(15000))
+        with get_connection() as conn:
+            conn.execute("DROP TABLE devices")
+        database.init_db()
+        assert get_sweep_candidates(1) == [{"device_id": "m5stick_01", "new_samples": 15000, "lag_sec": pytest.approx(30.0, abs=0.01)}]
+
+        save_analysis_state("m5stick_01", {
+            "last_us": int(t_us[4999]), "sample_rate": 500.0, "segment_len": 500,
+            "sample_count": 5000, "sample_mean": 1.0, "sample_m2": 0.0,
+            "segment_count": 10, "rms_mean": 0.0, "rms_m2": 0.0, "rms_history": np.zeros(0),
+        })
+        assert get_sweep_candidates(1) == [{"device_id": "m5stick_01", "new_samples": 10000, "lag_sec": 20.0}]
+        assert get_sweep_candidates(10001) == []
+
+    def test_boundary_leftover_partial_segment(self, db: str) -> None:
+        """境界値: 解析済みの時刻を含むブロックは残りの件数だけを数え、1セグメントに満たない端数は候補にしない"""
+        t_us = T0_US + np.arange(3650) * 2000  # 7.3秒の1ブロック
+        insert_vibration_arrays("m5stick_01", t_us, np.zeros(3650), np.zeros(3650), np.ones(3650))
+        save_analysis_state("m5stick_01", {
+            "last_us": int(t_us[3499]), "sample_rate": 500.0, "segment_len": 500,
+            "sample_count": 3500, "sample_mean": 1.0, "sample_m2": 0.0,
+            "segment_count": 7, "rms_mean": 0.0, "rms_m2": 0.0, "rms_history": np.zeros(0),
+        })
+        assert get_sweep_candidates(1)[0]["new_samples"] == 150
+        assert get_sweep_candidates(500) == []
+
+    def test_boundary_many_devices_single_query(self, db: str) -> None:
+        """境界値: デバイスが多くても1回のクエリで数え、未解析の時間幅の大きい順に返す"""
+        for i in range(20):
+            n = 1000 + 100 * i
+            t_us = T0_US + np.arange(n) * 2000
+            insert_vibration_arrays(f"dev{i:02d}", t_us, np.zeros(n), np.zeros(n), np.ones(n))
+        statements = []
+        with get_connection(readonly=True) as conn:
+            conn.set_trace_callback(statements.append)
+        try:
+            candidates = get_sweep_candidates(2000)
+        finally:
+            with get_connection(readonly=True) as conn:
+                conn.set_trace_callback(None)
+        assert len(statements) == 1
+        assert [c["device_id"] for c in candidates] == [f"dev{i:02d}" for i in range(19, 9, -1)]
+        assert [c["new_samples"] for c in candidates] == [1000 + 100 * i for i in range(19, 9, -1)]
+
+
+class TestMigration:
+    """旧形式からの移行のテスト"""
+
+    def test_normal_migrate_legacy_table(self, db: str) -> None:
+        """正常系: 1サンプル1行の旧テーブルを移行し、旧テーブルを削除する"""
+        conn = sqlite3.connect(db)
+        conn.execute(
+            "CREATE TABLE vibration_data (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "device_id TEXT NOT NULL, timestamp TEXT NOT NULL, "
+            "x REAL NOT NULL, y REAL NOT NULL, z REAL NOT NULL, created_at TEXT)"
+        )
+        conn.executemany(
+            "INSERT INTO vibration_data (device_id, timestamp, x, y, z) VALUES (?, ?, ?, ?, ?)",
+            [
+                (dev, (T0 + timedelta(milliseconds=2 * i)).isoformat(), 0.01, -0.02, 1.0 + i * 1e-3)
+                for dev in ("m5stick_01", "m5stick_02") for i in range(1200)
+            ],
+        )
+        conn.commit()
+        migrated = migrate_legacy_vibration(conn, chunk_rows=500)
+        tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        conn.close()
+
+        assert migrated == {"m5stick_01": 1200, "m5stick_02": 1200}
+        assert "vibration_data" not in tables
+        data = fetch_vibration_arrays("m5stick_02")
+        np.testing.assert_array_equal(data["timestamp_us"], T0_US + np.arange(1200) * 2000)
+        np.testing.assert_allclose(data["z"], 1.0 + np.arange(1200) * 1e-3, rtol=1e-6)
@@ -1,17 +1,21 @@
 """
 Service 3: Slack通知APIのテスト
 
-正常系2・異常系2・境界値1
+正常系8・異常系5・境界値2
 """
 
+import asyncio
 import sys
+from collections import OrderedDict
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
+import httpx
 import pytest
 from fastapi.testclient import TestClient
 
+from services.notifier.coalescer import AlertCoalescer, TokenBucket
 from services.notifier.main import app
 
 
@@ -82,6 +86,230 @@ class TestNotifyAPI:
         assert resp.status_code == 200
 
 
+class TestSlackSender:
+    """Slack送信（非同期クライアント・重複キー）のテスト"""
+
+    @pytest.fixture
+    def webhook(self, monkeypatch: pytest.MonkeyPatch) -> list:
+        """Webhookへの送信を記録して200を返すモック"""
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request)
+            return httpx.Response(200)
+
+        monkeypatch.setattr("services.notifier.main.SLACK_WEBHOOK_URL", "https://hooks.example/T0/B0/X")
+        monkeypatch.setattr(
+            "services.notifier.main._http", httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        )
+        monkeypatch.setattr("services.notifier.main._sent_keys", OrderedDict())
+        return calls
+
+    def test_normal_send_once_per_key(self, client: TestClient, webhook: list) -> None:
+        """正常系: 送信済みの重複キーは送らずに duplicate を返す"""
+        body = {"device_id": "m5stick_01", "message": "異常検出", "color": "danger", "dedup_key": "anomaly:1"}
+        assert client.post("/api/v1/notify", json=body).json()["status"] == "sent"
+        assert client.post("/api/v1/notify", json=body).json()["status"] == "duplicate"
+        assert len(webhook) == 1
+        assert webhook[0].read().decode() == (
+            '{"attachments":[{"color":"danger","text":"異常検出","mrkdwn_in":["text"]}]}'
+        )
+
+    def test_error_failed_key_can_retry(
+        self, client: TestClient, webhook: list, monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """異常系: Slackが失敗したら502を返し、同じ重複キーで再送できる"""
+        responses = iter([503, 200])
+        monkeypatch.setattr(
+            "services.notifier.main._http",
+            httpx.AsyncClient(transport=httpx.MockTransport(
+                lambda request: webhook.append(request) or httpx.Response(next(responses)),
+            )),
+        )
+        body = {"device_id": "m5stick_01", "message": "異常検出", "dedup_key": "anomaly:2"}
+        assert client.post("/api/v1/notify", json=body).status_code == 502
+        assert client.post("/api/v1/notify", json=body).json()["status"] == "sent"
+        assert len(webhook) == 2
+
+    def test_error_retry_while_sending_is_deferred(
+        self, webhook: list, monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """異常系: 送信中の重複キーには deferred（202）を返し、先の送信が失敗したら送り直せる"""
+        from services.notifier import main
+
+        responses = iter([503, 200])
+        released = asyncio.Event()
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            webhook.append(request)
+            await released.wait()
+            return httpx.Response(next(responses))
+
+        monkeypatch.setattr(main, "_http", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        body = {"device_id": "m5stick_01", "message": "異常検出", "dedup_key": "anomaly:3"}
+
+        async def run() -> list[httpx.Response]:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://notifier") as client:
+                first = asyncio.create_task(client.post("/api/v1/notify", json=body))
+                while "anomaly:3" not in main._sending_keys:
+                    await asyncio.sleep(0.001)
+                overlapped = await client.post("/api/v1/notify", json=body)
+                released.set()
+                return [overlapped, await first, await client.post("/api/v1/notify", json=body)]
+
+        overlapped, first, retried = asyncio.run(run())
+        assert (overlapped.status_code, overlapped.json()["status"]) == (202, "deferred")
+        assert first.status_code == 502
+        assert (retried.status_code, retried.json()["status"]) == (200, "sent")
+        assert len(webhook) == 2
+
+
+class TestTokenBucket:
+    """送信レート制限（トークンバケット）のテスト"""
+
+    def test_normal_burst_then_refill(self) -> None:
+        """正常系: burst 通まで続けて送れ、以降は rate に応じて補充される"""
+        now = [0.0]
+        bucket = TokenBucket(rate=2.0, burst=3, clock=lambda: now[0])
+        assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+        assert bucket.wait_time() == pytest.approx(0.5)
+        now[0] = 0.5
+        assert bucket.try_acquire()
+        assert not bucket.try_acquire()
+
+    def test_boundary_idle_does_not_exceed_burst(self) -> None:
+        """境界値: 長く空いてもトークンは burst を超えて貯まらない"""
+        now = [0.0]
+        bucket = TokenBucket(rate=1.0, burst=2, clock=lambda: now[0])
+        now[0] = 3600.0
+        assert [bucket.try_acquire() for _ in range(3)] == [True, True, False]
+
+
+class TestAlertCoalescer:
+    """通知のまとめ送信のテスト"""
+
+    @staticmethod
+    def make(sent: list, rate: float = 0, burst: int = 5, down: list | None = None) -> AlertCoalescer:
+        """送信内容を sent に記録する AlertCoalescer（down[0] が真の間は送信に失敗する）"""
+
+        async def sender(text: str, color: str, webhook_url: str) -> bool:
+            if down and down[0]:
+                raise RuntimeError("webhook down")
+            sent.append((text, color, webhook_url))
+            return True
+
+        return AlertCoalescer(sender, window_sec=60, digest_lines=2, rate_per_sec=rate, burst=burst)
+
+    def test_normal_merge_into_digest(self) -> None:
+        """正常系: 同じデバイス・色の通知は最初の1件だけ送り、残りは1通のダイジェストにまとめる"""
+        sent = []
+
+        async def run() -> tuple[list, AlertCoalescer]:
+            coalescer = self.make(sent)
+            statuses = [await coalescer.submit("dev1", f"異常{i}", "danger", "url") for i in range(4)]
+            statuses.append(await coalescer.submit("dev1", "注意", "warning", "url"))
+            await coalescer.flush(force=True)
+            return statuses, coalescer
+
+        statuses, coalescer = asyncio.run(run())
+        assert statuses == ["sent", "merged", "merged", "merged", "sent"]
+        assert [t for t, _, _ in sent[:2]] == ["異常0", "注意"]
+        assert len(sent) == 3
+        digest = sent[2][0]
+        assert "`dev1` の通知 3件" in digest
+        assert "異常1" not in digest and "異常2" in digest and "異常3" in digest
+        assert "…ほか1件" in digest
+        assert coalescer.stats() == {
+            "window_sec": 60, "open_windows": 0, "pending_alerts": 0,
+            "sent": 3, "digests": 1, "merged": 3, "suppressed": 0,
+        }
+
+    def test_normal_rate_limit_per_destination(self) -> None:
+        """正常系: 送信先ごとに burst を超えた通知は suppressed としてダイジェストに回す"""
+        sent = []
+
+        async def run() -> tuple[list, AlertCoalescer]:
+            coalescer = self.make(sent, rate=0.001, burst=1)
+            statuses = [
+                await coalescer.submit("dev1", "a", "danger", "url1"),
+                await coalescer.submit("dev2", "b", "danger", "url1"),
+                await coalescer.submit("dev2", "c", "danger", "url2"),
+            ]
+            return statuses, coalescer
+
+        statuses, coalescer = asyncio.run(run())
+        assert statuses == ["sent", "suppressed", "sent"]
+        assert coalescer.suppressed_total == 1
+        assert coalescer.pending == 1
+
+    def test_error_failed_digest_carried_over(self) -> None:
+        """異常系: ダイジェストが送れなかったら次のまとめ時間に持ち越して送る"""
+        sent, down = [], [False]
+
+        async def run() -> AlertCoalescer:
+            coalescer = self.make(sent, down=down)
+            await coalescer.submit("dev1", "a", "danger", "url")
+            await coalescer.submit("dev1", "b", "danger", "url")
+            down[0] = True
+            assert await coalescer.flush(force=True) == 0
+            assert coalescer.pending == 1
+            down[0] = False
+            await coalescer.submit("dev1", "c", "danger", "url")
+            assert await coalescer.flush(force=True) == 1
+            return coalescer
+
+        coalescer = asyncio.run(run())
+        assert "`dev1` の通知 2件" in sent[-1][0]
+        assert "b" in sent[-1][0] and "c" in sent[-1][0]
+        assert coalescer.pending == 0
+
+    def test_normal_api_merges_during_window(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """正常系: 起動中は同じデバイスの2件目以降が merged（202）になり、統計に反映される"""
+        sent = []
+
+        async def fake_send(text: str, color: str = "good", webhook_url: str = "") -> bool:
+            sent.append(text)
+            return True
+
+        monkeypatch.setattr("services.notifier.main.SLACK_WEBHOOK_URL", "https://hooks.example/T0/B0/X")
+        monkeypatch.setattr("services.notifier.main._send_slack", fake_send)
+        body = {"device_id": "m5stick_01", "message": "異常検出", "color": "danger"}
+        with TestClient(app) as client:
+            assert client.post("/api/v1/notify", json=body).json()["status"] == "sent"
+            resp = client.post("/api/v1/notify", json=body)
+            assert resp.status_code == 202 and resp.json()["status"] == "merged"
+            stats = client.get("/api/v1/notify/stats").json()
+            assert stats["merged"] == 1 and stats["pending_alerts"] == 1
+            assert client.get("/health").json()["pending_alerts"] == 1
+        # 終了時にまとめ中の通知をダイジェストで送る
+        assert len(sent) == 2 and "2件" not in sent[1] and "1件" in sent[1]
+
+    def test_normal_api_key_sent_after_digest(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """正常系: ダイジェストに回した重複キーは届くまで deferred（202）、届いたら duplicate になる"""
+        sent = []
+
+        async def fake_send(text: str, color: str = "good", webhook_url: str = "") -> bool:
+            sent.append(text)
+            return True
+
+        monkeypatch.setattr("services.notifier.main.SLACK_WEBHOOK_URL", "https://hooks.example/T0/B0/X")
+        monkeypatch.setattr("services.notifier.main._send_slack", fake_send)
+        monkeypatch.setattr("services.notifier.main._sent_keys", OrderedDict())
+        body = {"device_id": "m5stick_01", "message": "異常検出", "color": "danger"}
+        with TestClient(app) as client:
+            assert client.post("/api/v1/notify", json={**body, "dedup_key": "anomaly:1"}).status_code == 200
+            resp = client.post("/api/v1/notify", json={**body, "dedup_key": "anomaly:2"})
+            assert (resp.status_code, resp.json()["status"]) == (202, "merged")
+            # アウトボックスの再確認: まだ届いていないので送信済みにしない
+            resp = client.post("/api/v1/notify", json={**body, "dedup_key": "anomaly:2"})
+            assert (resp.status_code, resp.json()["status"]) == (202, "deferred")
+        # 終了時にダイジェストが届き、重複キーを送信済みとして覚える
+        assert len(sent) == 2
+        resp = TestClient(app).post("/api/v1/notify", json={**body, "dedup_key": "anomaly:2"})
+        assert (resp.status_code, resp.json()["status"]) == (200, "duplicate")
+
+
 class TestHealth:
     """ヘルスチェックのテスト"""
 
@@ -0,0 +1,177 @@
+"""
+HTTPレスポンスキャッシュ
+企業デジタル分析ツール用
+
+取得したHTMLをSQLiteに保存し、同じリストを再分析するときの再ダウンロードを減らす。
+  - TTL以内        : ネットワークに出ずにキャッシュを返す（hit）
+  - TTL切れ        : If-None-Match / If-Modified-Since で再検証し、304ならキャッシュを返す（revalidated）
+  - キャッシュなし等: 通常どおり取得して保存する（miss）
+"""
+
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+
+DEFAULT_TTL = 24 * 60 * 60  # 秒
+OUTCOMES = ("hit", "revalidated", "miss")
+
+
+def cache_key(url):
+    """キャッシュキー用にURLを正規化する（スキーム・ホストを小文字化、既定ポートとフラグメントを除去）"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or "https"
+    host = (parts.hostname or "").lower()
+    port = parts.port
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        host = f"{host}:{port}"
+    return urlunsplit((scheme, host, parts.path or "/", parts.query, ""))
+
+
+class CachedResponse:
+    """キャッシュに保存された1ページ分"""
+
+    def __init__(self, body, encoding, etag, last_modified, fetched_at):
+        self.body = body
+        self.encoding = encoding
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+
+    @property
+    def age(self):
+        return time.time() - self.fetched_at
+
+    @property
+    def text(self):
+        return self.body.decode(self.encoding or "utf-8", errors="replace")
+
+
+class ResponseCache:
+    """
+    URL単位のレスポンスキャッシュ（SQLite・スレッドセーフ）
+
+    Args:
+        path: SQLiteファイルのパス
+        ttl: 再検証なしでキャッシュを使う秒数（0なら毎回再検証）
+    """
+
+    def __init__(self, path, ttl=DEFAULT_TTL):
+        self.path = str(path)
+        self.ttl = ttl
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                encoding TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+        self.stats = dict.fromkeys(OUTCOMES, 0)
+
+    def get(self, url):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, encoding, etag, last_modified, fetched_at FROM responses WHERE url = ?",
+                (cache_key(url),),
+            ).fetchone()
+        if not row: return None
+        return CachedResponse(zlib.decompress(row[0]), *row[1:])
+
+    def put(self, url, body, encoding=None, etag=None, last_modified=None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (url, body, encoding, etag, last_modified, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (cache_key(url), zlib.compress(body), encoding, etag, last_modified, time.time()),
+            )
+            self._conn.commit()
+
+    def touch(self, url):
+        """304で再検証できたときに取得時刻だけ更新する"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE responses SET fetched_at = ? WHERE url = ?", (time.time(), cache_key(url)),
+            )
+            self._conn.commit()
+
+    def record(self, outcome):
+        with self._lock:
+            self.stats[outcome] += 1
+
+    def snapshot(self):
+        """現在の統計のコピー（一括分析の前後差分用）"""
+        with self._lock:
+            return dict(self.stats)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+def hit_rate(stats):
+    """hit + revalidated（本文の再ダウンロードなし）の割合"""
+    total = sum(stats.get(k, 0) for k in OUTCOMES)
+    return (stats.get("hit", 0) + stats.get("revalidated", 0)) / total if total else 0.0
+
+
+def stats_delta(before, after):
+    return {k: after.get(k, 0) - before.get(k, 0) for k in OUTCOMES}
+
+
+def cached_fetch(url, cache=None, headers=None, timeout=15, session=requests):
+    """
+    キャッシュを使ってページを取得する。
+
+    Args:
+        url: 取得するURL
+        cache: ResponseCache（Noneならキャッシュなしで取得）
+        headers: リクエストヘッダー
+        timeout: タイムアウト秒数
+        session: requests.Session 等（get() を持つもの）
+
+    Returns:
+        tuple: (HTML文字列, "hit" / "revalidated" / "miss")
+
+    Raises:
+        requests.exceptions.RequestException: 通信エラー・HTTPエラー
+    """
+    entry = cache.get(url) if cache is not None else None
+    if entry and entry.age < cache.ttl:
+        cache.record("hit")
+        return entry.text, "hit"
+
+    h = dict(headers or {})
+    if entry:
+        if entry.etag: h["If-None-Match"] = entry.etag
+        if entry.last_modified: h["If-Modified-Since"] = entry.last_modified
+
+    r = session.get(url, headers=h, timeout=timeout, allow_redirects=True)
+    if r.status_code == 304 and entry:
+        cache.touch(url)
+        cache.record("revalidated")
+        return entry.text, "revalidated"
+    r.raise_for_status()
+    if r.encoding and r.encoding.lower() == "iso-8859-1": r.encoding = r.apparent_encoding
+    if not r.encoding: r.encoding = r.apparent_encoding
+    if cache is not None:
+        cache.put(url, r.content, r.encoding, r.headers.get("ETag"), r.headers.get("Last-Modified"))
+        cache.record("miss")
+    return r.text, "miss"
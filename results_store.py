@@ -0,0 +1,174 @@
+"""
+分析結果データベース
+企業デジタル分析ツール用
+
+run_analysis の結果をすべてSQLiteに保存し、再起動後も履歴・推移を参照できるようにする。
+  - 取得したページ本文のハッシュを一緒に保存し、前回と同じ本文なら再スコアリングを省く
+  - 履歴一覧・ドメイン別集計・スコア推移はSQLで取得する（domain / analyzed_at にインデックス）
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+from pathlib import Path
+
+from scoring import SCORING_VERSION
+
+# URLごとの最新の結果（スコア昇順）
+LATEST_BY_SCORE_SQL = (
+    "SELECT result_json FROM results WHERE id IN (SELECT MAX(id) FROM results GROUP BY url) ORDER BY score, id"
+)
+
+
+def content_hash(text):
+    """ページ本文のハッシュ（スコアリングのバージョンを含めるので、配点変更後は一致しない）"""
+    return hashlib.sha256(f"{SCORING_VERSION}\n{text}".encode("utf-8", errors="replace")).hexdigest()
+
+
+class ResultsStore:
+    """
+    分析結果の保存先（SQLite・スレッドセーフ）
+
+    Args:
+        path: SQLiteファイルのパス
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS results (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL,
+                domain TEXT NOT NULL,
+                score INTEGER NOT NULL,
+                rank TEXT NOT NULL,
+                category TEXT,
+                content_hash TEXT NOT NULL,
+                rescored INTEGER NOT NULL DEFAULT 1,
+                analyzed_at TEXT NOT NULL,
+                result_json TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_results_domain ON results(domain, analyzed_at);
+            CREATE INDEX IF NOT EXISTS idx_results_analyzed_at ON results(analyzed_at);
+            CREATE INDEX IF NOT EXISTS idx_results_url ON results(url, id);
+            CREATE INDEX IF NOT EXISTS idx_results_score ON results(score, id);
+        """)
+        self._conn.commit()
+
+    def save(self, result, digest, rescored=True):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO results (url, domain, score, rank, category, content_hash, rescored, analyzed_at, result_json) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (result["url"], result["domain"], result["score"], result["rank"], result["category"],
+                 digest, int(rescored), result["analyzed_at"], json.dumps(result, ensure_ascii=False)),
+            )
+            self._conn.commit()
+
+    def latest(self, url):
+        """
+        URLの直近の結果を返す。
+
+        Returns:
+            tuple: (content_hash, 結果dict)。未分析なら None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash, result_json FROM results WHERE url = ? ORDER BY id DESC LIMIT 1", (url,),
+            ).fetchone()
+        if not row: return None
+        return row[0], json.loads(row[1])
+
+    def history(self, limit=100):
+        """新しい順の分析結果（dictのリスト）"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT result_json FROM results ORDER BY analyzed_at DESC, id DESC LIMIT ?", (limit,),
+            ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def iter_by_score(self):
+        """
+        URLごとの最新の結果をスコア昇順に1件ずつ返す（サマリーPDF用。全件をメモリに載せない）。
+
+        読み出し中も分析結果を書き込めるよう、別の接続でカーソルを回す。
+        """
+        if self.path == ":memory:":
+            with self._lock:
+                rows = self._conn.execute(LATEST_BY_SCORE_SQL).fetchall()
+            for r in rows: yield json.loads(r[0])
+            return
+        conn = sqlite3.connect(self.path)
+        try:
+            for r in conn.execute(LATEST_BY_SCORE_SQL):
+                yield json.loads(r[0])
+        finally:
+            conn.close()
+
+    def domain_summary(self, limit=100):
+        """
+        ドメインごとの集計（最新スコア・前回比・最小・最大・分析回数）。最近分析した順。
+
+        Returns:
+            list[dict]: domain, analyses, latest_score, previous_score, min_score, max_score, last_analyzed_at
+        """
+        with self._lock:
+            rows = self._conn.execute("""
+                WITH ranked AS (
+                    SELECT domain, score, analyzed_at,
+                           ROW_NUMBER() OVER (PARTITION BY domain ORDER BY analyzed_at DESC, id DESC) AS rn
+                    FROM results
+                )
+                SELECT domain, COUNT(*), MAX(CASE WHEN rn = 1 THEN score END), MAX(CASE WHEN rn = 2 THEN score END),
+                       MIN(score), MAX(score), MAX(analyzed_at)
+                FROM ranked GROUP BY domain ORDER BY MAX(analyzed_at) DESC, domain LIMIT ?
+            """, (limit,)).fetchall()
+        keys = ("domain", "analyses", "latest_score", "previous_score", "min_score", "max_score", "last_analyzed_at")
+        return [dict(zip(keys, r)) for r in rows]
+
+    def trend(self, domain):
+        """ドメインのスコア推移（古い順の (analyzed_at, score) のリスト）"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT analyzed_at, score FROM results WHERE domain = ? ORDER BY analyzed_at, id", (domain,),
+            ).fetchall()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM results")
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+def score_or_reuse(url, text, store, score_fn, analyzed_at):
+    """
+    前回と本文が同じなら保存済みの結果を再利用し、変わっていれば score_fn で採点して保存する。
+
+    Args:
+        url: 正規化済みURL
+        text: 取得したページ本文
+        store: ResultsStore（Noneなら毎回採点して保存しない）
+        score_fn: text を受け取って結果dictを返す関数（analyzed_at は上書きする）
+        analyzed_at: 今回の分析日時文字列
+
+    Returns:
+        tuple: (結果dict, 再利用したかどうか)
+    """
+    digest = content_hash(text)
+    prev = store.latest(url) if store is not None else None
+    if prev and prev[0] == digest:
+        result = dict(prev[1], analyzed_at=analyzed_at)
+        store.save(result, digest, rescored=False)
+        return result, True
+    result = dict(score_fn(text), analyzed_at=analyzed_at)
+    if store is not None: store.save(result, digest)
+    return result, False
@@ -0,0 +1,53 @@
+"""
+スコアリングモジュール
+企業デジタル分析ツール用
+
+page_analyzer の分析結果から7項目100点満点のスコアと営業ランクを算出する
+"""
+
+SCORING_VERSION = 1  # 配点・判定ロジックを変えたら上げる（保存済み結果の再利用判定に使う）
+
+
+def check_https(url): return url.startswith("https://")
+
+def calculate_score(url, seo, links, contact, tech):
+    score=0; details=[]
+    p=10 if check_https(url) else 0; score+=p; details.append(("HTTPS対応",p,10,"✅" if p==10 else "❌"))
+    s=0
+    if 10<=seo["title_length"]<=60: s+=8
+    elif seo["title_length"]>0: s+=4
+    if 50<=seo["description_length"]<=160: s+=7
+    elif seo["description_length"]>0: s+=3
+    if seo["has_viewport"]: s+=5
+    if seo["h1_count"]==1: s+=3
+    elif seo["h1_count"]>1: s+=1
+    if seo["has_favicon"]: s+=2
+    score+=s; details.append(("SEO基礎",s,25,"✅" if s>=18 else("⚠️" if s>=10 else "❌")))
+    s=min(links["sns_count"]*5,15); score+=s; details.append(("SNS連携",s,15,"✅" if s>=10 else("⚠️" if s>=5 else "❌")))
+    s=0
+    if links["total_links"]>100: s+=10
+    elif links["total_links"]>50: s+=7
+    elif links["total_links"]>20: s+=4
+    if links["internal_links"]>30: s+=5
+    elif links["internal_links"]>10: s+=3
+    s=min(s,15); score+=s; details.append(("コンテンツ充実度",s,15,"✅" if s>=10 else("⚠️" if s>=5 else "❌")))
+    s=0
+    if contact["has_form"]: s+=6
+    if contact["has_phone"]: s+=4
+    if contact["has_email_link"]: s+=3
+    if contact["has_contact_page"]: s+=2
+    s=min(s,15); score+=s; details.append(("問い合わせ導線",s,15,"✅" if s>=10 else("⚠️" if s>=5 else "❌")))
+    s=0
+    if tech["has_analytics"]: s+=5
+    if tech["has_structured_data"]: s+=3
+    if seo["has_ogp"]: s+=2
+    s=min(s,10); score+=s; details.append(("技術・運用",s,10,"✅" if s>=7 else("⚠️" if s>=3 else "❌")))
+    p=10 if links["recruit_found"] else 0; score+=p; details.append(("採用ページ",p,10,"✅" if p==10 else "❌"))
+    return score, details
+
+def judge(score):
+    if score<=25: return "S","最優先ターゲット","s"
+    elif score<=40: return "A","営業対象（高確度）","a"
+    elif score<=55: return "B","営業対象（中確度）","b"
+    elif score<=70: return "C","要検討","c"
+    else: return "D","対象外（デジタル成熟）","d"
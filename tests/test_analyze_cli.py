@@ -0,0 +1,120 @@
+"""
+ヘッドレス一括分析（CLI）のテスト
+
+正常系4・異常系1・境界値1
+"""
+
+import csv
+import json
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from analyze_cli import analyze_stream, chunk_by_host, main, read_urls
+from test_page_analyzer import CORPORATE_HTML
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        if self.path.startswith("/slow"):
+            time.sleep(2)
+        if self.path.startswith("/missing"):
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = CORPORATE_HTML.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture(scope="module")
+def server() -> Iterator[str]:
+    """テスト用HTTPサーバー"""
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+def _run(tmp_path: Path, urls: list[str], output: str, *extra: str) -> Path:
+    src = tmp_path / "urls.txt"
+    src.write_text("\n".join(urls), encoding="utf-8")
+    out = tmp_path / output
+    main([str(src), "-o", str(out), "--host-interval", "0", "--cache", "",
+          "--results-db", str(tmp_path / "results.sqlite3"), *extra])
+    return out
+
+
+class TestCli:
+    """CLI全体のテスト"""
+
+    def test_normal_jsonl_streaming(self, server: str, tmp_path: Path) -> None:
+        """正常系: JSONLに成功・エラーの行が1件ずつ出力される"""
+        urls = [f"{server}/a", f"{server}/b", f"{server}/missing"]
+        out = _run(tmp_path, urls, "results.jsonl")
+        rows = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+        assert sorted(r["url"] for r in rows) == sorted(urls)
+        assert {r["url"]: r.get("error") for r in rows}[f"{server}/missing"] == "HTTP 404"
+        assert all(0 <= r["score"] <= 100 for r in rows if "error" not in r)
+
+    def test_normal_process_pool_csv(self, server: str, tmp_path: Path) -> None:
+        """正常系: プロセスプールでも全件がCSVに出力される"""
+        host2 = server.replace("127.0.0.1", "localhost")
+        urls = [f"{server}/p{i}" for i in range(4)] + [f"{host2}/q{i}" for i in range(4)]
+        out = _run(tmp_path, urls, "results.csv", "--processes", "2", "--chunk-size", "4")
+        with open(out, encoding="utf-8-sig", newline="") as f:
+            rows = list(csv.DictReader(f))
+        assert sorted(r["URL"] for r in rows) == sorted(urls)
+
+    def test_normal_process_pool_yields_per_url(self, server: str, tmp_path: Path) -> None:
+        """正常系: プロセスプールでもチャンクの完了を待たず、終わったURLから1件ずつ返す"""
+        urls = [f"{server}/slow"] + [f"{server}/p{i}" for i in range(3)]  # 同じホストなので1チャンク
+        config = {"workers": 4, "host_interval": 0, "backend": "auto", "timeout": 10,
+                  "cache_path": "", "results_path": str(tmp_path / "results.sqlite3")}
+        start = time.perf_counter()
+        stream = analyze_stream(urls, config, processes=2)
+        first_url, _, error = next(stream)
+        assert error is None and first_url != f"{server}/slow"
+        assert time.perf_counter() - start < 2  # /slow（2秒）の完了より前に届く
+        rest = list(stream)
+        assert sorted([first_url] + [u for u, _, _ in rest]) == sorted(urls)
+
+    def test_normal_core_import_without_streamlit(self) -> None:
+        """正常系: 分析モジュールはStreamlitを読み込まずにimportできる"""
+        code = "import sys, analysis_core, analyze_cli; print('streamlit' in sys.modules)"
+        root = Path(__file__).resolve().parent.parent
+        out = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+        assert out.stdout.strip() == "False"
+
+    def test_error_read_urls(self, tmp_path: Path) -> None:
+        """異常系: CSVからURL以外の列・見出しを除き、リストではコメント・空行を除く"""
+        (tmp_path / "list.csv").write_text("会社名,URL\n山田工務店,yamada.co.jp\nサンプル,https://x.example.com/\n", encoding="utf-8-sig")
+        (tmp_path / "list.txt").write_text("# コメント\n\nhttps://a.jp/\n  b.jp  \n", encoding="utf-8")
+        assert read_urls(str(tmp_path / "list.csv")) == ["yamada.co.jp", "https://x.example.com/"]
+        assert read_urls(str(tmp_path / "list.txt")) == ["https://a.jp/", "b.jp"]
+
+
+class TestChunkByHost:
+    """chunk_by_host のテスト"""
+
+    def test_boundary_same_host_kept_together(self) -> None:
+        """境界値: 同一ホストはチャンクをまたがず、チャンクサイズを超える場合は単独チャンクになる"""
+        urls = [f"https://big.jp/{i}" for i in range(5)] + ["https://a.jp/", "https://b.jp/", "https://a.jp/x"]
+        chunks = chunk_by_host(urls, chunk_size=3)
+        assert sorted(u for ch in chunks for u in ch) == sorted(urls)
+        for host in ("big.jp", "a.jp", "b.jp"):
+            assert sum(any(host + "/" in u for u in ch) for ch in chunks) == 1
+        assert chunks[0] == [f"https://big.jp/{i}" for i in range(5)]
@@ -0,0 +1,106 @@
+"""
+振動データ解析パイプライン（起動・読み込み）のテスト
+
+analyze_vibration は import 時にカレントディレクトリへ app.log を作るので、
+一時ディレクトリで別プロセスとして実行する。
+
+正常系4・異常系1
+"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+HEAVY = ("matplotlib", "pandas", "scipy.signal")
+
+
+def run(code: str, cwd: Path) -> dict:
+    """別プロセスでコードを実行し、最後に print された JSON を返す"""
+    prelude = f"import json, sys\nsys.path.insert(0, {str(ROOT)!r})\n"
+    env = dict(os.environ, SLACK_WEBHOOK_URL="")
+    out = subprocess.run([sys.executable, "-c", prelude + code], cwd=cwd, env=env,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def write_csv(path: Path, n: int = 2000) -> str:
+    t = np.arange(n) / 500
+    az = 1.0 + 0.3 * np.sin(2 * np.pi * 160 * t) * (1 + 0.8 * np.sin(2 * np.pi * 13 * t))
+    pd.DataFrame({"timestamp_us": (t * 1e6).astype(np.int64), "ax": 0.0, "ay": 0.0, "az": az}).to_csv(path, index=False)
+    return str(path)
+
+
+class TestLazyImport:
+    """重いライブラリの遅延読み込み"""
+
+    def test_normal_import_is_light(self, tmp_path: Path) -> None:
+        """正常系: import しただけでは matplotlib・pandas・scipy.signal を読み込まない"""
+        loaded = run(f"import analyze_vibration\nprint(json.dumps([m for m in {HEAVY!r} if m in sys.modules]))", tmp_path)
+        assert loaded == []
+
+    def test_normal_no_plot_skips_matplotlib_and_pandas(self, tmp_path: Path) -> None:
+        """正常系: --no-plot の実行では matplotlib・pandas を読み込まない"""
+        csv = write_csv(tmp_path / "vibration_001.csv")
+        loaded = run(
+            "import analyze_vibration\n"
+            f"sys.argv = ['analyze_vibration.py', {csv!r}, '--no-plot']\n"
+            "analyze_vibration.main()\n"
+            f"print(json.dumps([m for m in {HEAVY!r} if m in sys.modules]))",
+            tmp_path,
+        )
+        assert loaded == ["scipy.signal"]
+
+    def test_normal_watch_reads_without_plot_data(self, tmp_path: Path) -> None:
+        """正常系: 監視モードは --no-plot なしでもプロット用の読み込み（pandas）をしない"""
+        write_csv(tmp_path / "vibration_001.csv")
+        result = run(
+            "import analyze_vibration as av\n"
+            "calls = []\n"
+            "av.notify_result = lambda summary: None\n"
+            "def fake_watch(data_dir, handle, ledger, **kwargs):\n"
+            "    calls.append(handle(data_dir + '/vibration_001.csv'))\n"
+            "av.watch_directory = fake_watch\n"
+            f"sys.argv = ['analyze_vibration.py', '--watch', '--data-dir', {str(tmp_path)!r}, '--polling']\n"
+            "av.run_daemon(av.parse_args())\n"
+            "print(json.dumps([calls[0].get('plot') is None, 'pandas' in sys.modules]))",
+            tmp_path,
+        )
+        assert result == [True, False]
+
+
+class TestLoadAxis:
+    """pandas を使わない1軸の読み込み"""
+
+    def test_normal_same_result_as_pandas(self, tmp_path: Path) -> None:
+        """正常系: プロット用（pandas）とプロットなし（numpy）で解析結果が一致する"""
+        csv = write_csv(tmp_path / "vibration_001.csv")
+        fast, full = run(
+            "import analyze_vibration as av\n"
+            "keys = ('rms_total', 'mean_rms', 'max_z', 'peak_freq', 'env_peak_freq')\n"
+            f"a = av.analyze_file({csv!r})\n"
+            f"b = av.analyze_file({csv!r}, plot=True)\n"
+            "print(json.dumps([[a[k] for k in keys], [b[k] for k in keys]]))",
+            tmp_path,
+        )
+        assert fast == full
+
+    def test_error_missing_column(self, tmp_path: Path) -> None:
+        """異常系: 対象の軸の列が無ければ ValueError"""
+        path = tmp_path / "vibration_001.csv"
+        path.write_text("timestamp_us,ax,ay\n0,0,0\n", encoding="utf-8")
+        result = run(
+            "import analyze_vibration as av\n"
+            "try:\n"
+            f"    av.load_axis({str(path)!r})\n"
+            "    print(json.dumps('no error'))\n"
+            "except ValueError as e:\n"
+            "    print(json.dumps(str(e)))",
+            tmp_path,
+        )
+        assert result.startswith("列 az がありません")
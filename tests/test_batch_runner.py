@@ -0,0 +1,84 @@
+"""
+一括分析エンジンのテスト
+
+正常系2・異常系1・境界値1
+"""
+
+import threading
+import time
+
+from batch_runner import BatchRunner, HostThrottle, host_of
+
+
+def _fake_analyze(url: str) -> tuple:
+    """ネットワークを使わない run_analysis の代用"""
+    time.sleep(0.05)
+    if "error" in url:
+        return None, "接続エラー"
+    return {"url": url}, None
+
+
+class TestBatchRunner:
+    """BatchRunnerのテスト"""
+
+    def test_normal_all_results_returned(self) -> None:
+        """正常系: 全URLの結果が1件ずつ返る"""
+        urls = [f"https://site{i}.example.jp/" for i in range(10)]
+        runner = BatchRunner(max_workers=5, host_interval=0.0)
+        got = list(runner.run(urls, _fake_analyze))
+        assert sorted(u for u, _, _ in got) == sorted(urls)
+        assert runner.completed == 10
+        assert runner.throughput > 0
+
+    def test_normal_runs_concurrently(self) -> None:
+        """正常系: 別ホストは並列に処理され、直列より速い"""
+        urls = [f"https://site{i}.example.jp/" for i in range(8)]
+        runner = BatchRunner(max_workers=8, host_interval=0.0)
+        list(runner.run(urls, _fake_analyze))
+        assert runner.elapsed < 0.05 * len(urls) / 2
+
+    def test_error_exception_is_captured(self) -> None:
+        """異常系: 分析関数の例外はエラー扱いになり、他のURLは続行される"""
+        def boom(url: str) -> tuple:
+            if "bad" in url:
+                raise RuntimeError("想定外")
+            return {"url": url}, None
+
+        got = list(BatchRunner(host_interval=0.0).run(
+            ["https://bad.jp/", "https://ok.jp/", "https://error.jp/"], boom,
+        ))
+        errors = {u: e for u, _, e in got if e}
+        assert errors["https://bad.jp/"].startswith("エラー")
+        assert len(got) == 3
+
+    def test_boundary_same_host_is_throttled(self) -> None:
+        """境界値: 同一ホストへのアクセスは間隔が空けられる"""
+        stamps = []
+        lock = threading.Lock()
+
+        def record(url: str) -> tuple:
+            with lock:
+                stamps.append(time.monotonic())
+            return {"url": url}, None
+
+        urls = [f"https://same.example.jp/page{i}" for i in range(3)]
+        list(BatchRunner(max_workers=3, host_interval=0.1).run(urls, record))
+        stamps.sort()
+        gaps = [b - a for a, b in zip(stamps, stamps[1:])]
+        assert min(gaps) >= 0.09
+
+
+class TestHostHelpers:
+    """ホスト関連ヘルパーのテスト"""
+
+    def test_host_of_without_scheme(self) -> None:
+        """正常系: スキーム省略URLからもホストを取り出せる"""
+        assert host_of("Example.CO.jp/about") == "example.co.jp"
+
+    def test_throttle_zero_interval(self) -> None:
+        """境界値: 間隔0なら待機しない"""
+        t = HostThrottle(0.0)
+        start = time.monotonic()
+        for _ in range(5):
+            t.wait("a.jp")
+        assert time.monotonic() - start < 0.05
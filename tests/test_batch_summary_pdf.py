@@ -0,0 +1,95 @@
+"""
+一括分析サマリーPDFのテスト
+
+正常系3・境界値3
+"""
+
+import base64
+import re
+import tracemalloc
+import zlib
+from pathlib import Path
+from typing import Iterator
+
+from pdf_report import generate_batch_summary_pdf
+from results_store import ResultsStore, content_hash
+
+
+def make_row(i: int, score: int) -> dict:
+    return {"url": f"https://c{i}.jp/", "domain": f"c{i}.jp", "score": score, "rank": "S", "rank_class": "s",
+            "rank_label": "営業対象", "category": "製造業", "analyzed_at": "2026-06-01 10:00",
+            "links": {"sns_count": 1, "recruit_found": True}}
+
+
+def page_count(pdf: bytes) -> int:
+    return len(re.findall(rb"/Type /Page\b", pdf))
+
+
+def page_streams(pdf: bytes) -> list[str]:
+    """ページ・フォームの描画命令（reportlab の既定は ASCII85 + Flate）"""
+    out = []
+    for m in re.finditer(rb"stream\r?\n(.*?)~>\s*endstream", pdf, re.S):
+        out.append(zlib.decompress(base64.a85decode(m.group(1).strip())).decode("latin-1"))
+    return out
+
+
+class TestSummaryPdf:
+    """generate_batch_summary_pdf のテスト"""
+
+    def test_normal_iterator_is_consumed_lazily(self) -> None:
+        """正常系: イテレーターを1件ずつ消費し、最後まで読み切る（リストに変換しない）"""
+        consumed = []
+
+        def rows() -> Iterator[dict]:
+            for i in range(120):
+                consumed.append(i)
+                yield make_row(i, i % 101)
+
+        pdf = generate_batch_summary_pdf(rows())
+        assert len(consumed) == 120
+        assert page_count(pdf) == 4
+
+    def test_normal_header_and_band_are_forms(self) -> None:
+        """正常系: 見出し行・縞模様はフォームXObjectとして1回だけ定義され、各ページから参照される"""
+        pdf = generate_batch_summary_pdf([make_row(i, 50) for i in range(200)])
+        streams = page_streams(pdf)
+        assert pdf.count(b"/Subtype /Form") == 3  # table_header・band・summary
+        assert sum("/FormXob.table_header Do" in s for s in streams) == page_count(pdf) == 6
+        assert sum("/FormXob.band Do" in s for s in streams) == page_count(pdf)
+
+    def test_normal_list_sorted_and_summary_counts(self) -> None:
+        """正常系: リストはスコア昇順に並べ替え、1ページ目から参照するサマリーには全行の件数が入る"""
+        rows = [make_row(0, 70), make_row(1, 30), make_row(2, 50)]
+        text = "\n".join(page_streams(generate_batch_summary_pdf(rows)))
+        assert text.index("(c1.jp)") < text.index("(c2.jp)") < text.index("(c0.jp)")
+        assert "/FormXob.summary Do" in text
+        assert "(: 3)" in text  # 分析件数: 3件
+
+    def test_boundary_store_iterator_and_file_output(self, tmp_path: Path) -> None:
+        """境界値: 結果DBのイテレーターからファイルへ直接書き出せる（URLごとの最新結果のみ）"""
+        store = ResultsStore(tmp_path / "results.sqlite3")
+        store.save(make_row(0, 90), content_hash("old"))
+        store.save(make_row(0, 20), content_hash("new"))
+        store.save(make_row(1, 40), content_hash("x"))
+        assert [r["score"] for r in store.iter_by_score()] == [20, 40]
+        out = tmp_path / "summary.pdf"
+        assert generate_batch_summary_pdf(store.iter_by_score(), out=str(out)) is None
+        assert out.read_bytes().startswith(b"%PDF") and page_count(out.read_bytes()) == 1
+
+    def test_boundary_memory_growth_per_row(self) -> None:
+        """境界値: 行を増やしたときのメモリの増え方は1行あたり1KB未満（ページの描画命令の分だけ）"""
+
+        def peak(n: int) -> int:
+            tracemalloc.start()
+            generate_batch_summary_pdf(make_row(i, i % 101) for i in range(n))
+            size = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            return size
+
+        peak(10)  # フォント登録などの1回きりの確保を済ませておく
+        assert (peak(1500) - peak(300)) / 1200 < 1024
+
+    def test_boundary_empty(self) -> None:
+        """境界値: 0件でも1ページのPDFになる"""
+        pdf = generate_batch_summary_pdf(iter([]))
+        assert pdf.startswith(b"%PDF") and page_count(pdf) == 1
@@ -0,0 +1,150 @@
+"""
+分析結果のストリーミング出力のテスト
+
+正常系4・異常系2・境界値3
+"""
+
+import csv
+import gzip
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+import exporter
+from analysis_core import CSV_FIELDS, generate_csv
+from exporter import ResultExporter, done_domains, iter_csv_lines
+
+
+def make_result(i: int) -> dict:
+    """run_analysis の結果と同じ形のdict"""
+    url = f"https://site{i}.example.jp/"
+    return {
+        "url": url, "domain": f"site{i}.example.jp", "score": i, "rank": "S", "rank_label": "営業対象",
+        "rank_class": "s", "details": [], "category": "製造業", "analyzed_at": "2026-06-01 10:00",
+        "seo": {"title": f"会社{i}\n改行入り", "description_length": 0, "has_viewport": True, "has_ogp": False, "h1_count": 1},
+        "links": {"total_links": 3, "internal_links": 2, "external_links": 1, "sns_count": 0, "sns_links": {}, "recruit_found": False},
+        "contact": {"has_form": False, "phone_number": "", "has_email_link": False},
+        "tech": {"has_analytics": False, "has_structured_data": False, "image_count": 0, "images_without_alt": 0},
+    }
+
+
+def export(path: Path, ids: range, resume: bool = False, errors: tuple = ()) -> ResultExporter:
+    with ResultExporter(str(path), resume=resume) as ex:
+        for i in ids:
+            r = make_result(i)
+            if ex.is_done(r["url"]): continue
+            ex.write(r["url"], None if i in errors else r, "タイムアウト" if i in errors else None)
+    return ex
+
+
+def read_csv(path: Path) -> list[dict]:
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rt", encoding="utf-8-sig", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+class TestFormats:
+    """各形式の出力"""
+
+    def test_normal_csv_same_as_generate_csv(self) -> None:
+        """正常系: ジェネレーター版のCSVは generate_csv と同じ内容になる"""
+        results = [make_result(i) for i in range(3)]
+        assert "".join(iter_csv_lines(results)) == generate_csv(results)
+
+    def test_normal_gzip_csv_resume(self, tmp_path: Path) -> None:
+        """正常系: 中断後に resume すると出力済みドメインを飛ばし、ヘッダーを重複させずに追記する"""
+        path = tmp_path / "out.csv.gz"
+        export(path, range(0, 5))
+        ex = export(path, range(0, 8), resume=True)
+        assert ex.written == 3
+        rows = read_csv(path)
+        assert [r["URL"] for r in rows] == [make_result(i)["url"] for i in range(8)]
+        assert rows[0]["タイトル"] == "会社0\n改行入り"
+
+    def test_normal_jsonl_errors_are_retried(self, tmp_path: Path) -> None:
+        """正常系: JSONLのエラー行は出力済みに数えず、再開時にもう一度分析する"""
+        path = tmp_path / "out.jsonl"
+        export(path, range(3), errors=(1,))
+        assert done_domains(str(path)) == {"site0.example.jp", "site2.example.jp"}
+        assert export(path, range(3), resume=True).written == 1
+
+    def test_normal_parquet_resume(self, tmp_path: Path) -> None:
+        """正常系: Parquetも再開でき、数値列は整数型で保存される"""
+        pq = pytest.importorskip("pyarrow.parquet")
+        path = tmp_path / "out.parquet"
+        export(path, range(3))
+        export(path, range(5), resume=True)
+        table = pq.read_table(path)
+        assert table.column("スコア").to_pylist() == [0, 1, 2, 3, 4]
+        assert table.schema.field("スコア").type == "int64"
+
+
+class TestResume:
+    """中断されたファイルからの再開"""
+
+    def test_boundary_truncated_line(self, tmp_path: Path) -> None:
+        """境界値: 書きかけの最終行は捨て、そのドメインは分析し直す"""
+        path = tmp_path / "out.csv"
+        export(path, range(3))
+        text = path.read_bytes()
+        path.write_bytes(text[: len(text) - 40])
+        assert done_domains(str(path)) == {"site0.example.jp", "site1.example.jp"}
+        export(path, range(4), resume=True)
+        assert [r["スコア"] for r in read_csv(path)] == ["0", "1", "2", "3"]
+
+    def test_boundary_truncated_gzip(self, tmp_path: Path) -> None:
+        """境界値: 途中で切れたgzipでも、読める行までを残して再開できる"""
+        path = tmp_path / "out.jsonl.gz"
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            for i in range(200):
+                f.write(json.dumps(make_result(i), ensure_ascii=False) + "\n")
+        data = path.read_bytes()
+        path.write_bytes(data[: len(data) // 2])
+        export(path, range(200), resume=True)
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            scores = sorted(json.loads(line)["score"] for line in f)
+        assert scores == list(range(200))
+
+    def test_error_foreign_csv_is_not_overwritten(self, tmp_path: Path) -> None:
+        """異常系: 列が違うCSVへの再開はエラーにし、ファイルを書き換えない"""
+        path = tmp_path / "other.csv"
+        path.write_text("name,url\nA,https://a.jp/\n", encoding="utf-8")
+        with pytest.raises(ValueError):
+            ResultExporter(str(path), resume=True)
+        assert path.read_text(encoding="utf-8") == "name,url\nA,https://a.jp/\n"
+
+    def test_error_unsupported_format(self, monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+        """異常系: Parquetのgzipや未対応形式、pyarrow未インストールはエラー"""
+        with pytest.raises(ValueError):
+            ResultExporter(str(tmp_path / "out.parquet.gz"))
+        with pytest.raises(ValueError):
+            ResultExporter(str(tmp_path / "out.csv"), fmt="xlsx")
+        with pytest.raises(ValueError):
+            ResultExporter("-", fmt="parquet", stream=io.StringIO())
+        monkeypatch.setattr(exporter, "pq", None)
+        with pytest.raises(ImportError):
+            ResultExporter(str(tmp_path / "out.parquet"))
+        out = io.StringIO()
+        ResultExporter("-", stream=out).write("https://a.jp/", make_result(1))
+        assert out.getvalue().splitlines()[0] == ",".join(CSV_FIELDS)
+
+    def test_boundary_flush_every_n_rows(self) -> None:
+        """境界値: 1行ごとではなく FLUSH_ROWS 行ごと（と close 時）に書き出す"""
+
+        class CountingStream(io.StringIO):
+            flushes = 0
+
+            def flush(self) -> None:
+                self.flushes += 1
+                super().flush()
+
+        out = CountingStream()
+        with ResultExporter("-", fmt="jsonl", stream=out) as ex:
+            for i in range(exporter.FLUSH_ROWS * 2 + 50):
+                r = make_result(i)
+                ex.write(r["url"], r)
+            assert out.flushes == 2
+        assert out.flushes == 3
+        assert len(out.getvalue().splitlines()) == exporter.FLUSH_ROWS * 2 + 50
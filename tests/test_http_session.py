@@ -0,0 +1,94 @@
+"""
+共有HTTPセッションのテスト（ローカルHTTPサーバーを使用）
+
+正常系3・異常系1・境界値1
+"""
+
+import gzip
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+
+import pytest
+import requests
+
+from http_session import HttpSession
+from response_cache import ResponseCache, cached_fetch
+
+BIG_BODY = ("<p>" + "あ" * 1000 + "</p>\n").encode() * 2000  # 約6MB
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive を有効にする
+    client_ports: set = set()
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        _Handler.client_ports.add(self.client_address[1])
+        if self.path == "/missing":
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = BIG_BODY if self.path == "/big" else "<title>小さいページ</title>".encode()
+        headers = {"Content-Type": "text/html; charset=utf-8"}
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+        self.send_response(200)
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture(scope="module")
+def server() -> Iterator[str]:
+    """テスト用HTTPサーバー"""
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+class TestHttpSession:
+    """HttpSessionのテスト"""
+
+    def test_normal_gzip_decoded(self, server: str) -> None:
+        """正常系: gzip圧縮されたページが展開・デコードされる"""
+        r = HttpSession().get(f"{server}/small")
+        assert r.headers["Content-Encoding"] == "gzip"
+        assert r.text == "<title>小さいページ</title>"
+        assert r.truncated is False
+
+    def test_normal_keep_alive_reuses_connection(self, server: str) -> None:
+        """正常系: 同じホストへの連続リクエストは1本の接続を使い回す"""
+        s = HttpSession()
+        _Handler.client_ports.clear()
+        for _ in range(5):
+            s.get(f"{server}/small")
+        assert len(_Handler.client_ports) == 1
+
+    def test_normal_works_with_cache(self, server: str, tmp_path) -> None:
+        """正常系: cached_fetch の session としてそのまま使える"""
+        cache = ResponseCache(tmp_path / "c.sqlite3")
+        text, outcome = cached_fetch(f"{server}/small", cache, session=HttpSession())
+        assert outcome == "miss" and "小さいページ" in text
+        assert cache.get(f"{server}/small").text == text
+
+    def test_error_http_status(self, server: str) -> None:
+        """異常系: 404は raise_for_status で HTTPError になる"""
+        r = HttpSession().get(f"{server}/missing")
+        with pytest.raises(requests.exceptions.HTTPError):
+            r.raise_for_status()
+
+    def test_boundary_byte_budget(self, server: str) -> None:
+        """境界値: 上限バイト数で打ち切られ、途中までの本文が読める"""
+        r = HttpSession(max_bytes=300 * 1024).get(f"{server}/big")
+        assert r.truncated is True
+        assert len(r.content) == 300 * 1024
+        assert r.text.startswith("<p>ああ")
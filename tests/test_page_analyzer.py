@@ -0,0 +1,111 @@
+"""
+1パスページ分析のテスト
+
+個別の analyze_* 関数と analyze_page の結果が一致することを確認する
+正常系2・異常系2・境界値1
+"""
+
+import pytest
+from bs4 import BeautifulSoup
+
+from page_analyzer import (
+    analyze_contact,
+    analyze_links,
+    analyze_meta_seo,
+    analyze_page,
+    analyze_tech,
+    detect_category,
+)
+
+BASE_URL = "https://example.co.jp/"
+
+CORPORATE_HTML = """<!DOCTYPE html><html><head>
+<title> 株式会社サンプル製作所 </title>
+<meta name="description" content=" 精密部品の製造メーカーです ">
+<meta name="viewport" content="width=device-width">
+<meta property="og:title" content="サンプル">
+<link rel="shortcut icon" href="/favicon.ico"><link rel="canonical" href="/">
+<script async src="https://www.googletagmanager.com/gtag/js"></script>
+<script type="application/ld+json">{"@type": "Organization"}</script>
+</head><body>
+<h1>ようこそ <span>サンプル</span></h1><h1>二つ目</h1>
+<a href="/about/">会社概要</a><a href="https://twitter.com/sample">X</a>
+<a href="https://www.facebook.com/sample">FB</a><a href="/recruit/"> 採用 情報 </a>
+<a href="mailto:info@example.co.jp">メール</a><a href="tel:0312345678">電話</a>
+<a href="#top">TOP</a><a href="">空</a><a>リンクなし</a>
+<form action="/contact"><input name="q"></form>
+<p>TEL: 03-1234-5678 工場見学受付中</p>
+<img src="a.png" alt="a"><img src="b.png"><img src="c.png" alt="">
+</body></html>"""
+
+
+def _legacy(soup: BeautifulSoup) -> dict:
+    """従来の5関数を個別に呼んだ結果"""
+    return {
+        "seo": analyze_meta_seo(soup),
+        "links": analyze_links(soup, BASE_URL),
+        "contact": analyze_contact(soup),
+        "tech": analyze_tech(soup),
+        "category": detect_category(soup),
+    }
+
+
+def _assert_same(html: str) -> dict:
+    soup = BeautifulSoup(html, "html.parser")
+    old, new = _legacy(soup), analyze_page(soup, BASE_URL)
+    assert new == old
+    # SNS一覧はCSVで順序どおり出力されるので挿入順も一致させる
+    assert list(new["links"]["sns_links"]) == list(old["links"]["sns_links"])
+    return new
+
+
+class TestAnalyzePage:
+    """analyze_page のテスト"""
+
+    def test_normal_corporate_page(self) -> None:
+        """正常系: 一般的な企業サイトで従来関数と一致する"""
+        r = _assert_same(CORPORATE_HTML)
+        assert r["seo"]["title"] == "株式会社サンプル製作所"
+        assert r["seo"]["h1_count"] == 2
+        assert r["seo"]["h1_text"] == "ようこそサンプル"
+        assert r["links"]["total_links"] == 8
+        assert r["links"]["sns_count"] == 2
+        assert r["contact"]["phone_number"] == "03-1234-5678"
+        assert r["tech"]["has_analytics"] is True
+        assert r["tech"]["images_without_alt"] == 2
+        assert r["category"] == "製造"
+
+    def test_normal_nested_anchor_and_title_markup(self) -> None:
+        """正常系: 入れ子の<a>や子要素を持つ<title>でも一致する"""
+        _assert_same(
+            "<title><b>入れ子</b></title><title>二つ目</title>"
+            "<a href='/x'>外<a href='/careers'>内</a>お問い合わせ</a>"
+            "<a href='/y'>採用<a>hrefなし</a>後</a>"
+        )
+
+    def test_error_empty_document(self) -> None:
+        """異常系: 空のHTMLでも既定値が返る"""
+        r = _assert_same("")
+        assert r["seo"]["title"] == ""
+        assert r["links"]["total_links"] == 0
+        assert r["category"] == "その他"
+
+    def test_error_text_outside_get_text(self) -> None:
+        """異常系: コメント・scriptの文字列は本文扱いしないが、GA判定には使う"""
+        r = _assert_same(
+            "<!-- 03-9999-9999 gtag --><script>var tel='03-1111-2222';</script>"
+            "<template>06-1111-2222</template><p>本文</p>"
+        )
+        assert r["contact"]["has_phone"] is False
+        assert r["tech"]["has_analytics"] is True
+
+    @pytest.mark.parametrize("html", [
+        "<link rel='apple-touch-icon'><link rel='ICON'>",
+        "<meta name='description' content=''><meta name='description' content='後'>",
+        "<p>03-</p><p>1234-5678</p>",
+        "<h1></h1><h1>中身</h1>",
+        "<a href=' /jobs '>求人</a><a href='JavaScript:void(0)'>x</a>",
+    ])
+    def test_boundary_edge_markup(self, html: str) -> None:
+        """境界値: 属性・テキスト境界の紛らわしいケースでも一致する"""
+        _assert_same(html)
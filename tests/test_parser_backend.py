@@ -0,0 +1,109 @@
+"""
+HTMLパーサーバックエンドのテスト
+
+html.parser / lxml / selectolax で calculate_score が同じスコアになることを確認する
+（未インストールのバックエンドはスキップ）
+"""
+
+import pytest
+
+import parser_backend
+from page_analyzer import analyze_page
+from parser_backend import available_backends, parse_html, resolve_backend
+from scoring import calculate_score
+
+URL = "https://www.example.co.jp/"
+
+# 典型的なサイト構成ごとのフィクスチャ
+PAGES = {
+    "legacy_table_site": """<html><head><title>山田工務店</title></head>
+<body><table><tr><td><img src="logo.gif"></td><td>TEL 0120-123-456</td></tr></table>
+<a href="works.html">施工例</a><a href="mailto:info@yamada.jp">お問合せ</a>
+<p>建築・リフォーム・不動産のことなら</p></body></html>""",
+    "modern_corporate": """<!DOCTYPE html><html lang="ja"><head><meta charset="utf-8">
+<title>株式会社サンプル製作所 | 精密部品メーカー</title>
+<meta name="description" content="株式会社サンプル製作所は精密部品の製造・加工を行うメーカーです。工場見学も受け付けています。">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<meta property="og:title" content="サンプル製作所"><link rel="icon" href="/favicon.ico">
+<link rel="canonical" href="https://www.example.co.jp/">
+<script async src="https://www.googletagmanager.com/gtag/js?id=G-TEST"></script>
+<script>window.dataLayer=[];function gtag(){dataLayer.push(arguments)}</script>
+<script type="application/ld+json">{"@type":"Organization","telephone":"03-0000-0000"}</script>
+</head><body><header><h1>サンプル製作所</h1><nav><ul>
+""" + "".join(f'<li><a href="/business/{i}/">事業{i}</a></li>' for i in range(40)) + """
+</ul></nav></header><main>
+""" + "".join(f'<article><a href="/news/{i}.html">お知らせ{i}</a><img src="/n{i}.jpg" alt="n{i}"></article>' for i in range(30)) + """
+<form action="/contact/" method="post"><input name="name"><button>送信</button></form></main>
+<footer><a href="/recruit/">採用情報</a><a href="/contact/">お問い合わせ</a>
+<a href="https://twitter.com/sample">X</a><a href="https://www.instagram.com/sample/">Instagram</a>
+<a href="https://www.youtube.com/@sample">YouTube</a><p>TEL 03-1234-5678</p></footer></body></html>""",
+    "spa_shell": """<!DOCTYPE html><html><head><title>App</title>
+<meta name="viewport" content="width=device-width"><link rel="apple-touch-icon" href="/a.png">
+<noscript><iframe src="https://www.googletagmanager.com/ns.html?id=GTM-X"></iframe></noscript>
+</head><body><div id="root"></div><script src="/static/js/main.js"></script></body></html>""",
+    "clinic_with_entities": """<html><head><title>さくら歯科クリニック &amp; 矯正歯科</title>
+<meta name="description" content="駅前の歯科医院です"></head><body>
+<h1>さくら歯科</h1><h1>診療案内</h1><p>ご予約：06&#8208;1234&#8208;5678</p>
+<a href="https://line.me/R/ti/p/@sakura">LINE予約</a><a href=" /careers/ ">スタッフ募集</a>
+<a href="#top">ページトップ</a><a href="javascript:void(0)">メニュー</a>
+<img src="a.jpg" alt=""><img src="b.jpg"></body></html>""",
+}
+
+
+def _score(html: str, backend: str) -> tuple:
+    page = parse_html(html, backend)
+    assert page.backend == backend
+    r = analyze_page(page, URL)
+    return calculate_score(URL, r["seo"], r["links"], r["contact"], r["tech"]), r["category"]
+
+
+@pytest.fixture(params=["lxml", "selectolax"])
+def fast_backend(request: pytest.FixtureRequest) -> str:
+    """高速バックエンド（未インストールならスキップ）"""
+    if request.param not in available_backends():
+        pytest.skip(f"{request.param} 未インストール")
+    return request.param
+
+
+class TestScoreParity:
+    """バックエンド間のスコア一致"""
+
+    @pytest.mark.parametrize("name", sorted(PAGES))
+    def test_same_score_as_html_parser(self, name: str, fast_backend: str) -> None:
+        """正常系: 高速バックエンドでも html.parser と同じスコア・内訳・業種になる"""
+        assert _score(PAGES[name], fast_backend) == _score(PAGES[name], "html.parser")
+
+    def test_same_analysis_dicts(self, fast_backend: str) -> None:
+        """正常系: 分析結果のdictそのものも一致する"""
+        html = PAGES["modern_corporate"]
+        expected = analyze_page(parse_html(html, "html.parser"), URL)
+        assert analyze_page(parse_html(html, fast_backend), URL) == expected
+
+
+class TestFallback:
+    """html.parser へのフォールバック"""
+
+    def test_auto_prefers_fastest(self) -> None:
+        """正常系: auto は利用可能な中で最速のものを選ぶ"""
+        assert resolve_backend("auto") == available_backends()[0]
+
+    def test_error_missing_backend(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """異常系: 未インストールのバックエンド指定時は html.parser になる"""
+        monkeypatch.setattr(parser_backend, "LexborHTMLParser", None)
+        monkeypatch.setattr(parser_backend, "HAS_LXML", False)
+        assert resolve_backend("selectolax") == "html.parser"
+        assert parse_html("<p>x</p>", "auto").backend == "html.parser"
+
+    def test_error_parser_failure(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """異常系: 高速パーサーが例外を出しても html.parser で分析できる"""
+        def broken(text: str) -> None:
+            raise RuntimeError("parse error")
+
+        monkeypatch.setattr(parser_backend, "LexborHTMLParser", broken)
+        page = parse_html(PAGES["legacy_table_site"], "selectolax")
+        assert page.backend == "html.parser"
+        assert analyze_page(page, URL)["contact"]["has_phone"] is True
+
+    def test_boundary_empty_document(self, fast_backend: str) -> None:
+        """境界値: 空文字でもすべてのバックエンドで同じスコアになる"""
+        assert _score("", fast_backend) == _score("", "html.parser")
@@ -0,0 +1,89 @@
+"""
+PDFレポート一括生成のテスト
+
+正常系3・異常系1・境界値2
+"""
+
+import io
+import json
+import os
+import zipfile
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+import reportlab
+
+import pdf_report
+from analysis_core import score_page
+from pdf_batch import iter_report_zip, read_results, report_filename
+from test_page_analyzer import CORPORATE_HTML
+
+VERA = os.path.join(os.path.dirname(reportlab.__file__), "fonts", "Vera.ttf")
+
+
+def make_results(n: int) -> list[dict]:
+    base = score_page("https://www.example.co.jp/", CORPORATE_HTML)
+    return [dict(base, domain=f"www.c{i}.co.jp", analyzed_at="2026-06-01 10:00") for i in range(n)]
+
+
+@pytest.fixture
+def fresh_font_cache() -> Iterator[None]:
+    """フォント検出のキャッシュを空にし、テスト後も元に戻す"""
+    pdf_report.get_japanese_font.cache_clear()
+    yield
+    pdf_report.get_japanese_font.cache_clear()
+
+
+class TestFontCache:
+    """フォント登録のキャッシュ"""
+
+    def test_normal_registered_once(self, monkeypatch: pytest.MonkeyPatch, fresh_font_cache: None) -> None:
+        """正常系: 何社分生成してもフォントの登録は1回だけ"""
+        from reportlab.pdfbase import pdfmetrics
+
+        calls = []
+        register = pdfmetrics.registerFont
+        monkeypatch.setattr(pdfmetrics, "registerFont", lambda f: (calls.append(f.fontName), register(f)))
+        monkeypatch.setattr(pdf_report, "FONT_CANDIDATES", [(VERA, "TestVera")])
+        for r in make_results(3):
+            pdf_report.generate_report_pdf(r)
+        assert calls.count("TestVera") == 1
+
+    def test_error_no_font_falls_back(self, monkeypatch: pytest.MonkeyPatch, fresh_font_cache: None) -> None:
+        """異常系: 日本語フォントが無くてもHelveticaでPDFを生成できる"""
+        monkeypatch.setattr(pdf_report, "FONT_CANDIDATES", [("/nonexistent/font.ttc", "X")])
+        assert pdf_report.get_japanese_font() == "Helvetica"
+        assert pdf_report.generate_report_pdf(make_results(1)[0]).startswith(b"%PDF")
+
+
+class TestReportZip:
+    """ZIPへの一括出力"""
+
+    def test_normal_process_pool_zip(self) -> None:
+        """正常系: プロセスプールで生成した全社分のPDFがZIPに入る"""
+        data = b"".join(iter_report_zip(make_results(5), processes=2))
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            assert sorted(zf.namelist()) == sorted(f"report_www.c{i}.co.jp_20260601.pdf" for i in range(5))
+            assert all(zf.read(n).startswith(b"%PDF") for n in zf.namelist())
+
+    def test_normal_jsonl_input(self, tmp_path: Path) -> None:
+        """正常系: analyze_cli のJSONLから、エラー行を除いて読み込む"""
+        path = tmp_path / "results.jsonl"
+        rows = make_results(2) + [{"url": "https://x.jp/", "error": "タイムアウト"}]
+        path.write_text("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in rows), encoding="utf-8")
+        assert [r["domain"] for r in read_results(str(path))] == ["www.c0.co.jp", "www.c1.co.jp"]
+
+    def test_boundary_duplicate_names_and_port(self) -> None:
+        """境界値: 同じドメインは連番を付け、ポートの : はファイル名に使わない"""
+        results = [dict(r, domain="localhost:8501") for r in make_results(2)]
+        assert report_filename(results[0]) == "report_localhost_8501_20260601.pdf"
+        data = b"".join(iter_report_zip(results, processes=1))
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            assert zf.namelist() == ["report_localhost_8501_20260601.pdf", "report_localhost_8501_20260601_2.pdf"]
+
+    def test_boundary_empty(self) -> None:
+        """境界値: 0件でも空の正しいZIPになる"""
+        data = b"".join(iter_report_zip([], processes=2))
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            assert zf.namelist() == []
@@ -0,0 +1,118 @@
+"""
+HTTPレスポンスキャッシュのテスト
+
+正常系3・異常系2・境界値1
+"""
+
+from pathlib import Path
+
+import pytest
+import requests
+
+from response_cache import ResponseCache, cache_key, cached_fetch, hit_rate
+
+URL = "https://example.co.jp/"
+
+
+class FakeResponse:
+    """requests.Response の代用"""
+
+    def __init__(self, status: int, body: bytes = b"", headers: dict | None = None) -> None:
+        self.status_code = status
+        self.content = body
+        self.headers = headers or {}
+        self.encoding = "utf-8"
+        self.apparent_encoding = "utf-8"
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding)
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(response=self)
+
+
+class FakeSession:
+    """ETagが一致すれば304を返すサーバーの代用"""
+
+    def __init__(self, body: bytes = "<title>テスト</title>".encode(), etag: str = '"v1"') -> None:
+        self.body = body
+        self.etag = etag
+        self.requests: list[dict] = []
+
+    def get(self, url: str, headers: dict, **kwargs) -> FakeResponse:
+        self.requests.append(headers)
+        if headers.get("If-None-Match") == self.etag:
+            return FakeResponse(304)
+        return FakeResponse(200, self.body, {"ETag": self.etag, "Last-Modified": "Mon, 01 Jun 2026 00:00:00 GMT"})
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> ResponseCache:
+    """テスト用キャッシュ（一時ファイル）"""
+    return ResponseCache(tmp_path / "cache.sqlite3", ttl=3600)
+
+
+class TestCachedFetch:
+    """cached_fetch のテスト"""
+
+    def test_normal_miss_then_hit(self, cache: ResponseCache) -> None:
+        """正常系: 2回目はTTL内なのでネットワークに出ない"""
+        session = FakeSession()
+        assert cached_fetch(URL, cache, session=session) == ("<title>テスト</title>", "miss")
+        assert cached_fetch(URL, cache, session=session) == ("<title>テスト</title>", "hit")
+        assert len(session.requests) == 1
+
+    def test_normal_revalidate_with_304(self, cache: ResponseCache) -> None:
+        """正常系: TTL切れは条件付きリクエストで再検証し、304ならキャッシュ本文を返す"""
+        session = FakeSession()
+        cached_fetch(URL, cache, session=session)
+        cache.ttl = 0
+        text, outcome = cached_fetch(URL, cache, session=session)
+        assert outcome == "revalidated"
+        assert text == "<title>テスト</title>"
+        assert session.requests[-1]["If-None-Match"] == '"v1"'
+        assert "If-Modified-Since" in session.requests[-1]
+
+    def test_normal_changed_page_is_refetched(self, cache: ResponseCache) -> None:
+        """正常系: ETagが変わっていれば本文を取り直して上書きする"""
+        cached_fetch(URL, cache, session=FakeSession())
+        cache.ttl = 0
+        text, outcome = cached_fetch(URL, cache, session=FakeSession(b"new", '"v2"'))
+        assert (text, outcome) == ("new", "miss")
+        assert cache.get(URL).etag == '"v2"'
+
+    def test_error_http_error_not_cached(self, cache: ResponseCache) -> None:
+        """異常系: HTTPエラーは例外になり、キャッシュされない"""
+        class NotFound(FakeSession):
+            def get(self, url: str, headers: dict, **kwargs) -> FakeResponse:
+                return FakeResponse(404)
+
+        with pytest.raises(requests.exceptions.HTTPError):
+            cached_fetch(URL, cache, session=NotFound())
+        assert len(cache) == 0
+
+    def test_error_without_cache(self) -> None:
+        """異常系: cache=None でも通常の取得として動く"""
+        assert cached_fetch(URL, None, session=FakeSession())[1] == "miss"
+
+
+class TestCacheStore:
+    """キャッシュ本体のテスト"""
+
+    def test_persisted_across_instances(self, tmp_path: Path) -> None:
+        """正常系: 再起動（別インスタンス）後もキャッシュが残る"""
+        path = tmp_path / "cache.sqlite3"
+        cached_fetch(URL, ResponseCache(path), session=FakeSession())
+        assert ResponseCache(path).get("HTTPS://EXAMPLE.co.jp:443/#top") is not None
+
+    def test_boundary_key_normalization(self) -> None:
+        """境界値: 大文字ホスト・既定ポート・フラグメントは同じキーになる"""
+        assert cache_key("HTTPS://Example.CO.JP:443/#top") == cache_key(URL)
+        assert cache_key("http://example.co.jp:8080") == "http://example.co.jp:8080/"
+
+    def test_hit_rate(self) -> None:
+        """正常系: 304もヒットとして数える"""
+        assert hit_rate({"hit": 1, "revalidated": 2, "miss": 1}) == 0.75
+        assert hit_rate({}) == 0.0
@@ -0,0 +1,109 @@
+"""
+分析結果データベースのテスト
+
+正常系4・異常系1・境界値2
+"""
+
+from pathlib import Path
+
+import pytest
+
+import results_store
+from results_store import ResultsStore, content_hash, score_or_reuse
+
+URL = "https://example.co.jp/"
+
+
+def make_result(url: str = URL, score: int = 42) -> dict:
+    """run_analysis の結果と同じ形のdict"""
+    return {
+        "url": url, "domain": url.split("/")[2], "score": score, "rank": "A", "rank_label": "要検討",
+        "rank_class": "a", "details": [("HTTPS対応", 10, 10, "✅")], "seo": {}, "links": {"sns_count": 1},
+        "contact": {}, "tech": {}, "category": "製造業",
+    }
+
+
+class Scorer:
+    """呼び出し回数を数える score_fn"""
+
+    def __init__(self, score: int = 42) -> None:
+        self.score = score
+        self.calls = 0
+
+    def __call__(self, text: str) -> dict:
+        self.calls += 1
+        return make_result(score=self.score)
+
+
+@pytest.fixture
+def store(tmp_path: Path) -> ResultsStore:
+    """テスト用結果DB（一時ファイル）"""
+    return ResultsStore(tmp_path / "results.sqlite3")
+
+
+class TestScoreOrReuse:
+    """score_or_reuse のテスト"""
+
+    def test_normal_unchanged_page_is_not_rescored(self, store: ResultsStore) -> None:
+        """正常系: 本文が同じなら採点せず前回結果を再利用し、分析日時だけ新しくなる"""
+        scorer = Scorer()
+        first, reused1 = score_or_reuse(URL, "<p>a</p>", store, scorer, "2026-06-01 10:00")
+        second, reused2 = score_or_reuse(URL, "<p>a</p>", store, scorer, "2026-06-02 10:00")
+        assert (reused1, reused2, scorer.calls) == (False, True, 1)
+        assert second["score"] == first["score"]
+        assert second["analyzed_at"] == "2026-06-02 10:00"
+        assert len(store) == 2
+
+    def test_normal_changed_page_is_rescored(self, store: ResultsStore) -> None:
+        """正常系: 本文が変わったら採点し直す"""
+        score_or_reuse(URL, "<p>a</p>", store, Scorer(40), "2026-06-01 10:00")
+        result, reused = score_or_reuse(URL, "<p>b</p>", store, Scorer(60), "2026-06-02 10:00")
+        assert (result["score"], reused) == (60, False)
+
+    def test_normal_scoring_version_invalidates(self, store: ResultsStore, monkeypatch: pytest.MonkeyPatch) -> None:
+        """正常系: 配点のバージョンが上がると同じ本文でも採点し直す"""
+        score_or_reuse(URL, "<p>a</p>", store, Scorer(), "2026-06-01 10:00")
+        monkeypatch.setattr(results_store, "SCORING_VERSION", 999)
+        assert score_or_reuse(URL, "<p>a</p>", store, Scorer(), "2026-06-02 10:00")[1] is False
+
+    def test_error_without_store(self) -> None:
+        """異常系: store=None でも毎回採点して結果を返す"""
+        scorer = Scorer()
+        score_or_reuse(URL, "x", None, scorer, "2026-06-01 10:00")
+        score_or_reuse(URL, "x", None, scorer, "2026-06-01 10:00")
+        assert scorer.calls == 2
+
+
+class TestQueries:
+    """履歴・推移の取得"""
+
+    def test_persisted_history_and_trend(self, tmp_path: Path) -> None:
+        """正常系: 再起動後も履歴が新しい順に取れ、推移・前回比が集計される"""
+        path = tmp_path / "results.sqlite3"
+        s = ResultsStore(path)
+        for day, score in [(1, 30), (3, 50), (2, 40)]:
+            s.save(dict(make_result(score=score), analyzed_at=f"2026-06-0{day} 09:00"), content_hash(str(score)))
+        s.save(dict(make_result("https://other.jp/", 70), analyzed_at="2026-05-01 09:00"), "h")
+
+        s = ResultsStore(path)
+        assert [r["score"] for r in s.history()] == [50, 40, 30, 70]
+        assert s.trend("example.co.jp") == [("2026-06-01 09:00", 30), ("2026-06-02 09:00", 40), ("2026-06-03 09:00", 50)]
+        summary = s.domain_summary()
+        assert summary[0] == {
+            "domain": "example.co.jp", "analyses": 3, "latest_score": 50, "previous_score": 40,
+            "min_score": 30, "max_score": 50, "last_analyzed_at": "2026-06-03 09:00",
+        }
+        assert summary[1]["previous_score"] is None
+
+    def test_boundary_history_limit(self, store: ResultsStore) -> None:
+        """境界値: limit件までしか返さない"""
+        for i in range(5):
+            store.save(dict(make_result(score=i), analyzed_at=f"2026-06-01 0{i}:00"), "h")
+        assert [r["score"] for r in store.history(limit=2)] == [4, 3]
+
+    def test_boundary_empty_and_indexes(self, store: ResultsStore) -> None:
+        """境界値: 空のDBでも各クエリが動き、domain / analyzed_at のインデックスがある"""
+        assert (store.history(), store.domain_summary(), store.trend("x"), len(store)) == ([], [], [], 0)
+        plan = " ".join(r[3] for r in store._conn.execute(
+            "EXPLAIN QUERY PLAN SELECT analyzed_at, score FROM results WHERE domain = ? ORDER BY analyzed_at", ("x",)))
+        assert "idx_results_domain" in plan
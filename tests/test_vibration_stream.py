@@ -0,0 +1,103 @@
+"""
+振動データのストリーミング解析のテスト
+
+正常系4・異常系2・境界値1
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import signal
+
+from api_shared import segment_stats
+from vibration_stream import EnvelopeStream, RunningStats, analyze_csv_stream
+
+FS = 500
+
+
+def make_signal(n: int, seed: int = 0) -> np.ndarray:
+    """160Hzの搬送波を13HzでAM変調し、37Hzの成分とノイズ・オフセットを足した信号"""
+    t = np.arange(n) / FS
+    rng = np.random.default_rng(seed)
+    return (1.0 + 0.2 * np.sin(2 * np.pi * 37 * t)
+            + (1 + 0.8 * np.sin(2 * np.pi * 13 * t)) * 0.3 * np.sin(2 * np.pi * 160 * t)
+            + rng.normal(0, 0.05, n))
+
+
+def write_csv(path: Path, az: np.ndarray) -> str:
+    t_us = (np.arange(len(az)) * 1e6 / FS).astype(np.int64)
+    pd.DataFrame({"timestamp_us": t_us, "ax": 0.0, "ay": 0.0, "az": az}).to_csv(path, index=False)
+    return str(path)
+
+
+def batch_scores(az: np.ndarray, segment_len: int) -> tuple[float, float, float]:
+    """一括解析と同じ前処理（平均除去＋5σクリッピング）をしたときの RMS平均・標準偏差・最大|Z|"""
+    x = az - np.mean(az)
+    std = np.std(x)
+    rms = segment_stats(np.clip(x, -5 * std, 5 * std), segment_len)["rms"]
+    z = (rms - rms.mean()) / (rms.std() + 1e-10)
+    return rms.mean(), rms.std(), np.max(np.abs(z))
+
+
+class TestStreamAnalysis:
+    """analyze_csv_stream のテスト"""
+
+    def test_normal_scores_match_batch(self, tmp_path: Path) -> None:
+        """正常系: チャンクの境目がセグメントとずれていても、RMS・Zスコアは一括解析と一致する"""
+        az = make_signal(FS * 60 + 123)
+        az[FS * 30:FS * 31] *= 5
+        result = analyze_csv_stream(write_csv(tmp_path / "v.csv", az), FS, FS, chunk_rows=777)
+        mean_rms, std_rms, max_z = batch_scores(az, FS)
+        assert result["n_segments"] == 60
+        assert result["sample_count"] == len(az)
+        assert result["mean_rms"] == pytest.approx(mean_rms, rel=1e-9)
+        assert result["std_rms"] == pytest.approx(std_rms, rel=1e-9)
+        assert result["max_z"] == pytest.approx(max_z, rel=1e-9)
+
+    def test_normal_spectrum_and_envelope_peaks(self, tmp_path: Path) -> None:
+        """正常系: Welch平均のピークは搬送波、エンベロープのピークは変調周波数になる"""
+        path = write_csv(tmp_path / "v.csv", make_signal(FS * 120))
+        result = analyze_csv_stream(path, FS, FS, chunk_rows=10_000, nperseg=2048)
+        assert result["freq"][np.argmax(result["amp"])] == pytest.approx(160, abs=0.5)
+        assert result["env_freq"][np.argmax(result["env_amp"])] == pytest.approx(13, abs=0.5)
+
+    def test_normal_envelope_matches_full_hilbert(self) -> None:
+        """正常系: ブロックごとのヒルベルト変換は、端を除いて全長の変換とほぼ一致する"""
+        x = make_signal(FS * 60) - 1.0
+        stream = EnvelopeStream(FS)
+        env = np.concatenate([stream.update(x[i:i + 3333]) for i in range(0, len(x), 3333)] + [stream.flush()])
+        ref = np.abs(signal.hilbert(signal.sosfilt(stream.sos, x)))
+        assert len(env) == len(x)
+        assert np.max(np.abs(env - ref)[1000:-1000]) < 0.005 * ref.max()
+
+    def test_normal_running_stats(self) -> None:
+        """正常系: 分割して取り込んだ平均・標準偏差・最小・最大が全体の値と一致する"""
+        values = np.random.default_rng(1).normal(3, 2, 10_001)
+        stats = RunningStats()
+        for part in np.array_split(values, 7):
+            stats.update(part)
+        stats.update(np.empty(0))
+        assert stats.n == len(values)
+        assert stats.mean == pytest.approx(values.mean())
+        assert stats.std == pytest.approx(values.std())
+        assert (stats.min, stats.max) == (values.min(), values.max())
+
+    def test_error_missing_file(self, tmp_path: Path) -> None:
+        """異常系: ファイルが無ければ FileNotFoundError"""
+        with pytest.raises(FileNotFoundError):
+            analyze_csv_stream(str(tmp_path / "none.csv"), FS, FS)
+
+    def test_error_too_short(self, tmp_path: Path) -> None:
+        """異常系: 1セグメントに満たないデータは ValueError"""
+        with pytest.raises(ValueError, match="データが短すぎます"):
+            analyze_csv_stream(write_csv(tmp_path / "v.csv", make_signal(FS - 1)), FS, FS)
+
+    def test_boundary_shorter_than_welch_frame(self, tmp_path: Path) -> None:
+        """境界値: Welchの1フレームに満たない長さでも、全長を1フレームとしてスペクトルを返す"""
+        path = write_csv(tmp_path / "v.csv", make_signal(FS * 3))
+        result = analyze_csv_stream(path, FS, FS, chunk_rows=7, nperseg=4096)
+        assert result["n_segments"] == 3
+        assert len(result["freq"]) == FS * 3 // 2 + 1
+        assert result["freq"][np.argmax(result["amp"])] == pytest.approx(160, abs=1)
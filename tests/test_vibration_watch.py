@@ -0,0 +1,144 @@
+"""
+振動データディレクトリ監視のテスト
+
+正常系4・異常系1・境界値1
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from vibration_watch import (
+    InotifyWatcher, PollingWatcher, ProcessedLedger, watch_directory,
+)
+
+
+def write(path: Path, text: str = "timestamp_us,ax,ay,az\n0,0,0,1\n") -> str:
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def wait_for(cond, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if cond():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+class TestLedger:
+    """処理済み台帳のテスト"""
+
+    def test_normal_persist_and_rewrite(self, tmp_path: Path) -> None:
+        """正常系: 記録は再起動後も残り、内容が書き換わったファイルは未処理に戻る"""
+        csv = write(tmp_path / "vibration_001.csv")
+        ledger = ProcessedLedger(tmp_path / "ledger.sqlite3")
+        assert not ledger.is_done(csv)
+        ledger.record(csv, "ok", max_z=1.5)
+        ledger.close()
+
+        ledger = ProcessedLedger(tmp_path / "ledger.sqlite3")
+        assert ledger.is_done(csv) and len(ledger) == 1
+        write(tmp_path / "vibration_001.csv", "timestamp_us,ax,ay,az\n0,0,0,1\n1,0,0,2\n")
+        assert not ledger.is_done(csv)
+
+
+class TestWatchDirectory:
+    """watch_directory のテスト"""
+
+    def _run(self, tmp_path: Path, handler, watcher) -> tuple[threading.Thread, threading.Event, ProcessedLedger]:
+        ledger = ProcessedLedger(":memory:")
+        stop = threading.Event()
+        thread = threading.Thread(
+            target=watch_directory, args=(str(tmp_path), handler, ledger),
+            kwargs={"watcher": watcher, "stop": stop, "timeout": 0.05}, daemon=True,
+        )
+        thread.start()
+        return thread, stop, ledger
+
+    def test_normal_backlog_then_new_files(self, tmp_path: Path) -> None:
+        """正常系: 起動前からあるファイルを名前順に処理し、その後に届いたファイルも処理する"""
+        write(tmp_path / "vibration_002.csv")
+        write(tmp_path / "vibration_001.csv")
+        write(tmp_path / "other.csv")
+        done = []
+        thread, stop, ledger = self._run(
+            tmp_path, lambda p: done.append(os.path.basename(p)) or {"max_z": 0.0},
+            PollingWatcher(str(tmp_path), interval=0.05),
+        )
+        assert wait_for(lambda: len(done) == 2)
+        write(tmp_path / "vibration_003.csv")
+        assert wait_for(lambda: len(done) == 3)
+        stop.set()
+        thread.join(2)
+        assert done == ["vibration_001.csv", "vibration_002.csv", "vibration_003.csv"]
+        assert len(ledger) == 3
+
+    def test_normal_inotify_close_write_and_rename(self, tmp_path: Path) -> None:
+        """正常系: inotify で書き込み完了・リネームを検知し、対象外の名前は無視する"""
+        try:
+            watcher = InotifyWatcher(str(tmp_path))
+        except OSError:
+            pytest.skip("inotify が使えない環境")
+        write(tmp_path / "vibration_001.csv")
+        write(tmp_path / "tmp.part")
+        os.rename(tmp_path / "tmp.part", tmp_path / "vibration_002.csv")
+        write(tmp_path / "notes.txt")
+        found = []
+        assert wait_for(lambda: found.extend(watcher.poll(0.05)) or len(found) >= 2)
+        watcher.close()
+        assert sorted(map(os.path.basename, found)) == ["vibration_001.csv", "vibration_002.csv"]
+
+    def test_normal_skip_processed(self, tmp_path: Path) -> None:
+        """正常系: 台帳に記録済みのファイルは処理しない"""
+        csv = write(tmp_path / "vibration_001.csv")
+        ledger = ProcessedLedger(":memory:")
+        ledger.record(csv, "ok")
+        stop = threading.Event()
+        stop.set()
+        calls = []
+        watch_directory(str(tmp_path), calls.append, ledger,
+                        watcher=PollingWatcher(str(tmp_path), interval=0.01), stop=stop)
+        assert calls == []
+
+    def test_error_handler_failure_recorded(self, tmp_path: Path) -> None:
+        """異常系: 解析に失敗しても監視は続き、失敗したファイルは書き換わるまで再試行しない"""
+        write(tmp_path / "vibration_001.csv")
+        calls = []
+
+        def handler(path: str) -> dict:
+            calls.append(os.path.basename(path))
+            if path.endswith("001.csv"):
+                raise ValueError("データが短すぎます")
+            return {"max_z": 1.0}
+
+        thread, stop, ledger = self._run(tmp_path, handler, PollingWatcher(str(tmp_path), interval=0.05))
+        assert wait_for(lambda: len(calls) == 1)
+        write(tmp_path / "vibration_002.csv")
+        assert wait_for(lambda: len(calls) == 2)
+        time.sleep(0.3)
+        stop.set()
+        thread.join(2)
+        assert calls == ["vibration_001.csv", "vibration_002.csv"]
+        row = ledger._conn.execute("SELECT status, error FROM processed WHERE path LIKE '%001.csv'").fetchone()
+        assert row == ("error", "データが短すぎます")
+
+
+class TestPollingWatcher:
+    """ポーリング監視のテスト"""
+
+    def test_boundary_wait_until_stable(self, tmp_path: Path) -> None:
+        """境界値: 書き込み途中（サイズが変わり続ける）のファイルは、止まるまで返さない"""
+        watcher = PollingWatcher(str(tmp_path), interval=0.01)
+        path = tmp_path / "vibration_001.csv"
+        write(path, "timestamp_us,ax,ay,az\n")
+        assert watcher.poll() == []
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("0,0,0,1\n")
+        assert watcher.poll() == []  # 前回とサイズが違う
+        assert watcher.poll() == [str(path)]  # 2回続けて同じ
+        assert watcher.poll() == []  # 同じ内容は1回だけ
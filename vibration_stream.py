@@ -0,0 +1,343 @@
+# -*- coding: utf-8 -*-
+"""
+振動データのストリーミング解析
+
+長時間のCSV（500Hzで1日分、25.6kHzの計測など）を一定のメモリで解析する。
+CSVはチャンク単位で読み、解析の状態だけを持ち越す。
+
+  - 前処理: 1回目の読み込みで平均・標準偏差を求め、2回目で平均除去＋5σクリッピング
+  - セグメント統計: 端数を次のチャンクに持ち越し、RMSの平均・分散・最小・最大を逐次更新
+  - スペクトル: Welch法（ハニング窓・50%オーバーラップ）で振幅スペクトルを平均
+  - エンベロープ: バンドパスはフィルタ状態を持ち越し、ヒルベルト変換は
+    前後にガード区間を付けたブロックごとに行う（オーバーラップセーブ）
+
+RMS・Zスコアは一括解析（analyze_vibration.compute_scores）と同じ値になる。
+スペクトルは全長FFTではなくWelch平均なので、周波数分解能は fs / nperseg。
+pandas・scipy.signal は使うときに読み込む（analyze_vibration の起動を遅くしない）。
+"""
+
+import math
+import os
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from api_shared import EPS, dsp_cache, segment_stats
+
+# ── 定数 ──────────────────────────────────────────────────────
+CHUNK_ROWS = 100_000
+NPERSEG = 4096
+HILBERT_BLOCK = 8192
+HILBERT_GUARD = 512
+
+
+# ════════════════════════════════════════════════════════════
+# 逐次計算の部品
+# ════════════════════════════════════════════════════════════
+
+
+class RunningStats:
+    """平均・分散・最小・最大を逐次計算する（Chanの並列アルゴリズム）。"""
+
+    def __init__(self) -> None:
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values: np.ndarray) -> None:
+        """値の配列をまとめて取り込む。
+
+        Args:
+            values: 追加する値
+        """
+        n_b = len(values)
+        if n_b == 0:
+            return
+        mean_b = float(np.mean(values))
+        m2_b = float(np.sum((values - mean_b) ** 2))
+        n = self.n + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / n
+        self.m2 += m2_b + delta * delta * self.n * n_b / n
+        self.n = n
+        self.min = min(self.min, float(np.min(values)))
+        self.max = max(self.max, float(np.max(values)))
+
+    @property
+    def std(self) -> float:
+        """母標準偏差（np.std と同じ定義）。"""
+        return math.sqrt(self.m2 / self.n) if self.n else 0.0
+
+
+class SegmentAccumulator:
+    """チャンクをまたいでセグメント統計量を計算する。
+
+    Args:
+        segment_len: セグメント長（サンプル数）
+    """
+
+    def __init__(self, segment_len: int) -> None:
+        self.segment_len = segment_len
+        self.rms = RunningStats()
+        self.max_peak = 0.0
+        self.max_cf = 0.0
+        self.max_kurtosis = 0.0
+        self._carry = np.empty(0)
+
+    def update(self, x: np.ndarray) -> dict:
+        """チャンクを取り込み、完成したセグメントの統計量を返す。
+
+        Args:
+            x: 前処理済みのチャンク
+
+        Returns:
+            dict: segment_stats の戻り値（このチャンクで完成したセグメント分）
+        """
+        buf = np.concatenate([self._carry, x])
+        stats = segment_stats(buf, self.segment_len)
+        n_done = len(stats["rms"]) * self.segment_len
+        self._carry = buf[n_done:]
+        if n_done:
+            self.rms.update(stats["rms"])
+            self.max_peak = max(self.max_peak, float(stats["peak"].max()))
+            self.max_cf = max(self.max_cf, float(stats["cf"].max()))
+            self.max_kurtosis = max(
+                self.max_kurtosis, float(stats["kurtosis"].max())
+            )
+        return stats
+
+    def z_score(self, rms: np.ndarray) -> np.ndarray:
+        """これまでのRMSの平均・標準偏差に対するZスコア。"""
+        return (rms - self.rms.mean) / (self.rms.std + EPS)
+
+    @property
+    def max_z(self) -> float:
+        """全セグメントのZスコアの絶対値の最大（最小・最大RMSから求める）。"""
+        if not self.rms.n:
+            return 0.0
+        dev = max(self.rms.max - self.rms.mean, self.rms.mean - self.rms.min)
+        return dev / (self.rms.std + EPS)
+
+
+class WelchAccumulator:
+    """Welch法で振幅スペクトルを逐次平均する。
+
+    振幅のスケールは compute_fft（ハニング窓・2/n）に合わせる。
+
+    Args:
+        fs: サンプリング周波数
+        nperseg: 1フレームのサンプル数
+    """
+
+    def __init__(self, fs: float, nperseg: int = NPERSEG) -> None:
+        self.fs = fs
+        self.nperseg = nperseg
+        self.step = nperseg // 2
+        self.window = dsp_cache.hanning(nperseg)
+        self.power = np.zeros(nperseg // 2 + 1)
+        self.frames = 0
+        self._carry = np.empty(0)
+
+    def update(self, x: np.ndarray) -> None:
+        """チャンクを取り込む（フレームに満たない端数は持ち越す）。
+
+        Args:
+            x: 時系列データのチャンク
+        """
+        buf = np.concatenate([self._carry, x])
+        if len(buf) < self.nperseg:
+            self._carry = buf
+            return
+        frames = sliding_window_view(buf, self.nperseg)[:: self.step]
+        frames = frames - frames.mean(axis=1, keepdims=True)
+        spec = np.fft.rfft(frames * self.window, axis=1)
+        self.power += np.sum(spec.real**2 + spec.imag**2, axis=0)
+        self.frames += len(frames)
+        self._carry = buf[len(frames) * self.step :]
+
+    def result(self) -> tuple:
+        """平均した振幅スペクトルを返す。
+
+        1フレームに満たない短いデータは、全長を1フレームとして計算する。
+
+        Returns:
+            tuple: (周波数配列, 振幅配列)
+        """
+        if self.frames == 0:
+            x = self._carry if len(self._carry) else np.zeros(1)
+            x = x - np.mean(x)
+            n = len(x)
+            amp = np.abs(np.fft.rfft(x * dsp_cache.hanning(n))) * 2 / n
+            return dsp_cache.rfftfreq(n, self.fs), amp
+        amp = np.sqrt(self.power / self.frames) * 2 / self.nperseg
+        return dsp_cache.rfftfreq(self.nperseg, self.fs), amp
+
+
+class EnvelopeStream:
+    """バンドパス＋ヒルベルト変換によるエンベロープを逐次計算する。
+
+    フィルタは状態（zi）を持ち越すので一括処理と同じ出力になる。
+    ヒルベルト変換は前後に guard サンプルの余白を付けたブロックで行い、
+    余白を捨てた中央部分だけを出力する（オーバーラップセーブ）。
+    信号の前には guard 個の0を置く（フィルタの初期状態と同じく、開始前は0とみなす）。
+
+    Args:
+        fs: サンプリング周波数
+        band_low: バンドパスフィルタ下限周波数
+        band_high: バンドパスフィルタ上限周波数（Noneならナイキストの0.9倍）
+        block: ヒルベルト変換のブロック長
+        guard: 片側の余白サンプル数
+    """
+
+    def __init__(
+        self,
+        fs: float,
+        band_low: float = 50.0,
+        band_high: float = None,
+        block: int = HILBERT_BLOCK,
+        guard: int = HILBERT_GUARD,
+    ) -> None:
+        if band_high is None:
+            band_high = fs / 2 * 0.9
+        self.sos = dsp_cache.bandpass_sos(fs, band_low, band_high)
+        self.zi = np.zeros((self.sos.shape[0], 2))
+        self.block = block
+        self.guard = guard
+        self.step = block - 2 * guard
+        self._buf = np.zeros(guard)
+
+    def update(self, x: np.ndarray) -> np.ndarray:
+        """チャンクを取り込み、確定したエンベロープを返す。
+
+        Args:
+            x: 前処理済みのチャンク
+
+        Returns:
+            np.ndarray: エンベロープ（入力より guard 程度遅れて出てくる）
+        """
+        from scipy import signal
+
+        xf, self.zi = signal.sosfilt(self.sos, x, zi=self.zi)
+        buf = np.concatenate([self._buf, xf])
+        if len(buf) < self.block:
+            self._buf = buf
+            return np.empty(0)
+        frames = sliding_window_view(buf, self.block)[:: self.step]
+        env = np.abs(signal.hilbert(frames, axis=1))
+        self._buf = buf[len(frames) * self.step :]
+        return env[:, self.guard : self.block - self.guard].ravel()
+
+    def flush(self) -> np.ndarray:
+        """残りのサンプルのエンベロープを返す。"""
+        from scipy import signal
+
+        buf, self._buf = self._buf, np.zeros(self.guard)
+        if len(buf) <= self.guard:
+            return np.empty(0)
+        return np.abs(signal.hilbert(buf))[self.guard :]
+
+
+# ════════════════════════════════════════════════════════════
+# CSVのストリーミング解析
+# ════════════════════════════════════════════════════════════
+
+
+def iter_csv_chunks(
+    file_path: str, axis: str = "az", chunk_rows: int = CHUNK_ROWS
+):
+    """CSVの1列をチャンク単位で読み出す。
+
+    Args:
+        file_path: CSVファイルのパス
+        axis: 読み出す列名
+        chunk_rows: 1チャンクの行数
+
+    Yields:
+        np.ndarray: float64 のチャンク
+    """
+    import pandas as pd
+
+    reader = pd.read_csv(
+        file_path, usecols=[axis], dtype={axis: np.float64},
+        chunksize=chunk_rows,
+    )
+    with reader:
+        for chunk in reader:
+            yield chunk[axis].to_numpy()
+
+
+def analyze_csv_stream(
+    file_path: str,
+    fs: float,
+    segment_len: int,
+    axis: str = "az",
+    chunk_rows: int = CHUNK_ROWS,
+    nperseg: int = NPERSEG,
+) -> dict:
+    """CSVをチャンク単位で2回読み、一定のメモリで解析する。
+
+    Args:
+        file_path: CSVファイルのパス
+        fs: サンプリング周波数
+        segment_len: セグメント長（サンプル数）
+        axis: 解析対象の軸名
+        chunk_rows: 1チャンクの行数
+        nperseg: Welch法の1フレームのサンプル数
+
+    Returns:
+        dict: sample_count, rms_total, mean_rms, std_rms, max_z, n_segments,
+              max_peak, max_cf, max_kurtosis, freq, amp, env_freq, env_amp
+
+    Raises:
+        FileNotFoundError: ファイルが存在しない場合
+        ValueError: データが短すぎる場合
+    """
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(
+            f"CSVファイルが見つかりません: {file_path}"
+        )
+
+    # 1回目: 平均・標準偏差（前処理のクリッピング幅）
+    raw = RunningStats()
+    for chunk in iter_csv_chunks(file_path, axis, chunk_rows):
+        raw.update(chunk)
+    if raw.n < segment_len:
+        raise ValueError(
+            f"データが短すぎます。"
+            f"{segment_len}サンプル以上必要です。"
+        )
+    limit = 5 * raw.std
+
+    # 2回目: 前処理 → セグメント統計・スペクトル・エンベロープ
+    segments = SegmentAccumulator(segment_len)
+    spectrum = WelchAccumulator(fs, nperseg)
+    env_spectrum = WelchAccumulator(fs, nperseg)
+    envelope = EnvelopeStream(fs)
+    sum_sq = 0.0
+    for chunk in iter_csv_chunks(file_path, axis, chunk_rows):
+        x = np.clip(chunk - raw.mean, -limit, limit)
+        sum_sq += float(np.dot(x, x))
+        segments.update(x)
+        spectrum.update(x)
+        env_spectrum.update(envelope.update(x))
+    env_spectrum.update(envelope.flush())
+
+    freq, amp = spectrum.result()
+    env_freq, env_amp = env_spectrum.result()
+    return {
+        "sample_count": raw.n,
+        "rms_total": math.sqrt(sum_sq / raw.n),
+        "mean_rms": segments.rms.mean,
+        "std_rms": segments.rms.std,
+        "max_z": segments.max_z,
+        "n_segments": segments.rms.n,
+        "max_peak": segments.max_peak,
+        "max_cf": segments.max_cf,
+        "max_kurtosis": segments.max_kurtosis,
+        "freq": freq,
+        "amp": amp,
+        "env_freq": env_freq,
+        "env_amp": env_amp,
+    }
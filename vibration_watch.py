@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+"""
+振動データディレクトリの監視
+
+analyze_vibration.py の常駐モード（--watch）で使う。
+新しいCSVが書き込まれたら、起動済みのプロセスのまま解析する。
+
+  - 監視: Linux では inotify（書き込み完了・移動を検知）、使えなければポーリング
+  - 処理済み台帳: SQLite にパス・サイズ・更新時刻を記録し、再起動しても二重に解析しない
+    （同じパスでも内容が書き換わっていれば再解析する）
+"""
+
+import ctypes
+import ctypes.util
+import fnmatch
+import glob
+import logging
+import os
+import select
+import sqlite3
+import struct
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# ── 定数 ──────────────────────────────────────────────────────
+PATTERN = "vibration_*.csv"
+POLL_INTERVAL = 2.0
+
+# inotify のイベント（<sys/inotify.h>）
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+_EVENT = struct.Struct("iIII")
+
+
+# ════════════════════════════════════════════════════════════
+# 処理済み台帳
+# ════════════════════════════════════════════════════════════
+
+
+class ProcessedLedger:
+    """解析済みファイルの台帳（SQLite）。
+
+    Args:
+        path: SQLiteファイルのパス
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = str(path)
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS processed (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                max_z REAL,
+                error TEXT,
+                processed_at TEXT NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    @staticmethod
+    def _signature(path: str) -> tuple:
+        st = os.stat(path)
+        return st.st_size, st.st_mtime_ns
+
+    def is_done(self, path: str) -> bool:
+        """同じ内容（サイズ・更新時刻）で処理済みなら True。"""
+        try:
+            size, mtime_ns = self._signature(path)
+        except FileNotFoundError:
+            return True
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns FROM processed WHERE path = ?",
+                (os.path.abspath(path),),
+            ).fetchone()
+        return row == (size, mtime_ns)
+
+    def record(
+        self, path: str, status: str, max_z: float = None,
+        error: str = None,
+    ) -> None:
+        """処理結果を記録する（エラーも記録し、書き換わるまで再試行しない）。
+
+        Args:
+            path: CSVファイルのパス
+            status: "ok" / "error"
+            max_z: 最大Zスコア
+            error: エラーメッセージ
+        """
+        size, mtime_ns = self._signature(path)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO processed "
+                "(path, size, mtime_ns, status, max_z, error, processed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (os.path.abspath(path), size, mtime_ns, status, max_z,
+                 error, datetime.now().isoformat(timespec="seconds")),
+            )
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM processed"
+            ).fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+# ════════════════════════════════════════════════════════════
+# 監視
+# ════════════════════════════════════════════════════════════
+
+
+class PollingWatcher:
+    """ディレクトリを定期的に走査する監視（どのOSでも動く）。
+
+    サイズ・更新時刻が2回続けて同じになったファイルを書き込み完了とみなす。
+
+    Args:
+        data_dir: 監視するディレクトリ
+        pattern: 対象ファイル名のパターン
+        interval: 走査間隔（秒）
+    """
+
+    def __init__(
+        self, data_dir: str, pattern: str = PATTERN,
+        interval: float = POLL_INTERVAL,
+    ) -> None:
+        self.data_dir = data_dir
+        self.pattern = pattern
+        self.interval = interval
+        self._pending = {}
+        self._reported = {}
+
+    def poll(self, timeout: float = None) -> list:
+        """書き込みが終わった新しいファイルを返す（走査間隔だけ待つ）。
+
+        Args:
+            timeout: 待ち時間の上限（秒）
+
+        Returns:
+            list: ファイルパスのリスト（名前順）
+        """
+        wait = self.interval if timeout is None else min(timeout, self.interval)
+        time.sleep(wait)
+        ready = []
+        seen = {}
+        with os.scandir(self.data_dir) as it:
+            for entry in it:
+                if not fnmatch.fnmatch(entry.name, self.pattern):
+                    continue
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                sig = (st.st_size, st.st_mtime_ns)
+                seen[entry.path] = sig
+                stable = self._pending.get(entry.path) == sig
+                if stable and self._reported.get(entry.path) != sig:
+                    self._reported[entry.path] = sig
+                    ready.append(entry.path)
+        self._pending = seen
+        return sorted(ready)
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """inotify による監視（Linuxのみ）。
+
+    書き込み後のクローズ（IN_CLOSE_WRITE）と、ディレクトリへの移動（IN_MOVED_TO）を
+    書き込み完了とみなす。
+
+    Args:
+        data_dir: 監視するディレクトリ
+        pattern: 対象ファイル名のパターン
+
+    Raises:
+        OSError: inotify が使えない場合
+    """
+
+    def __init__(self, data_dir: str, pattern: str = PATTERN) -> None:
+        self.data_dir = data_dir
+        self.pattern = pattern
+        libc = ctypes.CDLL(
+            ctypes.util.find_library("c") or "libc.so.6", use_errno=True
+        )
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        wd = libc.inotify_add_watch(
+            self._fd, os.fsencode(data_dir), IN_CLOSE_WRITE | IN_MOVED_TO
+        )
+        if wd < 0:
+            err = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(err, f"inotify_add_watch failed: {data_dir}")
+
+    def poll(self, timeout: float = None) -> list:
+        """書き込みが終わった新しいファイルを返す（イベントが来るまで待つ）。
+
+        Args:
+            timeout: 待ち時間の上限（秒。None なら無期限）
+
+        Returns:
+            list: ファイルパスのリスト（名前順）
+        """
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return []
+        ready = set()
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            pos = 0
+            while pos < len(data):
+                _, mask, _, name_len = _EVENT.unpack_from(data, pos)
+                pos += _EVENT.size
+                name = os.fsdecode(data[pos:pos + name_len].rstrip(b"\0"))
+                pos += name_len
+                if mask & (IN_CLOSE_WRITE | IN_MOVED_TO) and fnmatch.fnmatch(
+                    name, self.pattern
+                ):
+                    ready.add(os.path.join(self.data_dir, name))
+        return sorted(ready)
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+def open_watcher(
+    data_dir: str, pattern: str = PATTERN, interval: float = POLL_INTERVAL,
+    use_inotify: bool = True,
+):
+    """inotify の監視を作り、使えなければポーリングにする。
+
+    Args:
+        data_dir: 監視するディレクトリ
+        pattern: 対象ファイル名のパターン
+        interval: ポーリング間隔（秒）
+        use_inotify: False なら常にポーリング
+
+    Returns:
+        InotifyWatcher または PollingWatcher
+    """
+    if use_inotify:
+        try:
+            return InotifyWatcher(data_dir, pattern)
+        except (OSError, AttributeError) as e:
+            logger.warning(f"inotify が使えないためポーリングで監視します: {e}")
+    return PollingWatcher(data_dir, pattern, interval)
+
+
+# ════════════════════════════════════════════════════════════
+# 常駐ループ
+# ════════════════════════════════════════════════════════════
+
+
+def process_file(path: str, handler, ledger: ProcessedLedger) -> bool:
+    """1ファイルを解析して台帳に記録する（エラーでも止まらない）。
+
+    Args:
+        path: CSVファイルのパス
+        handler: パスを受け取って結果dict（max_z を含む）を返す関数
+        ledger: 処理済み台帳
+
+    Returns:
+        bool: 解析に成功したかどうか
+    """
+    start = time.perf_counter()
+    try:
+        result = handler(path)
+    except Exception as e:
+        logger.error(f"解析エラー: {os.path.basename(path)}: {e}")
+        if os.path.exists(path):
+            ledger.record(path, "error", error=str(e))
+        return False
+    ledger.record(path, "ok", max_z=result.get("max_z"))
+    logger.info(
+        f"処理完了: {os.path.basename(path)} "
+        f"({(time.perf_counter() - start) * 1000:.0f} ms)"
+    )
+    return True
+
+
+def watch_directory(
+    data_dir: str,
+    handler,
+    ledger: ProcessedLedger,
+    watcher=None,
+    pattern: str = PATTERN,
+    stop: threading.Event = None,
+    timeout: float = 1.0,
+) -> None:
+    """未処理のファイルを解析してから、新しいファイルを待ち続ける。
+
+    Args:
+        data_dir: 監視するディレクトリ
+        handler: パスを受け取って結果dictを返す関数
+        ledger: 処理済み台帳
+        watcher: open_watcher の戻り値（Noneなら作る）
+        pattern: 対象ファイル名のパターン
+        stop: セットされたら終了するイベント
+        timeout: 停止要求を確認する間隔（秒）
+    """
+    stop = stop or threading.Event()
+    # 先に監視を始めてから既存ファイルを処理する（その間に届いたファイルを取りこぼさない）
+    watcher = watcher or open_watcher(data_dir, pattern)
+    logger.info(
+        f"監視開始: {data_dir} ({type(watcher).__name__} / "
+        f"処理済み {len(ledger)}件)"
+    )
+    try:
+        for path in sorted(glob.glob(os.path.join(data_dir, pattern))):
+            if stop.is_set():
+                return
+            if not ledger.is_done(path):
+                process_file(path, handler, ledger)
+        while not stop.is_set():
+            for path in watcher.poll(timeout):
+                if not ledger.is_done(path):
+                    process_file(path, handler, ledger)
+    finally:
+        watcher.close()